@@ -0,0 +1,41 @@
+"""add suggestion cache + wardrobe version
+
+Revision ID: m4n5o6p7q8r9
+Revises: l3m4n5o6p7q8
+Create Date: 2026-10-19 09:00:00.000000
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = 'm4n5o6p7q8r9'
+down_revision = 'l3m4n5o6p7q8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('user', sa.Column('wardrobe_version', sa.Integer(), nullable=False, server_default='0'))
+
+    op.create_table(
+        'suggestioncache',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('user.id'), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('weather_bucket', sa.String(), nullable=False),
+        sa.Column('wardrobe_version', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('payload', sa.String(), nullable=False, server_default='{}'),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index('ix_suggestioncache_user_id', 'suggestioncache', ['user_id'])
+    op.create_index('ix_suggestioncache_day', 'suggestioncache', ['day'])
+    op.create_index(
+        'ix_suggestioncache_user_day_bucket', 'suggestioncache', ['user_id', 'day', 'weather_bucket'], unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_suggestioncache_user_day_bucket', table_name='suggestioncache')
+    op.drop_index('ix_suggestioncache_day', table_name='suggestioncache')
+    op.drop_index('ix_suggestioncache_user_id', table_name='suggestioncache')
+    op.drop_table('suggestioncache')
+    op.drop_column('user', 'wardrobe_version')
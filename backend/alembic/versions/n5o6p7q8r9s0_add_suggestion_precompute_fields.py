@@ -0,0 +1,23 @@
+"""add precompute fields to suggestion cache
+
+Revision ID: n5o6p7q8r9s0
+Revises: m4n5o6p7q8r9
+Create Date: 2026-10-19 10:00:00.000000
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = 'n5o6p7q8r9s0'
+down_revision = 'm4n5o6p7q8r9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('suggestioncache', sa.Column('source', sa.String(), nullable=False, server_default='live'))
+    op.add_column('suggestioncache', sa.Column('forecast_temperature', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('suggestioncache', 'forecast_temperature')
+    op.drop_column('suggestioncache', 'source')
@@ -0,0 +1,46 @@
+"""add chat sessions + messages (server-side chat memory)
+
+Revision ID: o6p7q8r9s0t1
+Revises: n5o6p7q8r9s0
+Create Date: 2026-10-19 12:00:00.000000
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = 'o6p7q8r9s0t1'
+down_revision = 'n5o6p7q8r9s0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'chatsession',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('user.id'), nullable=False),
+        sa.Column('summary', sa.String(), nullable=False, server_default=''),
+        sa.Column('summarized_until', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index('ix_chatsession_user_id', 'chatsession', ['user_id'])
+    op.create_index('ix_chatsession_updated_at', 'chatsession', ['updated_at'])
+
+    op.create_table(
+        'chatmessage',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('session_id', sa.Integer(), sa.ForeignKey('chatsession.id'), nullable=False),
+        sa.Column('role', sa.String(), nullable=False),
+        sa.Column('content', sa.String(), nullable=False),
+        sa.Column('products', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index('ix_chatmessage_session_id', 'chatmessage', ['session_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chatmessage_session_id', table_name='chatmessage')
+    op.drop_table('chatmessage')
+    op.drop_index('ix_chatsession_updated_at', table_name='chatsession')
+    op.drop_index('ix_chatsession_user_id', table_name='chatsession')
+    op.drop_table('chatsession')
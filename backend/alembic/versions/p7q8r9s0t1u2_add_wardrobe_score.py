@@ -0,0 +1,30 @@
+"""add wardrobe score (persisted AI report keyed by content hash)
+
+Revision ID: p7q8r9s0t1u2
+Revises: o6p7q8r9s0t1
+Create Date: 2026-10-19 13:00:00.000000
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = 'p7q8r9s0t1u2'
+down_revision = 'o6p7q8r9s0t1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'wardrobescore',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('user.id'), nullable=False),
+        sa.Column('content_hash', sa.String(), nullable=False),
+        sa.Column('payload', sa.String(), nullable=False, server_default='{}'),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index('ix_wardrobescore_user_id', 'wardrobescore', ['user_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_wardrobescore_user_id', table_name='wardrobescore')
+    op.drop_table('wardrobescore')
@@ -0,0 +1,41 @@
+"""add wardrobe summary (per-user aggregates maintained on item writes)
+
+Revision ID: q8r9s0t1u2v3
+Revises: p7q8r9s0t1u2
+Create Date: 2026-10-19 14:00:00.000000
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = 'q8r9s0t1u2v3'
+down_revision = 'p7q8r9s0t1u2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Rows are built lazily on first access (or via rebuild_wardrobe_summaries.py)
+    op.create_table(
+        'wardrobesummary',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('user.id'), nullable=False),
+        sa.Column('total_items', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('category_counts', sa.String(), nullable=False, server_default='{}'),
+        sa.Column('colors', sa.String(), nullable=False, server_default='{}'),
+        sa.Column('seasons', sa.String(), nullable=False, server_default='{}'),
+        sa.Column('types', sa.String(), nullable=False, server_default='{}'),
+        sa.Column('styles', sa.String(), nullable=False, server_default='{}'),
+        sa.Column('look_score_sum', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('look_score_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('value_budget', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('value_moyen', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('value_premium', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('outfit_count', sa.Integer(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index('ix_wardrobesummary_user_id', 'wardrobesummary', ['user_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_wardrobesummary_user_id', table_name='wardrobesummary')
+    op.drop_table('wardrobesummary')
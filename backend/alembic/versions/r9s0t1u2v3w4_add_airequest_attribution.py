@@ -0,0 +1,21 @@
+"""add airequest.attribution (per-item token split for batch calls)
+
+Revision ID: r9s0t1u2v3w4
+Revises: q8r9s0t1u2v3
+Create Date: 2026-10-19 15:00:00.000000
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = 'r9s0t1u2v3w4'
+down_revision = 'q8r9s0t1u2v3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('airequest', sa.Column('attribution', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('airequest', 'attribution')
@@ -0,0 +1,35 @@
+"""add geocode cache + user push coordinates
+
+Revision ID: s0t1u2v3w4x5
+Revises: r9s0t1u2v3w4
+Create Date: 2026-10-19 16:00:00.000000
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = 's0t1u2v3w4x5'
+down_revision = 'r9s0t1u2v3w4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'geocodecache',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('city_key', sa.String(), nullable=False),
+        sa.Column('city', sa.String(), nullable=False),
+        sa.Column('latitude', sa.Float(), nullable=False),
+        sa.Column('longitude', sa.Float(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index('ix_geocodecache_city_key', 'geocodecache', ['city_key'], unique=True)
+    op.add_column('user', sa.Column('push_lat', sa.Float(), nullable=True))
+    op.add_column('user', sa.Column('push_lon', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('user', 'push_lon')
+    op.drop_column('user', 'push_lat')
+    op.drop_index('ix_geocodecache_city_key', table_name='geocodecache')
+    op.drop_table('geocodecache')
@@ -0,0 +1,31 @@
+"""add scheduler lease + user push timezone / last morning push
+
+Revision ID: t1u2v3w4x5y6
+Revises: s0t1u2v3w4x5
+Create Date: 2026-10-19 17:00:00.000000
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = 't1u2v3w4x5y6'
+down_revision = 's0t1u2v3w4x5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'schedulerlease',
+        sa.Column('name', sa.String(), primary_key=True),
+        sa.Column('holder', sa.String(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('acquired_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.add_column('user', sa.Column('push_timezone', sa.String(), nullable=True))
+    op.add_column('user', sa.Column('last_morning_push', sa.Date(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('user', 'last_morning_push')
+    op.drop_column('user', 'push_timezone')
+    op.drop_table('schedulerlease')
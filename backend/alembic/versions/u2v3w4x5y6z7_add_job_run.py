@@ -0,0 +1,37 @@
+"""add jobrun (checkpointed batch job progress)
+
+Revision ID: u2v3w4x5y6z7
+Revises: t1u2v3w4x5y6
+Create Date: 2026-10-19 18:00:00.000000
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = 'u2v3w4x5y6z7'
+down_revision = 't1u2v3w4x5y6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'jobrun',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('job', sa.String(), nullable=False),
+        sa.Column('run_key', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False, server_default='running'),
+        sa.Column('cursor', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('progress', sa.String(), nullable=True),
+        sa.Column('holder', sa.String(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('heartbeat_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_jobrun_job', 'jobrun', ['job'])
+    op.create_index('ix_jobrun_run_key', 'jobrun', ['run_key'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_jobrun_run_key', table_name='jobrun')
+    op.drop_index('ix_jobrun_job', table_name='jobrun')
+    op.drop_table('jobrun')
@@ -0,0 +1,44 @@
+"""add emailoutbox (transactional emails sent by the background dispatcher)
+
+Revision ID: v3w4x5y6z7a8
+Revises: u2v3w4x5y6z7
+Create Date: 2026-10-19 20:00:00.000000
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = 'v3w4x5y6z7a8'
+down_revision = 'u2v3w4x5y6z7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'emailoutbox',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('template', sa.String(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('recipient', sa.String(), nullable=False),
+        sa.Column('subject', sa.String(), nullable=False),
+        sa.Column('html', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('last_error', sa.String(), nullable=True),
+        sa.Column('provider_id', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_emailoutbox_template', 'emailoutbox', ['template'])
+    op.create_index('ix_emailoutbox_user_id', 'emailoutbox', ['user_id'])
+    op.create_index('ix_emailoutbox_status', 'emailoutbox', ['status'])
+    op.create_index('ix_emailoutbox_next_attempt_at', 'emailoutbox', ['next_attempt_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_emailoutbox_next_attempt_at', table_name='emailoutbox')
+    op.drop_index('ix_emailoutbox_status', table_name='emailoutbox')
+    op.drop_index('ix_emailoutbox_user_id', table_name='emailoutbox')
+    op.drop_index('ix_emailoutbox_template', table_name='emailoutbox')
+    op.drop_table('emailoutbox')
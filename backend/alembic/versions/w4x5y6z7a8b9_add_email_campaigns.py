@@ -0,0 +1,41 @@
+"""add campaignsend + user locale, indexes for the campaign selection
+
+Revision ID: w4x5y6z7a8b9
+Revises: v3w4x5y6z7a8
+Create Date: 2026-10-19 21:00:00.000000
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = 'w4x5y6z7a8b9'
+down_revision = 'v3w4x5y6z7a8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'campaignsend',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('campaign', sa.String(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('anchor', sa.Date(), nullable=False),
+        sa.Column('dedupe_key', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index('ix_campaignsend_campaign', 'campaignsend', ['campaign'])
+    op.create_index('ix_campaignsend_user_id', 'campaignsend', ['user_id'])
+    op.create_index('ix_campaignsend_dedupe_key', 'campaignsend', ['dedupe_key'], unique=True)
+    op.add_column('user', sa.Column('locale', sa.String(), nullable=False, server_default='fr'))
+    op.create_index('ix_user_streak_last_activity', 'user', ['streak_last_activity'])
+    op.create_index('ix_user_created_at', 'user', ['created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_created_at', table_name='user')
+    op.drop_index('ix_user_streak_last_activity', table_name='user')
+    op.drop_column('user', 'locale')
+    op.drop_index('ix_campaignsend_dedupe_key', table_name='campaignsend')
+    op.drop_index('ix_campaignsend_user_id', table_name='campaignsend')
+    op.drop_index('ix_campaignsend_campaign', table_name='campaignsend')
+    op.drop_table('campaignsend')
@@ -0,0 +1,30 @@
+"""add storedimage (refcounts of content-addressed images)
+
+Revision ID: x5y6z7a8b9c0
+Revises: w4x5y6z7a8b9
+Create Date: 2026-10-19 22:00:00.000000
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = 'x5y6z7a8b9c0'
+down_revision = 'w4x5y6z7a8b9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'storedimage',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('path', sa.String(), nullable=False),
+        sa.Column('size_bytes', sa.Integer(), nullable=False),
+        sa.Column('refcount', sa.Integer(), nullable=False, server_default='1'),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index('ix_storedimage_path', 'storedimage', ['path'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_storedimage_path', table_name='storedimage')
+    op.drop_table('storedimage')
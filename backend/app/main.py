@@ -16,8 +16,9 @@ if _SENTRY_DSN:
     )
 
 from datetime import date as _date
+from typing import Optional
 
-from fastapi import FastAPI, Depends, HTTPException, Request
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
@@ -31,13 +32,20 @@ from slowapi.middleware import SlowAPIMiddleware
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import init_db, get_session
-from app.models import User, ClothingItem, MarketplaceListing
+from app.models import User
 from app.routers import wardrobe, users, admin, outfit_calendar, push, billing, shop, orders, addresses
 from app.routers.users import update_streak
-from app.services.weather_cron import start_scheduler, stop_scheduler
+from app.services.weather_cron import close_http_client, local_date, start_scheduler, stop_scheduler
 from app.services.ai_suggestions import get_daily_suggestions
 from app.services.ai_service import chat_with_stylist
 from app.services.ai_base import drain_pending_requests
+from app.services import (
+    chat_answer_cache, chat_memory, email_outbox, listing_snapshot, push_service, scheduler_lease, storage_service,
+    suggestion_cache, wardrobe_score,
+)
+from app.services.ai_chat import FALLBACK_REPLIES
+from app.services.suggestion_precompute import load_wardrobe_items, user_profile
+from app.services.outfit_engine import compose_outfits
 from app.models import AIRequest
 from app.auth import get_current_user
 
@@ -58,7 +66,9 @@ class WeatherRequest(BaseModel):
 
 class ChatRequest(BaseModel):
     message: str
-    history: list = []
+    session_id: Optional[int] = None   # omitted → latest active conversation (see chat_memory)
+    new_session: bool = False
+    history: list = []                 # deprecated — ignored, history is kept server-side
 
     @field_validator("message")
     @classmethod
@@ -88,6 +98,16 @@ async def lifespan(_app: FastAPI):
     logger.info("Digital Stylist API démarrée")
     yield
     stop_scheduler(_app)
+    try:
+        await scheduler_lease.release()
+    except Exception as exc:
+        logger.warning("Scheduler lease release failed: %s", exc)
+    await close_http_client()
+    await push_service.close()
+    await email_outbox.close()
+    await storage_service.close()
+    await chat_memory.wait_for_summaries()
+    wardrobe_score.cancel_pending()
 
 app = FastAPI(title="Digital Stylist API", lifespan=lifespan)
 app.state.limiter = limiter
@@ -166,6 +186,23 @@ async def daily_suggestions(
         raise HTTPException(status_code=403, detail="Accès refusé")
 
     today = _date.today()
+    day = local_date(current_user)  # cache key: the user's own day, as the push and precompute use
+    bucket = suggestion_cache.weather_bucket(weather_data.temperature, weather_data.description)
+
+    # Repeat view: same day, same weather bucket, unchanged wardrobe → no Gemini call,
+    # and it does not count against the free daily quota.
+    cached = await suggestion_cache.get_cached(
+        session, user_id, day, bucket, current_user.wardrobe_version,
+    )
+    if cached is None:
+        # Overnight precompute, as long as the forecast it used still holds
+        cached = await suggestion_cache.get_precomputed(
+            session, user_id, day, current_user.wardrobe_version,
+            weather_data.temperature, weather_data.description,
+        )
+    if cached is not None:
+        return {**cached, "cached": True}
+
     if not current_user.is_premium:
         if current_user.suggestions_date == today and current_user.suggestions_count_today >= FREE_SUGGESTIONS_PER_DAY:
             raise HTTPException(
@@ -173,42 +210,13 @@ async def daily_suggestions(
                 detail=f"Limite atteinte ({FREE_SUGGESTIONS_PER_DAY} suggestion/jour en version gratuite). Passez à Premium pour un accès illimité."
             )
 
-    profile = {
-        "prenom": current_user.prenom,
-        "genre": current_user.genre,
-        "age": current_user.age,
-        "morphologie": current_user.morphologie,
-    }
+    profile = user_profile(current_user)
+    wardrobe_items = await load_wardrobe_items(session, user_id)
 
-    # Fetch user's wardrobe items
-    from sqlmodel import select
-    wardrobe_result = await session.execute(
-        select(ClothingItem).where(
-            ClothingItem.user_id == user_id,
-            ClothingItem.category == "wardrobe",
-        )
+    # Active marketplace listings (exclude user's own) — served from the in-memory snapshot
+    marketplace_listings = await listing_snapshot.get_active_listings(
+        session, exclude_seller_id=user_id, limit=50,
     )
-    wardrobe_items = [
-        {"id": it.id, "type": it.type, "couleur": it.couleur, "saison": it.saison, "tags_ia": it.tags_ia}
-        for it in wardrobe_result.scalars().all()
-    ]
-
-    # Fetch active marketplace listings (exclude user's own)
-    marketplace_result = await session.execute(
-        select(MarketplaceListing).where(
-            MarketplaceListing.status == "active",
-            MarketplaceListing.seller_id != user_id,
-        ).limit(50)
-    )
-    marketplace_listings = [
-        {
-            "id": ls.id, "title": ls.title, "brand": ls.brand,
-            "price_cents": ls.price_cents, "condition": ls.condition,
-            "category_type": ls.category_type, "color": ls.color,
-            "season": ls.season, "size": ls.size,
-        }
-        for ls in marketplace_result.scalars().all()
-    ]
 
     result = await get_daily_suggestions(
         profile, weather_data.model_dump(),
@@ -217,6 +225,12 @@ async def daily_suggestions(
         user_id=user_id,
     )
 
+    # Local-engine fallback (Gemini down) is not cached: the next view retries Gemini
+    if result.get("suggestions") and result.get("source") != "local":
+        await suggestion_cache.store(
+            session, user_id, day, bucket, current_user.wardrobe_version, result,
+        )
+
     # Increment counter + streak after successful generation
     current_user.suggestions_count_today = (
         (current_user.suggestions_count_today + 1) if current_user.suggestions_date == today else 1
@@ -234,6 +248,35 @@ async def daily_suggestions(
     return result
 
 
+@app.post("/suggestions/{user_id}/preview")
+@limiter.limit("60/hour")
+async def suggestions_preview(
+    request: Request,
+    user_id: int,
+    weather_data: WeatherRequest,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Instant looks from the local outfit engine — no Gemini call, no quota."""
+    if current_user.id != user_id:
+        raise HTTPException(status_code=403, detail="Accès refusé")
+    wardrobe_items = await load_wardrobe_items(session, user_id)
+    return compose_outfits(user_profile(current_user), weather_data.model_dump(), wardrobe_items)
+
+
+@app.get("/suggestions/{user_id}/history")
+async def suggestions_history(
+    user_id: int,
+    limit: int = Query(30, ge=1, le=90),
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Past days' suggestions (latest payload per day, newest first)."""
+    if current_user.id != user_id:
+        raise HTTPException(status_code=403, detail="Accès refusé")
+    return {"history": await suggestion_cache.list_history(session, user_id, limit=limit)}
+
+
 @app.post("/chat/{user_id}")
 @limiter.limit("30/hour")
 async def chat_endpoint(
@@ -260,7 +303,21 @@ async def chat_endpoint(
         "age": current_user.age,
         "morphologie": current_user.morphologie,
     }
-    result = await chat_with_stylist(profile, body.message, body.history, user_id=user_id)
+    chat = await chat_memory.get_or_create_session(
+        session, user_id, session_id=body.session_id, new_session=body.new_session,
+    )
+    summary, history = await chat_memory.prompt_context(session, chat)
+
+    # Stand-alone opening question: near-duplicates of recent ones are answered from cache
+    standalone = not history and not summary
+    cached = chat_answer_cache.lookup(profile, body.message) if standalone else None
+    if cached is not None:
+        result = {**cached, "cached": True}
+    else:
+        result = await chat_with_stylist(profile, body.message, history, user_id=user_id, summary=summary)
+        if standalone and result.get("reply") not in FALLBACK_REPLIES:
+            chat_answer_cache.store(profile, body.message, result)
+    await chat_memory.append_turn(session, chat, body.message, result)
 
     current_user.chat_count_today = (
         (current_user.chat_count_today + 1) if current_user.chat_date == today else 1
@@ -275,4 +332,26 @@ async def chat_endpoint(
 
     await session.commit()
 
-    return result
+    # history + the turn just stored
+    if chat_memory.needs_summary(len(history) + 2):
+        chat_memory.schedule_summary(chat.id, user_id=user_id)
+
+    return {**result, "session_id": chat.id}
+
+
+@app.get("/chat/{user_id}/sessions/{session_id}")
+async def chat_session_messages(
+    user_id: int,
+    session_id: int,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Messages of a conversation (oldest first) — lets the app restore the chat screen."""
+    if current_user.id != user_id:
+        raise HTTPException(status_code=403, detail="Accès refusé")
+    chat = await chat_memory.get_or_create_session(session, user_id, session_id=session_id)
+    return {
+        "session_id": chat.id,
+        "messages": await chat_memory.list_messages(session, chat, limit=limit),
+    }
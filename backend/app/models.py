@@ -1,6 +1,7 @@
 from typing import Optional, List
 from datetime import datetime, timezone, date
 from enum import Enum
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel, Relationship
 
 
@@ -29,7 +30,7 @@ class UserBase(SQLModel):
     genre: str = Field(default="Homme")
     age: int = Field(default=25)
     style_prefere: Optional[str] = None
-    created_at: datetime = Field(default_factory=_utcnow)
+    created_at: datetime = Field(default_factory=_utcnow, index=True)
 
 # Database model
 class User(UserBase, table=True):
@@ -49,12 +50,19 @@ class User(UserBase, table=True):
     fcm_token: Optional[str] = Field(default=None, index=True)
     push_notifications_enabled: bool = Field(default=False)
     push_city: Optional[str] = Field(default=None)
+    push_lat: Optional[float] = Field(default=None)  # resolved from push_city (weather_cache)
+    push_lon: Optional[float] = Field(default=None)
+    push_timezone: Optional[str] = Field(default=None)  # IANA, from the coordinates (gazetteer)
+    last_morning_push: Optional[date] = Field(default=None)  # user's local date of the last push
     # Streak / gamification
     streak_current: int = Field(default=0)
     streak_max: int = Field(default=0)
-    streak_last_activity: Optional[date] = Field(default=None)
+    streak_last_activity: Optional[date] = Field(default=None, index=True)
     # Email (optional — collected post-onboarding for transactional emails)
     email: Optional[str] = Field(default=None, index=True)
+    locale: str = Field(default="fr")  # language of the emails (email_service.LOCALES)
+    # Bumped on every wardrobe upload / update / delete — part of the suggestion cache key
+    wardrobe_version: int = Field(default=0)
     clothing_items: List["ClothingItem"] = Relationship(back_populates="user")
     link_clicks: List["LinkClick"] = Relationship(back_populates="user")
     outfit_plans: List["OutfitPlan"] = Relationship(back_populates="user")
@@ -75,6 +83,7 @@ class UserRead(UserBase):
     streak_current: int = 0
     streak_max: int = 0
     streak_last_activity: Optional[date] = None
+    locale: str = "fr"
 
 # Shared properties
 class ClothingItemBase(SQLModel):
@@ -147,6 +156,161 @@ class OutfitPlanRead(OutfitPlanBase):
     id: int
 
 
+# ---------------------------------------------------------------------------
+# Geocoding cache — city name → coordinates, shared by all users of a city
+# ---------------------------------------------------------------------------
+class GeocodeCache(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    city_key: str = Field(unique=True, index=True)  # see weather_cache.city_key
+    city: str                                       # as first requested
+    latitude: float
+    longitude: float
+    created_at: datetime = Field(default_factory=_utcnow)
+
+
+# ---------------------------------------------------------------------------
+# Scheduler lease — the one worker allowed to run scheduled jobs (see scheduler_lease)
+# ---------------------------------------------------------------------------
+class SchedulerLease(SQLModel, table=True):
+    name: str = Field(primary_key=True)
+    holder: str
+    expires_at: datetime
+    acquired_at: datetime = Field(default_factory=_utcnow)
+
+
+# ---------------------------------------------------------------------------
+# Job runs — progress checkpoint of batch jobs over users (see job_runs)
+# ---------------------------------------------------------------------------
+class JobRun(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    job: str = Field(index=True)                      # "morning_push", "suggestion_precompute"
+    run_key: str = Field(unique=True, index=True)     # "<job>:<scheduled time or day>"
+    status: str = Field(default="running")            # running / done / abandoned
+    cursor: int = Field(default=0)                    # last user id fully processed
+    progress: Optional[str] = Field(default=None)     # JSON report so far
+    holder: str                                       # worker id (scheduler_lease.WORKER_ID)
+    started_at: datetime = Field(default_factory=_utcnow)
+    heartbeat_at: datetime = Field(default_factory=_utcnow)
+    finished_at: Optional[datetime] = Field(default=None)
+
+
+# ---------------------------------------------------------------------------
+# Email outbox — transactional emails queued with the change that triggers them,
+# sent in batches by a background dispatcher (see email_outbox)
+# ---------------------------------------------------------------------------
+class EmailOutbox(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    template: str = Field(index=True)                 # "welcome", "winback_day7", …
+    user_id: Optional[int] = Field(default=None, index=True)
+    recipient: str
+    subject: str
+    html: str
+    status: str = Field(default="pending", index=True)  # pending / sent / failed
+    attempts: int = Field(default=0)
+    next_attempt_at: datetime = Field(default_factory=_utcnow, index=True)
+    last_error: Optional[str] = Field(default=None)
+    provider_id: Optional[str] = Field(default=None)  # Resend email id
+    created_at: datetime = Field(default_factory=_utcnow)
+    sent_at: Optional[datetime] = Field(default=None)
+
+
+# One row per campaign email queued to a user, so nobody gets the same campaign twice
+# for the same ``anchor`` (last activity day for win-back, signup day for upgrade)
+class CampaignSend(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    campaign: str = Field(index=True)                 # "winback_day7", "upgrade_reminder"
+    user_id: int = Field(index=True)
+    anchor: date
+    dedupe_key: str = Field(unique=True, index=True)  # "<campaign>:<user_id>:<anchor>"
+    created_at: datetime = Field(default_factory=_utcnow)
+
+
+# ---------------------------------------------------------------------------
+# Stored images — content-addressed objects shared by every row that points at them
+# (see storage_service); the object is deleted with its last reference
+# ---------------------------------------------------------------------------
+class StoredImage(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    path: str = Field(unique=True, index=True)        # as stored in image_path / image_urls
+    size_bytes: int
+    refcount: int = Field(default=1)                  # items + listings using it
+    created_at: datetime = Field(default_factory=_utcnow)
+
+
+# ---------------------------------------------------------------------------
+# Daily suggestion cache — one generated payload per user/day/weather/wardrobe
+# ---------------------------------------------------------------------------
+class SuggestionCache(SQLModel, table=True):
+    __table_args__ = (
+        # One entry per key: concurrent generations / precompute + live request upsert the same row
+        Index("ix_suggestioncache_user_day_bucket", "user_id", "day", "weather_bucket", unique=True),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    day: date = Field(index=True)
+    weather_bucket: str            # e.g. "15:pluie" — see suggestion_cache.weather_bucket
+    wardrobe_version: int = Field(default=0)
+    payload: str = Field(default="{}")  # JSON suggestions response
+    source: str = Field(default="live")  # "live" | "precompute"
+    forecast_temperature: Optional[float] = Field(default=None)  # precompute only
+    created_at: datetime = Field(default_factory=_utcnow)
+
+
+# ---------------------------------------------------------------------------
+# Wardrobe score — last AI report per user, keyed by a hash of its inputs
+# ---------------------------------------------------------------------------
+class WardrobeScore(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id", unique=True, index=True)
+    content_hash: str              # see wardrobe_score.content_hash
+    payload: str = Field(default="{}")  # JSON score_wardrobe response
+    updated_at: datetime = Field(default_factory=_utcnow)
+
+
+# ---------------------------------------------------------------------------
+# Wardrobe summary — per-user aggregates maintained on every item write
+# ---------------------------------------------------------------------------
+class WardrobeSummary(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id", unique=True, index=True)
+    total_items: int = 0                     # all categories (freemium quota)
+    category_counts: str = Field(default="{}")  # JSON {category: count}
+    # Histograms below cover the "wardrobe" category only (what analytics shows)
+    colors: str = Field(default="{}")        # JSON {couleur: count}
+    seasons: str = Field(default="{}")
+    types: str = Field(default="{}")
+    styles: str = Field(default="{}")
+    look_score_sum: float = 0.0
+    look_score_count: int = 0
+    value_budget: float = 0.0                # sums of prix_total_look.*.min
+    value_moyen: float = 0.0
+    value_premium: float = 0.0
+    outfit_count: Optional[int] = None       # None = stale, recomputed on next read
+    updated_at: datetime = Field(default_factory=_utcnow)
+
+
+# ---------------------------------------------------------------------------
+# Chat memory — server-side conversations with a rolling summary
+# ---------------------------------------------------------------------------
+class ChatSession(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    summary: str = Field(default="")        # compacted older turns — see chat_memory
+    summarized_until: int = Field(default=0)  # last ChatMessage.id folded into the summary
+    created_at: datetime = Field(default_factory=_utcnow)
+    updated_at: datetime = Field(default_factory=_utcnow, index=True)
+
+
+class ChatMessage(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    session_id: int = Field(foreign_key="chatsession.id", index=True)
+    role: str                                 # "user" | "assistant"
+    content: str
+    products: Optional[str] = Field(default=None)  # JSON list, assistant turns only
+    created_at: datetime = Field(default_factory=_utcnow)
+
+
 # ---------------------------------------------------------------------------
 # AI Request Tracking — every Gemini call is logged
 # ---------------------------------------------------------------------------
@@ -176,8 +340,10 @@ class AIRequestType(str, Enum):
     ANALYZE = "analyze"
     SUGGEST = "suggest"
     CHAT = "chat"
+    CHAT_SUMMARY = "chat_summary"
     SCORE = "score"
     PUSH_CRON = "push_cron"
+    PRICING_BATCH = "pricing_batch"
 
 
 class AIRequest(SQLModel, table=True):
@@ -190,6 +356,8 @@ class AIRequest(SQLModel, table=True):
     duration_ms: int = Field(default=0)
     status: str = Field(default="success")       # "success" | "error" | "blocked"
     error_message: Optional[str] = Field(default=None)
+    # Batch calls: JSON [{"listing_id": 12, "input_tokens": 80, "output_tokens": 25}, …]
+    attribution: Optional[str] = Field(default=None)
     created_at: datetime = Field(default_factory=_utcnow, index=True)
 
 
@@ -11,7 +11,11 @@ load_dotenv()
 
 from app.database import get_session
 from app.models import User, ClothingItem, LinkClick, AIRequest
-from app.services import storage_service
+from app.services import chat_answer_cache, email_outbox, storage_service
+from app.services.chat_memory import delete_user_chats
+from app.services.wardrobe_score import delete_user_score
+from app.services import wardrobe_summary
+from app.services.wardrobe_summary import delete_user_summary
 from app.services.ai_base import (
     AVAILABLE_MODELS,
     get_active_model,
@@ -102,12 +106,9 @@ async def delete_user_cascade(
     )
     items = items_result.scalars().all()
 
-    deleted_files = 0
     for item in items:
-        if item.image_path:
-            await storage_service.delete_image(item.image_path)
-            deleted_files += 1
         await session.delete(item)
+    released = await storage_service.delete_images(session, [item.image_path for item in items])
 
     # Delete AI request logs
     ai_result = await session.execute(
@@ -116,8 +117,14 @@ async def delete_user_cascade(
     for ai_req in ai_result.scalars().all():
         await session.delete(ai_req)
 
+    await delete_user_chats(session, user_id)
+    await delete_user_score(session, user_id)
+    await delete_user_summary(session, user_id)
+    await email_outbox.delete_user_emails(session, user_id)
+
     await session.delete(user)
     await session.commit()
+    deleted_files = await storage_service.remove_objects(session, released)
 
     return {
         "message": f"Utilisateur '{user.prenom}' supprimé avec succès",
@@ -126,6 +133,17 @@ async def delete_user_cascade(
     }
 
 
+@router.post("/wardrobe-summaries/rebuild")
+async def rebuild_wardrobe_summaries(
+    admin: bool = Depends(verify_admin),
+    session: AsyncSession = Depends(get_session),
+):
+    """Recompute every user's WardrobeSummary from their items and report drift."""
+    report = await wardrobe_summary.rebuild_all(session)
+    logger.info("Wardrobe summaries rebuilt: %d users, %d drifted", report["users"], report["drifted"])
+    return report
+
+
 # ---------------------------------------------------------------------------
 # Platform Stats (enhanced)
 # ---------------------------------------------------------------------------
@@ -382,6 +400,32 @@ async def get_ai_stats(
     }
 
 
+@router.get("/ai/chat-cache")
+async def get_chat_cache_stats(
+    admin: bool = Depends(verify_admin),
+):
+    """Near-duplicate chat answer cache metrics (this worker)."""
+    return chat_answer_cache.stats()
+
+
+@router.get("/emails/stats")
+async def get_email_stats(
+    admin: bool = Depends(verify_admin),
+    session: AsyncSession = Depends(get_session),
+):
+    """Email outbox per template: rows by status + send metrics (this worker)."""
+    return await email_outbox.stats(session)
+
+
+@router.get("/storage/stats")
+async def get_storage_stats(
+    admin: bool = Depends(verify_admin),
+    session: AsyncSession = Depends(get_session),
+):
+    """Image storage backend, S3 request latency per operation (this worker), bytes saved by dedup."""
+    return {**storage_service.stats(), "dedup": await storage_service.dedup_report(session)}
+
+
 @router.get("/ai/models")
 async def list_ai_models(
     admin: bool = Depends(verify_admin),
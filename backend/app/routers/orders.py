@@ -25,6 +25,7 @@ from app.models import (
     User, MarketplaceListing, MarketplaceOrder,
     ShippingAddress, OrderRead,
 )
+from app.services import listing_snapshot
 
 logger = logging.getLogger(__name__)
 
@@ -132,8 +133,10 @@ async def checkout(
         # Dev mode — auto-confirm without Stripe
         order.paid_at = datetime.now(timezone.utc)
         listing.status = "sold"
+        listing.updated_at = order.paid_at
         session.add(listing)
         await session.commit()
+        listing_snapshot.invalidate()
         logger.info("Order %d created (dev mode, no Stripe)", order.id)
         return {"order_id": order.id, "checkout_url": None, "dev_mode": True}
 
@@ -208,9 +211,11 @@ async def marketplace_webhook(
             listing = await session.get(MarketplaceListing, order.listing_id)
             if listing:
                 listing.status = "sold"
+                listing.updated_at = order.paid_at
                 session.add(listing)
 
             await session.commit()
+            listing_snapshot.invalidate()
             logger.info("Marketplace order %d paid via webhook", order_id)
 
     return {"received": True}
@@ -14,6 +14,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.auth import get_current_user
 from app.database import get_session
 from app.models import User
+from app.services import gazetteer, weather_cache
 
 logger = logging.getLogger(__name__)
 
@@ -36,10 +37,16 @@ async def register_fcm_token(
     if current_user.id != user_id:
         raise HTTPException(status_code=403, detail="Accès refusé")
 
+    if body.city and body.city != current_user.push_city:
+        # Resolved once here so the morning cron can group users by location
+        coords = await weather_cache.resolve_city(session, body.city)
+        current_user.push_city = body.city
+        current_user.push_lat, current_user.push_lon = coords or (None, None)
+        # Local time of the morning push; the cron derives it lazily when unknown here
+        current_user.push_timezone = gazetteer.timezone_at(*coords) if coords else None
+
     current_user.fcm_token = body.fcm_token
     current_user.push_notifications_enabled = True
-    if body.city:
-        current_user.push_city = body.city
     session.add(current_user)
     await session.commit()
 
@@ -9,13 +9,16 @@ POST /shop/listings                  — create listing (auth)
 POST /shop/listings/from-wardrobe/{item_id} — create from wardrobe item (auth)
 PUT  /shop/listings/{listing_id}     — update listing (auth, owner only)
 DELETE /shop/listings/{listing_id}   — cancel listing (auth, owner only)
-POST /shop/listings/{listing_id}/ai-price — AI price suggestion (auth)
+POST /shop/listings/{listing_id}/ai-price — price suggestion, local history first then AI (auth)
+POST /shop/listings/ai-price         — same for many listings, batched AI calls (auth)
 """
 import json
 import logging
+from datetime import datetime, timezone
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, Field
 from sqlalchemy import func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
@@ -27,7 +30,8 @@ from app.models import (
     ListingCreate, ListingUpdate, ListingRead,
     AIRequest,
 )
-from app.services.ai_pricing import suggest_listing_price
+from app.services import listing_snapshot, price_estimator, storage_service
+from app.services.ai_pricing import suggest_listing_price, suggest_listing_prices
 from app.services.ai_base import drain_pending_requests
 
 logger = logging.getLogger(__name__)
@@ -35,6 +39,7 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/shop", tags=["marketplace"])
 
 SHIPPING_FLAT_CENTS = 499  # €4.99 flat shipping
+BULK_PRICE_MAX_LISTINGS = 100
 
 
 def _listing_to_read(listing: MarketplaceListing, seller_prenom: Optional[str] = None) -> dict:
@@ -215,8 +220,11 @@ async def create_listing(
         status="active",
     )
     session.add(listing)
+    # Kept if the item is deleted — only the seller's own item pictures
+    await storage_service.retain_images(session, current_user.id, body.image_urls)
     await session.commit()
     await session.refresh(listing)
+    listing_snapshot.invalidate()
     logger.info("Listing %d created by user %d", listing.id, current_user.id)
     return _listing_to_read(listing, current_user.prenom)
 
@@ -276,10 +284,12 @@ async def update_listing(
     update_data = body.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(listing, key, value)
+    listing.updated_at = datetime.now(timezone.utc)
 
     session.add(listing)
     await session.commit()
     await session.refresh(listing)
+    listing_snapshot.invalidate()
     return _listing_to_read(listing, current_user.prenom)
 
 
@@ -299,36 +309,91 @@ async def cancel_listing(
         raise HTTPException(status_code=400, detail="Impossible de supprimer une annonce vendue")
 
     listing.status = "cancelled"
+    listing.updated_at = datetime.now(timezone.utc)
     session.add(listing)
     await session.commit()
+    listing_snapshot.invalidate()
     logger.info("Listing %d cancelled by user %d", listing_id, current_user.id)
     return {"ok": True}
 
 
+def _pricing_item(listing: MarketplaceListing) -> dict:
+    return {
+        "type": listing.category_type or listing.title,
+        "brand": listing.brand or "",
+        "condition": listing.condition,
+        "season": listing.season,
+        "color": listing.color,
+        "tags_ia": "",
+    }
+
+
+class BulkPriceRequest(BaseModel):
+    listing_ids: list[int] = Field(min_length=1, max_length=BULK_PRICE_MAX_LISTINGS)
+
+
+@router.post("/listings/ai-price")
+async def bulk_ai_price_suggestion(
+    body: BulkPriceRequest,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Price suggestions for many listings: local history first, the rest in batched Gemini calls."""
+    listing_ids = list(dict.fromkeys(body.listing_ids))
+    result = await session.execute(
+        select(MarketplaceListing).where(MarketplaceListing.id.in_(listing_ids))
+    )
+    listings = {listing.id: listing for listing in result.scalars().all()}
+    if len(listings) != len(listing_ids):
+        raise HTTPException(status_code=404, detail="Annonce introuvable")
+    if any(listing.seller_id != current_user.id for listing in listings.values()):
+        raise HTTPException(status_code=403, detail="Accès refusé")
+
+    prices: dict[int, dict] = {}
+    to_ai: list[dict] = []
+    for listing_id in listing_ids:
+        item_data = _pricing_item(listings[listing_id])
+        local = await price_estimator.estimate(session, item_data)
+        if local and local["confidence"] >= price_estimator.PRICE_MIN_CONFIDENCE:
+            prices[listing_id] = local
+        else:
+            to_ai.append({**item_data, "listing_id": listing_id, "local_estimate": local})
+
+    if to_ai:
+        for listing_id, suggestion in (await suggest_listing_prices(to_ai, user_id=current_user.id)).items():
+            prices[listing_id] = {**suggestion, "source": "ai"}
+        for entry in drain_pending_requests():
+            session.add(AIRequest(**entry))
+        await session.commit()
+
+    logger.info("Bulk pricing for user %d: %d listings, %d via AI", current_user.id, len(listing_ids), len(to_ai))
+    return {
+        "results": [{"listing_id": listing_id, **prices[listing_id]} for listing_id in listing_ids],
+        "local_count": len(listing_ids) - len(to_ai),
+        "ai_count": len(to_ai),
+    }
+
+
 @router.post("/listings/{listing_id}/ai-price")
 async def ai_price_suggestion(
     listing_id: int,
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ):
-    """Get AI price suggestion for a listing."""
+    """Price suggestion for a listing: sold-listing history when confident, else Gemini."""
     listing = await session.get(MarketplaceListing, listing_id)
     if not listing:
         raise HTTPException(status_code=404, detail="Annonce introuvable")
     if listing.seller_id != current_user.id:
         raise HTTPException(status_code=403, detail="Accès refusé")
 
-    result = await suggest_listing_price(
-        {
-            "type": listing.category_type or listing.title,
-            "brand": listing.brand or "",
-            "condition": listing.condition,
-            "season": listing.season,
-            "color": listing.color,
-            "tags_ia": "",
-        },
-        user_id=current_user.id,
-    )
+    item_data = _pricing_item(listing)
+    local = await price_estimator.estimate(session, item_data)
+    if local and local["confidence"] >= price_estimator.PRICE_MIN_CONFIDENCE:
+        return local
+
+    result = await suggest_listing_price(item_data, user_id=current_user.id, local_estimate=local)
+    result["source"] = "ai"
 
     # Flush AI request logs
     for entry in drain_pending_requests():
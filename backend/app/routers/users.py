@@ -14,7 +14,12 @@ from typing import List, Optional
 from app.database import get_session
 from app.models import User, UserRead, UserCreate, LinkClick, LinkClickCreate, LinkClickRead, ClothingItem
 from app.auth import create_access_token, get_current_user
-from app.services.email_service import send_welcome_email
+from app.services.email_outbox import delete_user_emails
+from app.services.email_service import LOCALES, queue_email
+from app.services.chat_memory import delete_user_chats
+from app.services.storage_service import delete_images, remove_objects
+from app.services.wardrobe_score import delete_user_score
+from app.services.wardrobe_summary import delete_user_summary
 
 logger = logging.getLogger(__name__)
 
@@ -70,6 +75,7 @@ class UpdateUserRequest(BaseModel):
     age: Optional[int] = None
     style_prefere: Optional[str] = None
     email: Optional[str] = None
+    locale: Optional[str] = None
 
 
 @router.post("/create")
@@ -120,6 +126,10 @@ async def create_user(
         referred_by_id=referrer.id if referrer else None,
     )
     session.add(user)
+    if email:
+        # Welcome email committed with the user, sent by the outbox dispatcher
+        await session.flush()
+        queue_email(session, "welcome", to=email, user_id=user.id, locale=user.locale, prenom=user.prenom)
     await session.commit()
     await session.refresh(user)
 
@@ -142,11 +152,6 @@ async def create_user(
     token = create_access_token(user.id, remember_me=True)
     logger.info("User created: id=%d email=%s referred_by=%s", user.id, email, referrer.id if referrer else None)
 
-    # Fire-and-forget welcome email
-    if email:
-        import asyncio
-        asyncio.create_task(send_welcome_email(to=email, prenom=user.prenom))
-
     return {"user": UserRead.model_validate(user).model_dump(), "token": token}
 
 
@@ -245,6 +250,9 @@ async def update_user(
             raise HTTPException(status_code=409, detail="Cet email est déjà utilisé")
         update_data["email"] = new_email
 
+    if "locale" in update_data and update_data["locale"] not in LOCALES:
+        raise HTTPException(status_code=400, detail="Langue non prise en charge")
+
     for field, value in update_data.items():
         setattr(user, field, value)
 
@@ -272,13 +280,21 @@ async def delete_user(
     for click in result.scalars().all():
         await session.delete(click)
 
-    # Delete clothing items
+    # Delete clothing items, then their images in bulk
     result = await session.execute(select(ClothingItem).where(ClothingItem.user_id == user_id))
-    for item in result.scalars().all():
+    items = result.scalars().all()
+    for item in items:
         await session.delete(item)
+    released = await delete_images(session, [item.image_path for item in items])
+
+    await delete_user_chats(session, user_id)
+    await delete_user_score(session, user_id)
+    await delete_user_summary(session, user_id)
+    await delete_user_emails(session, user_id)
 
     await session.delete(user)
     await session.commit()
+    await remove_objects(session, released)  # only once the rows are gone for good
     return {"message": "Compte supprimé avec succès"}
 
 
@@ -1,16 +1,17 @@
 import os
-import json
 import logging
-from collections import Counter
 from typing import List, Optional
 from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlmodel import select, func
+from sqlmodel import select
 
 from app.database import get_session
 from app.models import ClothingItem, User, ClothingItemRead, AIRequest
 from app.services import ai_service
 from app.services import storage_service
+from app.services import wardrobe_score
+from app.services import wardrobe_summary
+from app.services.suggestion_cache import bump_wardrobe_version
 from app.services.ai_base import drain_pending_requests
 from app.auth import get_current_user
 
@@ -59,10 +60,8 @@ async def upload_clothing_item(
     # Freemium limit: free users can store at most 20 items total
     FREE_LIMIT = 20
     if not current_user.is_premium:
-        item_count = (await session.execute(
-            select(func.count(ClothingItem.id)).where(ClothingItem.user_id == user_id)
-        )).scalar_one()
-        if item_count >= FREE_LIMIT:
+        summary = await wardrobe_summary.get_or_build(session, user_id)
+        if summary.total_items >= FREE_LIMIT:
             raise HTTPException(
                 status_code=403,
                 detail=f"Limite gratuite atteinte ({FREE_LIMIT} pièces). Passez à Premium pour en ajouter plus."
@@ -99,16 +98,17 @@ async def upload_clothing_item(
             save_content = content
             save_ext = MIME_TO_EXT[file.content_type]
 
-    # Persist image via storage service (local disk or S3/R2 CDN)
+    # Send original (non-removed) content to Gemini — richer color/detail for analysis
+    analysis = await ai_service.analyze_clothing_image(content, mime_type=file.content_type or "image/jpeg", user_id=user_id)
+
+    # Persist image via storage service (local disk or S3/R2 CDN). Its reference row stays
+    # locked until the commit below, so this comes after the (slow) analysis.
     try:
-        image_url = await storage_service.save_image(save_content, save_ext)
+        image_url = await storage_service.save_image(session, save_content, save_ext)
     except Exception as e:
         logger.error("Could not save uploaded file: %s", e)
         raise HTTPException(status_code=500, detail="Impossible de sauvegarder le fichier")
 
-    # Send original (non-removed) content to Gemini — richer color/detail for analysis
-    analysis = await ai_service.analyze_clothing_image(content, mime_type=file.content_type or "image/jpeg", user_id=user_id)
-
     # Create DB Entry
     new_item = ClothingItem(
         user_id=user_id,
@@ -121,6 +121,9 @@ async def upload_clothing_item(
     )
     
     session.add(new_item)
+    await wardrobe_summary.record(session, user_id, added=wardrobe_summary.item_facts(new_item))
+    bump_wardrobe_version(current_user)
+    session.add(current_user)
 
     # Flush AI request logs to DB
     for entry in drain_pending_requests():
@@ -128,6 +131,8 @@ async def upload_clothing_item(
 
     await session.commit()
     await session.refresh(new_item)
+    if category == "wardrobe":
+        await wardrobe_score.after_wardrobe_change(session, user_id)
     logger.info("User %d uploaded item '%s' in '%s'", user_id, new_item.type, category)
     return new_item
 
@@ -169,11 +174,15 @@ async def delete_clothing_item(
     if item.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Accès refusé")
 
-    if item.image_path:
-        await storage_service.delete_image(item.image_path)
+    released = await storage_service.delete_image(session, item.image_path) if item.image_path else []
 
     await session.delete(item)
+    await wardrobe_summary.record(session, current_user.id, removed=wardrobe_summary.item_facts(item))
+    bump_wardrobe_version(current_user)
+    session.add(current_user)
     await session.commit()
+    await storage_service.remove_objects(session, released)
+    await wardrobe_score.after_wardrobe_change(session, current_user.id)
     logger.info("User %d deleted item %d", current_user.id, item_id)
     return {"message": "Vêtement supprimé", "id": item_id}
 
@@ -193,13 +202,18 @@ async def update_clothing_item(
     if item.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Accès refusé")
 
+    before = wardrobe_summary.item_facts(item)
     item.type = type
     item.couleur = couleur
     item.saison = saison
 
     session.add(item)
+    await wardrobe_summary.record(session, current_user.id, removed=before, added=wardrobe_summary.item_facts(item))
+    bump_wardrobe_version(current_user)
+    session.add(current_user)
     await session.commit()
     await session.refresh(item)
+    await wardrobe_score.after_wardrobe_change(session, current_user.id)
     return item
 
 
@@ -209,89 +223,15 @@ async def get_wardrobe_analytics(
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ):
-    """Return color palette, style breakdown, season distribution, and outfit count estimate."""
+    """Return color palette, style breakdown, season distribution, and valid outfit count."""
     if current_user.id != user_id:
         raise HTTPException(status_code=403, detail="Accès refusé")
 
-    result = await session.execute(
-        select(ClothingItem).where(
-            ClothingItem.user_id == user_id,
-            ClothingItem.category == "wardrobe",
-        )
-    )
-    items = result.scalars().all()
-
-    if not items:
-        return {
-            "total": 0,
-            "colors": [],
-            "styles": [],
-            "seasons": [],
-            "types": [],
-            "avg_look_score": None,
-            "estimated_outfit_count": 0,
-            "wardrobe_value_eur": {"budget": 0, "moyen": 0, "premium": 0},
-        }
-
-    colors = Counter(i.couleur for i in items if i.couleur)
-    seasons = Counter(i.saison for i in items if i.saison)
-    types = Counter(i.type for i in items if i.type)
-
-    styles: Counter = Counter()
-    look_scores: list[float] = []
-    total_budget_min = total_moyen_min = total_premium_min = 0.0
-
-    for item in items:
-        if not item.tags_ia:
-            continue
-        try:
-            data = json.loads(item.tags_ia)
-        except (json.JSONDecodeError, TypeError):
-            continue
-
-        # Style breakdown from first detected item
-        item_list = data.get("items", [])
-        if item_list:
-            style = item_list[0].get("style")
-            if style:
-                styles[style] += 1
-
-        # Look score
-        evaluation = data.get("evaluation", {})
-        note = evaluation.get("note")
-        if isinstance(note, (int, float)) and note > 0:
-            look_scores.append(float(note))
-
-        # Wardrobe value
-        prix = evaluation.get("prix_total_look", {})
-        budget = prix.get("budget", {})
-        moyen = prix.get("moyen", {})
-        premium = prix.get("premium", {})
-        total_budget_min += budget.get("min", 0) or 0
-        total_moyen_min += moyen.get("min", 0) or 0
-        total_premium_min += premium.get("min", 0) or 0
-
-    # Rough outfit count: combinations of tops × bottoms
-    top_types = {"T-shirt", "Chemise", "Pull", "Sweat", "Veste", "Manteau", "Haut", "Blazer"}
-    bottom_types = {"Jean", "Pantalon", "Short", "Jupe", "Chino"}
-    tops = sum(1 for i in items if any(t in i.type for t in top_types))
-    bottoms = sum(1 for i in items if any(b in i.type for b in bottom_types))
-    estimated_outfits = tops * bottoms if tops and bottoms else len(items)
-
-    return {
-        "total": len(items),
-        "colors": [{"name": c, "count": n} for c, n in colors.most_common(8)],
-        "styles": [{"name": s, "count": n} for s, n in styles.most_common(6)],
-        "seasons": [{"name": s, "count": n} for s, n in seasons.most_common(4)],
-        "types": [{"name": t, "count": n} for t, n in types.most_common(10)],
-        "avg_look_score": round(sum(look_scores) / len(look_scores), 1) if look_scores else None,
-        "estimated_outfit_count": estimated_outfits,
-        "wardrobe_value_eur": {
-            "budget": round(total_budget_min),
-            "moyen": round(total_moyen_min),
-            "premium": round(total_premium_min),
-        },
-    }
+    # One summary row, maintained on every item write (see wardrobe_summary)
+    summary = await wardrobe_summary.get_or_build(session, user_id)
+    estimated_outfits = await wardrobe_summary.outfit_count(session, summary)
+    await session.commit()
+    return wardrobe_summary.analytics(summary, estimated_outfits)
 
 
 @router.get("/{user_id}/score")
@@ -304,51 +244,11 @@ async def get_wardrobe_score(
     if current_user.id != user_id:
         raise HTTPException(status_code=403, detail="Accès refusé")
 
-    result = await session.execute(
-        select(ClothingItem).where(
-            ClothingItem.user_id == user_id,
-            ClothingItem.category == "wardrobe",
-        )
-    )
-    items = result.scalars().all()
-
-    if len(items) < 3:
+    # Stored report unless the wardrobe / profile changed since (see wardrobe_score)
+    result = await wardrobe_score.get_or_compute(session, current_user)
+    if result is None:
         raise HTTPException(
             status_code=422,
             detail="Ajoutez au moins 3 vêtements pour obtenir une analyse de garde-robe."
         )
-
-    # Build item list for AI — extract style from tags_ia
-    item_dicts = []
-    for item in items:
-        style = None
-        if item.tags_ia:
-            try:
-                data = json.loads(item.tags_ia)
-                item_list = data.get("items", [])
-                if item_list:
-                    style = item_list[0].get("style")
-            except (json.JSONDecodeError, TypeError):
-                pass
-        item_dicts.append({
-            "type": item.type,
-            "couleur": item.couleur,
-            "saison": item.saison,
-            "style": style or "",
-        })
-
-    user_profile = {
-        "prenom": current_user.prenom,
-        "genre": current_user.genre,
-        "morphologie": current_user.morphologie.value if current_user.morphologie else "RECTANGLE",
-        "style_prefere": current_user.style_prefere or "",
-    }
-
-    result = await ai_service.score_wardrobe(user_profile, item_dicts, user_id=user_id)
-
-    # Flush AI request logs to DB
-    for entry in drain_pending_requests():
-        session.add(AIRequest(**entry))
-    await session.commit()
-
     return result
@@ -135,8 +135,14 @@ def log_ai_request(
     status: str = "success",
     error_message: Optional[str] = None,
     user_id: Optional[int] = None,
+    attribution: Optional[list[dict]] = None,
 ):
-    """Buffer an AI request log entry for async DB flush."""
+    """Buffer an AI request log entry for async DB flush.
+
+    ``attribution`` — one call serving several objects (batch prompts): a list of
+    {"<object>_id": ..., "weight": ...}. Tokens are split pro rata by weight and stored
+    per object on the row.
+    """
     _pending_requests.append({
         "user_id": user_id,
         "request_type": request_type,
@@ -146,9 +152,24 @@ def log_ai_request(
         "duration_ms": duration_ms,
         "status": status,
         "error_message": error_message,
+        "attribution": _attribute(attribution, input_tokens, output_tokens),
     })
 
 
+def _attribute(attribution: Optional[list[dict]], input_tokens: int, output_tokens: int) -> Optional[str]:
+    if not attribution:
+        return None
+    total = sum(a.get("weight", 1) for a in attribution) or 1
+    shares = []
+    for a in attribution:
+        share = {k: v for k, v in a.items() if k != "weight"}
+        ratio = a.get("weight", 1) / total
+        share["input_tokens"] = round(input_tokens * ratio)
+        share["output_tokens"] = round(output_tokens * ratio)
+        shares.append(share)
+    return json.dumps(shares)
+
+
 def drain_pending_requests() -> list[dict]:
     """Pop all buffered requests for DB insertion."""
     entries = _pending_requests.copy()
@@ -162,6 +183,7 @@ def tracked_generate(
     config: types.GenerateContentConfig,
     user_id: Optional[int] = None,
     model_override: Optional[str] = None,
+    attribution: Optional[list[dict]] = None,
 ):
     """
     Call Gemini generate_content with automatic tracking.
@@ -170,7 +192,8 @@ def tracked_generate(
     """
     if not client:
         log_ai_request(request_type, _active_model, status="error",
-                       error_message="Client not initialized", user_id=user_id)
+                       error_message="Client not initialized", user_id=user_id,
+                       attribution=attribution)
         raise RuntimeError("Gemini client not initialized")
 
     model = model_override or _active_model
@@ -207,6 +230,7 @@ def tracked_generate(
             duration_ms=elapsed,
             status=status,
             user_id=user_id,
+            attribution=attribution,
         )
         return response
 
@@ -219,6 +243,7 @@ def tracked_generate(
             status="error",
             error_message=str(e)[:500],
             user_id=user_id,
+            attribution=attribution,
         )
         raise
 
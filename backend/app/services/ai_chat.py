@@ -1,7 +1,12 @@
 """
 AI service — chat with the stylist.
 Conversational AI stylist with product recommendations.
+
+The conversation itself lives server-side (see chat_memory): each turn gets the
+rolling summary of older turns + the recent raw messages, and ``summarize_conversation``
+compacts older turns in the background.
 """
+import asyncio
 import logging
 from typing import Optional
 
@@ -11,17 +16,24 @@ from app.services.ai_base import client, extract_json, tracked_generate
 
 logger = logging.getLogger(__name__)
 
+MAX_HISTORY_MESSAGES = 16  # raw messages in the prompt, whatever the caller passes
+
+UNAVAILABLE_REPLY = "Désolé, je suis indisponible pour le moment."
+ERROR_REPLY = "Désolé, j'ai eu un souci. Réessaie dans un instant !"
+FALLBACK_REPLIES = (UNAVAILABLE_REPLY, ERROR_REPLY)
+
 
 async def chat_with_stylist(
     user_profile: dict,
     message: str,
     history: list[dict] = None,
     user_id: Optional[int] = None,
+    summary: Optional[str] = None,
 ) -> dict:
     """Chat with the AI stylist. Returns a text response + optional product links."""
     if not client:
         logger.error("Gemini client not initialized (missing API key)")
-        return {"reply": "Désolé, je suis indisponible pour le moment.", "products": []}
+        return {"reply": UNAVAILABLE_REPLY, "products": []}
 
     prenom = user_profile.get("prenom", "Utilisateur")
     genre = user_profile.get("genre", "Homme")
@@ -30,7 +42,7 @@ async def chat_with_stylist(
 
     history_text = ""
     if history:
-        for msg in history[-6:]:
+        for msg in history[-MAX_HISTORY_MESSAGES:]:
             role = "Utilisateur" if msg.get("role") == "user" else "Styliste"
             history_text += f"{role}: {msg.get('content', '')}\n"
 
@@ -43,6 +55,7 @@ PROFIL DE L'UTILISATEUR :
 - Age : {age} ans
 - Morphologie : {morphologie}
 
+{f"RESUME DE LA CONVERSATION PRECEDENTE :{chr(10)}{summary}{chr(10)}" if summary else ""}
 {f"HISTORIQUE DE CONVERSATION :{chr(10)}{history_text}" if history_text else ""}
 
 MESSAGE DE L'UTILISATEUR : {message}
@@ -92,4 +105,49 @@ REGLES :
         return {"reply": response.text.strip(), "products": []}
     except Exception as e:
         logger.error("Exception during chat: %s", e)
-        return {"reply": "Désolé, j'ai eu un souci. Réessaie dans un instant !", "products": []}
+        return {"reply": ERROR_REPLY, "products": []}
+
+
+async def summarize_conversation(
+    previous_summary: str,
+    messages: list[dict],
+    user_id: Optional[int] = None,
+) -> Optional[str]:
+    """Fold ``messages`` into the running summary. Returns None on failure (keep the old one)."""
+    if not client:
+        return None
+
+    lines = "\n".join(
+        f"{'Utilisateur' if m.get('role') == 'user' else 'Styliste'}: {m.get('content', '')}"
+        for m in messages
+    )
+    prompt = f"""Tu resumes une conversation entre un utilisateur et son styliste personnel.
+
+RESUME ACTUEL :
+{previous_summary or "(aucun)"}
+
+NOUVEAUX MESSAGES :
+{lines}
+
+Ecris le nouveau resume en francais, 120 mots maximum, en texte brut.
+Garde : les gouts et contraintes exprimes (couleurs, budget, occasions, tailles), les pieces
+recommandees, les questions encore ouvertes. Ignore les formules de politesse.
+"""
+    try:
+        # Blocking SDK call off the event loop — this runs in the background
+        response = await asyncio.to_thread(
+            tracked_generate,
+            request_type="chat_summary",
+            contents=prompt,
+            config=types.GenerateContentConfig(
+                temperature=0.2,
+                max_output_tokens=512,
+                http_options=types.HttpOptions(timeout=30000),
+            ),
+            user_id=user_id,
+        )
+        text = (response.text or "").strip()
+        return text or None
+    except Exception as e:
+        logger.error("Exception during chat summary: %s", e)
+        return None
@@ -1,13 +1,17 @@
 """
 AI service — pricing suggestions for marketplace listings.
-Uses Gemini to estimate fair resale prices based on item data.
+Uses Gemini to estimate fair resale prices based on item data, one listing at a time
+or many per prompt (``suggest_listing_prices``).
 """
+import asyncio
 import logging
+import os
 from typing import Optional
 
 from google.genai import types
 
 from app.services.ai_base import client, extract_json, tracked_generate
+from app.services.price_estimator import category_key
 
 logger = logging.getLogger(__name__)
 
@@ -15,9 +19,12 @@ logger = logging.getLogger(__name__)
 async def suggest_listing_price(
     item_data: dict,
     user_id: Optional[int] = None,
+    local_estimate: Optional[dict] = None,
 ) -> dict:
     """Suggest a fair resale price for a clothing item.
 
+    ``local_estimate`` (price_estimator, low confidence) is passed to the model as a hint.
+
     Returns {"price_min": 15, "price_max": 25, "suggested": 20, "reasoning": "..."}
     """
     if not client:
@@ -31,6 +38,14 @@ async def suggest_listing_price(
     season = item_data.get("season", "Toutes saisons")
     color = item_data.get("color", "")
     tags = item_data.get("tags_ia", "")
+    history = ""
+    if local_estimate:
+        history = (
+            f"\nHISTORIQUE DE NOTRE PLATEFORME (peu de données, à pondérer) : "
+            f"{local_estimate['sample_size']} ventes comparables, "
+            f"médiane {local_estimate['suggested']} €, "
+            f"fourchette {local_estimate['price_min']}-{local_estimate['price_max']} €\n"
+        )
 
     prompt = f"""Tu es un expert en revente de vêtements d'occasion sur le marché français.
 Analyse cet article et suggère un prix de revente juste.
@@ -42,7 +57,7 @@ ARTICLE :
 - Saison : {season}
 - Couleur : {color}
 - Tags IA : {tags}
-
+{history}
 INSTRUCTIONS :
 - Donne un prix minimum, maximum et suggéré en euros (nombres entiers).
 - Base-toi sur les prix de Vinted, Le Bon Coin, et les boutiques de seconde main.
@@ -78,3 +93,118 @@ Réponds UNIQUEMENT avec un JSON valide :
         logger.error("Exception during price suggestion: %s", e)
         return {"price_min": 5, "price_max": 15, "suggested": 10,
                 "reasoning": "Estimation par défaut (erreur IA)"}
+
+
+PRICING_BATCH_SIZE = 20  # items per multi-item prompt
+PRICING_BATCH_CONCURRENCY = int(os.getenv("PRICING_BATCH_CONCURRENCY", "3"))  # chunk calls in flight
+
+
+def _batch_line(index: int, item: dict) -> str:
+    line = (
+        f"{index}. Type : {item.get('type', 'vêtement')} | Marque : {item.get('brand') or 'marque inconnue'}"
+        f" | État : {item.get('condition', 'Bon état')} | Saison : {item.get('season', '')}"
+        f" | Couleur : {item.get('color', '')}"
+    )
+    local = item.get("local_estimate")
+    if local:
+        line += f" | Historique plateforme : {local['sample_size']} ventes, médiane {local['suggested']} €"
+    return line
+
+
+def _chunks(items: list[dict]) -> list[list[dict]]:
+    """Similar items side by side (same category), at most PRICING_BATCH_SIZE per prompt."""
+    ordered = sorted(items, key=lambda it: (category_key(it.get("type")), it.get("brand") or ""))
+    return [ordered[i:i + PRICING_BATCH_SIZE] for i in range(0, len(ordered), PRICING_BATCH_SIZE)]
+
+
+def _index(entry: dict) -> Optional[int]:
+    """The model's 1-based "n" — it sometimes answers "3" or 3.0 instead of 3."""
+    try:
+        return int(entry.get("n"))
+    except (TypeError, ValueError):
+        return None
+
+
+async def _price_chunk(chunk: list[dict], user_id: Optional[int], default: dict) -> dict[int, dict]:
+    lines = [_batch_line(i, item) for i, item in enumerate(chunk, 1)]
+    prompt = f"""Tu es un expert en revente de vêtements d'occasion sur le marché français.
+Suggère un prix de revente juste pour CHACUN des {len(chunk)} articles ci-dessous.
+
+ARTICLES :
+{chr(10).join(lines)}
+
+INSTRUCTIONS :
+- Pour chaque article : prix minimum, maximum et suggéré en euros (nombres entiers).
+- Base-toi sur les prix de Vinted, Le Bon Coin, et les boutiques de seconde main.
+- Prends en compte : marque, état, saisonnalité, demande.
+- Raisonnement en une phrase courte en français.
+
+Réponds UNIQUEMENT avec un tableau JSON valide, un objet par article, dans l'ordre :
+[
+  {{"n": 1, "price_min": 10, "price_max": 25, "suggested": 18, "reasoning": "Explication courte"}}
+]
+"""
+    attribution = [
+        {"listing_id": item["listing_id"], "weight": len(line)} for item, line in zip(chunk, lines)
+    ]
+    parsed = None
+    try:
+        # Blocking SDK call off the event loop (up to 60 s per chunk)
+        response = await asyncio.to_thread(
+            tracked_generate,
+            request_type="pricing_batch",
+            contents=prompt,
+            config=types.GenerateContentConfig(
+                temperature=0.3,
+                max_output_tokens=96 * len(chunk) + 128,
+                http_options=types.HttpOptions(timeout=60000),
+            ),
+            user_id=user_id,
+            attribution=attribution,
+        )
+        parsed = extract_json(response.text)
+    except Exception as e:
+        logger.error("Exception during batch price suggestion (%d items): %s", len(chunk), e)
+
+    by_index = {}
+    if isinstance(parsed, list):
+        for entry in parsed:
+            if isinstance(entry, dict) and "suggested" in entry:
+                index = _index(entry)
+                if index is not None:
+                    by_index[index] = entry
+    results = {}
+    for i, item in enumerate(chunk, 1):
+        entry = by_index.get(i)
+        if entry is None:
+            results[item["listing_id"]] = dict(default)
+        else:
+            results[item["listing_id"]] = {
+                k: entry.get(k, default[k]) for k in ("price_min", "price_max", "suggested", "reasoning")
+            }
+    return results
+
+
+async def suggest_listing_prices(
+    items: list[dict],
+    user_id: Optional[int] = None,
+) -> dict[int, dict]:
+    """Price many listings with one Gemini call per PRICING_BATCH_SIZE items.
+
+    ``items`` — ``suggest_listing_price`` item dicts plus "listing_id" (and optionally
+    "local_estimate"). Returns {listing_id: {"price_min", "price_max", "suggested",
+    "reasoning"}}; items the model skipped get the default estimate. Each call is logged
+    once, with its tokens attributed to the listings it priced. Up to
+    PRICING_BATCH_CONCURRENCY chunks are priced at once.
+    """
+    default = {"price_min": 5, "price_max": 15, "suggested": 10, "reasoning": "Estimation par défaut"}
+    semaphore = asyncio.Semaphore(PRICING_BATCH_CONCURRENCY)
+
+    async def run(chunk: list[dict]) -> dict[int, dict]:
+        async with semaphore:
+            return await _price_chunk(chunk, user_id, default)
+
+    results: dict[int, dict] = {}
+    for priced in await asyncio.gather(*(run(chunk) for chunk in _chunks(items))):
+        results.update(priced)
+    return results
@@ -2,16 +2,24 @@
 AI service — daily outfit suggestions.
 Wardrobe-first: composes outfits from the user's own clothes,
 then suggests complementary pieces from the marketplace.
+
+Large wardrobes are pre-shortlisted by the local outfit engine (weather fit, slot
+coverage) to keep the prompt short. When Gemini is unavailable or its answer is
+unusable, the local engine's looks are returned instead (``"source": "local"``).
 """
+import asyncio
 import logging
 from typing import Optional
 
 from google.genai import types
 
 from app.services.ai_base import client, extract_json, tracked_generate
+from app.services.outfit_engine import compose_outfits, shortlist_items
 
 logger = logging.getLogger(__name__)
 
+PROMPT_WARDROBE_LIMIT = 40  # items sent to Gemini at most
+
 
 def _format_wardrobe(items: list[dict]) -> str:
     """Format wardrobe items for the AI prompt."""
@@ -52,7 +60,7 @@ async def get_daily_suggestions(
     """Generate personalized style suggestions from wardrobe + marketplace."""
     if not client:
         logger.error("Gemini client not initialized (missing API key)")
-        return {"suggestions": []}
+        return compose_outfits(user_profile, weather_data, wardrobe_items)
 
     prenom = user_profile.get("prenom", "Utilisateur")
     genre = user_profile.get("genre", "Homme")
@@ -62,6 +70,7 @@ async def get_daily_suggestions(
     weather_desc = weather_data.get("description", "Ensoleillé")
     ville = weather_data.get("ville", "Paris")
 
+    wardrobe_items = shortlist_items(wardrobe_items, weather_data, limit=PROMPT_WARDROBE_LIMIT)
     wardrobe_text = _format_wardrobe(wardrobe_items)
     marketplace_text = _format_marketplace(marketplace_listings)
 
@@ -150,7 +159,9 @@ REGLES STRICTES :
 """
 
     try:
-        response = tracked_generate(
+        # Blocking SDK call off the event loop — the morning push runs many of these at once
+        response = await asyncio.to_thread(
+            tracked_generate,
             request_type="suggest",
             contents=prompt,
             config=types.GenerateContentConfig(
@@ -175,7 +186,7 @@ REGLES STRICTES :
                         piece["source"] = "suggestion"
                         piece.pop("listing_id", None)
             return parsed
-        return {"suggestions": [], "greeting": f"Bonjour {prenom} !"}
+        logger.warning("Unparsable suggestions response — falling back to local engine")
     except Exception as e:
         logger.error("Exception during suggestions: %s", e)
-        return {"suggestions": [], "greeting": f"Bonjour {prenom} !"}
+    return compose_outfits(user_profile, weather_data, wardrobe_items)
@@ -2,6 +2,7 @@
 AI service — wardrobe scoring.
 Analyses the full wardrobe and returns a stylist report with score, strengths, gaps, and top combos.
 """
+import asyncio
 import logging
 from typing import Optional
 
@@ -83,7 +84,9 @@ REGLES :
 """
 
     try:
-        response = tracked_generate(
+        # Blocking SDK call off the event loop — also runs from the debounced background recompute
+        response = await asyncio.to_thread(
+            tracked_generate,
             request_type="score",
             contents=prompt,
             config=types.GenerateContentConfig(
@@ -0,0 +1,253 @@
+"""
+Near-duplicate answer cache for stand-alone chat questions.
+
+Many first messages are the same FAQ asked in slightly different words ("que porter avec
+un blazer marine ?" / "Avec quoi porter mon blazer marine ?"). For a given profile
+bucket — (genre, age band, morphologie) — such questions get the same answer, so we keep
+recent Q/A pairs in a process-local MinHash / LSH index:
+
+  1. normalize   — lowercase, strip accents and punctuation, drop French stop words,
+                   crude singular ("blazers" → "blazer")
+  2. shingles    — word unigrams + bigrams
+  3. MinHash     — CHAT_CACHE_NUM_PERM permutations, split in LSH bands of _ROWS rows;
+                   questions sharing any band are candidates
+  4. verify      — exact Jaccard on the shingle sets ≥ CHAT_CACHE_MIN_SIMILARITY
+
+Only questions opening a conversation are looked up / stored (later turns depend on
+context). The user's first name is templated out of stored answers and filled back in
+for the asker. Entries expire after CHAT_CACHE_TTL_S; the index is capped at
+CHAT_CACHE_MAX_ENTRIES (oldest evicted first). ``stats()`` exposes hit-rate metrics.
+"""
+import hashlib
+import logging
+import os
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+CHAT_CACHE_TTL_S = float(os.getenv("CHAT_CACHE_TTL_S", str(24 * 3600)))
+CHAT_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_CACHE_MAX_ENTRIES", "5000"))
+CHAT_CACHE_MIN_SIMILARITY = float(os.getenv("CHAT_CACHE_MIN_SIMILARITY", "0.7"))
+CHAT_CACHE_NUM_PERM = 64
+_ROWS = 4  # rows per LSH band → 16 bands: pairs at Jaccard 0.7 collide with p ≈ 0.98
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_PRENOM_SLOT = "{prenom}"
+
+# Negations (ne, n', pas, jamais, sans, ni) are content: "que ne pas porter…" asks the opposite
+_STOP_WORDS = frozenset("""
+a à au aux avec ce ces cette de des du elle en est et il je j la le les leur lui ma mais me
+mes moi mon nous on ou où par pour qu que quel quelle quels quelles qui sa se ses son
+sur ta te tes toi ton tu un une vos votre vous y c d l m s t est-ce ca ça comment quoi
+bonjour salut stp svp merci
+""".split())
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text: str) -> list[str]:
+    """Content words of ``text``: lowercase, no accents, no stop words, crude singular."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    words = []
+    for word in _WORD_RE.findall(text):
+        if word in _STOP_WORDS:
+            continue
+        if len(word) > 3 and word[-1] in "sx":
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+def shingles(words: list[str]) -> frozenset[str]:
+    return frozenset(words) | frozenset(f"{a} {b}" for a, b in zip(words, words[1:]))
+
+
+def _perm_params() -> list[tuple[int, int]]:
+    """Fixed (a, b) pairs for h(x) = (a·x + b) mod p — deterministic across workers."""
+    params = []
+    for i in range(CHAT_CACHE_NUM_PERM):
+        digest = hashlib.blake2b(f"minhash-{i}".encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], "big") % (_PRIME - 1) + 1
+        b = int.from_bytes(digest[8:], "big") % _PRIME
+        params.append((a, b))
+    return params
+
+
+_PERMS = _perm_params()
+
+
+def _base_hash(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=4).digest(), "big")
+
+
+def minhash(shingle_set: frozenset[str]) -> tuple[int, ...]:
+    hashes = [_base_hash(s) for s in shingle_set]
+    if not hashes:
+        return ()
+    return tuple(min(((a * h + b) % _PRIME) & _MAX_HASH for h in hashes) for a, b in _PERMS)
+
+
+def _bands(signature: tuple[int, ...]) -> list[tuple[int, tuple[int, ...]]]:
+    return [(i, signature[i:i + _ROWS]) for i in range(0, len(signature), _ROWS)]
+
+
+def jaccard(a: frozenset[str], b: frozenset[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def age_band(age: Optional[int]) -> str:
+    if age is None:
+        return "?"
+    if age < 25:
+        return "<25"
+    if age < 35:
+        return "25-34"
+    if age < 50:
+        return "35-49"
+    return "50+"
+
+
+def profile_bucket(user_profile: dict) -> tuple[str, str, str]:
+    morphologie = user_profile.get("morphologie")
+    morphologie = morphologie.value if hasattr(morphologie, "value") else morphologie
+    return (
+        str(user_profile.get("genre") or "?"),
+        age_band(user_profile.get("age")),
+        str(morphologie or "?"),
+    )
+
+
+def _template(answer: dict, prenom: Optional[str]) -> dict:
+    reply = answer.get("reply", "")
+    if prenom:
+        reply = re.sub(rf"\b{re.escape(prenom)}\b", _PRENOM_SLOT, reply)
+    return {**answer, "reply": reply}
+
+
+def _render(answer: dict, prenom: Optional[str]) -> dict:
+    return {**answer, "reply": answer.get("reply", "").replace(_PRENOM_SLOT, prenom or "")}
+
+
+@dataclass
+class _Entry:
+    bucket: tuple
+    shingles: frozenset
+    bands: list
+    answer: dict
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class ChatAnswerCache:
+    def __init__(self) -> None:
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()  # insertion order = age
+        self._index: dict[tuple, set[int]] = {}  # (bucket, band no, band values) → entry ids
+        self._next_id = 0
+        self.lookups = self.hits = self.stores = self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _drop(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        for band in entry.bands:
+            ids = self._index.get((entry.bucket, *band))
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del self._index[(entry.bucket, *band)]
+        self.evictions += 1
+
+    def evict_expired(self) -> None:
+        cutoff = time.monotonic() - CHAT_CACHE_TTL_S
+        while self._entries:
+            entry_id, entry = next(iter(self._entries.items()))
+            if entry.created_at >= cutoff:
+                break
+            self._drop(entry_id)
+
+    def lookup(self, user_profile: dict, message: str) -> Optional[dict]:
+        """Cached answer for a near-duplicate question in the same profile bucket, or None."""
+        self.lookups += 1
+        self.evict_expired()
+        words = normalize(message)
+        shingle_set = shingles(words)
+        if not shingle_set:
+            return None
+        bucket = profile_bucket(user_profile)
+
+        candidates: set[int] = set()
+        for band in _bands(minhash(shingle_set)):
+            candidates |= self._index.get((bucket, *band), set())
+
+        best, best_score = None, CHAT_CACHE_MIN_SIMILARITY
+        for entry_id in candidates:
+            score = jaccard(shingle_set, self._entries[entry_id].shingles)
+            if score >= best_score:
+                best, best_score = entry_id, score
+        if best is None:
+            return None
+        self.hits += 1
+        logger.debug("Chat answer cache hit (similarity %.2f)", best_score)
+        return _render(self._entries[best].answer, user_profile.get("prenom"))
+
+    def store(self, user_profile: dict, message: str, answer: dict) -> None:
+        shingle_set = shingles(normalize(message))
+        if not shingle_set:
+            return
+        bucket = profile_bucket(user_profile)
+        entry = _Entry(
+            bucket=bucket,
+            shingles=shingle_set,
+            bands=_bands(minhash(shingle_set)),
+            answer=_template(answer, user_profile.get("prenom")),
+        )
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = entry
+        for band in entry.bands:
+            self._index.setdefault((bucket, *band), set()).add(entry_id)
+        self.stores += 1
+        while len(self._entries) > CHAT_CACHE_MAX_ENTRIES:
+            self._drop(next(iter(self._entries)))
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "misses": self.lookups - self.hits,
+            "hit_rate": round(self.hits / self.lookups, 3) if self.lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+        }
+
+
+_cache = ChatAnswerCache()
+
+
+def lookup(user_profile: dict, message: str) -> Optional[dict]:
+    return _cache.lookup(user_profile, message)
+
+
+def store(user_profile: dict, message: str, answer: dict) -> None:
+    _cache.store(user_profile, message, answer)
+
+
+def stats() -> dict:
+    return _cache.stats()
+
+
+def reset() -> None:
+    global _cache
+    _cache = ChatAnswerCache()
@@ -0,0 +1,196 @@
+"""
+Server-side chat memory with a rolling summary.
+
+Each conversation is a ``ChatSession`` + its ``ChatMessage`` rows. Clients send only the
+new message (and optionally ``session_id``); the prompt is rebuilt server-side from:
+
+  - ``ChatSession.summary``        — older turns, compacted
+  - the raw messages not yet folded into it (bounded, see below)
+
+Once more than CHAT_RECENT_MESSAGES + CHAT_SUMMARY_BATCH messages are un-summarized,
+a background task folds everything but the last CHAT_RECENT_MESSAGES into the summary
+(``ai_chat.summarize_conversation``). Summaries run one at a time, after
+CHAT_SUMMARY_DELAY_S, so they never compete with the reply being served. If summarizing
+fails the raw window is still capped at ``ai_chat.MAX_HISTORY_MESSAGES``.
+
+Without ``session_id`` the user's latest session is reused if it was active in the last
+CHAT_SESSION_IDLE_H hours; otherwise a new one starts.
+"""
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.database import async_session
+from app.models import AIRequest, ChatMessage, ChatSession
+from app.services.ai_base import drain_pending_requests
+from app.services.ai_chat import summarize_conversation
+
+logger = logging.getLogger(__name__)
+
+CHAT_RECENT_MESSAGES = int(os.getenv("CHAT_RECENT_MESSAGES", "6"))
+CHAT_SUMMARY_BATCH = int(os.getenv("CHAT_SUMMARY_BATCH", "6"))
+CHAT_SUMMARY_DELAY_S = float(os.getenv("CHAT_SUMMARY_DELAY_S", "2"))
+CHAT_SUMMARY_MAX_CHARS = 1500
+CHAT_SESSION_IDLE_H = 6
+
+_summary_slot = asyncio.Semaphore(1)      # low priority: one summary at a time
+_summary_tasks: dict[int, asyncio.Task] = {}  # chat session id → in-flight task
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+async def get_or_create_session(
+    session: AsyncSession,
+    user_id: int,
+    session_id: Optional[int] = None,
+    new_session: bool = False,
+) -> ChatSession:
+    """Resolve the conversation for this turn (caller commits)."""
+    if session_id is not None:
+        chat = await session.get(ChatSession, session_id)
+        if not chat or chat.user_id != user_id:
+            raise HTTPException(status_code=404, detail="Conversation introuvable")
+        return chat
+
+    if not new_session:
+        since = (_now() - timedelta(hours=CHAT_SESSION_IDLE_H)).replace(tzinfo=None)
+        result = await session.execute(
+            select(ChatSession)
+            .where(ChatSession.user_id == user_id, ChatSession.updated_at >= since)
+            .order_by(ChatSession.updated_at.desc())
+            .limit(1)
+        )
+        chat = result.scalars().first()
+        if chat:
+            return chat
+
+    chat = ChatSession(user_id=user_id)
+    session.add(chat)
+    await session.flush()
+    return chat
+
+
+async def _unsummarized(session: AsyncSession, chat: ChatSession) -> list[ChatMessage]:
+    result = await session.execute(
+        select(ChatMessage)
+        .where(ChatMessage.session_id == chat.id, ChatMessage.id > chat.summarized_until)
+        .order_by(ChatMessage.id)
+    )
+    return list(result.scalars().all())
+
+
+async def prompt_context(session: AsyncSession, chat: ChatSession) -> tuple[str, list[dict]]:
+    """(summary, raw history) to send with the next turn."""
+    messages = await _unsummarized(session, chat)
+    history = [{"role": m.role, "content": m.content} for m in messages]
+    return chat.summary, history
+
+
+async def append_turn(
+    session: AsyncSession,
+    chat: ChatSession,
+    message: str,
+    reply: dict,
+) -> None:
+    """Persist the user message + assistant reply (caller commits)."""
+    session.add(ChatMessage(session_id=chat.id, role="user", content=message))
+    products = reply.get("products") or []
+    session.add(ChatMessage(
+        session_id=chat.id,
+        role="assistant",
+        content=reply.get("reply", ""),
+        products=json.dumps(products, ensure_ascii=False) if products else None,
+    ))
+    chat.updated_at = _now()
+    session.add(chat)
+
+
+def needs_summary(pending_messages: int) -> bool:
+    """True once enough un-summarized messages piled up to fold a batch."""
+    return pending_messages > CHAT_RECENT_MESSAGES + CHAT_SUMMARY_BATCH
+
+
+def schedule_summary(chat_session_id: int, user_id: Optional[int] = None) -> None:
+    """Compact older turns in the background (no-op if one is already running for this session)."""
+    task = _summary_tasks.get(chat_session_id)
+    if task and not task.done():
+        return
+    _summary_tasks[chat_session_id] = asyncio.create_task(_summarize(chat_session_id, user_id))
+
+
+async def wait_for_summaries() -> None:
+    """Wait for in-flight summaries (shutdown, tests)."""
+    tasks = [t for t in _summary_tasks.values() if not t.done()]
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+    _summary_tasks.clear()
+
+
+async def _summarize(chat_session_id: int, user_id: Optional[int]) -> None:
+    await asyncio.sleep(CHAT_SUMMARY_DELAY_S)
+    async with _summary_slot:
+        try:
+            async with async_session() as session:
+                chat = await session.get(ChatSession, chat_session_id)
+                if not chat:
+                    return
+                messages = await _unsummarized(session, chat)
+                to_fold = messages[:-CHAT_RECENT_MESSAGES] if CHAT_RECENT_MESSAGES else messages
+                if not to_fold:
+                    return
+                summary = await summarize_conversation(
+                    chat.summary,
+                    [{"role": m.role, "content": m.content} for m in to_fold],
+                    user_id=user_id,
+                )
+                if summary:
+                    chat.summary = summary[:CHAT_SUMMARY_MAX_CHARS]
+                    chat.summarized_until = to_fold[-1].id
+                    session.add(chat)
+                for entry in drain_pending_requests():
+                    session.add(AIRequest(**entry))
+                await session.commit()
+                logger.info(
+                    "Chat session %d summarized up to message %d (%d folded)",
+                    chat_session_id, chat.summarized_until, len(to_fold) if summary else 0,
+                )
+        except Exception as exc:
+            logger.error("Chat summary failed for session %d: %s", chat_session_id, exc)
+
+
+async def list_messages(session: AsyncSession, chat: ChatSession, limit: int = 50) -> list[dict]:
+    """Latest ``limit`` messages of a conversation, oldest first."""
+    result = await session.execute(
+        select(ChatMessage)
+        .where(ChatMessage.session_id == chat.id)
+        .order_by(ChatMessage.id.desc())
+        .limit(limit)
+    )
+    rows = list(result.scalars().all())[::-1]
+    return [
+        {
+            "id": m.id,
+            "role": m.role,
+            "content": m.content,
+            "products": json.loads(m.products) if m.products else [],
+            "created_at": m.created_at.isoformat(),
+        }
+        for m in rows
+    ]
+
+
+async def delete_user_chats(session: AsyncSession, user_id: int) -> None:
+    """Remove every conversation of a user (account deletion — caller commits)."""
+    session_ids = select(ChatSession.id).where(ChatSession.user_id == user_id)
+    await session.execute(delete(ChatMessage).where(ChatMessage.session_id.in_(session_ids)))
+    await session.execute(delete(ChatSession).where(ChatSession.user_id == user_id))
@@ -0,0 +1,142 @@
+"""
+Win-back and upgrade-reminder email campaigns.
+
+Run once a day (CAMPAIGN_CRON_HOUR:CAMPAIGN_CRON_MINUTE) on the scheduler leader. Each
+campaign selects its recipients with one indexed query, read CAMPAIGN_CHUNK_SIZE users at
+a time (see job_runs.iter_user_chunks) — no per-user lookups:
+
+  - winback_day7     : last activity (``streak_last_activity``) WINBACK_INACTIVE_DAYS ago,
+                       or up to CAMPAIGN_WINDOW_DAYS - 1 days earlier if a run was missed
+  - upgrade_reminder : still free tier, signed up UPGRADE_REMINDER_DAYS ago (same window)
+
+Users who already got the campaign for the same anchor (last activity day / signup day)
+are excluded in the query itself (NOT EXISTS on ``CampaignSend``), so a win-back goes out
+once per inactivity streak and the upgrade reminder once. For each chunk the template is
+rendered once per locale and only personalized per user, and the emails and their
+``CampaignSend`` records are inserted in bulk, then sent by the outbox dispatcher.
+"""
+import logging
+import os
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+
+from app.database import async_session
+from app.models import CampaignSend, User
+from app.services import email_outbox, email_service, job_runs
+
+logger = logging.getLogger(__name__)
+
+CAMPAIGN_CRON_HOUR = int(os.getenv("CAMPAIGN_CRON_HOUR", "10"))
+CAMPAIGN_CRON_MINUTE = int(os.getenv("CAMPAIGN_CRON_MINUTE", "0"))
+CAMPAIGN_CHUNK_SIZE = int(os.getenv("CAMPAIGN_CHUNK_SIZE", "1000"))
+CAMPAIGN_WINDOW_DAYS = 3  # users who became eligible during missed runs are still caught up
+WINBACK_INACTIVE_DAYS = 7
+UPGRADE_REMINDER_DAYS = 14
+
+_COLUMNS = (User.id, User.email, User.prenom, User.locale, User.push_city, User.streak_last_activity, User.created_at)
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+
+@dataclass(frozen=True)
+class Campaign:
+    name: str                                    # also the email template
+    where: Callable[[date], tuple]               # eligibility on a given day
+    anchor: Callable[[object], date]             # the user's anchor day (dedupe)
+    anchor_column: Optional[object] = None       # same, as a User column (None: once per user)
+    params: Callable[[object], dict] = lambda user: {"prenom": user.prenom}
+
+    def not_sent(self):
+        sent = select(CampaignSend.id).where(CampaignSend.campaign == self.name, CampaignSend.user_id == User.id)
+        if self.anchor_column is not None:
+            sent = sent.where(CampaignSend.anchor == self.anchor_column)
+        return ~sent.exists()
+
+
+def _winback_where(today: date) -> tuple:
+    last = today - timedelta(days=WINBACK_INACTIVE_DAYS)
+    return (User.streak_last_activity <= last,
+            User.streak_last_activity > last - timedelta(days=CAMPAIGN_WINDOW_DAYS))
+
+
+def _upgrade_where(today: date) -> tuple:
+    signup = today - timedelta(days=UPGRADE_REMINDER_DAYS)
+    return (User.is_premium == False,  # noqa: E712
+            User.created_at < _day_start(signup + timedelta(days=1)),
+            User.created_at >= _day_start(signup - timedelta(days=CAMPAIGN_WINDOW_DAYS - 1)))
+
+
+CAMPAIGNS = (
+    Campaign(
+        "winback_day7", _winback_where,
+        anchor=lambda user: user.streak_last_activity,
+        anchor_column=User.streak_last_activity,
+        params=lambda user: {"prenom": user.prenom, "ville": user.push_city},
+    ),
+    Campaign("upgrade_reminder", _upgrade_where, anchor=lambda user: user.created_at.date()),
+)
+
+
+async def _queue_chunk(campaign: Campaign, users: list) -> int:
+    """Render once per locale, personalize, and insert the emails + campaign records in bulk."""
+    emails, sends = [], []
+    for user in users:
+        locale = email_service.locale_for(user.locale)
+        subject, body = email_service.render(campaign.name, locale)
+        params = campaign.params(user)
+        anchor = campaign.anchor(user)
+        emails.append({
+            "recipient": user.email,
+            "user_id": user.id,
+            "subject": email_service.personalize(campaign.name, locale, subject, escape=False, **params),
+            "html": email_service.personalize(campaign.name, locale, body, **params),
+        })
+        sends.append({
+            "campaign": campaign.name, "user_id": user.id, "anchor": anchor,
+            "dedupe_key": f"{campaign.name}:{user.id}:{anchor.isoformat()}",
+        })
+    async with async_session() as session:
+        await session.execute(insert(CampaignSend), sends)
+        queued = await email_outbox.enqueue_many(session, campaign.name, emails)
+        try:
+            await session.commit()
+        except IntegrityError:  # an overlapping run queued (some of) them first
+            await session.rollback()
+            logger.warning("Campaign %s: chunk of %d already queued, skipped", campaign.name, len(users))
+            return 0
+    return queued
+
+
+async def run_campaign(campaign: Campaign, today: Optional[date] = None) -> int:
+    """Queue ``campaign`` for every eligible user who has not had it yet. Returns the count."""
+    today = today or date.today()
+    queued = 0
+    async for users in job_runs.iter_user_chunks(
+        async_session, _COLUMNS, User.email != None, *campaign.where(today), campaign.not_sent(),  # noqa: E711
+        chunk_size=CAMPAIGN_CHUNK_SIZE,
+    ):
+        queued += await _queue_chunk(campaign, users)
+    return queued
+
+
+async def run_campaigns(today: Optional[date] = None) -> dict:
+    """Cron task: queue every campaign for today. Returns emails queued per campaign."""
+    if not email_outbox.configured():
+        return {}
+    report = {}
+    for campaign in CAMPAIGNS:
+        try:
+            report[campaign.name] = await run_campaign(campaign, today)
+        except Exception as exc:
+            logger.error("Campaign %s failed: %s", campaign.name, exc)
+            report[campaign.name] = None
+    logger.info("Email campaigns queued: %s", report)
+    return report
@@ -0,0 +1,290 @@
+"""
+Persistent outbox for transactional emails — Resend batch API.
+
+Emails used to be sent inline with the synchronous Resend SDK (blocking the event loop)
+from untracked ``asyncio.create_task`` calls, so a failure or a restart lost them. Now:
+
+  - ``enqueue`` adds an ``EmailOutbox`` row in the caller's session, committed together
+    with the change that triggers the email (no-op when RESEND_API_KEY is not set)
+  - ``dispatch``, scheduled every EMAIL_DISPATCH_INTERVAL_S on the scheduler leader, claims
+    due rows EMAIL_BATCH_SIZE at a time and posts them to ``POST /emails/batch`` over a
+    pooled async httpx client, EMAIL_SEND_CONCURRENCY batches in flight
+  - 429 / 5xx / network errors retry with exponential backoff (EMAIL_RETRY_BASE_S × 2^n,
+    capped) up to EMAIL_MAX_ATTEMPTS; a batch rejected as invalid (Resend validates the
+    whole batch) is resent one email at a time so only the bad address fails
+  - sent / retried / failed counts and delivery delay are kept per template (``stats``)
+
+A claimed row is hidden for EMAIL_CLAIM_S: if the worker dies mid-send it is picked up
+again. ``standins/resend.py`` mimics the API for tests.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import httpx
+from sqlalchemy import delete, func, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.database import async_session
+from app.models import CampaignSend, EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+RESEND_API_KEY = os.getenv("RESEND_API_KEY")
+RESEND_API_URL = os.getenv("RESEND_API_URL", "https://api.resend.com")
+EMAIL_FROM = os.getenv("RESEND_FROM_EMAIL", "Digital Stylist <bonjour@digitalstylist.app>")
+
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "100"))             # Resend maximum
+EMAIL_SEND_CONCURRENCY = int(os.getenv("EMAIL_SEND_CONCURRENCY", "2"))   # default Resend limit: 2 req/s
+EMAIL_DISPATCH_INTERVAL_S = float(os.getenv("EMAIL_DISPATCH_INTERVAL_S", "10"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "6"))
+EMAIL_RETRY_BASE_S = float(os.getenv("EMAIL_RETRY_BASE_S", "30"))
+EMAIL_RETRY_MAX_S = 3600.0
+EMAIL_CLAIM_S = 120.0
+EMAIL_RETENTION_DAYS = 30
+
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_warned_no_key = False
+_http: Optional[httpx.AsyncClient] = None
+_http_loop: Optional[asyncio.AbstractEventLoop] = None
+_metrics: dict[str, dict[str, float]] = defaultdict(
+    lambda: {"queued": 0, "sent": 0, "retried": 0, "failed": 0, "delay_s": 0.0}
+)
+_counters = {"batches": 0, "requests": 0, "send_s": 0.0}
+
+
+def configured() -> bool:
+    global _warned_no_key
+    if RESEND_API_KEY:
+        return True
+    if not _warned_no_key:
+        logger.warning("RESEND_API_KEY non définie — emails désactivés")
+        _warned_no_key = True
+    return False
+
+
+def enqueue(session: AsyncSession, template: str, to: str, subject: str, html: str,
+            user_id: Optional[int] = None) -> Optional[EmailOutbox]:
+    """Queue an email in ``session`` (caller commits). None when emails are disabled."""
+    if not configured():
+        return None
+    row = EmailOutbox(template=template, user_id=user_id, recipient=to, subject=subject, html=html)
+    session.add(row)
+    _metrics[template]["queued"] += 1
+    return row
+
+
+async def enqueue_many(session: AsyncSession, template: str, emails: list[dict]) -> int:
+    """Bulk ``enqueue``: one multi-row INSERT of ``emails`` (dicts with recipient, subject,
+    html, user_id) in ``session`` (caller commits). Returns the number queued."""
+    if not emails or not configured():
+        return 0
+    now = datetime.now(timezone.utc)
+    await session.execute(insert(EmailOutbox), [
+        {"template": template, "status": "pending", "attempts": 0, "next_attempt_at": now, "created_at": now, **email}
+        for email in emails
+    ])
+    _metrics[template]["queued"] += len(emails)
+    return len(emails)
+
+
+async def delete_user_emails(session: AsyncSession, user_id: int) -> None:
+    """Account deletion: drop the user's queued and sent emails and campaign records (caller commits)."""
+    await session.execute(delete(EmailOutbox).where(EmailOutbox.user_id == user_id))
+    await session.execute(delete(CampaignSend).where(CampaignSend.user_id == user_id))
+
+
+def _http_client() -> httpx.AsyncClient:
+    """Shared keep-alive client for Resend (one per event loop)."""
+    global _http, _http_loop
+    loop = asyncio.get_running_loop()
+    if _http is None or _http.is_closed or _http_loop is not loop:
+        _http = httpx.AsyncClient(
+            timeout=httpx.Timeout(20, connect=5),
+            limits=httpx.Limits(max_connections=EMAIL_SEND_CONCURRENCY, keepalive_expiry=60),
+        )
+        _http_loop = loop
+    return _http
+
+
+async def close() -> None:
+    global _http
+    if _http is not None and not _http.is_closed:
+        await _http.aclose()
+    _http = None
+
+
+def _payload(row: EmailOutbox) -> dict:
+    return {"from": EMAIL_FROM, "to": [row.recipient], "subject": row.subject, "html": row.html}
+
+
+def _error(resp: httpx.Response) -> str:
+    try:
+        body = resp.json()
+    except ValueError:
+        return f"{resp.status_code} {resp.text[:200]}"
+    return f"{resp.status_code} {body.get('name', '')}: {body.get('message', '')}".strip()
+
+
+async def _post(path: str, body) -> httpx.Response:
+    started = time.monotonic()
+    try:
+        return await _http_client().post(
+            f"{RESEND_API_URL.rstrip('/')}{path}", json=body,
+            headers={"Authorization": f"Bearer {RESEND_API_KEY}"},
+        )
+    finally:
+        _counters["requests"] += 1
+        _counters["send_s"] += time.monotonic() - started
+
+
+async def _send_one(row: EmailOutbox) -> tuple[str, str]:
+    """("sent", provider id) / ("retry" | "failed", error) for a single email."""
+    try:
+        resp = await _post("/emails", _payload(row))
+    except httpx.HTTPError as exc:
+        return "retry", repr(exc)
+    if resp.status_code == 200:
+        return "sent", resp.json().get("id", "")
+    return ("retry" if resp.status_code in _RETRY_STATUSES else "failed"), _error(resp)
+
+
+async def _send_batch(rows: list[EmailOutbox]) -> list[tuple[str, str]]:
+    """One outcome per row, in order."""
+    _counters["batches"] += 1
+    try:
+        resp = await _post("/emails/batch", [_payload(row) for row in rows])
+    except httpx.HTTPError as exc:
+        return [("retry", repr(exc))] * len(rows)
+    if resp.status_code == 200:
+        ids = [entry.get("id", "") for entry in resp.json().get("data", [])]
+        if len(ids) == len(rows):
+            return [("sent", provider_id) for provider_id in ids]
+        logger.warning("Resend batch: %d ids for %d emails", len(ids), len(rows))
+        return [("sent", "")] * len(rows)
+    if resp.status_code in _RETRY_STATUSES:
+        return [("retry", _error(resp))] * len(rows)
+    if len(rows) == 1:
+        return [("failed", _error(resp))]
+    # The whole batch is rejected when one email is invalid: find it
+    logger.warning("Resend batch of %d rejected (%s), sending one by one", len(rows), _error(resp))
+    return list(await asyncio.gather(*(_send_one(row) for row in rows)))
+
+
+def retry_delay(attempts: int) -> float:
+    return min(EMAIL_RETRY_BASE_S * 2 ** max(0, attempts - 1), EMAIL_RETRY_MAX_S)
+
+
+def _aware(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+async def _claim(limit: int) -> list[EmailOutbox]:
+    """Due rows, hidden for EMAIL_CLAIM_S and their attempt counted — one conditional UPDATE."""
+    now = datetime.now(timezone.utc)
+    async with async_session() as session:
+        due = select(EmailOutbox.id).where(
+            EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now,
+        ).order_by(EmailOutbox.next_attempt_at, EmailOutbox.id).limit(limit)
+        result = await session.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(due), EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now)
+            .values(next_attempt_at=now + timedelta(seconds=EMAIL_CLAIM_S), attempts=EmailOutbox.attempts + 1)
+            .returning(EmailOutbox.id)
+        )
+        ids = result.scalars().all()
+        await session.commit()
+        if not ids:
+            return []
+        rows = await session.execute(select(EmailOutbox).where(EmailOutbox.id.in_(ids)).order_by(EmailOutbox.id))
+        return list(rows.scalars().all())
+
+
+async def _record(rows: list[EmailOutbox], outcomes: list[tuple[str, str]], report: dict) -> None:
+    now = datetime.now(timezone.utc)
+    async with async_session() as session:
+        for row, (outcome, detail) in zip(rows, outcomes):
+            metrics = _metrics[row.template]
+            if outcome == "sent":
+                values = {"status": "sent", "sent_at": now, "provider_id": detail or None, "last_error": None}
+                metrics["delay_s"] += (now - _aware(row.created_at)).total_seconds()
+            elif outcome == "retry" and row.attempts < EMAIL_MAX_ATTEMPTS:
+                values = {"next_attempt_at": now + timedelta(seconds=retry_delay(row.attempts)), "last_error": detail}
+                outcome = "retried"
+            else:
+                values = {"status": "failed", "last_error": detail}
+                outcome = "failed"
+                logger.error("Email %d (%s) to %s failed: %s", row.id, row.template, row.recipient, detail)
+            metrics[outcome] += 1
+            report[outcome] += 1
+            await session.execute(update(EmailOutbox).where(EmailOutbox.id == row.id).values(**values))
+        await session.commit()
+
+
+async def dispatch() -> dict:
+    """Scheduled task: send every due email, EMAIL_BATCH_SIZE per request."""
+    report = {"sent": 0, "retried": 0, "failed": 0, "batches": 0}
+    if not configured():
+        return report
+    semaphore = asyncio.Semaphore(EMAIL_SEND_CONCURRENCY)
+
+    async def send(rows: list[EmailOutbox]) -> None:
+        async with semaphore:
+            outcomes = await _send_batch(rows)
+        await _record(rows, outcomes, report)
+
+    while True:
+        claimed = await _claim(EMAIL_BATCH_SIZE * EMAIL_SEND_CONCURRENCY)
+        if not claimed:
+            break
+        batches = [claimed[i:i + EMAIL_BATCH_SIZE] for i in range(0, len(claimed), EMAIL_BATCH_SIZE)]
+        report["batches"] += len(batches)
+        await asyncio.gather(*(send(rows) for rows in batches))
+
+    if report["batches"]:
+        async with async_session() as session:
+            await session.execute(
+                delete(EmailOutbox).where(
+                    EmailOutbox.status != "pending",
+                    EmailOutbox.created_at < datetime.now(timezone.utc) - timedelta(days=EMAIL_RETENTION_DAYS),
+                )
+            )
+            await session.commit()
+        logger.info("Email outbox dispatched: %s", report)
+    return report
+
+
+async def stats(session: AsyncSession) -> dict:
+    """Outbox rows per template and status, plus this worker's send metrics per template."""
+    result = await session.execute(
+        select(EmailOutbox.template, EmailOutbox.status, func.count()).group_by(EmailOutbox.template, EmailOutbox.status)
+    )
+    outbox: dict[str, dict[str, int]] = defaultdict(dict)
+    for template, status, count in result.all():
+        outbox[template][status] = count
+    templates = {
+        template: {
+            **{k: int(v) for k, v in m.items() if k != "delay_s"},
+            "mean_delay_s": round(m["delay_s"] / m["sent"], 1) if m["sent"] else None,
+        }
+        for template, m in _metrics.items()
+    }
+    return {
+        "outbox": dict(outbox),
+        "templates": templates,
+        "batches": _counters["batches"],
+        "requests": _counters["requests"],
+        "mean_request_ms": round(_counters["send_s"] / _counters["requests"] * 1000, 1) if _counters["requests"] else None,
+    }
+
+
+def reset() -> None:
+    _metrics.clear()
+    for key in _counters:
+        _counters[key] = 0
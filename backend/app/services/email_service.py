@@ -1,68 +1,123 @@
 """
 Email transactional service — Resend
-https://resend.com/docs/send-with-python
+https://resend.com/docs/api-reference/emails/send-batch-emails
 
 Activated when RESEND_API_KEY env var is set.
 No-op gracefully when not configured (dev / CI environment).
 
+Emails are not sent inline: ``queue_email`` renders the template and adds it to the
+outbox in the caller's session, and the background dispatcher sends it (see email_outbox).
+
+Each template is rendered once per locale (``render``, cached) with ``{{prenom}}``-style
+placeholders; ``personalize`` only fills in the recipient's values, so a campaign to
+thousands of users renders the HTML once (see email_campaigns).
+
 Emails supported:
   - welcome          : sent on user creation
-  - winback_day7     : sent by cron when user inactive 7 days
-  - winback_day30    : sent by cron when user inactive 30 days
-  - upgrade_reminder : sent at D+14 if still free tier
+  - winback_day7     : sent by the campaign job when user inactive 7 days
+  - upgrade_reminder : sent by the campaign job at D+14 if still free tier
 
 Usage:
-    from app.services.email_service import send_welcome_email
-    await send_welcome_email(user_email="...", prenom="Sarah")
+    from app.services.email_service import queue_email
+    queue_email(session, "welcome", to="...", prenom="Sarah")
+    await session.commit()
 """
 
-import logging
+import html
 import os
+from functools import lru_cache
 from typing import Optional
 
-logger = logging.getLogger(__name__)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services import email_outbox
 
-_RESEND_API_KEY = os.getenv("RESEND_API_KEY")
-_FROM_EMAIL = os.getenv("RESEND_FROM_EMAIL", "Digital Stylist <bonjour@digitalstylist.app>")
 _FRONTEND_URL = os.getenv("FRONTEND_URL", "https://digital-stylist-mvp.vercel.app")
 
-_warned_no_key = False
-
-
-def _resend_available() -> bool:
-    global _warned_no_key
-    if _RESEND_API_KEY:
-        return True
-    if not _warned_no_key:
-        logger.warning("RESEND_API_KEY non définie — emails désactivés")
-        _warned_no_key = True
-    return False
-
-
-async def _send(to: str, subject: str, html: str) -> bool:
-    """Send an email via Resend API. Returns True on success."""
-    if not _resend_available():
-        return False
-    try:
-        import resend
-        resend.api_key = _RESEND_API_KEY
-        resend.Emails.send({
-            "from": _FROM_EMAIL,
-            "to": [to],
-            "subject": subject,
-            "html": html,
-        })
-        logger.info("Email sent to %s — subject: %s", to, subject)
-        return True
-    except Exception as e:
-        logger.error("Email send failed to %s: %s", to, e)
-        return False
-
-
-def _base_template(content: str) -> str:
+DEFAULT_LOCALE = "fr"
+
+# Copy per locale — {{name}} placeholders are filled per recipient by ``personalize``
+_COPY = {
+    "fr": {
+        "tagline": "Digital Stylist · Ton styliste IA personnel",
+        "open_app": "Ouvrir l'app",
+        "welcome": {
+            "subject": "Bienvenue {{prenom}} — ton styliste IA t'attend ✨",
+            "title": "Bienvenue, {{prenom}} ! 👋",
+            "intro": "Ton styliste IA personnel est prêt. Commence par ajouter tes premiers vêtements\n"
+                     "        pour recevoir des suggestions personnalisées chaque matin.",
+            "list_title": "Tes 3 premières étapes :",
+            "steps": ["📸 &nbsp;Prends en photo tes vêtements préférés",
+                      "✨ &nbsp;Reçois ta première suggestion de tenue",
+                      "🔔 &nbsp;Active les notifications pour ton look du matin"],
+            "cta": "Découvrir mon styliste →",
+        },
+        "winback_day7": {
+            "subject": "{{prenom}}, ton look du moment t'attend 👀",
+            "title": "{{prenom}}, tu nous manques ! 👀",
+            "intro": "Ça fait une semaine que tu n'es pas revenu(e). La météo{{ville_txt}} a changé\n"
+                     "        — et ton styliste IA a de nouvelles idées de tenues pour toi.",
+            "ville_txt": " à {ville}",
+            "offer": "🎁 Reviens aujourd'hui et reçois 7 suggestions offertes",
+            "cta": "Voir mon look du jour →",
+        },
+        "upgrade_reminder": {
+            "subject": "{{prenom}}, suggestions illimitées à €0.10/jour 💎",
+            "title": "{{prenom}}, tu rates le meilleur 💎",
+            "intro": "Pendant que tu utilises Digital Stylist gratuitement, les membres Premium\n"
+                     "        reçoivent des suggestions illimitées, le chat stylist sans limite, et\n"
+                     "        les analyses avancées de leur garde-robe.",
+            "list_title": "Premium, c'est :",
+            "steps": ["✅ &nbsp;Suggestions illimitées chaque jour",
+                      "✅ &nbsp;Chat styliste IA sans limite",
+                      "✅ &nbsp;Garde-robe illimitée (vs 20 pièces)"],
+            "cta": "Passer à Premium — €0.10/jour →",
+        },
+    },
+    "en": {
+        "tagline": "Digital Stylist · Your personal AI stylist",
+        "open_app": "Open the app",
+        "welcome": {
+            "subject": "Welcome {{prenom}} — your AI stylist is waiting ✨",
+            "title": "Welcome, {{prenom}}! 👋",
+            "intro": "Your personal AI stylist is ready. Start by adding your first clothes\n"
+                     "        to get tailored outfit suggestions every morning.",
+            "list_title": "Your first 3 steps:",
+            "steps": ["📸 &nbsp;Snap your favourite clothes",
+                      "✨ &nbsp;Get your first outfit suggestion",
+                      "🔔 &nbsp;Turn on notifications for your morning look"],
+            "cta": "Meet my stylist →",
+        },
+        "winback_day7": {
+            "subject": "{{prenom}}, your look of the day is waiting 👀",
+            "title": "{{prenom}}, we miss you! 👀",
+            "intro": "It's been a week since your last visit. The weather{{ville_txt}} has changed\n"
+                     "        — and your AI stylist has new outfit ideas for you.",
+            "ville_txt": " in {ville}",
+            "offer": "🎁 Come back today and get 7 free suggestions",
+            "cta": "See my look of the day →",
+        },
+        "upgrade_reminder": {
+            "subject": "{{prenom}}, unlimited suggestions for €0.10/day 💎",
+            "title": "{{prenom}}, you're missing the best part 💎",
+            "intro": "While you use Digital Stylist for free, Premium members get unlimited\n"
+                     "        suggestions, unlimited stylist chat and advanced wardrobe insights.",
+            "list_title": "Premium means:",
+            "steps": ["✅ &nbsp;Unlimited suggestions every day",
+                      "✅ &nbsp;Unlimited AI stylist chat",
+                      "✅ &nbsp;Unlimited wardrobe (vs 20 items)"],
+            "cta": "Go Premium — €0.10/day →",
+        },
+    },
+}
+LOCALES = tuple(_COPY)
+
+
+def _base_template(content: str, locale: str) -> str:
+    copy = _COPY[locale]
     return f"""
 <!DOCTYPE html>
-<html lang="fr">
+<html lang="{locale}">
 <head><meta charset="UTF-8"><meta name="viewport" content="width=device-width, initial-scale=1.0">
 <title>Digital Stylist</title></head>
 <body style="margin:0;padding:0;background-color:#030712;font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',sans-serif;">
@@ -82,8 +137,8 @@ def _base_template(content: str) -> str:
         <!-- Footer -->
         <tr><td style="padding-top:24px;text-align:center;">
           <p style="color:#4b5563;font-size:12px;margin:0;">
-            Digital Stylist · Ton styliste IA personnel<br>
-            <a href="{_FRONTEND_URL}" style="color:#7c3aed;text-decoration:none;">Ouvrir l'app</a>
+            {copy["tagline"]}<br>
+            <a href="{_FRONTEND_URL}" style="color:#7c3aed;text-decoration:none;">{copy["open_app"]}</a>
           </p>
         </td></tr>
       </table>
@@ -92,68 +147,95 @@ def _base_template(content: str) -> str:
 </body></html>"""
 
 
-async def send_welcome_email(to: str, prenom: str) -> bool:
-    """Welcome email sent immediately after user creation."""
-    content = f"""
+def _steps(title: str, steps: list[str], accent: str, border: str, heading: str) -> str:
+    lines = "\n".join(
+        f'        <p style="color:#d1d5db;font-size:14px;margin:0{" 0 8px" if i < len(steps) - 1 else ""};">{step}</p>'
+        for i, step in enumerate(steps)
+    )
+    return f"""
+      <div style="background:{accent};border:1px solid {border};border-radius:12px;padding:20px;margin-bottom:24px;">
+        <p style="color:{heading};font-size:13px;font-weight:600;margin:0 0 12px;">{title}</p>
+{lines}
+      </div>"""
+
+
+def _content(copy: dict, middle: str, button: str) -> str:
+    return f"""
       <h1 style="color:#ffffff;font-size:24px;font-weight:800;margin:0 0 8px;">
-        Bienvenue, {prenom} ! 👋
+        {copy["title"]}
       </h1>
       <p style="color:#9ca3af;font-size:15px;line-height:1.6;margin:0 0 24px;">
-        Ton styliste IA personnel est prêt. Commence par ajouter tes premiers vêtements
-        pour recevoir des suggestions personnalisées chaque matin.
-      </p>
-      <div style="background:rgba(168,85,247,0.1);border:1px solid rgba(168,85,247,0.2);border-radius:12px;padding:20px;margin-bottom:24px;">
-        <p style="color:#c084fc;font-size:13px;font-weight:600;margin:0 0 12px;">Tes 3 premières étapes :</p>
-        <p style="color:#d1d5db;font-size:14px;margin:0 0 8px;">📸 &nbsp;Prends en photo tes vêtements préférés</p>
-        <p style="color:#d1d5db;font-size:14px;margin:0 0 8px;">✨ &nbsp;Reçois ta première suggestion de tenue</p>
-        <p style="color:#d1d5db;font-size:14px;margin:0;">🔔 &nbsp;Active les notifications pour ton look du matin</p>
-      </div>
-      <a href="{_FRONTEND_URL}" style="display:inline-block;background:linear-gradient(135deg,#7c3aed,#db2777);color:#ffffff;font-size:15px;font-weight:700;text-decoration:none;padding:14px 32px;border-radius:12px;">
-        Découvrir mon styliste →
+        {copy["intro"]}
+      </p>{middle}
+      <a href="{_FRONTEND_URL}" style="display:inline-block;background:{button};color:#ffffff;font-size:15px;font-weight:700;text-decoration:none;padding:14px 32px;border-radius:12px;">
+        {copy["cta"]}
       </a>"""
-    return await _send(to, f"Bienvenue {prenom} — ton styliste IA t'attend ✨", _base_template(content))
 
 
-async def send_winback_day7(to: str, prenom: str, ville: Optional[str] = None) -> bool:
+def _welcome(locale: str) -> tuple[str, str]:
+    """Welcome email sent immediately after user creation."""
+    copy = _COPY[locale]["welcome"]
+    steps = _steps(copy["list_title"], copy["steps"], "rgba(168,85,247,0.1)", "rgba(168,85,247,0.2)", "#c084fc")
+    return copy["subject"], _base_template(_content(copy, steps, "linear-gradient(135deg,#7c3aed,#db2777)"), locale)
+
+
+def _winback_day7(locale: str) -> tuple[str, str]:
     """Winback email at D+7 inactivity."""
-    ville_txt = f" à {ville}" if ville else ""
-    content = f"""
-      <h1 style="color:#ffffff;font-size:24px;font-weight:800;margin:0 0 8px;">
-        {prenom}, tu nous manques ! 👀
-      </h1>
-      <p style="color:#9ca3af;font-size:15px;line-height:1.6;margin:0 0 24px;">
-        Ça fait une semaine que tu n'es pas revenu(e). La météo{ville_txt} a changé
-        — et ton styliste IA a de nouvelles idées de tenues pour toi.
-      </p>
+    copy = _COPY[locale]["winback_day7"]
+    offer = f"""
       <div style="background:rgba(251,191,36,0.08);border:1px solid rgba(251,191,36,0.2);border-radius:12px;padding:20px;margin-bottom:24px;">
         <p style="color:#fbbf24;font-size:14px;font-weight:600;margin:0;">
-          🎁 Reviens aujourd'hui et reçois 7 suggestions offertes
+          {copy["offer"]}
         </p>
-      </div>
-      <a href="{_FRONTEND_URL}" style="display:inline-block;background:linear-gradient(135deg,#7c3aed,#db2777);color:#ffffff;font-size:15px;font-weight:700;text-decoration:none;padding:14px 32px;border-radius:12px;">
-        Voir mon look du jour →
-      </a>"""
-    return await _send(to, f"{prenom}, ton look du moment t'attend 👀", _base_template(content))
+      </div>"""
+    return copy["subject"], _base_template(_content(copy, offer, "linear-gradient(135deg,#7c3aed,#db2777)"), locale)
 
 
-async def send_upgrade_reminder(to: str, prenom: str) -> bool:
+def _upgrade_reminder(locale: str) -> tuple[str, str]:
     """Upsell email at D+14 for free-tier users."""
-    content = f"""
-      <h1 style="color:#ffffff;font-size:24px;font-weight:800;margin:0 0 8px;">
-        {prenom}, tu rates le meilleur 💎
-      </h1>
-      <p style="color:#9ca3af;font-size:15px;line-height:1.6;margin:0 0 24px;">
-        Pendant que tu utilises Digital Stylist gratuitement, les membres Premium
-        reçoivent des suggestions illimitées, le chat stylist sans limite, et
-        les analyses avancées de leur garde-robe.
-      </p>
-      <div style="background:rgba(251,191,36,0.08);border:1px solid rgba(251,191,36,0.2);border-radius:12px;padding:20px;margin-bottom:24px;">
-        <p style="color:#fbbf24;font-size:13px;font-weight:600;margin:0 0 12px;">Premium, c'est :</p>
-        <p style="color:#d1d5db;font-size:14px;margin:0 0 8px;">✅ &nbsp;Suggestions illimitées chaque jour</p>
-        <p style="color:#d1d5db;font-size:14px;margin:0 0 8px;">✅ &nbsp;Chat styliste IA sans limite</p>
-        <p style="color:#d1d5db;font-size:14px;margin:0;">✅ &nbsp;Garde-robe illimitée (vs 20 pièces)</p>
-      </div>
-      <a href="{_FRONTEND_URL}" style="display:inline-block;background:linear-gradient(135deg,#d97706,#f59e0b);color:#ffffff;font-size:15px;font-weight:700;text-decoration:none;padding:14px 32px;border-radius:12px;">
-        Passer à Premium — €0.10/jour →
-      </a>"""
-    return await _send(to, f"{prenom}, suggestions illimitées à €0.10/jour 💎", _base_template(content))
+    copy = _COPY[locale]["upgrade_reminder"]
+    steps = _steps(copy["list_title"], copy["steps"], "rgba(251,191,36,0.08)", "rgba(251,191,36,0.2)", "#fbbf24")
+    return copy["subject"], _base_template(_content(copy, steps, "linear-gradient(135deg,#d97706,#f59e0b)"), locale)
+
+
+TEMPLATES = {
+    "welcome": _welcome,
+    "winback_day7": _winback_day7,
+    "upgrade_reminder": _upgrade_reminder,
+}
+
+
+def locale_for(locale: Optional[str]) -> str:
+    return locale if locale in _COPY else DEFAULT_LOCALE
+
+
+@lru_cache(maxsize=None)
+def render(template: str, locale: str = DEFAULT_LOCALE) -> tuple[str, str]:
+    """(subject, html) of ``template`` in ``locale``, with {{placeholders}} left in."""
+    return TEMPLATES[template](locale_for(locale))
+
+
+def personalize(template: str, locale: str, text: str, prenom: str = "", ville: Optional[str] = None,
+                escape: bool = True) -> str:
+    """Fill the recipient's values into a rendered body (HTML-escaped) or subject (``escape=False``)."""
+    copy = _COPY[locale_for(locale)][template]
+    ville_txt = copy.get("ville_txt", "").format(ville=ville) if ville else ""
+    quote = html.escape if escape else str
+    return text.replace("{{prenom}}", quote(prenom)).replace("{{ville_txt}}", quote(ville_txt))
+
+
+def render_for(template: str, locale: Optional[str] = None, **params) -> tuple[str, str]:
+    """(subject, html) of ``template`` for one recipient."""
+    locale = locale_for(locale)
+    subject, body = render(template, locale)
+    return personalize(template, locale, subject, escape=False, **params), personalize(template, locale, body, **params)
+
+
+def queue_email(session: AsyncSession, template: str, to: str, user_id: Optional[int] = None,
+                locale: Optional[str] = None, **params) -> bool:
+    """Render ``template`` with ``params`` and add it to the outbox (caller commits).
+
+    Returns False when emails are disabled (no RESEND_API_KEY).
+    """
+    subject, body = render_for(template, locale, **params)
+    return email_outbox.enqueue(session, template, to, subject, body, user_id=user_id) is not None
@@ -0,0 +1,173 @@
+"""
+Native async sender for the FCM HTTP v1 API.
+
+firebase-admin is synchronous: every send holds a worker thread, and ``send_each`` fans a
+batch out over one thread per message. This client talks to
+``POST /v1/projects/{project}/messages:send`` directly:
+
+  - OAuth access token minted from the service account (signed JWT → token_uri), cached
+    until FCM_TOKEN_REFRESH_MARGIN_S before expiry and refreshed by a single caller
+  - one pooled httpx client, HTTP/2 — many concurrent sends are multiplexed over a few
+    connections instead of one TLS handshake per message
+  - at most FCM_HTTP_CONCURRENCY sends in flight; 401 refreshes the token and retries
+    once, 429/5xx retry once after Retry-After (capped)
+
+push_service uses it behind ``send_push`` / ``send_push_batch`` (FCM_TRANSPORT=http2).
+``standins/fcm.py`` mimics both endpoints for tests and benchmarks.
+"""
+import asyncio
+import email.utils
+import logging
+import os
+import time
+from typing import Optional
+
+import httpx
+from google.auth import crypt, jwt
+
+from app.services.push_service import PushMessage, PushResult
+
+logger = logging.getLogger(__name__)
+
+FCM_API_URL = os.getenv("FCM_API_URL", "https://fcm.googleapis.com")
+FCM_HTTP_CONCURRENCY = int(os.getenv("FCM_HTTP_CONCURRENCY", "200"))
+FCM_HTTP_CONNECTIONS = int(os.getenv("FCM_HTTP_CONNECTIONS", "4"))
+FCM_TOKEN_REFRESH_MARGIN_S = 300
+FCM_MAX_RETRY_DELAY_S = 5.0
+
+_SCOPE = "https://www.googleapis.com/auth/firebase.messaging"
+_GOOGLE_TOKEN_URI = "https://oauth2.googleapis.com/token"
+_INVALID_TOKEN_CODES = {"UNREGISTERED", "SENDER_ID_MISMATCH"}
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def message_payload(message: PushMessage) -> dict:
+    """HTTP v1 JSON for a message — same content as push_service._build_message."""
+    return {"message": {
+        "token": message.fcm_token,
+        "notification": {"title": message.title, "body": message.body},
+        "data": {k: str(v) for k, v in (message.data or {}).items()},
+        "android": {"priority": "high"},
+        "apns": {"payload": {"aps": {"sound": "default", "badge": 1}}},
+        "webpush": {"notification": {
+            "title": message.title,
+            "body": message.body,
+            "icon": "/icon-192.png",
+            "badge": "/icon-192.png",
+            "vibrate": [200, 100, 200],
+        }},
+    }}
+
+
+def _error(resp: httpx.Response) -> tuple[str, str]:
+    """(FCM error code, message) from an error response."""
+    try:
+        error = resp.json().get("error", {})
+    except ValueError:
+        return str(resp.status_code), resp.text[:200]
+    code = error.get("status", str(resp.status_code))
+    for detail in error.get("details", []):
+        if detail.get("errorCode"):
+            code = detail["errorCode"]
+    return code, error.get("message", "")
+
+
+def _retry_after(resp: httpx.Response) -> float:
+    value = resp.headers.get("Retry-After", "1")
+    try:
+        delay = float(value)
+    except ValueError:
+        parsed = email.utils.parsedate_to_datetime(value) if value else None
+        delay = parsed.timestamp() - time.time() if parsed else 1.0
+    return max(0.0, min(delay, FCM_MAX_RETRY_DELAY_S))
+
+
+class FcmClient:
+    """Async FCM v1 sender for one service account. Create and use it on a single event loop."""
+
+    def __init__(
+        self,
+        service_account: dict,
+        *,
+        api_url: str = FCM_API_URL,
+        concurrency: int = FCM_HTTP_CONCURRENCY,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        self.project_id = service_account["project_id"]
+        self._email = service_account["client_email"]
+        self._token_uri = service_account.get("token_uri") or _GOOGLE_TOKEN_URI
+        self._signer = crypt.RSASigner.from_service_account_info(service_account)
+        self._send_url = f"{api_url.rstrip('/')}/v1/projects/{self.project_id}/messages:send"
+        self._http = httpx.AsyncClient(
+            http2=True,
+            transport=transport,
+            timeout=httpx.Timeout(10, connect=5),
+            limits=httpx.Limits(max_connections=FCM_HTTP_CONNECTIONS, keepalive_expiry=60),
+        )
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._token: Optional[str] = None
+        self._token_expiry = 0.0
+        self._token_lock = asyncio.Lock()
+        self.stats = {"sent": 0, "failed": 0, "invalid_tokens": 0, "retries": 0, "token_refreshes": 0}
+
+    async def _access_token(self, stale: Optional[str] = None) -> str:
+        """Cached OAuth token; ``stale`` forces a refresh unless another caller already did."""
+        async with self._token_lock:
+            if self._token is None or self._token == stale or time.time() >= self._token_expiry:
+                now = int(time.time())
+                assertion = jwt.encode(self._signer, {
+                    "iss": self._email, "scope": _SCOPE, "aud": self._token_uri,
+                    "iat": now, "exp": now + 3600,
+                })
+                resp = await self._http.post(self._token_uri, data={
+                    "grant_type": "urn:ietf:params:oauth:grant-type:jwt-bearer",
+                    "assertion": assertion.decode() if isinstance(assertion, bytes) else assertion,
+                })
+                resp.raise_for_status()
+                body = resp.json()
+                self._token = body["access_token"]
+                self._token_expiry = time.time() + int(body.get("expires_in", 3600)) - FCM_TOKEN_REFRESH_MARGIN_S
+                self.stats["token_refreshes"] += 1
+            return self._token
+
+    async def send(self, message: PushMessage) -> PushResult:
+        async with self._semaphore:
+            try:
+                return await self._send(message)
+            except Exception as exc:  # transport / auth failure: nothing known about the token
+                logger.warning("FCM send to …%s failed: %r", message.fcm_token[-6:], exc)
+                self.stats["failed"] += 1
+                return PushResult(message.fcm_token, success=False)
+
+    async def _send(self, message: PushMessage) -> PushResult:
+        payload = message_payload(message)
+        token = await self._access_token()
+        for attempt in range(2):
+            resp = await self._http.post(self._send_url, json=payload, headers={"Authorization": f"Bearer {token}"})
+            if attempt == 0 and resp.status_code == 401:
+                token = await self._access_token(stale=token)
+            elif attempt == 0 and resp.status_code in _RETRY_STATUSES:
+                self.stats["retries"] += 1
+                await asyncio.sleep(_retry_after(resp))
+            else:
+                break
+
+        if resp.status_code == 200:
+            self.stats["sent"] += 1
+            return PushResult(message.fcm_token, success=True)
+
+        code, text = _error(resp)
+        invalid = code in _INVALID_TOKEN_CODES or (code == "INVALID_ARGUMENT" and "registration token" in text.lower())
+        self.stats["failed"] += 1
+        if invalid:
+            self.stats["invalid_tokens"] += 1
+        else:
+            logger.warning("FCM send to …%s failed: %s %s", message.fcm_token[-6:], code, text)
+        return PushResult(message.fcm_token, success=False, invalid_token=invalid)
+
+    async def send_many(self, messages: list[PushMessage]) -> list[PushResult]:
+        """One result per message, in order; at most ``concurrency`` requests in flight."""
+        return list(await asyncio.gather(*(self.send(m) for m in messages)))
+
+    async def aclose(self) -> None:
+        await self._http.aclose()
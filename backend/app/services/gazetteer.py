@@ -0,0 +1,126 @@
+"""
+Offline gazetteer: city name → coordinates without a network round trip.
+
+``app/data/cities.tsv`` bundles French communes above ~15,000 inhabitants (plus the
+overseas capitals) and the main European cities, with their usual French names as extra
+rows (Londres, Munich, Genève…). It is loaded once into two parallel lists sorted by
+``city_key``, so a lookup is a couple of ``bisect`` calls — microseconds, no I/O.
+
+Matching, on the accent/case/punctuation-insensitive key:
+  1. exact name                       "saint etienne"      → Saint-Étienne
+  2. trailing qualifiers dropped      "Lyon 3e", "Nice, France"
+  3. whole-word prefix                "Clermont"           → Clermont-Ferrand
+Ambiguous names go to the French city if there is one, else the most populous. Anything
+else returns None and the caller falls back to the network geocoder
+(``weather_cache.resolve_city``).
+
+``timezone_at(lat, lon)`` gives the IANA time zone of the nearest bundled city, for
+coordinates that came from anywhere (gazetteer or network geocoder).
+"""
+import bisect
+import csv
+import logging
+import math
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from app.services.outfit_engine import normalize
+
+logger = logging.getLogger(__name__)
+
+DATA_PATH = Path(__file__).resolve().parent.parent / "data" / "cities.tsv"
+
+# Letters NFKD does not decompose, and punctuation that never distinguishes two cities
+_FOLD = str.maketrans({"ł": "l", "ø": "o", "æ": "ae", "œ": "oe", "ß": "ss", "đ": "d",
+                       "-": " ", "'": " ", "’": " ", ",": " ", ".": " ", "(": " ", ")": " "})
+_ABBREVIATIONS = {"st": "saint", "ste": "sainte"}
+_QUALIFIERS = {"france", "belgique", "suisse", "cedex", "fr", "be", "ch"}
+_NOT_A_PREFIX = {"saint", "sainte", "le", "la", "les", "san", "den", "mont", "port"}
+
+
+class Place(NamedTuple):
+    name: str
+    country: str
+    population: int
+    latitude: float
+    longitude: float
+    timezone: str
+
+
+def city_key(city: Optional[str]) -> str:
+    """"Saint-Étienne " / "st etienne" → "saint etienne"."""
+    words = normalize(city).translate(_FOLD).split()
+    return " ".join(_ABBREVIATIONS.get(w, w) for w in words)
+
+
+_keys: list[str] = []
+_places: list[Place] = []
+
+
+def _load() -> None:
+    rows = []
+    with DATA_PATH.open(encoding="utf-8", newline="") as f:
+        for name, country, population, lat, lon, tz in csv.reader(f, delimiter="\t"):
+            if name.startswith("#"):
+                continue
+            rows.append((city_key(name), Place(name, country, int(population), float(lat), float(lon), tz)))
+    rows.sort(key=lambda r: r[0])  # the file is kept sorted; this only guards hand edits
+    _keys[:] = [k for k, _ in rows]
+    _places[:] = [p for _, p in rows]
+    logger.info("Gazetteer loaded: %d names", len(_keys))
+
+
+def _best(lo: int, hi: int) -> Optional[Place]:
+    return max(_places[lo:hi], key=lambda p: (p.country == "FR", p.population)) if hi > lo else None
+
+
+def _exact(key: str) -> Optional[Place]:
+    return _best(bisect.bisect_left(_keys, key), bisect.bisect_right(_keys, key))
+
+
+def lookup(city: Optional[str]) -> Optional[Place]:
+    """Best bundled match for ``city``, or None."""
+    if not _keys:
+        _load()
+    words = city_key(city).split()
+    while words and (words[-1] in _QUALIFIERS or any(c.isdigit() for c in words[-1])):
+        words.pop()
+    key = " ".join(words)
+    if not key:
+        return None
+
+    place = _exact(key)
+    if place is None and len(key) >= 3 and key not in _NOT_A_PREFIX:
+        # Names starting with the query as whole words: "clermont" → "clermont ferrand"
+        place = _best(bisect.bisect_left(_keys, key + " "), bisect.bisect_left(_keys, key + "!"))
+    return place
+
+
+_MAX_TIMEZONE_DISTANCE_KM = 800
+
+
+def _distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 12742 * math.asin(math.sqrt(a))
+
+
+@lru_cache(maxsize=4096)
+def _timezone_near(lat: float, lon: float) -> Optional[str]:
+    distance, place = min((_distance_km(lat, lon, p.latitude, p.longitude), p) for p in _places)
+    return place.timezone if distance <= _MAX_TIMEZONE_DISTANCE_KM else None
+
+
+def timezone_at(lat: float, lon: float) -> Optional[str]:
+    """Time zone of the nearest bundled city (within 800 km), or None."""
+    if not _keys:
+        _load()
+    return _timezone_near(round(lat, 1), round(lon, 1))
+
+
+def size() -> int:
+    if not _keys:
+        _load()
+    return len(_keys)
@@ -0,0 +1,155 @@
+"""
+Checkpointed batch jobs over the user table.
+
+The morning push and the overnight precompute used to load every push-enabled ``User``
+with ``.scalars().all()`` and keep them for the whole run; a restart mid-run silently
+skipped everyone after that point. Now:
+
+  - ``iter_user_chunks`` streams users by keyset pagination (``id > last id``, ordered,
+    LIMIT chunk) with only the columns the job needs — one short session per chunk
+  - ``start`` records a ``JobRun`` row. If the job has an unfinished run whose worker went
+    quiet (no heartbeat for JOB_RUN_STALE_S) it is taken over instead, and the job resumes
+    after its ``cursor``
+  - ``checkpoint`` stores the last user id fully processed (+ the report so far) after
+    each chunk and doubles as the heartbeat; ``finish`` closes the run
+
+What counts as "already done" for a user stays with the job (``last_morning_push``,
+the precompute cache row), so resuming never sends twice.
+"""
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.models import JobRun, User
+from app.services.scheduler_lease import WORKER_ID
+
+logger = logging.getLogger(__name__)
+
+JOB_USER_CHUNK_SIZE = int(os.getenv("JOB_USER_CHUNK_SIZE", "1000"))
+JOB_RUN_STALE_S = float(os.getenv("JOB_RUN_STALE_S", "600"))
+JOB_RUN_RETENTION_DAYS = 14
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _aware(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+async def iter_user_chunks(session_factory, columns: tuple, *where, after_id: int = 0,
+                           chunk_size: int = JOB_USER_CHUNK_SIZE):
+    """Yield lists of rows (``columns`` of User, must include ``User.id``) by id order."""
+    while True:
+        async with session_factory() as session:
+            result = await session.execute(
+                select(*columns).where(User.id > after_id, *where).order_by(User.id).limit(chunk_size)
+            )
+            rows = result.all()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < chunk_size:
+            return
+        after_id = rows[-1].id
+
+
+async def start(session: AsyncSession, job: str, key: str, resume_within_s: float) -> Optional[JobRun]:
+    """Resume ``job``'s unfinished run or start a new one for ``key``. Commits.
+
+    Returns None when another worker's run is still active, or when ``key`` already ran.
+    Unfinished runs older than ``resume_within_s`` are marked abandoned.
+    """
+    now = _now()
+    result = await session.execute(
+        select(JobRun).where(JobRun.job == job, JobRun.status == "running").order_by(JobRun.id.desc())
+    )
+    for run in result.scalars().all():
+        alive = now - _aware(run.heartbeat_at) < timedelta(seconds=JOB_RUN_STALE_S)
+        if run.holder != WORKER_ID and alive:
+            logger.info("%s still running on %s — not starting another", run.run_key, run.holder)
+            return None
+        if now - _aware(run.started_at) <= timedelta(seconds=resume_within_s):
+            taken = await session.execute(
+                update(JobRun)
+                .where(JobRun.id == run.id, JobRun.holder == run.holder, JobRun.status == "running")
+                .values(holder=WORKER_ID, heartbeat_at=now)
+            )
+            await session.commit()
+            if taken.rowcount != 1:
+                return None  # another worker took it over first
+            await session.refresh(run)
+            logger.info("Resuming %s after user %d (was %s)", run.run_key, run.cursor, run.holder)
+            return run
+        run.status, run.finished_at = "abandoned", now
+        session.add(run)
+        logger.warning("Abandoning %s stopped after user %d", run.run_key, run.cursor)
+
+    run = JobRun(job=job, run_key=f"{job}:{key}", holder=WORKER_ID, started_at=now, heartbeat_at=now)
+    session.add(run)
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        return None
+    await session.refresh(run)
+    return run
+
+
+async def has_stale_run(session: AsyncSession, job: str, resume_within_s: float) -> bool:
+    """True if ``job`` has an unfinished run, started within ``resume_within_s``, whose
+    worker stopped checkpointing — i.e. one ``start`` would resume."""
+    now = _now()
+    result = await session.execute(
+        select(JobRun.started_at, JobRun.heartbeat_at).where(JobRun.job == job, JobRun.status == "running")
+    )
+    return any(
+        now - _aware(heartbeat_at) >= timedelta(seconds=JOB_RUN_STALE_S)
+        and now - _aware(started_at) <= timedelta(seconds=resume_within_s)
+        for started_at, heartbeat_at in result.all()
+    )
+
+
+def resumed_progress(run: JobRun) -> dict:
+    return json.loads(run.progress) if run.progress else {}
+
+
+async def checkpoint(session: AsyncSession, run: JobRun, cursor: int, progress: dict) -> bool:
+    """Record progress up to ``cursor``. False if this worker no longer owns the run."""
+    result = await session.execute(
+        update(JobRun)
+        .where(JobRun.id == run.id, JobRun.holder == WORKER_ID, JobRun.status == "running")
+        .values(cursor=cursor, progress=json.dumps(progress, default=str),
+                heartbeat_at=_now())
+    )
+    await session.commit()
+    if result.rowcount != 1:
+        logger.warning("%s taken over by another worker — stopping", run.run_key)
+        return False
+    run.cursor = cursor
+    return True
+
+
+async def finish(session: AsyncSession, run: JobRun, progress: dict) -> None:
+    now = _now()
+    await session.execute(
+        update(JobRun)
+        .where(JobRun.id == run.id, JobRun.holder == WORKER_ID)
+        .values(status="done", finished_at=now, heartbeat_at=now, progress=json.dumps(progress, default=str))
+    )
+    await session.execute(
+        delete(JobRun).where(
+            JobRun.job == run.job,
+            JobRun.status != "running",
+            JobRun.started_at < now - timedelta(days=JOB_RUN_RETENTION_DAYS),
+        )
+    )
+    await session.commit()
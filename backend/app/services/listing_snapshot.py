@@ -0,0 +1,260 @@
+"""
+Process-local snapshot of active marketplace listings.
+
+Suggestion and recommendation code reads active listings from here instead of
+querying ``MarketplaceListing`` on every call. The snapshot is column-oriented
+(one array/list per field, sharing a row index) to stay compact, and refreshes
+incrementally from an ``updated_at`` / ``created_at`` watermark:
+
+  - first access             → full load of active listings
+  - after ``invalidate()``   → next access pulls only rows changed since the watermark
+  - every LISTING_SNAPSHOT_TTL_S seconds → same incremental pull
+                               (picks up writes made by other workers)
+
+Routers call ``invalidate()`` whenever a listing is created, updated, cancelled or sold.
+
+Usage:
+    from app.services import listing_snapshot
+    listings = await listing_snapshot.get_active_listings(session, exclude_seller_id=user_id)
+"""
+import asyncio
+import heapq
+import logging
+import os
+import sys
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.models import MarketplaceListing
+
+logger = logging.getLogger(__name__)
+
+LISTING_SNAPSHOT_TTL_S = float(os.getenv("LISTING_SNAPSHOT_TTL_S", "60"))
+
+# Low-cardinality text columns — interned so repeated values share one string
+_INTERNED_COLUMNS = ("condition", "category_type", "color", "season", "size", "brand")
+
+
+def _naive_utc(dt: Optional[datetime]) -> Optional[datetime]:
+    """DB rows come back naive (UTC), freshly created objects are aware — normalise."""
+    if dt is None:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _intern(value: Optional[str]) -> str:
+    return sys.intern(value) if value else ""
+
+
+class _ListingColumns:
+    """Column store for active listings. Rows are removed with swap-with-last."""
+
+    def __init__(self) -> None:
+        self.ids = array("q")
+        self.seller_ids = array("q")
+        self.price_cents = array("q")
+        self.created_ts = array("d")
+        self.title: list[str] = []
+        self.brand: list[str] = []
+        self.condition: list[str] = []
+        self.category_type: list[str] = []
+        self.color: list[str] = []
+        self.season: list[str] = []
+        self.size: list[str] = []
+        self.row_of: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _text_columns(self) -> tuple[list[str], ...]:
+        return (self.title, self.brand, self.condition, self.category_type,
+                self.color, self.season, self.size)
+
+    def upsert(self, listing: MarketplaceListing) -> None:
+        created = _naive_utc(listing.created_at)
+        values = (
+            listing.title or "",
+            _intern(listing.brand),
+            _intern(listing.condition),
+            _intern(listing.category_type),
+            _intern(listing.color),
+            _intern(listing.season),
+            _intern(listing.size),
+        )
+        row = self.row_of.get(listing.id)
+        if row is None:
+            self.row_of[listing.id] = len(self.ids)
+            self.ids.append(listing.id)
+            self.seller_ids.append(listing.seller_id)
+            self.price_cents.append(listing.price_cents)
+            self.created_ts.append(created.timestamp() if created else 0.0)
+            for column, value in zip(self._text_columns(), values):
+                column.append(value)
+            return
+
+        self.seller_ids[row] = listing.seller_id
+        self.price_cents[row] = listing.price_cents
+        for column, value in zip(self._text_columns(), values):
+            column[row] = value
+
+    def remove(self, listing_id: int) -> None:
+        row = self.row_of.pop(listing_id, None)
+        if row is None:
+            return
+        last = len(self.ids) - 1
+        columns = (self.ids, self.seller_ids, self.price_cents, self.created_ts, *self._text_columns())
+        if row != last:
+            for column in columns:
+                column[row] = column[last]
+            self.row_of[self.ids[row]] = row
+        for column in columns:
+            column.pop()
+
+    def row_dict(self, row: int) -> dict:
+        return {
+            "id": self.ids[row],
+            "title": self.title[row],
+            "brand": self.brand[row] or None,
+            "price_cents": self.price_cents[row],
+            "condition": self.condition[row],
+            "category_type": self.category_type[row],
+            "color": self.color[row],
+            "season": self.season[row],
+            "size": self.size[row] or None,
+        }
+
+
+class ListingSnapshot:
+    def __init__(self) -> None:
+        self._columns = _ListingColumns()
+        self._watermark: Optional[datetime] = None
+        self._loaded = False
+        self._dirty = False
+        self._refreshed_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self) -> None:
+        """Mark the snapshot stale — the next read pulls changed rows from the DB."""
+        self._dirty = True
+
+    def reset(self) -> None:
+        """Drop everything (next read performs a full load)."""
+        self.__init__()
+
+    def _needs_refresh(self) -> bool:
+        if not self._loaded or self._dirty:
+            return True
+        return time.monotonic() - self._refreshed_at >= LISTING_SNAPSHOT_TTL_S
+
+    async def ensure_fresh(self, session: AsyncSession) -> None:
+        if not self._needs_refresh():
+            return
+        async with self._lock:
+            if not self._needs_refresh():
+                return
+            # Clear the flag first: an invalidate() racing with this refresh re-arms it
+            self._dirty = False
+            if self._loaded:
+                await self._refresh_incremental(session)
+            else:
+                await self._load_full(session)
+            self._refreshed_at = time.monotonic()
+
+    async def _load_full(self, session: AsyncSession) -> None:
+        result = await session.execute(
+            select(MarketplaceListing).where(MarketplaceListing.status == "active")
+        )
+        self._columns = _ListingColumns()
+        self._watermark = None
+        for listing in result.scalars().all():
+            self._columns.upsert(listing)
+            self._advance_watermark(listing)
+        self._loaded = True
+        logger.info("Listing snapshot loaded: %d active listings", len(self._columns))
+
+    async def _refresh_incremental(self, session: AsyncSession) -> None:
+        stmt = select(MarketplaceListing)
+        if self._watermark is not None:
+            # >= so rows sharing the watermark timestamp are never missed (upsert is idempotent)
+            stmt = stmt.where(or_(
+                MarketplaceListing.updated_at >= self._watermark,
+                MarketplaceListing.created_at >= self._watermark,
+            ))
+        result = await session.execute(stmt)
+        changed = 0
+        for listing in result.scalars().all():
+            if listing.status == "active":
+                self._columns.upsert(listing)
+            else:
+                self._columns.remove(listing.id)
+            self._advance_watermark(listing)
+            changed += 1
+        logger.debug("Listing snapshot refreshed: %d changed rows, %d active", changed, len(self._columns))
+
+    def _advance_watermark(self, listing: MarketplaceListing) -> None:
+        for ts in (_naive_utc(listing.updated_at), _naive_utc(listing.created_at)):
+            if ts is not None and (self._watermark is None or ts > self._watermark):
+                self._watermark = ts
+
+    def select(
+        self,
+        exclude_seller_id: Optional[int] = None,
+        season: Optional[str] = None,
+        category_type: Optional[str] = None,
+        max_price_cents: Optional[int] = None,
+        limit: int = 50,
+    ) -> list[dict]:
+        """Filter in memory, newest first."""
+        cols = self._columns
+        rows = range(len(cols))
+        if exclude_seller_id is not None:
+            rows = [r for r in rows if cols.seller_ids[r] != exclude_seller_id]
+        if season:
+            rows = [r for r in rows if cols.season[r] == season]
+        if category_type:
+            rows = [r for r in rows if cols.category_type[r] == category_type]
+        if max_price_cents is not None:
+            rows = [r for r in rows if cols.price_cents[r] <= max_price_cents]
+        newest = heapq.nlargest(limit, rows, key=cols.created_ts.__getitem__)
+        return [cols.row_dict(r) for r in newest]
+
+    def __len__(self) -> int:
+        return len(self._columns)
+
+
+_snapshot = ListingSnapshot()
+
+
+def invalidate() -> None:
+    _snapshot.invalidate()
+
+
+def reset() -> None:
+    _snapshot.reset()
+
+
+async def get_active_listings(
+    session: AsyncSession,
+    exclude_seller_id: Optional[int] = None,
+    season: Optional[str] = None,
+    category_type: Optional[str] = None,
+    max_price_cents: Optional[int] = None,
+    limit: int = 50,
+) -> list[dict]:
+    """Active listings as prompt-ready dicts, served from the in-memory snapshot."""
+    await _snapshot.ensure_fresh(session)
+    return _snapshot.select(
+        exclude_seller_id=exclude_seller_id,
+        season=season,
+        category_type=category_type,
+        max_price_cents=max_price_cents,
+        limit=limit,
+    )
@@ -0,0 +1,244 @@
+"""
+Constraint-based outfit combination counter.
+
+Counts (and enumerates / samples) the valid outfits a wardrobe can make, instead of
+the old ``tops × bottoms`` estimate. An outfit is:
+
+    (top + bottom | dress) + one pair of shoes (if the wardrobe has any) + optional outer layer
+
+and every pair of pieces in it must be compatible on:
+  - colour  — colour-wheel harmony (``outfit_engine.colour_harmony``) ≥ COLOUR_MIN_HARMONY
+  - season  — no winter piece with a summer piece
+  - style   — no sport piece with a formal piece (from ``tags_ia``)
+
+Items are grouped into classes sharing (slot, colour, season, style): every item of a
+class has the same compatibility row. Each item is one bit of a Python int, laid out
+class by class, and each class keeps the bitset of all items it is compatible with.
+Counting loops over *classes* and intersects item bitsets, so the innermost step is
+an ``&`` + ``int.bit_count()`` instead of a loop over items.
+
+Usage:
+    engine = OutfitCombinations(items)   # dicts with id / type / couleur / saison / tags_ia
+    engine.count()
+    engine.sample(5, seed=42)
+"""
+import random
+from itertools import islice
+from typing import Iterator, Optional
+
+from app.services.outfit_engine import (
+    colour_harmony, colour_key, garment_slot, item_style, normalize, season_key,
+)
+
+COLOUR_MIN_HARMONY = 0.5
+
+_STYLE_FAMILIES = (
+    ("formal", ("business", "smart", "chic", "preppy", "classique", "elegant", "formel")),
+    ("sport", ("sport", "athleisure", "running", "training")),
+)
+_INCOMPATIBLE_STYLES = {frozenset(("formal", "sport"))}
+_INCOMPATIBLE_SEASONS = {frozenset(("hiver", "ete"))}
+
+# Slots that take part in an outfit (accessories do not change the count)
+_OUTFIT_SLOTS = ("top", "bottom", "dress", "shoes", "outer")
+
+
+def style_family(item: dict) -> str:
+    style = normalize(item_style(item))
+    for family, keywords in _STYLE_FAMILIES:
+        if any(k in style for k in keywords):
+            return family
+    return "casual"
+
+
+def compatible(key_a: tuple, key_b: tuple) -> bool:
+    """Pairwise constraint between two class keys (slot, colour, season, style)."""
+    _, colour_a, season_a, style_a = key_a
+    _, colour_b, season_b, style_b = key_b
+    if colour_harmony(colour_a, colour_b) < COLOUR_MIN_HARMONY:
+        return False
+    if frozenset((season_a, season_b)) in _INCOMPATIBLE_SEASONS:
+        return False
+    return frozenset((style_a, style_b)) not in _INCOMPATIBLE_STYLES
+
+
+def _bits(mask: int) -> Iterator[int]:
+    """Indices of the set bits of ``mask``, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class _Class:
+    __slots__ = ("key", "slot", "items", "first_bit", "mask", "compat")
+
+    def __init__(self, key: tuple, items: list[dict], first_bit: int) -> None:
+        self.key = key
+        self.slot = key[0]
+        self.items = items
+        self.first_bit = first_bit
+        self.mask = ((1 << len(items)) - 1) << first_bit  # bits of this class's items
+        self.compat = 0  # bits of every item compatible with this class
+
+    @property
+    def weight(self) -> int:
+        return len(self.items)
+
+
+class OutfitCombinations:
+    def __init__(self, items: list[dict]) -> None:
+        groups: dict[tuple, list[dict]] = {}
+        for item in items:
+            slot = garment_slot(item.get("type"))
+            if slot not in _OUTFIT_SLOTS:
+                continue
+            key = (slot, colour_key(item.get("couleur")), season_key(item.get("saison")), style_family(item))
+            groups.setdefault(key, []).append(item)
+
+        self.classes: list[_Class] = []
+        self.items: list[dict] = []  # bit index → item
+        for key in sorted(groups):
+            cls = _Class(key, groups[key], len(self.items))
+            self.classes.append(cls)
+            self.items.extend(cls.items)
+
+        # Per-attribute "compatible with value v" masks, then one AND per class
+        all_bits = (1 << len(self.items)) - 1
+        colour_ok = self._attribute_masks(1, lambda x, y: colour_harmony(x, y) >= COLOUR_MIN_HARMONY)
+        season_ok = self._attribute_masks(2, lambda x, y: frozenset((x, y)) not in _INCOMPATIBLE_SEASONS)
+        style_ok = self._attribute_masks(3, lambda x, y: frozenset((x, y)) not in _INCOMPATIBLE_STYLES)
+        slot_bits: dict[str, int] = {}
+        for cls in self.classes:
+            slot_bits[cls.slot] = slot_bits.get(cls.slot, 0) | cls.mask
+        for cls in self.classes:
+            _, colour, season, style = cls.key
+            cls.compat = colour_ok[colour] & season_ok[season] & style_ok[style] & (all_bits ^ slot_bits[cls.slot])
+
+        self.by_slot: dict[str, list[_Class]] = {slot: [] for slot in _OUTFIT_SLOTS}
+        self.slot_mask: dict[str, int] = dict.fromkeys(_OUTFIT_SLOTS, 0)
+        for cls in self.classes:
+            self.by_slot[cls.slot].append(cls)
+            self.slot_mask[cls.slot] |= cls.mask
+        self.has_shoes = bool(self.slot_mask["shoes"])
+        # Completions only depend on the core mask restricted to shoes + outer layers
+        self._tail_bits = self.slot_mask["shoes"] | self.slot_mask["outer"]
+        self._tail_memo: dict[int, int] = {}
+
+    def _attribute_masks(self, position: int, ok) -> dict[str, int]:
+        """value → bitset of items whose attribute at ``position`` of the class key is compatible with it."""
+        values = sorted({cls.key[position] for cls in self.classes})
+        masks = {}
+        for value in values:
+            mask = 0
+            for cls in self.classes:
+                if ok(value, cls.key[position]):
+                    mask |= cls.mask
+            masks[value] = mask
+        return masks
+
+    # ------------------------------------------------------------------
+    # Cores: (top, bottom) class pairs and dress classes, with their common mask
+    # ------------------------------------------------------------------
+    def _cores(self) -> Iterator[tuple[tuple[_Class, ...], int]]:
+        bottoms = self.by_slot["bottom"]
+        for top in self.by_slot["top"]:
+            top_compat = top.compat
+            for bottom in bottoms:
+                if top_compat & bottom.mask:
+                    yield (top, bottom), (top_compat & bottom.compat) & self._tail_bits
+        for dress in self.by_slot["dress"]:
+            yield (dress,), dress.compat & self._tail_bits
+
+    def _tail_count(self, mask: int) -> int:
+        """Number of (shoes, optional outer) completions of a core whose common mask is ``mask``."""
+        total = self._tail_memo.get(mask)
+        if total is not None:
+            return total
+        outers = mask & self.slot_mask["outer"]
+        if not self.has_shoes:
+            total = 1 + outers.bit_count()
+        else:
+            total = 0
+            for shoes in self.by_slot["shoes"]:
+                if mask & shoes.mask:
+                    total += shoes.weight * (1 + (outers & shoes.compat).bit_count())
+        self._tail_memo[mask] = total
+        return total
+
+    def _core_weight(self, core: tuple[_Class, ...], mask: int) -> int:
+        weight = 1
+        for cls in core:
+            weight *= cls.weight
+        return weight * self._tail_count(mask)
+
+    def count(self) -> int:
+        """Number of valid outfits."""
+        return sum(self._core_weight(*core) for core in self._cores())
+
+    def count_by_slot(self) -> dict[str, int]:
+        return {slot: mask.bit_count() for slot, mask in self.slot_mask.items()}
+
+    # ------------------------------------------------------------------
+    # Enumeration / sampling (item level)
+    # ------------------------------------------------------------------
+    def _completions(self, core_bits: tuple[int, ...], mask: int) -> Iterator[tuple[int, ...]]:
+        outers = mask & self.slot_mask["outer"]
+        if not self.has_shoes:
+            yield core_bits
+            for o in _bits(outers):
+                yield (*core_bits, o)
+            return
+        for s in _bits(mask & self.slot_mask["shoes"]):
+            yield (*core_bits, s)
+            for o in _bits(outers & self._compat_of(s)):
+                yield (*core_bits, s, o)
+
+    def _compat_of(self, bit: int) -> int:
+        return self._class_of(bit).compat
+
+    def _class_of(self, bit: int) -> _Class:
+        lo, hi = 0, len(self.classes)
+        while hi - lo > 1:  # classes are laid out in bit order
+            mid = (lo + hi) // 2
+            if self.classes[mid].first_bit <= bit:
+                lo = mid
+            else:
+                hi = mid
+        return self.classes[lo]
+
+    def iter_outfits(self, limit: Optional[int] = None) -> Iterator[list[dict]]:
+        """Valid outfits as lists of items (top, bottom | dress, [shoes], [outer])."""
+        def _all() -> Iterator[list[dict]]:
+            for core, mask in self._cores():
+                if len(core) == 2:
+                    top, bottom = core
+                    core_bits = [(t, b) for t in _bits(top.mask) for b in _bits(bottom.mask)]
+                else:
+                    core_bits = [(d,) for d in _bits(core[0].mask)]
+                for bits in core_bits:
+                    for outfit in self._completions(bits, mask):
+                        yield [self.items[i] for i in outfit]
+
+        return islice(_all(), limit)
+
+    def sample(self, k: int, seed: Optional[int] = None) -> list[list[dict]]:
+        """``k`` outfits drawn uniformly (with replacement) among all valid outfits."""
+        rng = random.Random(seed)
+        cores = list(self._cores())
+        weights = [self._core_weight(*core) for core in cores]
+        if not any(weights):
+            return []
+
+        outfits = []
+        for core, mask in rng.choices(cores, weights=weights, k=k):
+            bits = tuple(rng.choice(list(_bits(cls.mask))) for cls in core)
+            # Each completion is equally likely once the core is fixed
+            completions = list(self._completions(bits, mask))
+            outfit = rng.choice(completions)
+            outfits.append([self.items[i] for i in outfit])
+        return outfits
+
+
+def count_outfits(items: list[dict]) -> int:
+    return OutfitCombinations(items).count()
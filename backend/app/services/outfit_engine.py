@@ -0,0 +1,384 @@
+"""
+Local rule-based outfit composer — zero-latency fast path and Gemini fallback.
+
+Deterministic engine over the user's ``ClothingItem`` rows (as the dicts built by
+``suggestion_precompute.load_wardrobe_items``):
+
+  1. Slot assignment   — each item goes to top / bottom / dress / outer / shoes / accessory
+                         from keywords in its ``type`` (earliest keyword wins:
+                         "Veste en jean" → outer, "Jean slim" → bottom)
+  2. Weather fit       — season × temperature band table, plus hard exclusions
+                         (shorts/sandals in the cold, no coat above WARM_NO_OUTER_C)
+  3. Colour harmony    — colours resolved on a colour-wheel table (hue or neutral),
+                         pair scores for monochrome / analogous / triadic / complementary
+  4. Scoring           — every candidate combination is scored from precomputed
+                         item-pair and item-weather tables, so a candidate costs a
+                         handful of list lookups rather than re-deriving colours
+  5. Diversity         — 3 looks picked greedily, penalising re-used pieces
+
+Output has the same shape as ``ai_suggestions.get_daily_suggestions`` with
+``"source": "local"``. ``shortlist_items`` pre-filters a large wardrobe for the LLM prompt.
+"""
+import itertools
+import json
+import logging
+import unicodedata
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+LOOKS_COUNT = 3
+SLOT_SHORTLIST = 8          # best items per slot kept for combination
+COLD_NEEDS_OUTER_C = 14     # below: an outer layer is expected
+WARM_NO_OUTER_C = 22        # above: no coat / jacket
+REUSE_PENALTY = 0.25        # per piece already used in a previous look
+
+# ---------------------------------------------------------------------------
+# Garment slots
+# ---------------------------------------------------------------------------
+SLOTS = ("top", "bottom", "dress", "outer", "shoes", "accessory")
+
+_SLOT_KEYWORDS = {
+    "outer": ("manteau", "veste", "blazer", "doudoune", "parka", "trench", "blouson",
+              "cardigan", "gilet", "anorak", "perfecto", "caban", "impermeable", "coupe-vent"),
+    "top": ("t-shirt", "tee-shirt", "tshirt", "chemise", "chemisier", "pull", "sweat", "hoodie",
+            "haut", "blouse", "top", "polo", "debardeur", "tunique", "col roule", "mariniere", "crop"),
+    "bottom": ("jean", "pantalon", "short", "jupe", "chino", "jogging", "legging", "bermuda",
+               "cargo", "culotte"),
+    "dress": ("robe", "combinaison", "salopette"),
+    "shoes": ("chaussure", "basket", "sneaker", "botte", "bottine", "mocassin", "derby",
+              "escarpin", "sandale", "boots", "richelieu", "espadrille", "tennis", "ballerine",
+              "talon", "loafer"),
+    "accessory": ("sac", "ceinture", "echarpe", "bonnet", "casquette", "chapeau", "lunettes",
+                  "montre", "foulard", "cravate", "bijou", "collier", "gants"),
+}
+
+# Light pieces that make no sense in the cold
+_WARM_ONLY_KEYWORDS = ("short", "bermuda", "sandale", "debardeur", "espadrille", "crop")
+
+
+def normalize(text: Optional[str]) -> str:
+    """Lowercase, strip accents."""
+    text = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in text if not unicodedata.combining(c)).lower().strip()
+
+
+def garment_slot(item_type: Optional[str]) -> str:
+    """Slot for a garment type — the keyword appearing earliest in the type wins."""
+    text = normalize(item_type)
+    best_slot, best_pos = "accessory", None
+    for slot, keywords in _SLOT_KEYWORDS.items():
+        for kw in keywords:
+            pos = text.find(kw)
+            if pos != -1 and (best_pos is None or pos < best_pos):
+                best_slot, best_pos = slot, pos
+    if best_pos is None:
+        return "top"  # unknown garment: most uploads are tops
+    return best_slot
+
+
+# ---------------------------------------------------------------------------
+# Colour wheel — hue in degrees, or None for neutrals
+# ---------------------------------------------------------------------------
+_COLOUR_WHEEL: dict[str, Optional[int]] = {
+    # neutrals
+    "noir": None, "blanc": None, "gris": None, "anthracite": None, "beige": None,
+    "ecru": None, "creme": None, "ivoire": None, "camel": None, "taupe": None,
+    "marron": None, "chocolat": None, "sable": None, "denim": None, "marine": None,
+    "bleu nuit": None, "kaki": None, "argent": None, "nude": None,
+    # chromatic
+    "rouge": 0, "bordeaux": 345, "framboise": 335, "rose": 330, "fuchsia": 320,
+    "corail": 15, "terracotta": 20, "rouille": 22, "orange": 30, "brique": 12,
+    "ocre": 40, "moutarde": 45, "dore": 48, "jaune": 55, "citron": 60,
+    "olive": 75, "vert": 120, "sapin": 140, "emeraude": 145, "menthe": 155,
+    "turquoise": 175, "bleu ciel": 200, "ciel": 200, "bleu": 220, "bleu roi": 225,
+    "cobalt": 222, "indigo": 255, "violet": 275, "lavande": 270, "lilas": 285,
+    "prune": 300, "mauve": 295,
+}
+_COLOUR_KEYS = sorted(_COLOUR_WHEEL, key=len, reverse=True)  # longest match first
+_MULTI = "multicolore"
+
+
+def colour_key(colour: Optional[str]) -> str:
+    """Resolve a free-text colour ("Bleu Nuit", "Vert Sapin") to a colour-wheel key."""
+    text = normalize(colour)
+    if "multi" in text or "imprime" in text:
+        return _MULTI
+    for key in _COLOUR_KEYS:
+        if key in text:
+            return key
+    return "gris"  # unknown colours are treated as neutral
+
+
+def colour_harmony(a: str, b: str) -> float:
+    """Pair score in [0, 1] for two colour-wheel keys."""
+    if a == _MULTI or b == _MULTI:
+        return 0.4 if a == b else 0.7  # one printed piece is fine, two clash
+    hue_a, hue_b = _COLOUR_WHEEL.get(a), _COLOUR_WHEEL.get(b)
+    if hue_a is None and hue_b is None:
+        return 0.8
+    if hue_a is None or hue_b is None:
+        return 0.9  # neutral + accent: safest pairing
+    d = abs(hue_a - hue_b) % 360
+    d = min(d, 360 - d)
+    if d <= 15:
+        return 0.75  # monochrome
+    if d <= 45:
+        return 0.8   # analogous
+    if 150 <= d <= 210:
+        return 0.85  # complementary
+    if 105 <= d <= 135:
+        return 0.7   # triadic
+    return 0.3
+
+
+# ---------------------------------------------------------------------------
+# Season / temperature
+# ---------------------------------------------------------------------------
+def temperature_band(temperature: Optional[float]) -> str:
+    temp = 18.0 if temperature is None else float(temperature)
+    if temp < 10:
+        return "cold"
+    if temp < 18:
+        return "mild"
+    if temp < 25:
+        return "warm"
+    return "hot"
+
+
+def season_key(saison: Optional[str]) -> str:
+    text = normalize(saison)
+    if "hiver" in text or "winter" in text:
+        return "hiver"
+    if "ete" in text or "summer" in text:
+        return "ete"
+    if "mi" in text or "printemps" in text or "automne" in text:
+        return "mi-saison"
+    return "toutes"
+
+
+_SEASON_FIT = {
+    #             cold  mild  warm  hot
+    "hiver":     (1.0,  0.6,  0.0,  0.0),
+    "mi-saison": (0.5,  1.0,  0.7,  0.2),
+    "ete":       (0.0,  0.3,  1.0,  1.0),
+    "toutes":    (0.8,  0.9,  0.9,  0.8),
+}
+_BANDS = ("cold", "mild", "warm", "hot")
+
+
+def weather_fit(item: dict, temperature: Optional[float]) -> float:
+    """0 = excluded for this weather, 1 = perfect."""
+    band = temperature_band(temperature)
+    fit = _SEASON_FIT[season_key(item.get("saison"))][_BANDS.index(band)]
+    text = normalize(item.get("type"))
+    if band == "cold" and any(k in text for k in _WARM_ONLY_KEYWORDS):
+        return 0.0
+    temp = 18.0 if temperature is None else float(temperature)
+    if garment_slot(item.get("type")) == "outer" and temp >= WARM_NO_OUTER_C:
+        return 0.0
+    return fit
+
+
+# ---------------------------------------------------------------------------
+# Style (from tags_ia) → occasion
+# ---------------------------------------------------------------------------
+def item_style(item: dict) -> str:
+    tags = item.get("tags_ia")
+    if not tags:
+        return ""
+    try:
+        data = json.loads(tags)
+        items = data.get("items", []) if isinstance(data, dict) else []
+        return (items[0].get("style") or "") if items else ""
+    except (json.JSONDecodeError, TypeError, AttributeError):
+        return ""
+
+
+_OCCASIONS = (
+    (("business", "smart", "preppy", "chic"), "Bureau / rendez-vous"),
+    (("street", "sport"), "Week-end / sortie"),
+)
+
+
+def _occasion(styles: list[str]) -> str:
+    text = normalize(" ".join(styles))
+    for keywords, occasion in _OCCASIONS:
+        if any(k in text for k in keywords):
+            return occasion
+    return "Journée décontractée"
+
+
+# ---------------------------------------------------------------------------
+# Composition
+# ---------------------------------------------------------------------------
+class _Wardrobe:
+    """Items + precomputed lookup tables used to score candidate combinations."""
+
+    def __init__(self, items: list[dict], temperature: Optional[float]) -> None:
+        self.items = items
+        self.temperature = temperature
+        self.fit = [weather_fit(it, temperature) for it in items]
+        colours = [colour_key(it.get("couleur")) for it in items]
+        styles = [normalize(item_style(it)) for it in items]
+        self.styles = styles
+        # Pair table built once: colour harmony, with a bonus when styles agree
+        palette = sorted(set(colours))
+        colour_idx = {c: i for i, c in enumerate(palette)}
+        colour_table = [[colour_harmony(a, b) for b in palette] for a in palette]
+        cidx = [colour_idx[c] for c in colours]
+        n = len(items)
+        self.pair = [
+            [
+                colour_table[cidx[i]][cidx[j]]
+                + (0.1 if styles[i] and styles[i] == styles[j] else 0.0)
+                for j in range(n)
+            ]
+            for i in range(n)
+        ]
+        self.by_slot: dict[str, list[int]] = {slot: [] for slot in SLOTS}
+        for i, it in enumerate(items):
+            if self.fit[i] > 0:
+                self.by_slot[garment_slot(it.get("type"))].append(i)
+        for slot, idxs in self.by_slot.items():
+            idxs.sort(key=lambda i: self.fit[i], reverse=True)
+            del idxs[SLOT_SHORTLIST:]
+
+    def candidates(self) -> list[tuple[int, ...]]:
+        """Every top×bottom (or dress) core, with optional shoes and outer layer."""
+        cores = [(t, b) for t in self.by_slot["top"] for b in self.by_slot["bottom"]]
+        cores += [(d,) for d in self.by_slot["dress"]]
+        temp = 18.0 if self.temperature is None else float(self.temperature)
+        shoes: list[Optional[int]] = list(self.by_slot["shoes"]) or [None]
+        outers: list[Optional[int]] = list(self.by_slot["outer"])
+        if temp >= WARM_NO_OUTER_C or not outers:
+            outers = [None]
+        elif temp >= COLD_NEEDS_OUTER_C:
+            outers.append(None)  # layer optional at mild temperatures
+        return [
+            tuple(i for i in (*core, shoe, outer) if i is not None)
+            for core, shoe, outer in itertools.product(cores, shoes, outers)
+        ]
+
+    def score_all(self, combos: list[tuple[int, ...]]) -> list[float]:
+        """Score every combination from the precomputed tables."""
+        pair, fit = self.pair, self.fit
+        scores = []
+        for combo in combos:
+            pairs = list(itertools.combinations(combo, 2))
+            harmony = sum(pair[a][b] for a, b in pairs) / len(pairs) if pairs else 0.5
+            weather = sum(fit[i] for i in combo) / len(combo)
+            scores.append(0.6 * harmony + 0.4 * weather)
+        return scores
+
+
+def _piece(item: dict) -> dict:
+    return {
+        "type": item.get("type"),
+        "source": "wardrobe",
+        "item_id": item.get("id"),
+        "couleur": item.get("couleur"),
+        "marque": None,
+    }
+
+
+def _missing_pieces(wardrobe: _Wardrobe, combo: tuple[int, ...]) -> list[dict]:
+    slots = {garment_slot(wardrobe.items[i].get("type")) for i in combo}
+    temp = 18.0 if wardrobe.temperature is None else float(wardrobe.temperature)
+    missing = []
+    if "shoes" not in slots:
+        missing.append({
+            "type": "Baskets blanches minimalistes",
+            "source": "suggestion",
+            "prix_estime": 60.0,
+            "conseil": "Une paire neutre complète presque toutes les tenues.",
+        })
+    if "outer" not in slots and temp < COLD_NEEDS_OUTER_C:
+        missing.append({
+            "type": "Manteau chaud neutre",
+            "source": "suggestion",
+            "prix_estime": 90.0,
+            "conseil": f"À {temp:.0f}°C, une couche chaude est indispensable.",
+        })
+    return missing
+
+
+def compose_outfits(
+    user_profile: dict,
+    weather_data: dict,
+    wardrobe_items: list[dict],
+    looks: int = LOOKS_COUNT,
+) -> dict:
+    """Compose up to ``looks`` diverse outfits from the wardrobe, without any AI call."""
+    prenom = user_profile.get("prenom", "Utilisateur")
+    temp = weather_data.get("temperature")
+    desc = weather_data.get("description", "")
+    ville = weather_data.get("ville", "Paris")
+    greeting = f"Bonjour {prenom} ! {temp}°C à {ville}" + (f", {desc}" if desc else "") + "."
+
+    if not wardrobe_items:
+        return {"greeting": greeting, "suggestions": [], "source": "local"}
+
+    wardrobe = _Wardrobe(wardrobe_items, temp)
+    combos = wardrobe.candidates()
+    if not combos:
+        return {"greeting": greeting, "suggestions": [], "source": "local"}
+    scores = wardrobe.score_all(combos)
+
+    chosen: list[tuple[tuple[int, ...], float]] = []
+    used: set[int] = set()
+    for _ in range(looks):
+        best, best_score = None, -1.0
+        for combo, score in zip(combos, scores):
+            adjusted = score - REUSE_PENALTY * sum(1 for i in combo if i in used)
+            if adjusted > best_score and all(combo != c for c, _ in chosen):
+                best, best_score = combo, adjusted
+        if best is None:
+            break
+        chosen.append((best, best_score))
+        used.update(best)
+
+    suggestions = []
+    for n, (combo, score) in enumerate(chosen, start=1):
+        items = [wardrobe.items[i] for i in combo]
+        styles = [wardrobe.styles[i] for i in combo if wardrobe.styles[i]]
+        colours = ", ".join(normalize(it.get("couleur")) for it in items if it.get("couleur"))
+        suggestions.append({
+            "titre": f"Look {n} — {items[0].get('type')}",
+            "description": (
+                f"Palette {colours} : des couleurs qui s'accordent, "
+                f"des pièces adaptées à {temp}°C."
+            ),
+            "pieces": [_piece(it) for it in items] + _missing_pieces(wardrobe, combo),
+            "occasion": _occasion(styles),
+            "score": round(score, 2),
+        })
+
+    return {"greeting": greeting, "suggestions": suggestions, "source": "local"}
+
+
+def shortlist_items(wardrobe_items: list[dict], weather_data: dict, limit: int = 40) -> list[dict]:
+    """Trim a large wardrobe to the ``limit`` most weather-appropriate items, keeping every slot covered."""
+    if len(wardrobe_items) <= limit:
+        return wardrobe_items
+    temp = weather_data.get("temperature")
+    ranked = sorted(
+        (it for it in wardrobe_items if weather_fit(it, temp) > 0),
+        key=lambda it: weather_fit(it, temp),
+        reverse=True,
+    )
+    per_slot = max(2, limit // len(SLOTS))
+    picked: list[dict] = []
+    counts = dict.fromkeys(SLOTS, 0)
+    for it in ranked:  # first pass: a fair share per slot
+        slot = garment_slot(it.get("type"))
+        if counts[slot] < per_slot:
+            picked.append(it)
+            counts[slot] += 1
+    picked_ids = {id(it) for it in picked}
+    for it in ranked:  # second pass: fill with the best remaining
+        if len(picked) >= limit:
+            break
+        if id(it) not in picked_ids:
+            picked.append(it)
+    return picked[:limit]
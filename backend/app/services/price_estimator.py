@@ -0,0 +1,223 @@
+"""
+Local resale price estimator built from our own sold listings.
+
+``suggest_listing_price`` asks Gemini for "Vinted prices", which are guesses. We have the
+real thing: every ``MarketplaceListing`` that reached ``status == "sold"`` (orders flip it
+when paid) is a price someone actually paid. This module turns the last
+PRICE_HISTORY_DAYS of those into quantile tables (p25 / p50 / p75 of ``price_cents``) keyed
+at several levels, most specific first:
+
+    brand × category × condition
+    brand × category                 (× condition ratio)
+    category × condition
+    category                         (× condition ratio)
+    brand                            (× condition ratio)
+    everything                       (× condition ratio)
+
+``estimate`` walks the levels and answers from the first one with at least
+PRICE_MIN_SAMPLES sales — a few dict lookups, no I/O. The condition ratio (median price for
+a condition / overall median) adjusts levels that pool conditions together.
+
+Each answer carries a confidence in [0, 1] that grows with the sample size, drops with
+the backoff depth and with the price spread. Callers only fall back to Gemini below
+PRICE_MIN_CONFIDENCE.
+
+The tables are process-local and rebuilt from the DB every PRICE_MODEL_TTL_S seconds
+(first use builds them).
+"""
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.models import MarketplaceListing
+from app.services.outfit_engine import normalize
+
+logger = logging.getLogger(__name__)
+
+PRICE_MODEL_TTL_S = float(os.getenv("PRICE_MODEL_TTL_S", str(6 * 3600)))
+PRICE_HISTORY_DAYS = int(os.getenv("PRICE_HISTORY_DAYS", "365"))
+PRICE_MIN_SAMPLES = int(os.getenv("PRICE_MIN_SAMPLES", "5"))
+PRICE_MIN_CONFIDENCE = float(os.getenv("PRICE_MIN_CONFIDENCE", "0.5"))
+_SHRINK_N = 5  # confidence = n / (n + _SHRINK_N) × …: 5 sales → 0.5, 20 → 0.8
+
+# (level name, key fields, confidence weight, pools conditions, reasoning scope)
+_LEVELS = (
+    ("brand_category_condition", ("brand", "category", "condition"), 1.0, False,
+     "même marque, même catégorie, même état"),
+    ("brand_category", ("brand", "category"), 0.9, True, "même marque, même catégorie"),
+    ("category_condition", ("category", "condition"), 0.8, False, "même catégorie, même état"),
+    ("category", ("category",), 0.7, True, "même catégorie"),
+    ("brand", ("brand",), 0.5, True, "même marque"),
+    ("global", (), 0.3, True, "toutes catégories"),
+)
+
+
+def condition_key(condition: Optional[str]) -> str:
+    text = normalize(condition)
+    if "neuf" in text:
+        return "neuf_etiquette" if "avec etiquette" in text else "neuf"
+    if "tres bon" in text:
+        return "tres_bon"
+    if "bon" in text:
+        return "bon"
+    if "satisfaisant" in text or "usage" in text or "abime" in text:
+        return "satisfaisant"
+    return text or "bon"
+
+
+def category_key(category_type: Optional[str]) -> str:
+    """First word of the type, accent-free and singular: "Jeans slim" → "jean"."""
+    words = normalize(category_type).split()
+    if not words:
+        return ""
+    word = words[0]
+    if len(word) > 3 and word[-1] in "sx":
+        word = word[:-1]
+    return word
+
+
+def brand_key(brand: Optional[str]) -> str:
+    return " ".join(normalize(brand).split())
+
+
+def _quantile(values: list[int], q: float) -> float:
+    """Linear-interpolated quantile of an already sorted list."""
+    pos = (len(values) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+
+@dataclass(frozen=True)
+class _Stats:
+    n: int
+    p25: float
+    p50: float
+    p75: float
+
+    @classmethod
+    def of(cls, prices: list[int]) -> "_Stats":
+        prices.sort()
+        return cls(len(prices), _quantile(prices, 0.25), _quantile(prices, 0.5), _quantile(prices, 0.75))
+
+
+class PriceModel:
+    """Immutable quantile tables; build with ``from_rows``."""
+
+    def __init__(self, tables: dict[tuple, _Stats], condition_ratio: dict[str, float], sales: int) -> None:
+        self._tables = tables
+        self._condition_ratio = condition_ratio
+        self.sales = sales
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple[Optional[str], Optional[str], Optional[str], int]]) -> "PriceModel":
+        """rows: (brand, category_type, condition, price_cents) of sold listings."""
+        buckets: dict[tuple, list[int]] = {}
+        by_condition: dict[str, list[int]] = {}
+        sales = 0
+        for brand, category_type, condition, price_cents in rows:
+            if not price_cents or price_cents <= 0:
+                continue
+            sales += 1
+            fields = {"brand": brand_key(brand), "category": category_key(category_type),
+                      "condition": condition_key(condition)}
+            for name, keys, *_ in _LEVELS:
+                values = tuple(fields[k] for k in keys)
+                if all(values):  # unknown brand / category never pools into a keyed level
+                    buckets.setdefault((name, values), []).append(price_cents)
+            by_condition.setdefault(fields["condition"], []).append(price_cents)
+
+        tables = {key: _Stats.of(prices) for key, prices in buckets.items()}
+        overall = tables.get(("global", ()))
+        condition_ratio = {}
+        if overall:
+            for cond, prices in by_condition.items():
+                if len(prices) >= PRICE_MIN_SAMPLES:
+                    condition_ratio[cond] = _Stats.of(prices).p50 / overall.p50
+        return cls(tables, condition_ratio, sales)
+
+    def estimate(
+        self,
+        brand: Optional[str],
+        category_type: Optional[str],
+        condition: Optional[str],
+    ) -> Optional[dict]:
+        """Best local estimate (with its confidence), or None when there is no data at all."""
+        fields = {"brand": brand_key(brand), "category": category_key(category_type),
+                  "condition": condition_key(condition)}
+        for name, keys, weight, pooled, scope in _LEVELS:
+            values = tuple(fields[k] for k in keys)
+            if not all(values):
+                continue
+            stats = self._tables.get((name, values))
+            if stats is None or (stats.n < PRICE_MIN_SAMPLES and name != "global"):
+                continue
+            ratio = self._condition_ratio.get(fields["condition"], 1.0) if pooled else 1.0
+            spread = (stats.p75 - stats.p25) / stats.p50 if stats.p50 else 1.0
+            confidence = weight * stats.n / (stats.n + _SHRINK_N) / (1 + max(0.0, spread - 0.5))
+            low, mid, high = (max(1, round(p * ratio / 100)) for p in (stats.p25, stats.p50, stats.p75))
+            return {
+                "price_min": low,
+                "price_max": max(high, mid),
+                "suggested": mid,
+                "reasoning": f"Basé sur {stats.n} ventes sur la plateforme ({scope}).",
+                "source": "local",
+                "confidence": round(confidence, 2),
+                "sample_size": stats.n,
+                "level": name,
+            }
+        return None
+
+
+_model: Optional[PriceModel] = None
+_built_at = 0.0
+_lock = asyncio.Lock()
+
+
+def reset() -> None:
+    global _model, _built_at
+    _model, _built_at = None, 0.0
+
+
+async def rebuild(session: AsyncSession) -> PriceModel:
+    """Rebuild the tables from sold listings and swap them in."""
+    global _model, _built_at
+    cutoff = datetime.now(timezone.utc) - timedelta(days=PRICE_HISTORY_DAYS)
+    result = await session.execute(
+        select(
+            MarketplaceListing.brand,
+            MarketplaceListing.category_type,
+            MarketplaceListing.condition,
+            MarketplaceListing.price_cents,
+        ).where(
+            MarketplaceListing.status == "sold",
+            MarketplaceListing.updated_at >= cutoff,
+        )
+    )
+    started = time.perf_counter()
+    model = PriceModel.from_rows(result.all())
+    _model, _built_at = model, time.monotonic()
+    logger.info("Price model rebuilt from %d sales in %.1f ms", model.sales, (time.perf_counter() - started) * 1000)
+    return model
+
+
+async def get_model(session: AsyncSession) -> PriceModel:
+    if _model is not None and time.monotonic() - _built_at < PRICE_MODEL_TTL_S:
+        return _model
+    async with _lock:
+        if _model is not None and time.monotonic() - _built_at < PRICE_MODEL_TTL_S:
+            return _model
+        return await rebuild(session)
+
+
+async def estimate(session: AsyncSession, item_data: dict) -> Optional[dict]:
+    """Local estimate for ``item_data`` (same keys as ``suggest_listing_price``)."""
+    model = await get_model(session)
+    return model.estimate(item_data.get("brand"), item_data.get("type"), item_data.get("condition"))
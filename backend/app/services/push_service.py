@@ -5,16 +5,31 @@ Activated when FIREBASE_CREDENTIALS_JSON env var is set to the contents of
 the Firebase service account JSON (or FIREBASE_CREDENTIALS_PATH for a file path).
 
 When neither is set, send_push() is a no-op and logs a warning once.
+
+send_push_batch() sends many notifications at once and reports per token whether it was
+delivered and whether the token is dead and should be cleared.
+
+Transport (FCM_TRANSPORT):
+  - "http2" (default): native async FCM v1 client over pooled HTTP/2 (see fcm_client)
+  - "sdk": firebase-admin — ``messaging.send`` / ``send_each`` (FCM_BATCH_SIZE per call)
+    in worker threads
 """
+import asyncio
 import json
 import logging
 import os
+from dataclasses import dataclass
 from typing import Optional
 
 logger = logging.getLogger(__name__)
 
+FCM_TRANSPORT = os.getenv("FCM_TRANSPORT", "http2")
+FCM_BATCH_SIZE = 500  # send_each limit
+
 _app = None
 _init_attempted = False
+_client = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
 
 
 def _get_app():
@@ -54,6 +69,94 @@ def _get_app():
         return None
 
 
+def _service_account_info() -> Optional[dict]:
+    cred_json = os.getenv("FIREBASE_CREDENTIALS_JSON")
+    cred_path = os.getenv("FIREBASE_CREDENTIALS_PATH")
+    if cred_json:
+        return json.loads(cred_json)
+    if cred_path and os.path.exists(cred_path):
+        with open(cred_path) as f:
+            return json.load(f)
+    return None
+
+
+def _fcm_client():
+    """The async HTTP/2 client (one per event loop), or None to use firebase-admin."""
+    global _client, _client_loop
+    if FCM_TRANSPORT != "http2":
+        return None
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        try:
+            info = _service_account_info()
+            if info is None:
+                return None
+            from app.services.fcm_client import FcmClient
+
+            _client, _client_loop = FcmClient(info), loop
+            logger.info("FCM HTTP/2 client ready for project %s", _client.project_id)
+        except Exception as exc:
+            logger.error("FCM HTTP/2 client init failed, using firebase-admin: %s", exc)
+            return None
+    return _client
+
+
+async def close() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+    _client = None
+
+
+@dataclass
+class PushMessage:
+    fcm_token: str
+    title: str
+    body: str
+    data: Optional[dict] = None
+
+
+@dataclass
+class PushResult:
+    fcm_token: str
+    success: bool
+    invalid_token: bool = False  # FCM rejected the token itself: clear it
+
+
+def _build_message(fcm_token: str, title: str, body: str, data: Optional[dict] = None):
+    from firebase_admin import messaging
+
+    return messaging.Message(
+        notification=messaging.Notification(title=title, body=body),
+        data={k: str(v) for k, v in (data or {}).items()},
+        token=fcm_token,
+        android=messaging.AndroidConfig(priority="high"),
+        apns=messaging.APNSConfig(
+            payload=messaging.APNSPayload(
+                aps=messaging.Aps(sound="default", badge=1)
+            )
+        ),
+        webpush=messaging.WebpushConfig(
+            notification=messaging.WebpushNotification(
+                title=title,
+                body=body,
+                icon="/icon-192.png",
+                badge="/icon-192.png",
+                vibrate=[200, 100, 200],
+            )
+        ),
+    )
+
+
+def _is_invalid_token_error(exc: Exception) -> bool:
+    from firebase_admin import exceptions, messaging
+
+    if isinstance(exc, (messaging.UnregisteredError, messaging.SenderIdMismatchError)):
+        return True
+    # InvalidArgumentError also covers malformed payloads — only the token ones mean "clear it"
+    return isinstance(exc, exceptions.InvalidArgumentError) and "registration token" in str(exc).lower()
+
+
 async def send_push(
     fcm_token: str,
     title: str,
@@ -64,35 +167,18 @@ async def send_push(
 
     Returns True on success, False on failure (caller should clear invalid tokens).
     """
+    client = _fcm_client()
+    if client is not None:
+        return (await client.send(PushMessage(fcm_token, title, body, data))).success
+
     app = _get_app()
     if app is None:
         return False
 
-    import asyncio
-
     try:
         from firebase_admin import messaging
 
-        message = messaging.Message(
-            notification=messaging.Notification(title=title, body=body),
-            data={k: str(v) for k, v in (data or {}).items()},
-            token=fcm_token,
-            android=messaging.AndroidConfig(priority="high"),
-            apns=messaging.APNSConfig(
-                payload=messaging.APNSPayload(
-                    aps=messaging.Aps(sound="default", badge=1)
-                )
-            ),
-            webpush=messaging.WebpushConfig(
-                notification=messaging.WebpushNotification(
-                    title=title,
-                    body=body,
-                    icon="/icon-192.png",
-                    badge="/icon-192.png",
-                    vibrate=[200, 100, 200],
-                )
-            ),
-        )
+        message = _build_message(fcm_token, title, body, data)
 
         loop = asyncio.get_event_loop()
         await loop.run_in_executor(None, lambda: messaging.send(message))
@@ -106,3 +192,47 @@ async def send_push(
         else:
             logger.error("Push send failed: %s", exc)
         return False
+
+
+async def _send_chunk(chunk: list[PushMessage]) -> list[PushResult]:
+    from firebase_admin import messaging
+
+    try:
+        batch = await asyncio.to_thread(
+            messaging.send_each, [_build_message(m.fcm_token, m.title, m.body, m.data) for m in chunk]
+        )
+    except Exception as exc:  # transport / auth failure: nothing known about the tokens
+        logger.error("Batched push failed for %d messages: %s", len(chunk), exc)
+        return [PushResult(m.fcm_token, success=False) for m in chunk]
+
+    results = []
+    for message, response in zip(chunk, batch.responses):
+        if response.success:
+            results.append(PushResult(message.fcm_token, success=True))
+        else:
+            invalid = _is_invalid_token_error(response.exception)
+            if not invalid:
+                logger.warning("Push to token …%s failed: %s", message.fcm_token[-6:], response.exception)
+            results.append(PushResult(message.fcm_token, success=False, invalid_token=invalid))
+    logger.info("Batched push: %d/%d delivered", batch.success_count, len(chunk))
+    return results
+
+
+async def send_push_batch(messages: list[PushMessage]) -> list[PushResult]:
+    """Send many notifications: concurrent HTTP/2 requests, or FCM_BATCH_SIZE per
+    ``send_each`` call with the SDK (chunks sent concurrently).
+
+    Returns one result per message, in order. When push is not configured nothing is sent
+    and no token is reported invalid.
+    """
+    if not messages:
+        return []
+    client = _fcm_client()
+    if client is not None:
+        return await client.send_many(messages)
+    if _get_app() is None:
+        return [PushResult(m.fcm_token, success=False) for m in messages]
+
+    chunks = [messages[i:i + FCM_BATCH_SIZE] for i in range(0, len(messages), FCM_BATCH_SIZE)]
+    results = await asyncio.gather(*(_send_chunk(chunk) for chunk in chunks))
+    return [result for chunk_results in results for result in chunk_results]
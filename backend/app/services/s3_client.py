@@ -0,0 +1,220 @@
+"""
+Native async client for the subset of the S3 API the storage service uses.
+
+boto3 is synchronous: every upload used to hold a thread of the default executor — the
+same pool rembg runs in — for the whole request. This client sends the requests itself:
+
+  - SigV4 signatures from botocore (``S3SigV4Auth``), path-style URLs, so it works with
+    AWS S3, Cloudflare R2 and MinIO alike
+  - one pooled httpx client, at most S3_MAX_CONNECTIONS connections kept alive
+  - objects over S3_MULTIPART_THRESHOLD are sent as a multipart upload, S3_PART_SIZE
+    per part and S3_PART_CONCURRENCY parts in flight; a failed upload is aborted
+  - deletes batched with DeleteObjects, S3_DELETE_BATCH keys per request
+  - 500 / 503 (SlowDown) retried once
+  - count, errors and latency per operation (``stats``)
+
+``standins/s3.py`` implements the same requests (and checks the signatures) for tests.
+"""
+import asyncio
+import base64
+import hashlib
+import logging
+import os
+import time
+from collections import defaultdict
+from collections.abc import AsyncIterator
+from datetime import datetime
+from typing import Optional
+from urllib.parse import quote, urlencode
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+import httpx
+from botocore.auth import S3SigV4Auth
+from botocore.awsrequest import AWSRequest
+from botocore.credentials import Credentials
+
+logger = logging.getLogger(__name__)
+
+S3_MAX_CONNECTIONS = int(os.getenv("S3_MAX_CONNECTIONS", "16"))
+S3_MULTIPART_THRESHOLD = int(os.getenv("S3_MULTIPART_THRESHOLD", str(8 * 1024 * 1024)))
+S3_PART_SIZE = max(5 * 1024 * 1024, int(os.getenv("S3_PART_SIZE", str(5 * 1024 * 1024))))  # S3 minimum: 5 MiB
+S3_PART_CONCURRENCY = int(os.getenv("S3_PART_CONCURRENCY", "4"))
+S3_DELETE_BATCH = 1000  # DeleteObjects maximum
+
+_RETRY_STATUSES = {500, 503}
+_NS = "{http://s3.amazonaws.com/doc/2006-03-01/}"
+
+
+class S3Error(Exception):
+    def __init__(self, operation: str, status: int, body: str) -> None:
+        super().__init__(f"S3 {operation} failed: {status} {body[:200]}")
+        self.status = status
+
+
+def _find(xml: bytes, tag: str) -> Optional[str]:
+    node = _children(ElementTree.fromstring(xml), tag)
+    return node[0].text if node else None
+
+
+def _children(node: ElementTree.Element, tag: str) -> list[ElementTree.Element]:
+    # some S3-compatible servers omit the namespace
+    return node.findall(f"{_NS}{tag}") or node.findall(tag)
+
+
+def _text(node: ElementTree.Element, tag: str) -> str:
+    found = _children(node, tag)
+    return (found[0].text or "") if found else ""
+
+
+class S3Client:
+    """Async S3 client for one bucket. Create and use it on a single event loop."""
+
+    def __init__(
+        self,
+        *,
+        bucket: str,
+        access_key: str,
+        secret_key: str,
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        max_connections: int = S3_MAX_CONNECTIONS,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        self.bucket = bucket
+        self.region = region or ("auto" if endpoint_url else "us-east-1")
+        self.endpoint = (endpoint_url or f"https://s3.{self.region}.amazonaws.com").rstrip("/")
+        self._signer = S3SigV4Auth(Credentials(access_key, secret_key), "s3", self.region)
+        self._http = httpx.AsyncClient(
+            transport=transport,
+            timeout=httpx.Timeout(60, connect=5),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections,
+                                keepalive_expiry=60),
+        )
+        self._metrics: dict[str, dict[str, float]] = defaultdict(
+            lambda: {"count": 0, "errors": 0, "total_s": 0.0, "max_s": 0.0}
+        )
+
+    def url(self, key: str) -> str:
+        return f"{self.endpoint}/{self.bucket}/{quote(key, safe='/~')}"
+
+    async def _request(self, operation: str, method: str, key: str, *, params: str = "",
+                       body: bytes = b"", headers: Optional[dict] = None) -> httpx.Response:
+        url = self.url(key) + (f"?{params}" if params else "")
+        metrics = self._metrics[operation]
+        started = time.monotonic()
+        try:
+            for attempt in range(2):
+                request = AWSRequest(method=method, url=url, data=body, headers=dict(headers or {}))
+                self._signer.add_auth(request)  # fresh X-Amz-Date per attempt
+                resp = await self._http.request(method, url, content=body, headers=dict(request.headers.items()))
+                if resp.status_code not in _RETRY_STATUSES or attempt:
+                    break
+                await asyncio.sleep(0.2)
+            if resp.status_code >= 300:
+                raise S3Error(operation, resp.status_code, resp.text)
+            return resp
+        except Exception:
+            metrics["errors"] += 1
+            raise
+        finally:
+            elapsed = time.monotonic() - started
+            metrics["count"] += 1
+            metrics["total_s"] += elapsed
+            metrics["max_s"] = max(metrics["max_s"], elapsed)
+
+    async def put_object(self, key: str, body: bytes, content_type: str = "application/octet-stream") -> None:
+        """Upload ``body`` — in one request, or as a multipart upload over S3_MULTIPART_THRESHOLD."""
+        if len(body) > S3_MULTIPART_THRESHOLD:
+            await self._multipart_upload(key, body, content_type)
+        else:
+            await self._request("put_object", "PUT", key, body=body, headers={"Content-Type": content_type})
+
+    async def _multipart_upload(self, key: str, body: bytes, content_type: str) -> None:
+        resp = await self._request("create_multipart_upload", "POST", key, params="uploads",
+                                   headers={"Content-Type": content_type})
+        upload_id = _find(resp.content, "UploadId")
+        if not upload_id:
+            raise S3Error("create_multipart_upload", resp.status_code, "no UploadId in response")
+        upload = f"uploadId={quote(upload_id, safe='')}"
+        semaphore = asyncio.Semaphore(S3_PART_CONCURRENCY)
+
+        async def upload_part(number: int, offset: int) -> str:
+            async with semaphore:
+                part = await self._request("upload_part", "PUT", key, params=f"partNumber={number}&{upload}",
+                                           body=body[offset:offset + S3_PART_SIZE])
+            return part.headers.get("ETag", "")
+
+        offsets = range(0, len(body), S3_PART_SIZE)
+        parts = [asyncio.ensure_future(upload_part(n, off)) for n, off in enumerate(offsets, start=1)]
+        try:
+            etags = await asyncio.gather(*parts)
+            listing = "".join(
+                f"<Part><PartNumber>{n}</PartNumber><ETag>{etag}</ETag></Part>"
+                for n, etag in enumerate(etags, start=1)
+            )
+            await self._request(
+                "complete_multipart_upload", "POST", key, params=upload,
+                body=f"<CompleteMultipartUpload>{listing}</CompleteMultipartUpload>".encode(),
+                headers={"Content-Type": "application/xml"},
+            )
+        except BaseException:
+            for part in parts:  # stop the parts still in flight before aborting
+                part.cancel()
+            await asyncio.gather(*parts, return_exceptions=True)
+            try:
+                await self._request("abort_multipart_upload", "DELETE", key, params=upload)
+            except Exception as exc:
+                logger.warning("Could not abort multipart upload of %s: %s", key, exc)
+            raise
+
+    async def delete_object(self, key: str) -> None:
+        await self._request("delete_object", "DELETE", key)
+
+    async def delete_objects(self, keys: list[str]) -> list[str]:
+        """Delete many objects, S3_DELETE_BATCH per request (concurrently). Returns the keys that failed."""
+        batches = [keys[i:i + S3_DELETE_BATCH] for i in range(0, len(keys), S3_DELETE_BATCH)]
+        failed = await asyncio.gather(*(self._delete_batch(batch) for batch in batches))
+        return [key for batch in failed for key in batch]
+
+    async def _delete_batch(self, keys: list[str]) -> list[str]:
+        objects = "".join(f"<Object><Key>{escape(key)}</Key></Object>" for key in keys)
+        body = f"<Delete><Quiet>true</Quiet>{objects}</Delete>".encode()
+        resp = await self._request("delete_objects", "POST", "", params="delete", body=body, headers={
+            "Content-Type": "application/xml",
+            "Content-MD5": base64.b64encode(hashlib.md5(body).digest()).decode(),  # required by S3
+        })
+        errors = _children(ElementTree.fromstring(resp.content), "Error")
+        for error in errors:
+            logger.warning("Could not delete S3 object %s: %s", _text(error, "Key"), _text(error, "Code"))
+        return [_text(error, "Key") for error in errors]
+
+    async def list_objects(self, prefix: str = "", page_size: int = 1000) -> AsyncIterator[tuple[str, datetime, int]]:
+        """(key, last modified, size) of every object under ``prefix``, read ``page_size`` at a time."""
+        token = None
+        while True:
+            query = {"list-type": "2", "max-keys": str(page_size), "prefix": prefix}
+            if token:
+                query["continuation-token"] = token
+            resp = await self._request("list_objects", "GET", "", params=urlencode(sorted(query.items()), quote_via=quote))
+            root = ElementTree.fromstring(resp.content)
+            for node in _children(root, "Contents"):
+                modified = datetime.fromisoformat(_text(node, "LastModified").replace("Z", "+00:00"))
+                yield _text(node, "Key"), modified, int(_text(node, "Size") or 0)
+            token = _text(root, "NextContinuationToken")
+            if _text(root, "IsTruncated") != "true" or not token:
+                return
+
+    def stats(self) -> dict:
+        return {
+            op: {
+                "count": int(m["count"]),
+                "errors": int(m["errors"]),
+                "mean_ms": round(m["total_s"] / m["count"] * 1000, 1) if m["count"] else None,
+                "max_ms": round(m["max_s"] * 1000, 1),
+            }
+            for op, m in self._metrics.items()
+        }
+
+    async def aclose(self) -> None:
+        await self._http.aclose()
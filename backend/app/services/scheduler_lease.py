@@ -0,0 +1,109 @@
+"""
+DB-backed lease so exactly one worker runs the scheduled jobs.
+
+Every uvicorn worker / instance starts APScheduler, so without coordination each of them
+would send the morning push. Workers compete for a named ``SchedulerLease`` row instead:
+
+  - ``acquire`` takes the lease if it is free, expired or already ours, and extends it by
+    SCHEDULER_LEASE_TTL_S — one conditional UPDATE (INSERT the first time), so two workers
+    can never both succeed
+  - the holder renews it every SCHEDULER_LEASE_RENEW_S from a heartbeat job; if it dies,
+    another worker takes over once the lease expires
+  - ``leader_only(job)`` wraps a scheduled job so it only runs on the holder
+  - ``release`` on shutdown hands over immediately instead of waiting for expiry
+"""
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+
+from sqlalchemy import case, delete, or_, update
+from sqlalchemy.exc import IntegrityError
+
+from app.database import async_session
+from app.models import SchedulerLease
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_LEASE = "scheduler"
+SCHEDULER_LEASE_TTL_S = float(os.getenv("SCHEDULER_LEASE_TTL_S", "90"))
+SCHEDULER_LEASE_RENEW_S = float(os.getenv("SCHEDULER_LEASE_RENEW_S", "30"))
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_held: set[str] = set()
+
+
+async def acquire(name: str = SCHEDULER_LEASE, ttl_s: float = SCHEDULER_LEASE_TTL_S,
+                  holder: str = WORKER_ID) -> bool:
+    """Take or renew the lease. True if ``holder`` owns it for the next ``ttl_s`` seconds."""
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(seconds=ttl_s)
+    async with async_session() as session:
+        result = await session.execute(
+            update(SchedulerLease)
+            .where(
+                SchedulerLease.name == name,
+                or_(SchedulerLease.holder == holder, SchedulerLease.expires_at < now),
+            )
+            .values(
+                holder=holder,
+                expires_at=expires_at,
+                acquired_at=case((SchedulerLease.holder == holder, SchedulerLease.acquired_at), else_=now),
+            )
+        )
+        if result.rowcount == 1:
+            await session.commit()
+            acquired = True
+        else:
+            session.add(SchedulerLease(name=name, holder=holder, expires_at=expires_at, acquired_at=now))
+            try:
+                await session.commit()
+                acquired = True
+            except IntegrityError:  # row exists and is held by someone else
+                await session.rollback()
+                acquired = False
+
+    key = f"{name}:{holder}"
+    if acquired and key not in _held:
+        logger.info("Lease '%s' acquired by %s", name, holder)
+        _held.add(key)
+    elif not acquired and key in _held:
+        logger.warning("Lease '%s' lost by %s", name, holder)
+        _held.discard(key)
+    return acquired
+
+
+async def release(name: str = SCHEDULER_LEASE, holder: str = WORKER_ID) -> None:
+    async with async_session() as session:
+        await session.execute(
+            delete(SchedulerLease).where(SchedulerLease.name == name, SchedulerLease.holder == holder)
+        )
+        await session.commit()
+    _held.discard(f"{name}:{holder}")
+
+
+def leader_only(job):
+    """Scheduled-job wrapper: run ``job`` only on the worker holding the scheduler lease."""
+    @wraps(job)
+    async def wrapper(*args, **kwargs):
+        try:
+            leader = await acquire()
+        except Exception as exc:
+            logger.error("Lease check failed, skipping %s: %s", job.__name__, exc)
+            return None
+        if not leader:
+            logger.debug("Not the scheduler leader — skipping %s", job.__name__)
+            return None
+        return await job(*args, **kwargs)
+
+    return wrapper
+
+
+async def heartbeat() -> None:
+    try:
+        await acquire()
+    except Exception as exc:
+        logger.warning("Lease heartbeat failed: %s", exc)
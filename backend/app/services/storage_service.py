@@ -3,25 +3,71 @@ Storage service — abstraction over local disk and S3-compatible CDN (Cloudflar
 
 Activated via env vars:
   S3_ENDPOINT_URL   — R2: https://<account>.r2.cloudflarestorage.com
-                      S3: leave unset (boto3 uses default AWS endpoints)
+                      S3: leave unset (default AWS endpoint of S3_REGION)
+  S3_REGION         — signing region (default: "auto" with an endpoint, else us-east-1)
   S3_ACCESS_KEY_ID  — R2/S3 access key
   S3_SECRET_KEY     — R2/S3 secret
   S3_BUCKET         — bucket name
   CDN_BASE_URL      — public URL prefix for stored objects (e.g. https://cdn.example.com)
                       If unset, falls back to S3 endpoint + bucket URL.
 
-When env vars are absent, falls back to local disk in the ``uploads/`` directory.
+When env vars are absent, falls back to local disk in the ``uploads/`` directory, sharded
+by the first four hex characters of the file name (``uploads/ab/cd/abcd….png``): 65,536
+leaf directories, about 15 files each per million stored. Files are written on the storage
+thread pool through a temp file + rename (readers never see a partial image), fsync'ed
+per STORAGE_FSYNC. ``shard_flat_uploads`` (``python shard_uploads.py``) moves files of the
+older flat layout and rewrites their paths.
+
+Images are content-addressed: the key is the SHA-256 of the bytes (``clothing/<sha256>.png``),
+so a re-upload of the same picture reuses the stored object. ``StoredImage`` counts the
+rows pointing at each object — taken and released in the caller's transaction. On
+PostgreSQL the upsert locks the row until commit, so a save and a delete of the same object
+serialize. Paths stored before content addressing have no row (until a listing retains
+them) and are deleted directly.
+
+Deletes are batched and happen after the commit: ``delete_images`` releases many
+references at once, leaves a refcount-0 tombstone for each object that lost its last one
+and returns them; ``remove_objects`` then deletes the objects with S3 DeleteObjects (1000
+keys per request) or concurrent unlinks on the storage thread pool, holding the tombstones'
+row locks, and drops the rows. A save of the same bytes meanwhile revives the tombstone and
+stores the object again. ``collect_orphans`` (daily, scheduler leader) clears tombstones
+left behind, then deletes objects no row points at — uploads whose transaction rolled
+back — once older than ORPHAN_GRACE_S.
+
+S3 requests go through the async ``S3Client`` (pooled connections, multipart upload for
+large originals, latency per operation) — no executor threads, so uploads no longer
+compete with rembg for the default thread pool.
 """
+import asyncio
+import contextlib
+import hashlib
+import json
 import os
 import logging
-import uuid
+import re
+import tempfile
+from collections import Counter
+from collections.abc import AsyncIterator
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from typing import Optional
+from urllib.parse import unquote
+
+from sqlalchemy import delete, func, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.database import async_session
+from app.models import ClothingItem, MarketplaceListing, StoredImage
+from app.services.s3_client import S3Client
 
 logger = logging.getLogger(__name__)
 
 # ---- Configuration --------------------------------------------------------
 
 _S3_ENDPOINT = os.getenv("S3_ENDPOINT_URL")
+_S3_REGION = os.getenv("S3_REGION")
 _S3_KEY_ID = os.getenv("S3_ACCESS_KEY_ID")
 _S3_SECRET = os.getenv("S3_SECRET_KEY")
 _S3_BUCKET = os.getenv("S3_BUCKET")
@@ -29,130 +75,461 @@ _CDN_BASE = os.getenv("CDN_BASE_URL", "").rstrip("/")
 
 _USE_S3 = bool(_S3_KEY_ID and _S3_SECRET and _S3_BUCKET)
 
-_s3_client = None
+# Disk I/O runs on its own threads, not the default executor rembg uses
+STORAGE_DISK_THREADS = int(os.getenv("STORAGE_DISK_THREADS", "4"))
+ORPHAN_GRACE_S = int(os.getenv("ORPHAN_GRACE_S", str(24 * 3600)))
+ORPHAN_CRON_HOUR = int(os.getenv("ORPHAN_CRON_HOUR", "4"))
+ORPHAN_CRON_MINUTE = int(os.getenv("ORPHAN_CRON_MINUTE", "30"))
+_IN_CHUNK = 500  # paths per IN (...) lookup
+# none: rely on the OS; file: fsync each image before the rename; dir: also the directory
+# entry, so the rename survives a power loss (POSIX only)
+STORAGE_FSYNC = os.getenv("STORAGE_FSYNC", "none").lower()
+_HEX4 = re.compile(r"[0-9a-f]{4}")
+_SHA256_NAME = re.compile(r"[0-9a-f]{64}\.\w+")  # content-addressed object
+
+_disk = ThreadPoolExecutor(max_workers=STORAGE_DISK_THREADS, thread_name_prefix="storage-disk")
+
+_s3: Optional[S3Client] = None
+_s3_loop: Optional[asyncio.AbstractEventLoop] = None
+_metrics = {"deduplicated": 0}
 
 if _USE_S3:
-    try:
-        import boto3
-        from botocore.config import Config as BotocoreConfig
-
-        _s3_client = boto3.client(
-            "s3",
-            endpoint_url=_S3_ENDPOINT or None,
-            aws_access_key_id=_S3_KEY_ID,
-            aws_secret_access_key=_S3_SECRET,
-            config=BotocoreConfig(signature_version="s3v4"),
-        )
-        logger.info(
-            "Storage: S3-compatible backend initialised (bucket=%s, endpoint=%s)",
-            _S3_BUCKET,
-            _S3_ENDPOINT or "AWS default",
-        )
-    except ImportError:
-        logger.warning("boto3 not installed — falling back to local disk storage")
-        _USE_S3 = False
+    logger.info(
+        "Storage: S3-compatible backend (bucket=%s, endpoint=%s)",
+        _S3_BUCKET,
+        _S3_ENDPOINT or "AWS default",
+    )
 else:
     logger.info("Storage: local disk backend (set S3_* env vars to enable CDN)")
 
-# ---- Public API -----------------------------------------------------------
 
-LOCAL_UPLOAD_DIR = "uploads"
-os.makedirs(LOCAL_UPLOAD_DIR, exist_ok=True)
+def _s3_client() -> S3Client:
+    """Shared S3 client (one per event loop)."""
+    global _s3, _s3_loop
+    loop = asyncio.get_running_loop()
+    if _s3 is None or _s3_loop is not loop:
+        _s3 = S3Client(
+            bucket=_S3_BUCKET,
+            access_key=_S3_KEY_ID,
+            secret_key=_S3_SECRET,
+            endpoint_url=_S3_ENDPOINT,
+            region=_S3_REGION,
+        )
+        _s3_loop = loop
+    return _s3
 
 
-async def save_image(content: bytes, extension: str) -> str:
-    """Persist image bytes and return a URL/path usable as ``ClothingItem.image_path``.
+async def close() -> None:
+    global _s3
+    if _s3 is not None:
+        await _s3.aclose()
+    _s3 = None
 
-    - CDN mode: uploads to S3 bucket, returns public CDN URL.
-    - Local mode: writes to ``uploads/``, returns relative path like ``uploads/<uuid>.jpg``.
-    """
-    filename = f"{uuid.uuid4()}{extension}"
 
-    if _USE_S3 and _s3_client is not None:
-        return await _save_to_s3(content, filename, extension)
+def stats() -> dict:
+    """S3 request count / errors / latency per operation (this worker)."""
+    return {"backend": "s3" if _USE_S3 else "local", "operations": _s3.stats() if _s3 is not None else {}}
 
-    return _save_to_disk(content, filename)
 
+# ---- Public API -----------------------------------------------------------
 
-def _save_to_disk(content: bytes, filename: str) -> str:
-    file_path = os.path.join(LOCAL_UPLOAD_DIR, filename)
-    with open(file_path, "wb") as fh:
-        fh.write(content)
-    logger.debug("Saved image to disk: %s", file_path)
-    return file_path.replace("\\", "/")
+LOCAL_UPLOAD_DIR = "uploads"
+os.makedirs(LOCAL_UPLOAD_DIR, exist_ok=True)
 
 
-async def _save_to_s3(content: bytes, filename: str, extension: str) -> str:
-    import asyncio
+def _path_for(digest: str, extension: str) -> str:
+    if not _USE_S3:
+        return _local_path(f"{digest}{extension}")
+    return _url_for_key(f"clothing/{digest}{extension}")
 
-    content_type = _ext_to_mime(extension)
-    key = f"clothing/{filename}"
 
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(
-        None,
-        lambda: _s3_client.put_object(  # type: ignore[union-attr]
-            Bucket=_S3_BUCKET,
-            Key=key,
-            Body=content,
-            ContentType=content_type,
-        ),
-    )
-    logger.debug("Uploaded image to S3: bucket=%s key=%s", _S3_BUCKET, key)
+def _local_path(name: str) -> str:
+    """``uploads/ab/cd/<name>``: the first four characters of a hash or uuid4 name are random hex."""
+    prefix = name[:4].lower()
+    if not _HEX4.fullmatch(prefix):
+        prefix = hashlib.sha256(name.encode()).hexdigest()[:4]
+    return os.path.join(LOCAL_UPLOAD_DIR, prefix[:2], prefix[2:], name).replace("\\", "/")
 
+
+def _url_for_key(key: str) -> str:
     if _CDN_BASE:
         return f"{_CDN_BASE}/{key}"
     # Fallback: construct URL from endpoint + bucket
-    endpoint = (_S3_ENDPOINT or "").rstrip("/")
-    return f"{endpoint}/{_S3_BUCKET}/{key}"
+    return _s3_client().url(key)
 
 
-async def delete_image(image_path: str) -> None:
-    """Delete an image by its stored path/URL. No-op on errors."""
-    if not image_path:
-        return
+async def _take_reference(session: AsyncSession, path: str, size: int) -> int:
+    """Insert the object's row or bump its refcount (atomic upsert). Returns the new refcount."""
+    dialect = postgresql if session.bind.dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(StoredImage).values(path=path, size_bytes=size, refcount=1)
+    statement = statement.on_conflict_do_update(
+        index_elements=[StoredImage.path], set_={"refcount": StoredImage.refcount + 1},
+    ).returning(StoredImage.refcount)
+    return (await session.execute(statement)).scalar_one()
+
+
+async def save_image(session: AsyncSession, content: bytes, extension: str) -> str:
+    """Persist image bytes and return a URL/path usable as ``ClothingItem.image_path``.
+
+    - CDN mode: uploads to S3 bucket, returns public CDN URL.
+    - Local mode: writes to ``uploads/``, returns relative path like ``uploads/<sha256>.jpg``.
+
+    Identical content is stored once; the reference is taken in ``session`` (caller commits).
+    """
+    [path] = await save_images(session, [(content, extension)])
+    return path
 
-    if _USE_S3 and _s3_client is not None:
-        await _delete_from_s3(image_path)
+
+async def save_images(session: AsyncSession, images: list[tuple[bytes, str]]) -> list[str]:
+    """Persist several images (e.g. an original and its derivatives) concurrently.
+
+    ``images`` are (content, extension) pairs; returns their paths/URLs in the same order.
+    Only objects not stored yet are uploaded.
+    """
+    paths, uploads = [], {}
+    for content, extension in images:
+        path = _path_for(hashlib.sha256(content).hexdigest(), extension)
+        if await _take_reference(session, path, len(content)) == 1:
+            uploads[path] = (content, extension)
+        paths.append(path)
+    _metrics["deduplicated"] += len(images) - len(uploads)
+    await asyncio.gather(*(_store(path, content, ext) for path, (content, ext) in uploads.items()))
+    return paths
+
+
+async def retain_images(session: AsyncSession, user_id: int, paths: list[str]) -> list[str]:
+    """Take one more reference on ``user_id``'s own item pictures (a listing reusing them).
+
+    Paths that are not the ``image_path`` of one of the user's items are ignored: client-
+    supplied URLs never pin someone else's object. A path stored before content addressing
+    gets its row first (refcount 1, for the item), so the item's delete keeps the object.
+    Returns the paths retained.
+    """
+    if not paths:
+        return []
+    owned = (await session.execute(
+        select(ClothingItem.image_path).distinct()
+        .where(ClothingItem.user_id == user_id, ClothingItem.image_path.in_(set(paths)))
+    )).scalars().all()
+    tracked = set((await session.execute(
+        select(StoredImage.path).where(StoredImage.path.in_(owned))
+    )).scalars().all()) if owned else set()
+    for path in sorted(owned):
+        if path not in tracked:
+            await _take_reference(session, path, 0)  # legacy: size unknown, counts the item
+        await _take_reference(session, path, 0)
+    return sorted(owned)
+
+
+async def _store(path: str, content: bytes, extension: str) -> None:
+    if _USE_S3:
+        await _save_to_s3(content, _s3_key(path), extension)
     else:
-        _delete_from_disk(image_path)
+        await asyncio.get_running_loop().run_in_executor(_disk, _save_to_disk, content, path)
 
 
-def _delete_from_disk(path: str) -> None:
-    if os.path.exists(path):
+def _save_to_disk(content: bytes, file_path: str) -> None:
+    directory = os.path.dirname(file_path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(content)
+            if STORAGE_FSYNC in ("file", "dir"):
+                fh.flush()
+                os.fsync(fh.fileno())
+        os.chmod(tmp_path, 0o644)  # mkstemp creates 0600
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+    if STORAGE_FSYNC == "dir":
+        dir_fd = os.open(directory, os.O_RDONLY)
         try:
-            os.remove(path)
-            logger.debug("Deleted image from disk: %s", path)
-        except Exception as exc:
-            logger.warning("Could not delete image file %s: %s", path, exc)
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    logger.debug("Saved image to disk: %s", file_path)
 
 
-async def _delete_from_s3(image_url: str) -> None:
-    import asyncio
+async def _save_to_s3(content: bytes, key: str, extension: str) -> None:
+    await _s3_client().put_object(key, content, content_type=_ext_to_mime(extension))
+    logger.debug("Uploaded image to S3: bucket=%s key=%s", _S3_BUCKET, key)
 
-    # Derive key from stored URL
-    key: Optional[str] = None
-    if _CDN_BASE and image_url.startswith(_CDN_BASE):
-        key = image_url[len(_CDN_BASE):].lstrip("/")
-    elif _S3_ENDPOINT and image_url.startswith(_S3_ENDPOINT):
-        # strip endpoint + bucket
-        suffix = image_url[len(_S3_ENDPOINT):].lstrip("/")
-        if suffix.startswith(f"{_S3_BUCKET}/"):
-            key = suffix[len(_S3_BUCKET) + 1:]
-
-    if not key:
-        logger.warning("Could not derive S3 key from URL: %s", image_url)
-        return
 
-    loop = asyncio.get_event_loop()
+async def delete_image(session: AsyncSession, image_path: str) -> list[str]:
+    """Release a reference to an image; see ``delete_images``."""
+    return await delete_images(session, [image_path])
+
+
+async def delete_images(session: AsyncSession, image_paths: list[str]) -> list[str]:
+    """Release one reference per path (a path may repeat) in ``session``.
+
+    A row whose last reference goes stays behind with refcount 0 (a tombstone) until its
+    object is gone. Returns the paths left without any reference: the caller passes them
+    to ``remove_objects`` once its commit succeeded, so a rolled-back transaction never
+    loses a picture. Tombstones missed in between (crash) are cleared by ``collect_orphans``.
+    """
+    released = Counter(path for path in image_paths if path)
+    paths = list(released)
+    gone = set(paths)  # no row: stored before content addressing, deleted directly
+    for i in range(0, len(paths), _IN_CHUNK):
+        rows = (await session.execute(
+            select(StoredImage.id, StoredImage.path, StoredImage.refcount)
+            .where(StoredImage.path.in_(paths[i:i + _IN_CHUNK])).with_for_update()
+        )).all()
+        if rows:
+            await session.execute(update(StoredImage), [
+                {"id": row.id, "refcount": max(0, row.refcount - released[row.path])} for row in rows
+            ])
+        gone.difference_update(row.path for row in rows if row.refcount > released[row.path])
+    return sorted(gone)
+
+
+async def remove_objects(session: AsyncSession, paths: list[str]) -> int:
+    """Delete, in bulk, the objects ``delete_images`` released — after the caller's commit.
+
+    Tombstones are locked while their objects are deleted, then dropped (commits): a save
+    of the same bytes waits for the lock and stores the object again, and one that revived
+    the row first keeps it. Paths without a row are deleted directly if stored before
+    content addressing; a content-addressed one is left to ``collect_orphans``. Returns the
+    number of objects deleted; storage errors are logged, not raised.
+    """
+    if not paths:
+        return 0
+    paths = list(dict.fromkeys(paths))
+    refcounts = {}
+    for i in range(0, len(paths), _IN_CHUNK):
+        refcounts.update((await session.execute(
+            select(StoredImage.path, StoredImage.refcount)
+            .where(StoredImage.path.in_(paths[i:i + _IN_CHUNK])).with_for_update()
+        )).all())
+    tombstones = [path for path in paths if refcounts.get(path) == 0]
+    legacy = [path for path in paths if path not in refcounts and not _SHA256_NAME.fullmatch(_name(path))]
+    deleted = await _delete_objects(tombstones + legacy)
+    for i in range(0, len(tombstones), _IN_CHUNK):
+        await session.execute(delete(StoredImage).where(
+            StoredImage.path.in_(tombstones[i:i + _IN_CHUNK]), StoredImage.refcount == 0,
+        ))
+    await session.commit()
+    return deleted
+
+
+def _name(path: str) -> str:
+    return path.rsplit("/", 1)[-1]
+
+
+async def _delete_objects(paths: list[str]) -> int:
+    if not paths:
+        return 0
+    if not _USE_S3:
+        loop = asyncio.get_running_loop()
+        return sum(await asyncio.gather(*(loop.run_in_executor(_disk, _delete_from_disk, p) for p in paths)))
+
+    keys = []
+    for path in paths:
+        key = _s3_key(path)
+        if key:
+            keys.append(key)
+        else:
+            logger.warning("Could not derive S3 key from URL: %s", path)
     try:
-        await loop.run_in_executor(
-            None,
-            lambda: _s3_client.delete_object(Bucket=_S3_BUCKET, Key=key),  # type: ignore[union-attr]
-        )
-        logger.debug("Deleted S3 object: %s", key)
+        failed = await _s3_client().delete_objects(keys)
     except Exception as exc:
-        logger.warning("Could not delete S3 object %s: %s", key, exc)
+        logger.warning("Could not delete %d S3 objects: %s", len(keys), exc)
+        return 0
+    logger.debug("Deleted %d S3 objects", len(keys) - len(failed))
+    return len(keys) - len(failed)
+
+
+async def dedup_report(session: AsyncSession) -> dict:
+    """Stored objects vs references: bytes that would be stored without deduplication."""
+    row = (await session.execute(select(
+        func.count(StoredImage.id),
+        func.coalesce(func.sum(StoredImage.refcount), 0),
+        func.coalesce(func.sum(StoredImage.size_bytes), 0),
+        func.coalesce(func.sum(StoredImage.size_bytes * StoredImage.refcount), 0),
+    ).where(StoredImage.refcount > 0))).one()  # tombstones: object on its way out
+    objects, references, stored_bytes, referenced_bytes = (int(v) for v in row)
+    return {
+        "objects": objects,
+        "references": references,
+        "stored_bytes": stored_bytes,
+        "bytes_saved": referenced_bytes - stored_bytes,
+        "uploads_deduplicated": _metrics["deduplicated"],  # this worker, since start
+    }
+
+
+def _delete_from_disk(path: str) -> bool:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return False
+    except Exception as exc:
+        logger.warning("Could not delete image file %s: %s", path, exc)
+        return False
+    logger.debug("Deleted image from disk: %s", path)
+    return True
+
+
+def _s3_key(image_url: str) -> Optional[str]:
+    """Object key of a stored URL (CDN or endpoint + bucket)."""
+    if _CDN_BASE and image_url.startswith(_CDN_BASE):
+        return image_url[len(_CDN_BASE):].lstrip("/")
+    prefix = _s3_client().url("")
+    if image_url.startswith(prefix):
+        return unquote(image_url[len(prefix):])
+    return None
+
+
+# ---- Orphan collector --------------------------------------------------------
+
+async def _referenced_names(session: AsyncSession) -> set[str]:
+    """File names of every image a row points at (names are unique: hash or uuid)."""
+    names = set()
+    for statement in (select(StoredImage.path), select(ClothingItem.image_path).distinct()):
+        names.update(path.rsplit("/", 1)[-1] for path in (await session.execute(statement)).scalars() if path)
+    for urls in (await session.execute(select(MarketplaceListing.image_urls).distinct())).scalars():
+        try:
+            names.update(url.rsplit("/", 1)[-1] for url in json.loads(urls or "[]") if isinstance(url, str))
+        except (json.JSONDecodeError, TypeError):
+            continue
+    return names
+
+
+def _scan_disk(cutoff: float) -> list[str]:
+    """Files (flat or sharded, stale temp files included) last modified before ``cutoff``."""
+    found = []
+    for directory, _, names in os.walk(LOCAL_UPLOAD_DIR):
+        for name in names:
+            path = os.path.join(directory, name)
+            with contextlib.suppress(FileNotFoundError):
+                if os.stat(path).st_mtime < cutoff:
+                    found.append(path.replace("\\", "/"))
+    return found
+
+
+async def _stored_before(cutoff: datetime) -> AsyncIterator[str]:
+    if not _USE_S3:
+        for path in await asyncio.get_running_loop().run_in_executor(_disk, _scan_disk, cutoff.timestamp()):
+            yield path
+        return
+    async for key, modified, _ in _s3_client().list_objects("clothing/"):
+        if modified < cutoff:
+            yield _url_for_key(key)
+
+
+async def collect_orphans() -> dict:
+    """Cron task: clear tombstones left by an interrupted delete, then delete stored objects
+    older than ORPHAN_GRACE_S that no row points at."""
+    async with async_session() as session:
+        tombstones = (await session.execute(
+            select(StoredImage.path).where(StoredImage.refcount == 0)
+        )).scalars().all()
+        cleared = await remove_objects(session, list(tombstones))
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=ORPHAN_GRACE_S)
+    stored = [path async for path in _stored_before(cutoff)]  # listed before the references
+    async with async_session() as session:
+        referenced = await _referenced_names(session)
+    orphans = [path for path in stored if _name(path) not in referenced]
+    report = {
+        "tombstones": len(tombstones), "tombstones_deleted": cleared,
+        "scanned": len(stored), "orphans": len(orphans), "deleted": await _delete_objects(orphans),
+    }
+    logger.info("Storage orphan collection: %s", report)
+    return report
+
+
+# ---- Flat → sharded layout migration ----------------------------------------
+
+def _is_flat(path: Optional[str]) -> bool:
+    prefix = f"{LOCAL_UPLOAD_DIR}/"
+    return bool(path) and path.startswith(prefix) and "/" not in path[len(prefix):]
+
+
+def _move_files(moves: list[tuple[str, str]]) -> int:
+    moved = 0
+    for old, new in moves:
+        if os.path.exists(old):
+            os.makedirs(os.path.dirname(new), exist_ok=True)
+            os.replace(old, new)  # same filesystem: atomic
+            moved += 1
+    return moved
+
+
+async def _shard_column(model, column, report: dict, batch_size: int) -> int:
+    """Keyset over rows whose ``column`` is a flat local path: move the files, rewrite the rows."""
+    rewritten, last_id = 0, 0
+    loop = asyncio.get_running_loop()
+    while True:
+        async with async_session() as session:
+            rows = (await session.execute(
+                select(model.id, column)
+                .where(model.id > last_id, column.like(f"{LOCAL_UPLOAD_DIR}/%"),
+                       ~column.like(f"{LOCAL_UPLOAD_DIR}/%/%"))
+                .order_by(model.id).limit(batch_size)
+            )).all()
+            if not rows:
+                return rewritten
+            last_id = rows[-1][0]
+            changes = {row[0]: _local_path(os.path.basename(row[1])) for row in rows}
+            report["files_moved"] += await loop.run_in_executor(
+                _disk, _move_files, [(row[1], changes[row[0]]) for row in rows],
+            )
+            await session.execute(update(model), [{"id": id_, column.key: path} for id_, path in changes.items()])
+            await session.commit()
+            rewritten += len(changes)
+
+
+async def _shard_listings(report: dict, batch_size: int) -> int:
+    rewritten, last_id = 0, 0
+    while True:
+        async with async_session() as session:
+            rows = (await session.execute(
+                select(MarketplaceListing.id, MarketplaceListing.image_urls)
+                .where(MarketplaceListing.id > last_id, MarketplaceListing.image_urls.contains(f"{LOCAL_UPLOAD_DIR}/"))
+                .order_by(MarketplaceListing.id).limit(batch_size)
+            )).all()
+            if not rows:
+                return rewritten
+            last_id = rows[-1][0]
+            changes = []
+            for id_, urls in rows:
+                try:
+                    urls = json.loads(urls or "[]")
+                except (json.JSONDecodeError, TypeError):
+                    continue
+                if any(_is_flat(url) for url in urls):
+                    changes.append({"id": id_, "image_urls": json.dumps(
+                        [_local_path(os.path.basename(url)) if _is_flat(url) else url for url in urls]
+                    )})
+            if changes:
+                await session.execute(update(MarketplaceListing), changes)
+                await session.commit()
+            rewritten += len(changes)
+
+
+async def shard_flat_uploads(batch_size: int = 500) -> dict:
+    """Move files of the flat ``uploads/`` layout into shard directories and rewrite the
+    paths stored in items, stored images and listings, ``batch_size`` rows per transaction.
+
+    Idempotent: a second run (e.g. after an interruption) only finishes what is left.
+    Files no row points at are moved too.
+    """
+    report = {"files_moved": 0, "items": 0, "stored_images": 0, "listings": 0}
+    report["items"] = await _shard_column(ClothingItem, ClothingItem.image_path, report, batch_size)
+    report["stored_images"] = await _shard_column(StoredImage, StoredImage.path, report, batch_size)
+    report["listings"] = await _shard_listings(report, batch_size)
+
+    def move_unreferenced() -> int:
+        with os.scandir(LOCAL_UPLOAD_DIR) as entries:
+            names = [entry.name for entry in entries if entry.is_file() and not entry.name.startswith(".")]
+        return _move_files([(os.path.join(LOCAL_UPLOAD_DIR, name), _local_path(name)) for name in names])
+
+    report["files_moved"] += await asyncio.get_running_loop().run_in_executor(_disk, move_unreferenced)
+    logger.info("Uploads sharded: %s", report)
+    return report
 
 
 # ---- Helpers ----------------------------------------------------------------
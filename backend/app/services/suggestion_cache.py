@@ -0,0 +1,210 @@
+"""
+Daily suggestion result cache.
+
+Generated suggestion payloads are persisted per user with the key
+(day, weather bucket, wardrobe version):
+
+  - weather bucket   — temperature rounded down to SUGGESTION_TEMP_BUCKET_C degrees
+                       + a coarse condition group ("15:pluie", "20:soleil", ...)
+  - wardrobe version — ``User.wardrobe_version``, bumped on upload / update / delete
+
+A repeat view on the same day with the same weather and an unchanged wardrobe is
+served from the cache instead of calling Gemini again.
+
+Entries written by the overnight precompute job (``source="precompute"``) are keyed
+on the forecast; ``get_precomputed`` serves them as long as the actual weather stays
+within SUGGESTION_MAX_TEMP_DRIFT_C of the forecast and in the same condition group.
+"""
+import json
+import logging
+import math
+import os
+from datetime import date
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.models import SuggestionCache, User
+
+logger = logging.getLogger(__name__)
+
+SUGGESTION_TEMP_BUCKET_C = int(os.getenv("SUGGESTION_TEMP_BUCKET_C", "5"))
+SUGGESTION_MAX_TEMP_DRIFT_C = float(os.getenv("SUGGESTION_MAX_TEMP_DRIFT_C", "4"))
+
+# Keyword → condition group. First match wins, order matters (orage before pluie, ...).
+_CONDITION_GROUPS = (
+    ("neige", ("neige", "snow", "grêle", "grele")),
+    ("orage", ("orage", "storm", "thunder")),
+    ("pluie", ("pluie", "averse", "bruine", "rain", "drizzle", "shower")),
+    ("brouillard", ("brouillard", "brume", "fog", "mist")),
+    ("nuageux", ("nuage", "couvert", "cloud", "overcast", "gris")),
+)
+
+
+def condition_group(description: Optional[str]) -> str:
+    text = (description or "").lower()
+    for group, keywords in _CONDITION_GROUPS:
+        if any(k in text for k in keywords):
+            return group
+    return "soleil"
+
+
+def weather_bucket(temperature: Optional[float], description: Optional[str]) -> str:
+    """Coarse weather key: two days in the same bucket get the same suggestions."""
+    temp = 18.0 if temperature is None else float(temperature)
+    band = int(math.floor(temp / SUGGESTION_TEMP_BUCKET_C) * SUGGESTION_TEMP_BUCKET_C)
+    return f"{band}:{condition_group(description)}"
+
+
+def bump_wardrobe_version(user: User) -> None:
+    """Invalidate cached suggestions for this user (caller commits)."""
+    user.wardrobe_version = (user.wardrobe_version or 0) + 1
+
+
+async def get_cached(
+    session: AsyncSession,
+    user_id: int,
+    day: date,
+    bucket: str,
+    wardrobe_version: int,
+) -> Optional[dict]:
+    result = await session.execute(
+        select(SuggestionCache)
+        .where(
+            SuggestionCache.user_id == user_id,
+            SuggestionCache.day == day,
+            SuggestionCache.weather_bucket == bucket,
+            SuggestionCache.wardrobe_version == wardrobe_version,
+        )
+        .order_by(SuggestionCache.created_at.desc())
+        .limit(1)
+    )
+    entry = result.scalars().first()
+    if not entry:
+        return None
+    try:
+        return json.loads(entry.payload)
+    except (json.JSONDecodeError, TypeError):
+        logger.warning("Corrupt suggestion cache entry %d — ignored", entry.id)
+        return None
+
+
+def forecast_still_valid(
+    forecast_temperature: Optional[float],
+    forecast_bucket: str,
+    temperature: Optional[float],
+    description: Optional[str],
+) -> bool:
+    """True if the actual weather is close enough to the forecast a payload was built for."""
+    if forecast_temperature is None or temperature is None:
+        return False
+    if abs(float(temperature) - forecast_temperature) > SUGGESTION_MAX_TEMP_DRIFT_C:
+        return False
+    return forecast_bucket.split(":", 1)[-1] == condition_group(description)
+
+
+async def get_precomputed(
+    session: AsyncSession,
+    user_id: int,
+    day: date,
+    wardrobe_version: int,
+    temperature: Optional[float],
+    description: Optional[str],
+) -> Optional[dict]:
+    """Overnight payload for ``day`` if the forecast it was built on still holds."""
+    result = await session.execute(
+        select(SuggestionCache)
+        .where(
+            SuggestionCache.user_id == user_id,
+            SuggestionCache.day == day,
+            SuggestionCache.source == "precompute",
+            SuggestionCache.wardrobe_version == wardrobe_version,
+        )
+        .order_by(SuggestionCache.created_at.desc())
+        .limit(1)
+    )
+    entry = result.scalars().first()
+    if not entry:
+        return None
+    if not forecast_still_valid(entry.forecast_temperature, entry.weather_bucket, temperature, description):
+        logger.info(
+            "Precomputed suggestions for user %d diverge from actual weather (forecast %.1f°C, now %s°C)",
+            user_id, entry.forecast_temperature or 0, temperature,
+        )
+        return None
+    try:
+        return json.loads(entry.payload)
+    except (json.JSONDecodeError, TypeError):
+        return None
+
+
+async def store(
+    session: AsyncSession,
+    user_id: int,
+    day: date,
+    bucket: str,
+    wardrobe_version: int,
+    payload: dict,
+    source: str = "live",
+    forecast_temperature: Optional[float] = None,
+) -> None:
+    """Add (or replace) the cache entry for this key. Caller commits."""
+    fields = {
+        "wardrobe_version": wardrobe_version,
+        "payload": json.dumps(payload, ensure_ascii=False),
+        "source": source,
+        "forecast_temperature": forecast_temperature,
+    }
+    entry = await _load(session, user_id, day, bucket)
+    if entry is None:
+        try:
+            async with session.begin_nested():
+                session.add(SuggestionCache(user_id=user_id, day=day, weather_bucket=bucket, **fields))
+            return
+        except IntegrityError:  # a concurrent generation stored this key first
+            entry = await _load(session, user_id, day, bucket)
+    for name, value in fields.items():
+        setattr(entry, name, value)
+    session.add(entry)
+
+
+async def _load(session: AsyncSession, user_id: int, day: date, bucket: str) -> Optional[SuggestionCache]:
+    result = await session.execute(
+        select(SuggestionCache).where(
+            SuggestionCache.user_id == user_id,
+            SuggestionCache.day == day,
+            SuggestionCache.weather_bucket == bucket,
+        )
+    )
+    return result.scalars().first()
+
+
+async def list_history(session: AsyncSession, user_id: int, limit: int = 30) -> list[dict]:
+    """Most recent payload of each past day, newest day first."""
+    result = await session.execute(
+        select(SuggestionCache)
+        .where(SuggestionCache.user_id == user_id)
+        .order_by(SuggestionCache.day.desc(), SuggestionCache.created_at.desc())
+        .limit(limit * 8)  # a few weather buckets per day at most
+    )
+    history: list[dict] = []
+    seen_days: set[date] = set()
+    for entry in result.scalars().all():
+        if entry.day in seen_days:
+            continue
+        seen_days.add(entry.day)
+        try:
+            payload = json.loads(entry.payload)
+        except (json.JSONDecodeError, TypeError):
+            continue
+        history.append({
+            "date": entry.day.isoformat(),
+            "weather_bucket": entry.weather_bucket,
+            "greeting": payload.get("greeting"),
+            "suggestions": payload.get("suggestions", []),
+        })
+        if len(history) >= limit:
+            break
+    return history
@@ -0,0 +1,257 @@
+"""
+Overnight precomputation of next-morning suggestions for push-enabled users.
+
+Runs off-peak (PRECOMPUTE_CRON_HOUR:PRECOMPUTE_CRON_MINUTE, default 03:00) instead of
+generating everything at push time. For each user with push notifications enabled:
+  1. Geocode their city and fetch the forecast for the push hour of their next push day
+     (``next_push_day``: the local date of their next 07:30, in their own time zone)
+  2. Generate suggestions from their wardrobe + active marketplace listings
+  3. Store the payload in the suggestion cache (``source="precompute"``)
+
+Users are taken earliest push slot first, so the zones whose morning comes first are
+covered first, and PRECOMPUTE_CONCURRENCY of them are precomputed at a time, each slot
+pausing PRECOMPUTE_PAUSE_S after a user: a bounded share of Gemini quota, leaving the rest
+to interactive traffic. With ~5 s per user, 8 slots cover about 5,000 users an hour. The
+run is checkpointed after each chunk (see job_runs), so a restart resumes instead of
+skipping everyone left, and a run that reaches users after their push slot says so.
+
+Rows are keyed on that local date, the day the push and ``POST /suggestions/{user_id}``
+look up (``weather_cron.local_date``). Both serve the stored payload instantly,
+unless the actual weather diverged from the forecast (see ``suggestion_cache.get_precomputed``),
+in which case they regenerate.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.database import async_session
+from app.models import AIRequest, ClothingItem, SuggestionCache, User
+from app.services import ai_suggestions, job_runs, listing_snapshot, suggestion_cache, weather_cache
+from app.services.ai_base import drain_pending_requests
+
+logger = logging.getLogger(__name__)
+
+PRECOMPUTE_CRON_HOUR = int(os.getenv("PRECOMPUTE_CRON_HOUR", "3"))
+PRECOMPUTE_CRON_MINUTE = int(os.getenv("PRECOMPUTE_CRON_MINUTE", "0"))
+PRECOMPUTE_PAUSE_S = float(os.getenv("PRECOMPUTE_PAUSE_S", "1.0"))  # per slot, after each user
+PRECOMPUTE_CONCURRENCY = int(os.getenv("PRECOMPUTE_CONCURRENCY", "8"))  # users in flight
+PRECOMPUTE_CHUNK_SIZE = int(os.getenv("PRECOMPUTE_CHUNK_SIZE", "100"))  # users per checkpoint
+PRECOMPUTE_RESUME_WITHIN_S = 4 * 3600  # an interrupted run is still resumed this late
+PRECOMPUTE_JOB = "suggestion_precompute"
+# What push_slot reads: enough to order every push-enabled user by their next slot
+_SLOT_COLUMNS = (User.id, User.push_city, User.push_lat, User.push_lon, User.push_timezone)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def user_profile(user: User) -> dict:
+    """Profile dict expected by the ai_* services."""
+    morphologie = user.morphologie.value if hasattr(user.morphologie, "value") else user.morphologie
+    return {
+        "prenom": user.prenom,
+        "genre": user.genre,
+        "age": user.age,
+        "morphologie": morphologie or "RECTANGLE",
+    }
+
+
+async def load_wardrobe_items(session: AsyncSession, user_id: int) -> list[dict]:
+    """Wardrobe items (category="wardrobe") as prompt-ready dicts."""
+    result = await session.execute(
+        select(ClothingItem).where(
+            ClothingItem.user_id == user_id,
+            ClothingItem.category == "wardrobe",
+        )
+    )
+    return [
+        {"id": it.id, "type": it.type, "couleur": it.couleur, "saison": it.saison, "tags_ia": it.tags_ia}
+        for it in result.scalars().all()
+    ]
+
+
+async def generate_and_cache(
+    session: AsyncSession,
+    user: User,
+    weather: dict,
+    day: date,
+    source: str = "live",
+    forecast_temperature: Optional[float] = None,
+) -> dict:
+    """Generate suggestions for ``user`` and store them in the cache. Commits."""
+    wardrobe_items = await load_wardrobe_items(session, user.id)
+    marketplace_listings = await listing_snapshot.get_active_listings(
+        session, exclude_seller_id=user.id, limit=50,
+    )
+    result = await ai_suggestions.get_daily_suggestions(
+        user_profile(user), weather,
+        wardrobe_items=wardrobe_items,
+        marketplace_listings=marketplace_listings,
+        user_id=user.id,
+    )
+    if result.get("suggestions") and result.get("source") != "local":
+        bucket = suggestion_cache.weather_bucket(weather.get("temperature"), weather.get("description"))
+        await suggestion_cache.store(
+            session, user.id, day, bucket, user.wardrobe_version, result,
+            source=source, forecast_temperature=forecast_temperature,
+        )
+
+    for entry in drain_pending_requests():
+        session.add(AIRequest(**entry))
+    await session.commit()
+    return result
+
+
+async def suggestions_for_push(session: AsyncSession, user: User, weather: dict, day: date) -> dict:
+    """Morning push payload for the user's local ``day``: precomputed → cached → freshly generated."""
+    temperature = weather.get("temperature")
+    description = weather.get("description")
+
+    payload = await suggestion_cache.get_precomputed(
+        session, user.id, day, user.wardrobe_version, temperature, description,
+    )
+    if payload is None:
+        bucket = suggestion_cache.weather_bucket(temperature, description)
+        payload = await suggestion_cache.get_cached(session, user.id, day, bucket, user.wardrobe_version)
+    if payload is None:
+        payload = await generate_and_cache(session, user, weather, day)
+    return payload
+
+
+def next_push_slot(user: User, now: Optional[datetime] = None) -> datetime:
+    """The user's next morning push (their local time): today's slot if it has not passed yet,
+    else tomorrow's."""
+    from app.services.weather_cron import push_slot
+
+    now = now or datetime.now(timezone.utc)
+    slot = push_slot(user, now)
+    return slot if now < slot else push_slot(user, now + timedelta(days=1))
+
+
+def next_push_day(user: User, now: Optional[datetime] = None) -> date:
+    """Local date of the user's next morning push (in their push time zone, like
+    ``last_morning_push``)."""
+    return next_push_slot(user, now).date()
+
+
+async def _precompute_for_user(session: AsyncSession, user: User, day: date) -> str:
+    from app.services.weather_cron import PUSH_CRON_HOUR, _PARIS_COORDS, _fetch_forecast_at
+
+    existing = await session.execute(
+        select(SuggestionCache.id).where(
+            SuggestionCache.user_id == user.id,
+            SuggestionCache.day == day,
+            SuggestionCache.source == "precompute",
+            SuggestionCache.wardrobe_version == user.wardrobe_version,
+        ).limit(1)
+    )
+    if existing.first():
+        return "skipped"
+
+    city = user.push_city or "Paris"
+    if user.push_lat is not None and user.push_lon is not None:
+        lat, lon = user.push_lat, user.push_lon
+    else:
+        lat, lon = await weather_cache.resolve_city(session, city) or _PARIS_COORDS
+    forecast = await _fetch_forecast_at(lat, lon, day, PUSH_CRON_HOUR)
+    if not forecast:
+        return "failed"
+
+    result = await generate_and_cache(
+        session, user, {**forecast, "ville": city}, day,
+        source="precompute", forecast_temperature=forecast["temperature"],
+    )
+    stored = result.get("suggestions") and result.get("source") != "local"
+    return "stored" if stored else "failed"
+
+
+async def _push_order(since: datetime) -> list[tuple[datetime, int]]:
+    """(next push slot, user id) of every push-enabled user as of ``since``, earliest slot first."""
+    from app.services.weather_cron import PUSH_ENABLED
+
+    order = []
+    async for rows in job_runs.iter_user_chunks(async_session, _SLOT_COLUMNS, *PUSH_ENABLED):
+        order.extend((next_push_slot(row, since), row.id) for row in rows)
+    order.sort()
+    return order
+
+
+async def run_suggestion_precompute() -> dict:
+    """Cron task: precompute the next morning's suggestions for every push-enabled user,
+    keyed on the local date of each user's next push.
+
+    Users are taken in push-slot order (Nouméa before Paris before Montréal), as of the
+    run's start so a resumed run sees the same order. They are precomputed
+    PRECOMPUTE_CONCURRENCY at a time, PRECOMPUTE_CHUNK_SIZE per checkpoint (the cursor is
+    the position in that order); an unfinished run (worker restarted) is resumed by
+    ``resume_suggestion_precompute``. Users whose slot passed before their turn count as
+    "late" and are reported with a warning.
+    """
+    from app.services.weather_cron import PUSH_USER_COLUMNS
+
+    started = time.monotonic()
+    async with async_session() as session:
+        job = await job_runs.start(
+            session, PRECOMPUTE_JOB, datetime.now(timezone.utc).date().isoformat(),
+            resume_within_s=PRECOMPUTE_RESUME_WITHIN_S,
+        )
+    if job is None:
+        return {}
+    since = job_runs._aware(job.started_at)
+    order = await _push_order(since)
+    logger.info("Suggestion precompute %s started: %d users (from position %d)",
+                job.run_key, len(order), job.cursor)
+
+    report = {"users": 0, "stored": 0, "skipped": 0, "failed": 0, "late": 0, **job_runs.resumed_progress(job)}
+    slots = dict((user_id, slot) for slot, user_id in order)
+    semaphore = asyncio.Semaphore(PRECOMPUTE_CONCURRENCY)
+
+    async def precompute(user) -> None:
+        async with semaphore:
+            try:
+                async with async_session() as session:
+                    status = await _precompute_for_user(session, user, next_push_day(user, since))
+            except Exception as exc:
+                logger.error("Suggestion precompute failed for user %d: %s", user.id, exc)
+                status = "failed"
+            report["users"] += 1
+            report[status] += 1
+            if status != "skipped" and _now() >= slots[user.id]:
+                report["late"] += 1
+            # Low priority: leave Gemini quota to interactive requests
+            await asyncio.sleep(PRECOMPUTE_PAUSE_S)
+
+    for position in range(job.cursor, len(order), PRECOMPUTE_CHUNK_SIZE):
+        ids = [user_id for _, user_id in order[position:position + PRECOMPUTE_CHUNK_SIZE]]
+        async with async_session() as session:
+            rows = (await session.execute(select(*PUSH_USER_COLUMNS).where(User.id.in_(ids)))).all()
+        by_id = {row.id: row for row in rows}
+        await asyncio.gather(*(precompute(by_id[user_id]) for user_id in ids if user_id in by_id))
+        async with async_session() as session:
+            if not await job_runs.checkpoint(session, job, position + len(ids), report):
+                return report
+    async with async_session() as session:
+        await job_runs.finish(session, job, report)
+
+    report["duration_s"] = round(time.monotonic() - started, 1)
+    if report["late"]:
+        logger.warning("Suggestion precompute finished after the push slot of %d users — raise "
+                       "PRECOMPUTE_CONCURRENCY or start earlier: %s", report["late"], report)
+    else:
+        logger.info("Suggestion precompute finished: %s", report)
+    return report
+
+
+async def resume_suggestion_precompute() -> Optional[dict]:
+    """Scheduled check: finish a precompute run left unfinished by a worker that went away."""
+    async with async_session() as session:
+        if not await job_runs.has_stale_run(session, PRECOMPUTE_JOB, PRECOMPUTE_RESUME_WITHIN_S):
+            return None
+    return await run_suggestion_precompute()
@@ -0,0 +1,173 @@
+"""
+Persisted wardrobe score, keyed by a content hash of its inputs.
+
+``GET /wardrobe/{user_id}/score`` used to re-run ``score_wardrobe`` (Gemini) on every call.
+The report is now stored in ``WardrobeScore`` with a SHA-256 of everything the prompt
+depends on — the scored items (type, colour, season, style) and the profile fields — so:
+
+  - unchanged wardrobe + profile → stored report, no Gemini call
+  - anything changed             → recomputed once, stored again
+
+After uploads / edits / deletes, ``schedule_recompute`` refreshes the stored report in the
+background once the wardrobe has been quiet for WARDROBE_SCORE_DEBOUNCE_S (a burst of
+uploads triggers a single recompute). Only users who already have a report get one:
+nobody pays a Gemini call for a screen they never opened.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.database import async_session
+from app.models import AIRequest, ClothingItem, User, WardrobeScore
+from app.services import ai_service
+from app.services.ai_base import drain_pending_requests
+
+logger = logging.getLogger(__name__)
+
+WARDROBE_SCORE_DEBOUNCE_S = float(os.getenv("WARDROBE_SCORE_DEBOUNCE_S", "30"))
+MIN_ITEMS = 3
+
+_pending: dict[int, asyncio.Task] = {}  # user id → debounced recompute
+
+
+def _style(tags_ia: Optional[str]) -> str:
+    if not tags_ia:
+        return ""
+    try:
+        item_list = json.loads(tags_ia).get("items", [])
+        return (item_list[0].get("style") or "") if item_list else ""
+    except (json.JSONDecodeError, TypeError, AttributeError):
+        return ""
+
+
+def score_inputs(user: User, items: list[ClothingItem]) -> tuple[dict, list[dict]]:
+    """(profile, items) exactly as sent to ``score_wardrobe`` — items in a stable order."""
+    item_dicts = sorted(
+        (
+            {"type": it.type, "couleur": it.couleur, "saison": it.saison, "style": _style(it.tags_ia)}
+            for it in items
+        ),
+        key=lambda d: (d["type"] or "", d["couleur"] or "", d["saison"] or "", d["style"]),
+    )
+    profile = {
+        "prenom": user.prenom,
+        "genre": user.genre,
+        "morphologie": user.morphologie.value if user.morphologie else "RECTANGLE",
+        "style_prefere": user.style_prefere or "",
+    }
+    return profile, item_dicts
+
+
+def content_hash(profile: dict, item_dicts: list[dict]) -> str:
+    canonical = json.dumps({"profile": profile, "items": item_dicts}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+async def _load_items(session: AsyncSession, user_id: int) -> list[ClothingItem]:
+    result = await session.execute(
+        select(ClothingItem).where(
+            ClothingItem.user_id == user_id,
+            ClothingItem.category == "wardrobe",
+        )
+    )
+    return list(result.scalars().all())
+
+
+async def _stored(session: AsyncSession, user_id: int) -> Optional[WardrobeScore]:
+    result = await session.execute(select(WardrobeScore).where(WardrobeScore.user_id == user_id))
+    return result.scalars().first()
+
+
+async def has_score(session: AsyncSession, user_id: int) -> bool:
+    result = await session.execute(select(WardrobeScore.id).where(WardrobeScore.user_id == user_id))
+    return result.first() is not None
+
+
+async def get_or_compute(session: AsyncSession, user: User) -> Optional[dict]:
+    """Stored report if the inputs are unchanged, else a fresh one (stored). Commits.
+
+    Returns None when the wardrobe has fewer than MIN_ITEMS items.
+    """
+    items = await _load_items(session, user.id)
+    if len(items) < MIN_ITEMS:
+        return None
+    profile, item_dicts = score_inputs(user, items)
+    digest = content_hash(profile, item_dicts)
+
+    stored = await _stored(session, user.id)
+    if stored and stored.content_hash == digest:
+        try:
+            return {**json.loads(stored.payload), "cached": True}
+        except (json.JSONDecodeError, TypeError):
+            logger.warning("Corrupt wardrobe score for user %d — recomputing", user.id)
+
+    result = await ai_service.score_wardrobe(profile, item_dicts, user_id=user.id)
+    if result.get("score") is not None:  # never persist the fallback report
+        if stored is None:
+            stored = WardrobeScore(user_id=user.id, content_hash=digest)
+        stored.content_hash = digest
+        stored.payload = json.dumps(result, ensure_ascii=False)
+        stored.updated_at = datetime.now(timezone.utc)
+        session.add(stored)
+
+    for entry in drain_pending_requests():
+        session.add(AIRequest(**entry))
+    await session.commit()
+    return result
+
+
+def schedule_recompute(user_id: int) -> None:
+    """(Re)start the debounce timer for this user's background recompute."""
+    task = _pending.get(user_id)
+    if task and not task.done():
+        task.cancel()
+    _pending[user_id] = asyncio.create_task(_recompute_later(user_id))
+
+
+async def _recompute_later(user_id: int) -> None:
+    await asyncio.sleep(WARDROBE_SCORE_DEBOUNCE_S)
+    try:
+        async with async_session() as session:
+            user = await session.get(User, user_id)
+            if user:
+                await get_or_compute(session, user)
+                logger.info("Wardrobe score refreshed in background for user %d", user_id)
+    except Exception as exc:
+        logger.error("Background wardrobe score failed for user %d: %s", user_id, exc)
+    finally:
+        if _pending.get(user_id) is asyncio.current_task():
+            del _pending[user_id]
+
+
+async def after_wardrobe_change(session: AsyncSession, user_id: int) -> None:
+    """Hook for upload / update / delete — call after the change is committed."""
+    if await has_score(session, user_id):
+        schedule_recompute(user_id)
+
+
+async def wait_for_recomputes() -> None:
+    """Wait for pending recomputes (tests)."""
+    tasks = [t for t in _pending.values() if not t.done()]
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def cancel_pending() -> None:
+    """Drop pending recomputes (shutdown) — the next GET recomputes if needed."""
+    for task in _pending.values():
+        task.cancel()
+    _pending.clear()
+
+
+async def delete_user_score(session: AsyncSession, user_id: int) -> None:
+    """Account deletion (caller commits)."""
+    stored = await _stored(session, user_id)
+    if stored:
+        await session.delete(stored)
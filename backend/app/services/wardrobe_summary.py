@@ -0,0 +1,237 @@
+"""
+Per-user wardrobe aggregates, maintained incrementally.
+
+The upload freemium check used to ``COUNT(*)`` the user's items and
+``GET /wardrobe/{user_id}/analytics`` re-parsed every item's ``tags_ia`` on each call.
+``WardrobeSummary`` keeps one row per user with what both need — item counts per
+category, colour / season / type / style histograms, look-score sum and count, value
+totals — and every item write applies its delta in the same transaction:
+
+    facts = item_facts(item)                         # snapshot before a mutation
+    ... mutate / add / delete the item ...
+    await record(session, user_id, removed=facts, added=item_facts(item))
+    await session.commit()
+
+Reads are then a single row. The valid-outfit count depends on the whole wardrobe, so
+writes only mark it stale (``outfit_count = None``); the next analytics read recomputes
+and stores it.
+
+A user without a row (existing data, items inserted outside the API) gets one built
+from their items on first access. ``rebuild`` / ``rebuild_all`` recompute rows from
+scratch and report drift — see ``rebuild_wardrobe_summaries.py``.
+"""
+import json
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.models import ClothingItem, User, WardrobeSummary
+from app.services.outfit_combinations import count_outfits
+
+logger = logging.getLogger(__name__)
+
+_HISTOGRAMS = ("colors", "seasons", "types", "styles")
+_FIELDS = (
+    "total_items", "category_counts", *_HISTOGRAMS,
+    "look_score_sum", "look_score_count", "value_budget", "value_moyen", "value_premium",
+)
+
+
+def item_facts(item: ClothingItem) -> dict:
+    """What one item contributes to its owner's summary."""
+    style = None
+    note = None
+    value = {"budget": 0.0, "moyen": 0.0, "premium": 0.0}
+    if item.tags_ia:
+        try:
+            data = json.loads(item.tags_ia)
+        except (json.JSONDecodeError, TypeError):
+            data = None
+        if isinstance(data, dict):
+            item_list = data.get("items", [])
+            if item_list:
+                style = item_list[0].get("style") or None
+            evaluation = data.get("evaluation", {})
+            raw_note = evaluation.get("note")
+            if isinstance(raw_note, (int, float)) and raw_note > 0:
+                note = float(raw_note)
+            prix = evaluation.get("prix_total_look", {})
+            for tier in value:
+                value[tier] = float(prix.get(tier, {}).get("min", 0) or 0)
+    return {
+        "category": item.category,
+        "colors": item.couleur or None,
+        "seasons": item.saison or None,
+        "types": item.type or None,
+        "styles": style,
+        "note": note,
+        "value": value,
+    }
+
+
+def _counts(raw: str) -> Counter:
+    try:
+        return Counter(json.loads(raw or "{}"))
+    except (json.JSONDecodeError, TypeError):
+        return Counter()
+
+
+def _dump(counter: Counter) -> str:
+    return json.dumps({k: n for k, n in counter.items() if n > 0}, ensure_ascii=False)
+
+
+def apply(summary: WardrobeSummary, facts: dict, sign: int) -> None:
+    """Add (sign=+1) or remove (sign=-1) one item's contribution."""
+    summary.total_items += sign
+    categories = _counts(summary.category_counts)
+    categories[facts["category"]] += sign
+    summary.category_counts = _dump(categories)
+    if facts["category"] != "wardrobe":
+        return
+
+    for name in _HISTOGRAMS:
+        if facts[name]:
+            counter = _counts(getattr(summary, name))
+            counter[facts[name]] += sign
+            setattr(summary, name, _dump(counter))
+    if facts["note"] is not None:
+        summary.look_score_sum += sign * facts["note"]
+        summary.look_score_count += sign
+    summary.value_budget += sign * facts["value"]["budget"]
+    summary.value_moyen += sign * facts["value"]["moyen"]
+    summary.value_premium += sign * facts["value"]["premium"]
+    summary.outfit_count = None
+
+
+async def _load(session: AsyncSession, user_id: int, for_update: bool = False) -> Optional[WardrobeSummary]:
+    statement = select(WardrobeSummary).where(WardrobeSummary.user_id == user_id)
+    if for_update:
+        # Serialize concurrent writers on the row (no-op on SQLite, which locks the DB)
+        statement = statement.with_for_update().execution_options(populate_existing=True)
+    result = await session.execute(statement)
+    return result.scalars().first()
+
+
+async def rebuild(session: AsyncSession, user_id: int) -> tuple[WardrobeSummary, bool]:
+    """Recompute the row from the user's items. Returns (summary, drifted). Caller commits."""
+    await session.flush()  # pending item changes are part of the new totals
+    result = await session.execute(select(ClothingItem).where(ClothingItem.user_id == user_id))
+    fresh = WardrobeSummary(user_id=user_id)
+    for item in result.scalars().all():
+        apply(fresh, item_facts(item), +1)
+
+    summary = await _load(session, user_id)
+    if summary is None:
+        summary = WardrobeSummary(user_id=user_id)
+        drifted = False
+    else:
+        drifted = any(
+            _normalized(getattr(summary, f)) != _normalized(getattr(fresh, f)) for f in _FIELDS
+        )
+    for name in _FIELDS:
+        setattr(summary, name, getattr(fresh, name))
+    summary.outfit_count = None
+    summary.updated_at = datetime.now(timezone.utc)
+    session.add(summary)
+    await session.flush()
+    return summary, drifted
+
+
+def _normalized(value):
+    if isinstance(value, str):
+        return _counts(value)
+    if isinstance(value, float):
+        return round(value, 2)
+    return value
+
+
+async def get_or_build(session: AsyncSession, user_id: int) -> WardrobeSummary:
+    """The user's summary, built from their items if it does not exist yet."""
+    summary = await _load(session, user_id)
+    if summary is None:
+        summary, _ = await rebuild(session, user_id)
+    return summary
+
+
+async def record(
+    session: AsyncSession,
+    user_id: int,
+    removed: Optional[dict] = None,
+    added: Optional[dict] = None,
+) -> None:
+    """Apply an item write to the summary, in the caller's transaction (caller commits)."""
+    summary = await _load(session, user_id, for_update=True)
+    if summary is None:
+        await rebuild(session, user_id)
+        return
+    if removed is not None:
+        apply(summary, removed, -1)
+    if added is not None:
+        apply(summary, added, +1)
+    summary.updated_at = datetime.now(timezone.utc)
+    session.add(summary)
+
+
+async def outfit_count(session: AsyncSession, summary: WardrobeSummary) -> int:
+    """Stored valid-outfit count, recomputed (and stored) when stale. Caller commits."""
+    if summary.outfit_count is None:
+        result = await session.execute(
+            select(ClothingItem).where(
+                ClothingItem.user_id == summary.user_id,
+                ClothingItem.category == "wardrobe",
+            )
+        )
+        summary.outfit_count = count_outfits([
+            {"id": i.id, "type": i.type, "couleur": i.couleur, "saison": i.saison, "tags_ia": i.tags_ia}
+            for i in result.scalars().all()
+        ])
+        session.add(summary)
+    return summary.outfit_count
+
+
+def analytics(summary: WardrobeSummary, estimated_outfits: int) -> dict:
+    """``GET /wardrobe/{user_id}/analytics`` response from a summary row."""
+    def top(name: str, n: int) -> list[dict]:
+        return [{"name": k, "count": c} for k, c in _counts(getattr(summary, name)).most_common(n)]
+
+    return {
+        "total": _counts(summary.category_counts).get("wardrobe", 0),
+        "colors": top("colors", 8),
+        "styles": top("styles", 6),
+        "seasons": top("seasons", 4),
+        "types": top("types", 10),
+        "avg_look_score": (
+            round(summary.look_score_sum / summary.look_score_count, 1)
+            if summary.look_score_count else None
+        ),
+        "estimated_outfit_count": estimated_outfits,
+        "wardrobe_value_eur": {
+            "budget": round(summary.value_budget),
+            "moyen": round(summary.value_moyen),
+            "premium": round(summary.value_premium),
+        },
+    }
+
+
+async def rebuild_all(session: AsyncSession) -> dict:
+    """Rebuild every user's summary (drift repair). Commits per user."""
+    user_ids = (await session.execute(select(User.id).order_by(User.id))).scalars().all()
+    drifted: list[int] = []
+    for user_id in user_ids:
+        _, changed = await rebuild(session, user_id)
+        await session.commit()
+        if changed:
+            drifted.append(user_id)
+            logger.warning("Wardrobe summary drift repaired for user %d", user_id)
+    return {"users": len(user_ids), "drifted": len(drifted), "drifted_user_ids": drifted}
+
+
+async def delete_user_summary(session: AsyncSession, user_id: int) -> None:
+    """Account deletion (caller commits)."""
+    summary = await _load(session, user_id)
+    if summary:
+        await session.delete(summary)
@@ -0,0 +1,158 @@
+"""
+Geocoding and weather caches shared by every push user.
+
+The morning push and the overnight precompute used to geocode ``push_city`` and fetch the
+weather once per user — 5,000 Parisians meant 10,000 identical Open-Meteo calls.
+
+  - ``resolve_city``     city name → (lat, lon). The bundled gazetteer answers most cities
+                         offline; misses are persisted as ``GeocodeCache`` rows (one per
+                         normalized city name) behind a process-local dict. Open-Meteo is
+                         only asked for a city neither knows.
+  - ``current_weather``  (lat, lon) → current weather, cached per location (rounded to
+                         ~1 km) and WEATHER_CACHE_BUCKET_S time bucket. Concurrent callers
+                         for the same key share a single in-flight request.
+  - ``current_weather_many``  same for a list of locations, misses fetched in bulk
+                         (several locations per Open-Meteo request).
+
+Coordinates are also stored on the user (``push_lat`` / ``push_lon``) when ``push_city``
+is set, so the cron can group users by location without resolving anything.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.models import GeocodeCache
+from app.services import gazetteer
+
+logger = logging.getLogger(__name__)
+
+WEATHER_CACHE_BUCKET_S = float(os.getenv("WEATHER_CACHE_BUCKET_S", "1800"))
+_COORD_DECIMALS = 2  # 0.01° ≈ 1 km — same weather
+
+city_key = gazetteer.city_key  # GeocodeCache keys and cron grouping use the gazetteer's key
+
+_cities: dict[str, tuple[float, float]] = {}
+_weather: dict[tuple, dict] = {}             # (lat, lon, bucket) → weather
+_inflight: dict[tuple, asyncio.Task] = {}
+_stats = {"gazetteer_hits": 0, "geocode_hits": 0, "geocode_misses": 0, "weather_hits": 0, "weather_misses": 0}
+
+
+def location_key(lat: float, lon: float) -> tuple[float, float]:
+    return round(lat, _COORD_DECIMALS), round(lon, _COORD_DECIMALS)
+
+
+async def resolve_city(session: AsyncSession, city: str) -> Optional[tuple[float, float]]:
+    """Coordinates for ``city``: gazetteer → memory → GeocodeCache → Open-Meteo (stored).
+
+    Commits when a network result is stored.
+    """
+    from app.services import weather_cron
+
+    key = city_key(city)
+    if not key:
+        return None
+    place = gazetteer.lookup(key)
+    if place is not None:
+        _stats["gazetteer_hits"] += 1
+        return place.latitude, place.longitude
+    if key in _cities:
+        _stats["geocode_hits"] += 1
+        return _cities[key]
+
+    row = (await session.execute(select(GeocodeCache).where(GeocodeCache.city_key == key))).scalars().first()
+    if row:
+        _stats["geocode_hits"] += 1
+        _cities[key] = (row.latitude, row.longitude)
+        return _cities[key]
+
+    _stats["geocode_misses"] += 1
+    coords = await weather_cron._geocode_city(city)
+    if coords is None:
+        return None
+    session.add(GeocodeCache(city_key=key, city=city.strip(), latitude=coords[0], longitude=coords[1]))
+    try:
+        await session.commit()
+    except IntegrityError:  # another worker stored it first
+        await session.rollback()
+    _cities[key] = coords
+    return coords
+
+
+def _bucket() -> int:
+    return int(time.time() // WEATHER_CACHE_BUCKET_S)
+
+
+async def _fetch(key: tuple) -> Optional[dict]:
+    from app.services import weather_cron
+
+    weather = await weather_cron._fetch_weather(key[0], key[1])
+    if weather is not None:
+        current = key[2]
+        for old in [k for k in _weather if k[2] < current]:
+            del _weather[old]
+        _weather[key] = weather
+    return weather
+
+
+async def current_weather(lat: float, lon: float) -> Optional[dict]:
+    """Current weather at (lat, lon), fetched at most once per location and time bucket."""
+    key = (*location_key(lat, lon), _bucket())
+    if key in _weather:
+        _stats["weather_hits"] += 1
+        return _weather[key]
+    task = _inflight.get(key)
+    if task is None:
+        _stats["weather_misses"] += 1
+        task = asyncio.create_task(_fetch(key))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    else:
+        _stats["weather_hits"] += 1
+    # Shielded: a caller timing out must not cancel the fetch other callers are waiting on
+    return await asyncio.shield(task)
+
+
+async def current_weather_many(locations: list[tuple[float, float]]) -> dict[tuple, Optional[dict]]:
+    """Current weather for many locations: cache hits, then one bulk fetch for the rest.
+
+    Keyed by ``location_key``; None where the fetch failed.
+    """
+    from app.services import weather_cron
+
+    bucket = _bucket()
+    result: dict[tuple, Optional[dict]] = {}
+    misses = []
+    for loc in dict.fromkeys(location_key(lat, lon) for lat, lon in locations):
+        cached = _weather.get((*loc, bucket))
+        if cached is not None:
+            _stats["weather_hits"] += 1
+            result[loc] = cached
+        else:
+            _stats["weather_misses"] += 1
+            misses.append(loc)
+    if misses:
+        for loc, weather in zip(misses, await weather_cron._fetch_weather_bulk(misses)):
+            if weather is not None:
+                _weather[(*loc, bucket)] = weather
+            result[loc] = weather
+        for old in [k for k in _weather if k[2] < bucket]:
+            del _weather[old]
+    return result
+
+
+def stats() -> dict:
+    return {**_stats, "cities": len(_cities), "weather_entries": len(_weather)}
+
+
+def reset() -> None:
+    _cities.clear()
+    _weather.clear()
+    _inflight.clear()
+    for k in _stats:
+        _stats[k] = 0
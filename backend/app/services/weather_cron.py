@@ -1,29 +1,82 @@
 """
 Morning push notification cron job.
 
-Runs daily at 07:30 local server time (configurable via PUSH_CRON_HOUR / PUSH_CRON_MINUTE).
+Each user gets their push at 07:30 in their own time zone (PUSH_CRON_HOUR / PUSH_CRON_MINUTE,
+zone derived from the push city), plus a stable per-user offset spreading sends over
+PUSH_WINDOW_MINUTES. A tick every PUSH_TICK_MINUTES picks the users whose slot has come
+(``run_push_tick``), and only the worker holding the scheduler lease runs it (see
+scheduler_lease). ``last_morning_push``, set once FCM has answered for a user's message,
+makes sure nobody gets two pushes the same day. Users are read in chunks and each tick is
+checkpointed (see job_runs), so a run cut short by a restart resumes where it stopped.
+
 For each user with push_notifications_enabled + fcm_token:
-  1. Fetch current weather for their city (Open-Meteo geocoding + forecast API)
-  2. Generate a brief outfit suggestion via Gemini
-  3. Send Firebase push notification
+  1. Fetch current weather for their location (Open-Meteo geocoding + forecast API),
+     once per location — see weather_cache
+  2. Pick the outfit suggestion precomputed overnight (see suggestion_precompute),
+     or generate one via Gemini if none exists / the forecast was off
+  3. Send Firebase push notifications, in batches of up to 500 (push_service.send_push_batch)
+
+Users run through these stages concurrently, each stage with its own concurrency limit
+and timeout (PUSH_WEATHER_* / PUSH_AI_* / PUSH_SEND_*). A slow or failed stage degrades
+(default weather, generic message) instead of holding up the rest of the run.
 
 Requires APScheduler: pip install apscheduler
 """
+import asyncio
 import logging
 import os
-from datetime import date
+import time
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
 from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 import httpx
+from sqlalchemy import update
 
 from app.database import async_session
 from app.models import User
-from app.services import ai_service, push_service
+from app.services import (
+    email_campaigns, email_outbox, gazetteer, job_runs, push_service, scheduler_lease, storage_service, weather_cache,
+)
 
 logger = logging.getLogger(__name__)
 
 PUSH_CRON_HOUR = int(os.getenv("PUSH_CRON_HOUR", "7"))
 PUSH_CRON_MINUTE = int(os.getenv("PUSH_CRON_MINUTE", "30"))
+PUSH_WINDOW_MINUTES = int(os.getenv("PUSH_WINDOW_MINUTES", "30"))      # sends spread over this window
+PUSH_TICK_MINUTES = int(os.getenv("PUSH_TICK_MINUTES", "5"))
+PUSH_CATCHUP_MINUTES = int(os.getenv("PUSH_CATCHUP_MINUTES", "90"))    # a missed slot is still sent this late
+PUSH_DEFAULT_TIMEZONE = os.getenv("PUSH_DEFAULT_TIMEZONE", "Europe/Paris")
+PUSH_CHUNK_SIZE = int(os.getenv("PUSH_CHUNK_SIZE", str(job_runs.JOB_USER_CHUNK_SIZE)))  # users read at a time
+PUSH_JOB = "morning_push"
+
+PUSH_ENABLED = (
+    User.push_notifications_enabled == True,  # noqa: E712
+    User.fcm_token != None,  # noqa: E711
+)
+# Everything the push (and the precompute) reads from a user — rows stand in for User
+PUSH_USER_COLUMNS = (
+    User.id, User.prenom, User.genre, User.age, User.morphologie, User.wardrobe_version,
+    User.fcm_token, User.push_city, User.push_lat, User.push_lon, User.push_timezone,
+    User.last_morning_push,
+)
+
+# Morning push pipeline: per-stage concurrency limits and timeouts
+PUSH_WEATHER_CONCURRENCY = int(os.getenv("PUSH_WEATHER_CONCURRENCY", "20"))
+PUSH_AI_CONCURRENCY = int(os.getenv("PUSH_AI_CONCURRENCY", "8"))
+PUSH_SEND_CONCURRENCY = int(os.getenv("PUSH_SEND_CONCURRENCY", "4"))  # batch calls in flight
+PUSH_WEATHER_TIMEOUT_S = float(os.getenv("PUSH_WEATHER_TIMEOUT_S", "15"))
+PUSH_AI_TIMEOUT_S = float(os.getenv("PUSH_AI_TIMEOUT_S", "45"))
+PUSH_SEND_TIMEOUT_S = float(os.getenv("PUSH_SEND_TIMEOUT_S", "30"))  # per batch
+
+# Open-Meteo endpoints (overridable to point at standins/open_meteo.py)
+OPEN_METEO_FORECAST_URL = os.getenv("OPEN_METEO_FORECAST_URL", "https://api.open-meteo.com/v1/forecast")
+OPEN_METEO_GEOCODING_URL = os.getenv("OPEN_METEO_GEOCODING_URL", "https://geocoding-api.open-meteo.com/v1/search")
+WEATHER_BULK_SIZE = int(os.getenv("WEATHER_BULK_SIZE", "100"))  # locations per forecast request
+
+_PARIS_COORDS = (48.8566, 2.3522)
+_DEFAULT_WEATHER = {"temperature": 18, "description": "variable"}
 
 # WMO weather interpretation codes → French description
 _WMO_CODES = {
@@ -37,148 +90,537 @@ _WMO_CODES = {
 }
 
 
+_http: Optional[httpx.AsyncClient] = None
+_http_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _http_client() -> httpx.AsyncClient:
+    """Shared keep-alive client for Open-Meteo (one per event loop)."""
+    global _http, _http_loop
+    loop = asyncio.get_running_loop()
+    if _http is None or _http.is_closed or _http_loop is not loop:
+        _http = httpx.AsyncClient(
+            timeout=10,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=30),
+        )
+        _http_loop = loop
+    return _http
+
+
+async def close_http_client() -> None:
+    global _http
+    if _http is not None and not _http.is_closed:
+        await _http.aclose()
+    _http = None
+
+
 async def _geocode_city(city: str) -> Optional[tuple[float, float]]:
     """Returns (latitude, longitude) for a city name, or None."""
     try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            resp = await client.get(
-                "https://geocoding-api.open-meteo.com/v1/search",
-                params={"name": city, "count": 1, "language": "fr", "format": "json"},
-            )
-            data = resp.json()
-            results = data.get("results", [])
-            if results:
-                return results[0]["latitude"], results[0]["longitude"]
+        resp = await _http_client().get(
+            OPEN_METEO_GEOCODING_URL,
+            params={"name": city, "count": 1, "language": "fr", "format": "json"},
+        )
+        data = resp.json()
+        results = data.get("results", [])
+        if results:
+            return results[0]["latitude"], results[0]["longitude"]
     except Exception as exc:
         logger.warning("Geocoding failed for city '%s': %s", city, exc)
     return None
 
 
+def _current_weather(data: dict) -> dict:
+    current = data.get("current", {})
+    code = current.get("weathercode", 0) or 0
+    return {"temperature": current.get("temperature_2m"), "description": _WMO_CODES.get(int(code), "variable")}
+
+
+async def _fetch_weather_chunk(chunk: list[tuple[float, float]]) -> list[Optional[dict]]:
+    """One Open-Meteo request for several locations (comma-separated coordinates)."""
+    try:
+        resp = await _http_client().get(
+            OPEN_METEO_FORECAST_URL,
+            params={
+                "latitude": ",".join(f"{lat:.4f}" for lat, _ in chunk),
+                "longitude": ",".join(f"{lon:.4f}" for _, lon in chunk),
+                "current": "temperature_2m,weathercode",
+                "timezone": "auto",
+            },
+        )
+        resp.raise_for_status()
+        data = resp.json()
+        entries = data if isinstance(data, list) else [data]  # a single location is not wrapped
+        if len(entries) != len(chunk):
+            logger.warning("Bulk weather: %d results for %d locations", len(entries), len(chunk))
+            return [None] * len(chunk)
+        return [_current_weather(entry) for entry in entries]
+    except Exception as exc:
+        logger.warning("Bulk weather fetch failed (%d locations): %s", len(chunk), exc)
+    return [None] * len(chunk)
+
+
+async def _fetch_weather_bulk(locations: list[tuple[float, float]]) -> list[Optional[dict]]:
+    """Current weather for many locations, WEATHER_BULK_SIZE per request. Same order as input."""
+    chunks = [locations[i:i + WEATHER_BULK_SIZE] for i in range(0, len(locations), WEATHER_BULK_SIZE)]
+    results = await asyncio.gather(*(_fetch_weather_chunk(chunk) for chunk in chunks))
+    return [weather for chunk_result in results for weather in chunk_result]
+
+
 async def _fetch_weather(lat: float, lon: float) -> Optional[dict]:
     """Fetch current temperature + weather code from Open-Meteo."""
+    return (await _fetch_weather_chunk([(lat, lon)]))[0]
+
+
+async def _fetch_forecast_at(lat: float, lon: float, day: date, hour: int) -> Optional[dict]:
+    """Forecast temperature + weather code for ``day`` at ``hour`` (local time of the location)."""
     try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            resp = await client.get(
-                "https://api.open-meteo.com/v1/forecast",
-                params={
-                    "latitude": lat,
-                    "longitude": lon,
-                    "current": "temperature_2m,weathercode",
-                    "timezone": "auto",
-                },
-            )
-            data = resp.json()
-            current = data.get("current", {})
-            temp = current.get("temperature_2m")
-            code = current.get("weathercode", 0)
-            description = _WMO_CODES.get(int(code), "variable")
-            return {"temperature": temp, "description": description}
+        resp = await _http_client().get(
+            OPEN_METEO_FORECAST_URL,
+            params={
+                "latitude": lat,
+                "longitude": lon,
+                "hourly": "temperature_2m,weathercode",
+                "start_date": day.isoformat(),
+                "end_date": day.isoformat(),
+                "timezone": "auto",
+            },
+        )
+        hourly = resp.json().get("hourly", {})
+        times = hourly.get("time", [])
+        target = f"{day.isoformat()}T{hour:02d}:00"
+        if target not in times:
+            return None
+        idx = times.index(target)
+        temp = hourly["temperature_2m"][idx]
+        code = hourly.get("weathercode", [0] * len(times))[idx] or 0
+        return {"temperature": temp, "description": _WMO_CODES.get(int(code), "variable")}
     except Exception as exc:
-        logger.warning("Weather fetch failed (%.4f, %.4f): %s", lat, lon, exc)
+        logger.warning("Forecast fetch failed (%.4f, %.4f): %s", lat, lon, exc)
     return None
 
 
-async def _send_morning_push_for_user(user: User) -> None:
-    """Fetch weather, generate suggestion summary, send push — for a single user."""
-    if not user.fcm_token:
-        return
+class _PushRun:
+    """One morning push run: a semaphore and a timeout per stage, plus the report."""
 
-    city = user.push_city or "Paris"
+    def __init__(self, now: Optional[datetime] = None) -> None:
+        self.now = now or datetime.now(timezone.utc)
+        self.limits = {
+            "weather": (asyncio.Semaphore(PUSH_WEATHER_CONCURRENCY), PUSH_WEATHER_TIMEOUT_S),
+            "ai": (asyncio.Semaphore(PUSH_AI_CONCURRENCY), PUSH_AI_TIMEOUT_S),
+            "push": (asyncio.Semaphore(PUSH_SEND_CONCURRENCY), PUSH_SEND_TIMEOUT_S),
+        }
+        self.invalid_token_user_ids: list[int] = []
+        self._outbox: list[tuple[int, date, push_service.PushMessage]] = []
+        self._batches: list[asyncio.Task] = []
+        self.report = {
+            "users": 0, "locations": 0, "sent": 0, "failed": 0, "push_batches": 0,
+            "weather_fallbacks": 0, "ai_fallbacks": 0, "invalid_tokens": 0,
+            "timeouts": {"weather": 0, "ai": 0, "push": 0},
+        }
 
-    coords = await _geocode_city(city)
-    if not coords:
-        coords = (48.8566, 2.3522)  # Paris fallback
-    lat, lon = coords
+    async def stage(self, name: str, make_coro):
+        """Run ``make_coro()`` under the stage's semaphore and timeout (the wait for a slot is not timed)."""
+        semaphore, timeout = self.limits[name]
+        async with semaphore:
+            try:
+                return await asyncio.wait_for(make_coro(), timeout)
+            except asyncio.TimeoutError:
+                self.report["timeouts"][name] += 1
+                raise
 
-    weather = await _fetch_weather(lat, lon)
-    if not weather:
-        weather = {"temperature": 18, "description": "variable"}
+    def queue_push(self, user_id: int, day: date, message: push_service.PushMessage) -> None:
+        """Add ``user_id``'s push for their local ``day`` to the outbox; a full outbox
+        (FCM_BATCH_SIZE) is sent right away."""
+        self._outbox.append((user_id, day, message))
+        if len(self._outbox) >= push_service.FCM_BATCH_SIZE:
+            self._flush()
 
-    profile = {
-        "prenom": user.prenom,
-        "genre": user.genre,
-        "age": user.age,
-        "morphologie": user.morphologie.value if user.morphologie else "RECTANGLE",
-    }
+    def _flush(self) -> None:
+        if self._outbox:
+            batch, self._outbox = self._outbox, []
+            self._batches.append(asyncio.create_task(self._send_batch(batch)))
 
-    try:
-        result = await ai_service.get_daily_suggestions(profile, {**weather, "ville": city})
-        suggestions = result.get("suggestions", [])
-        if suggestions:
-            first = suggestions[0]
-            title = f"☀️ Look du jour — {weather['temperature']}°C à {city}"
-            body = f"{first.get('titre', 'Suggestion')} · {first.get('occasion', '')}"
+    async def _send_batch(self, batch: list[tuple[int, date, push_service.PushMessage]]) -> None:
+        self.report["push_batches"] += 1
+        try:
+            results = await self.stage("push", lambda: push_service.send_push_batch([m for _, _, m in batch]))
+        except Exception as exc:
+            logger.warning("Push batch of %d failed: %r", len(batch), exc)
+            self.report["failed"] += len(batch)
+            return  # timeout / transport error: keep the tokens, retried next tick
+        done: dict[date, list[int]] = {}
+        for (user_id, day, _), result in zip(batch, results):
+            if result.success:
+                self.report["sent"] += 1
+            else:
+                self.report["failed"] += 1
+                if result.invalid_token:
+                    self.invalid_token_user_ids.append(user_id)
+            if result.success or result.invalid_token:
+                done.setdefault(day, []).append(user_id)
+        await _mark_pushed(done)
+
+    async def drain_pushes(self) -> None:
+        """Send what is left in the outbox and wait for every batch."""
+        self._flush()
+        batches, self._batches = self._batches, []
+        await asyncio.gather(*batches)
+
+
+def _push_city(user: User) -> str:
+    return user.push_city or "Paris"
+
+
+async def _resolve_city(city: str) -> tuple[float, float]:
+    async with async_session() as session:
+        coords = await weather_cache.resolve_city(session, city)
+    if coords is None:
+        logger.warning("Unknown push city '%s', using Paris weather", city)
+        return _PARIS_COORDS
+    return coords
+
+
+async def _group_by_location(run: _PushRun, users: list[User]) -> dict[tuple, list[User]]:
+    """Users per location: stored coordinates, else their city resolved once per city."""
+    groups: dict[tuple, list[User]] = {}
+    by_city: dict[str, list[User]] = {}
+    for user in users:
+        if user.push_lat is not None and user.push_lon is not None:
+            groups.setdefault(weather_cache.location_key(user.push_lat, user.push_lon), []).append(user)
         else:
-            title = f"☀️ Bonjour {user.prenom} !"
-            body = f"{weather['temperature']}°C, {weather['description']} — ouvre l'app pour ton look du jour 👗"
+            by_city.setdefault(weather_cache.city_key(_push_city(user)), []).append(user)
+
+    async def resolve(city: str) -> tuple[float, float]:
+        try:
+            return await run.stage("weather", lambda: _resolve_city(city))
+        except Exception as exc:
+            logger.warning("Geocoding failed for '%s': %r", city, exc)
+            return _PARIS_COORDS
+
+    cities = list(by_city.values())
+    coords = await asyncio.gather(*(resolve(_push_city(members[0])) for members in cities))
+    for members, (lat, lon) in zip(cities, coords):
+        groups.setdefault(weather_cache.location_key(lat, lon), []).extend(members)
+    return groups
+
+
+async def _weather_by_location(run: _PushRun, locations: list[tuple]) -> dict[tuple, Optional[dict]]:
+    """Current weather for every location, WEATHER_BULK_SIZE locations per request."""
+    async def fetch(chunk: list[tuple]) -> dict[tuple, Optional[dict]]:
+        try:
+            return await run.stage("weather", lambda: weather_cache.current_weather_many(chunk))
+        except Exception as exc:
+            logger.warning("Weather stage failed for %d locations: %r", len(chunk), exc)
+            return {}
+
+    chunks = [locations[i:i + WEATHER_BULK_SIZE] for i in range(0, len(locations), WEATHER_BULK_SIZE)]
+    weather: dict[tuple, Optional[dict]] = {}
+    for part in await asyncio.gather(*(fetch(chunk) for chunk in chunks)):
+        weather.update(part)
+    return weather
+
+
+async def _push_message(user: User, weather: dict, city: str, day: date) -> tuple[str, str]:
+    """(title, body) from the user's suggestion of their local ``day`` (precomputed / cached / Gemini)."""
+    from app.services.suggestion_precompute import suggestions_for_push
+
+    async with async_session() as session:
+        result = await suggestions_for_push(session, user, {**weather, "ville": city}, day)
+    suggestions = result.get("suggestions", [])
+    if suggestions:
+        first = suggestions[0]
+        title = f"☀️ Look du jour — {weather['temperature']}°C à {city}"
+        body = f"{first.get('titre', 'Suggestion')} · {first.get('occasion', '')}"
+    else:
+        title = f"☀️ Bonjour {user.prenom} !"
+        body = f"{weather['temperature']}°C, {weather['description']} — ouvre l'app pour ton look du jour 👗"
+    return title, body
+
+
+async def _send_morning_push_for_user(run: _PushRun, user: User, weather: Optional[dict]) -> None:
+    """Suggestion → outbox for a single user (weather fetched per location beforehand,
+    messages sent in batches); each stage degrades instead of failing."""
+    city = _push_city(user)
+    day = push_slot(user, run.now).date()
+    if not weather:
+        weather = dict(_DEFAULT_WEATHER)
+        run.report["weather_fallbacks"] += 1
+
+    try:
+        title, body = await run.stage("ai", lambda: _push_message(user, weather, city, day))
     except Exception as exc:
-        logger.warning("AI suggestion failed for user %d: %s", user.id, exc)
+        logger.warning("AI suggestion failed for user %d: %r", user.id, exc)
+        run.report["ai_fallbacks"] += 1
         title = f"☀️ Bonjour {user.prenom} !"
         body = f"{weather['temperature']}°C et {weather['description']} aujourd'hui — check ton look du jour !"
 
-    success = await push_service.send_push(
+    run.queue_push(user.id, day, push_service.PushMessage(
         fcm_token=user.fcm_token,
         title=title,
         body=body,
-        data={"type": "morning_suggestion", "date": date.today().isoformat()},
-    )
+        data={"type": "morning_suggestion", "date": day.isoformat()},
+    ))
 
-    if not success:
-        # Token invalid — disable push for this user
-        async with async_session() as session:
-            db_user = await session.get(User, user.id)
-            if db_user:
-                db_user.push_notifications_enabled = False
-                db_user.fcm_token = None
-                session.add(db_user)
-                await session.commit()
-                logger.info("Cleared invalid FCM token for user %d", user.id)
 
+async def _clear_invalid_tokens(user_ids: list[int]) -> None:
+    """Disable push for users whose token was rejected — one UPDATE per chunk of users."""
+    if not user_ids:
+        return
+    async with async_session() as session:
+        await session.execute(
+            update(User)
+            .where(User.id.in_(user_ids))
+            .values(push_notifications_enabled=False, fcm_token=None)
+        )
+        await session.commit()
+    logger.info("Cleared invalid FCM tokens for %d users", len(user_ids))
 
-async def run_morning_push() -> None:
-    """Main cron task: iterate all push-enabled users and send morning notifications."""
-    logger.info("Morning push cron started")
-    from sqlmodel import select
 
+async def _mark_pushed(user_ids_by_day: dict[date, list[int]]) -> None:
+    """Record each user's local push day once FCM has answered for their message, so a
+    resumed or overlapping run skips them (tokens that failed transiently stay due)."""
+    if not user_ids_by_day:
+        return
     async with async_session() as session:
-        result = await session.execute(
-            select(User).where(
-                User.push_notifications_enabled == True,  # noqa: E712
-                User.fcm_token != None,  # noqa: E711
-            )
-        )
-        users = result.scalars().all()
+        for day, ids in user_ids_by_day.items():
+            await session.execute(update(User).where(User.id.in_(ids)).values(last_morning_push=day))
+        await session.commit()
+
+
+@lru_cache(maxsize=None)
+def _zone(name: str) -> ZoneInfo:
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning("Unknown time zone '%s', using %s", name, PUSH_DEFAULT_TIMEZONE)
+        return ZoneInfo(PUSH_DEFAULT_TIMEZONE)
+
+
+def timezone_for(user: User) -> str:
+    """IANA zone for the user's push city: stored, else from coordinates or the gazetteer."""
+    if user.push_timezone:
+        return user.push_timezone
+    tz = None
+    if user.push_lat is not None and user.push_lon is not None:
+        tz = gazetteer.timezone_at(user.push_lat, user.push_lon)
+    if tz is None:
+        place = gazetteer.lookup(_push_city(user))
+        tz = place.timezone if place else None
+    return tz or PUSH_DEFAULT_TIMEZONE
+
+
+def _slot_offset(user_id: int) -> int:
+    """Stable minute offset in the send window (multiplicative hash of the id)."""
+    return (user_id * 2654435761) % 2**32 % max(1, PUSH_WINDOW_MINUTES)
+
+
+def local_date(user: User, now: Optional[datetime] = None) -> date:
+    """The user's current date in their push time zone (suggestions are cached per local day)."""
+    return (now or datetime.now(timezone.utc)).astimezone(_zone(timezone_for(user))).date()
+
+
+def push_slot(user: User, now: datetime) -> datetime:
+    """Today's push time for ``user``, in their local time."""
+    local_now = now.astimezone(_zone(timezone_for(user)))
+    slot = local_now.replace(hour=PUSH_CRON_HOUR, minute=PUSH_CRON_MINUTE, second=0, microsecond=0)
+    return slot + timedelta(minutes=_slot_offset(user.id))
+
+
+def is_due(user: User, now: datetime) -> bool:
+    slot = push_slot(user, now)
+    local_now = now.astimezone(slot.tzinfo)
+    return (
+        slot <= local_now < slot + timedelta(minutes=PUSH_CATCHUP_MINUTES)
+        and user.last_morning_push != slot.date()
+    )
+
 
-    logger.info("Sending morning push to %d users", len(users))
+async def _store_timezones(users: list) -> None:
+    """Persist derived zones for users that have none yet — one UPDATE per zone."""
+    by_zone: dict[str, list[int]] = {}
     for user in users:
+        if not user.push_timezone:
+            by_zone.setdefault(timezone_for(user), []).append(user.id)
+    if not by_zone:
+        return
+    async with async_session() as session:
+        for tz, ids in by_zone.items():
+            await session.execute(update(User).where(User.id.in_(ids)).values(push_timezone=tz))
+        await session.commit()
+
+
+async def _push_chunk(run: _PushRun, users: list) -> None:
+    """Weather per location → suggestion per user → batched sends, for one chunk of users.
+    Returns once every batch has been answered and rejected tokens are cleared."""
+    groups = await _group_by_location(run, users)
+    weathers = await _weather_by_location(run, list(groups))
+    weather_by_user = {user.id: weathers.get(loc) for loc, members in groups.items() for user in members}
+    run.report["users"] += len(users)
+    run.report["locations"] += len(groups)
+
+    async def guarded(user) -> None:
         try:
-            await _send_morning_push_for_user(user)
+            await _send_morning_push_for_user(run, user, weather_by_user.get(user.id))
         except Exception as exc:
+            run.report["failed"] += 1
             logger.error("Morning push failed for user %d: %s", user.id, exc)
 
-    logger.info("Morning push cron finished")
+    await asyncio.gather(*(guarded(user) for user in users))
+    await run.drain_pushes()
+
+    invalid, run.invalid_token_user_ids = run.invalid_token_user_ids, []
+    run.report["invalid_tokens"] += len(invalid)
+    await _clear_invalid_tokens(invalid)
+
+
+async def run_push_tick(now: Optional[datetime] = None) -> dict:
+    """Scheduled every PUSH_TICK_MINUTES: push the users whose local slot has come.
+
+    Push-enabled users are read PUSH_CHUNK_SIZE at a time (keyset pagination, projected
+    columns) and the run is checkpointed after each chunk (see job_runs): a tick left
+    unfinished by a worker that went away is resumed by the next one after its last chunk.
+    """
+    now = now or datetime.now(timezone.utc)
+    async with async_session() as session:
+        job = await job_runs.start(
+            session, PUSH_JOB, now.strftime("%Y-%m-%dT%H:%M"), resume_within_s=PUSH_CATCHUP_MINUTES * 60,
+        )
+    if job is None:
+        return {"due": 0}
+
+    run = _PushRun(now)
+    due = 0
+    async for rows in job_runs.iter_user_chunks(
+        async_session, PUSH_USER_COLUMNS, *PUSH_ENABLED, after_id=job.cursor, chunk_size=PUSH_CHUNK_SIZE,
+    ):
+        await _store_timezones(rows)
+        chunk = [row for row in rows if is_due(row, now)]
+        if chunk:
+            due += len(chunk)
+            await _push_chunk(run, chunk)
+        async with async_session() as session:
+            if not await job_runs.checkpoint(session, job, rows[-1].id, {"due": due, **run.report}):
+                break
+    else:
+        async with async_session() as session:
+            await job_runs.finish(session, job, {"due": due, **run.report})
+
+    if not due:
+        return {"due": 0}
+    logger.info("Morning push tick %s: %s", job.run_key, run.report)
+    return {"due": due, **run.report}
+
+
+async def run_morning_push(users: Optional[list[User]] = None) -> dict:
+    """Send morning notifications to ``users`` (default: all push-enabled users), concurrently.
+
+    Without ``users``, push-enabled users are streamed PUSH_CHUNK_SIZE at a time with only
+    the columns the push needs, and each chunk is pushed before the next one is read.
+    Users are first grouped by location (stored coordinates, else their city geocoded once),
+    and the weather is fetched once per location, WEATHER_BULK_SIZE locations per request.
+    Every user then goes through the ai stage, and the messages are sent FCM_BATCH_SIZE at a
+    time as the outbox fills (one ``send_each`` call per batch). Each stage admits at most
+    PUSH_<STAGE>_CONCURRENCY tasks at a time and gives up after PUSH_<STAGE>_TIMEOUT_S, so
+    the run takes about users × stage latency / limit rather than users × total latency.
+    Rejected tokens are cleared with one UPDATE per chunk. Returns the completion report
+    (also logged).
+    """
+    started = time.monotonic()
+    logger.info("Morning push cron started")
+    run = _PushRun()
+
+    if users is not None:
+        await _push_chunk(run, users)
+    else:
+        async for rows in job_runs.iter_user_chunks(
+            async_session, PUSH_USER_COLUMNS, *PUSH_ENABLED, chunk_size=PUSH_CHUNK_SIZE,
+        ):
+            await _push_chunk(run, rows)
+
+    run.report["duration_s"] = round(time.monotonic() - started, 2)
+    logger.info("Morning push cron finished: %s", run.report)
+    return run.report
 
 
 def start_scheduler(app) -> None:
-    """Start APScheduler background scheduler attached to the FastAPI app."""
+    """Start APScheduler background scheduler attached to the FastAPI app.
+
+    Every worker starts one, but the jobs only run on the holder of the scheduler lease,
+    renewed by a heartbeat job every SCHEDULER_LEASE_RENEW_S.
+    """
     try:
         from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
         scheduler = AsyncIOScheduler()
         scheduler.add_job(
-            run_morning_push,
-            trigger="cron",
-            hour=PUSH_CRON_HOUR,
-            minute=PUSH_CRON_MINUTE,
+            scheduler_lease.heartbeat,
+            trigger="interval",
+            seconds=scheduler_lease.SCHEDULER_LEASE_RENEW_S,
+            next_run_time=datetime.now(),
+            id="scheduler_lease",
+            replace_existing=True,
+        )
+        scheduler.add_job(
+            scheduler_lease.leader_only(run_push_tick),
+            trigger="interval",
+            minutes=PUSH_TICK_MINUTES,
             id="morning_push",
             replace_existing=True,
         )
+        from app.services.suggestion_precompute import (
+            PRECOMPUTE_CRON_HOUR, PRECOMPUTE_CRON_MINUTE, resume_suggestion_precompute, run_suggestion_precompute,
+        )
+        scheduler.add_job(
+            scheduler_lease.leader_only(run_suggestion_precompute),
+            trigger="cron",
+            hour=PRECOMPUTE_CRON_HOUR,
+            minute=PRECOMPUTE_CRON_MINUTE,
+            id="suggestion_precompute",
+            replace_existing=True,
+        )
+        scheduler.add_job(
+            scheduler_lease.leader_only(email_outbox.dispatch),
+            trigger="interval",
+            seconds=email_outbox.EMAIL_DISPATCH_INTERVAL_S,
+            id="email_outbox",
+            replace_existing=True,
+        )
+        scheduler.add_job(
+            scheduler_lease.leader_only(email_campaigns.run_campaigns),
+            trigger="cron",
+            hour=email_campaigns.CAMPAIGN_CRON_HOUR,
+            minute=email_campaigns.CAMPAIGN_CRON_MINUTE,
+            id="email_campaigns",
+            replace_existing=True,
+        )
+        scheduler.add_job(
+            scheduler_lease.leader_only(storage_service.collect_orphans),
+            trigger="cron",
+            hour=storage_service.ORPHAN_CRON_HOUR,
+            minute=storage_service.ORPHAN_CRON_MINUTE,
+            id="storage_orphans",
+            replace_existing=True,
+        )
+        scheduler.add_job(
+            scheduler_lease.leader_only(resume_suggestion_precompute),
+            trigger="interval",
+            seconds=job_runs.JOB_RUN_STALE_S,
+            id="suggestion_precompute_resume",
+            replace_existing=True,
+        )
         scheduler.start()
         app.state.scheduler = scheduler
         logger.info(
-            "APScheduler started — morning push at %02d:%02d daily",
+            "APScheduler started (worker %s) — suggestion precompute at %02d:%02d, morning push "
+            "at %02d:%02d local time over %d min, checked every %d min",
+            scheduler_lease.WORKER_ID,
+            PRECOMPUTE_CRON_HOUR,
+            PRECOMPUTE_CRON_MINUTE,
             PUSH_CRON_HOUR,
             PUSH_CRON_MINUTE,
+            PUSH_WINDOW_MINUTES,
+            PUSH_TICK_MINUTES,
         )
     except ImportError:
         logger.warning("apscheduler not installed — morning push cron disabled")
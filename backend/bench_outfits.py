@@ -0,0 +1,70 @@
+"""
+Benchmark for the outfit combination counter over synthetic wardrobes of growing size.
+
+    python bench_outfits.py              # 25 → 1000 items
+    python bench_outfits.py 500 2000     # custom sizes
+"""
+import json
+import random
+import sys
+import time
+
+from app.services.outfit_combinations import OutfitCombinations
+
+# Realistic-ish distributions: neutrals dominate, most pieces are tops
+TYPES = (
+    ["T-shirt", "Chemise", "Pull", "Sweat", "Polo", "Blouse"] * 6
+    + ["Jean", "Pantalon", "Chino", "Jupe", "Short"] * 5
+    + ["Robe", "Combinaison"] * 2
+    + ["Baskets", "Bottines", "Mocassins", "Sandales"] * 3
+    + ["Veste", "Manteau", "Blazer", "Doudoune"] * 2
+    + ["Ceinture", "Écharpe"]
+)
+COLOURS = (
+    ["Noir", "Blanc", "Gris", "Bleu Nuit", "Beige"] * 4
+    + ["Bleu", "Marron", "Kaki", "Bordeaux", "Vert", "Rouge", "Rose", "Jaune", "Orange", "Violet"]
+)
+SEASONS = ["Toutes saisons"] * 3 + ["Été", "Hiver", "Mi-saison"]
+STYLES = ["Casual", "Casual", "Streetwear", "Business Casual", "Sportswear", "Smart Casual", "Chic"]
+
+
+def synthetic_wardrobe(size: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "id": i,
+            "type": rng.choice(TYPES),
+            "couleur": rng.choice(COLOURS),
+            "saison": rng.choice(SEASONS),
+            "tags_ia": json.dumps({"items": [{"style": rng.choice(STYLES)}]}),
+        }
+        for i in range(size)
+    ]
+
+
+def bench(size: int, repeat: int = 5) -> None:
+    items = synthetic_wardrobe(size)
+    build_s = count_s = 0.0
+    for _ in range(repeat):  # fresh engine each time: no warm memo
+        started = time.perf_counter()
+        engine = OutfitCombinations(items)
+        built = time.perf_counter()
+        count = engine.count()
+        build_s += built - started
+        count_s += time.perf_counter() - built
+
+    started = time.perf_counter()
+    engine.sample(10, seed=1)
+    sample_ms = (time.perf_counter() - started) * 1000
+
+    print(
+        f"{size:>6} items | {len(engine.classes):>4} classes | {count:>14,} outfits "
+        f"| build {build_s / repeat * 1000:7.1f} ms | count {count_s / repeat * 1000:7.1f} ms "
+        f"| sample(10) {sample_ms:7.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [25, 50, 100, 250, 500, 1000]
+    for n in sizes:
+        bench(n)
@@ -0,0 +1,83 @@
+"""
+Benchmark for the morning push weather fetch against the Open-Meteo stand-in.
+
+Compares, for N distinct locations:
+  - per-location requests, a new client each time (the old behaviour)
+  - per-location requests over the pooled keep-alive client
+  - bulk requests (WEATHER_BULK_SIZE locations each) over the pooled client
+
+    python bench_weather.py                     # 500 locations, 20 ms server latency
+    python bench_weather.py 2000 50             # locations, latency in ms
+"""
+import asyncio
+import sys
+import threading
+import time
+
+import httpx
+import uvicorn
+
+from app.services import weather_cron
+from standins import open_meteo
+
+PORT = 8091
+
+
+def start_standin(latency_ms: float) -> uvicorn.Server:
+    open_meteo.LATENCY_S = latency_ms / 1000
+    server = uvicorn.Server(uvicorn.Config(open_meteo.app, host="127.0.0.1", port=PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def per_location_new_client(locations: list[tuple[float, float]]) -> None:
+    sem = asyncio.Semaphore(weather_cron.PUSH_WEATHER_CONCURRENCY)
+
+    async def one(lat: float, lon: float) -> None:
+        async with sem, httpx.AsyncClient(timeout=10) as client:
+            await client.get(weather_cron.OPEN_METEO_FORECAST_URL, params={
+                "latitude": lat, "longitude": lon, "current": "temperature_2m,weathercode",
+            })
+
+    await asyncio.gather(*(one(lat, lon) for lat, lon in locations))
+
+
+async def per_location_pooled(locations: list[tuple[float, float]]) -> None:
+    sem = asyncio.Semaphore(weather_cron.PUSH_WEATHER_CONCURRENCY)
+
+    async def one(lat: float, lon: float) -> None:
+        async with sem:
+            await weather_cron._fetch_weather(lat, lon)
+
+    await asyncio.gather(*(one(lat, lon) for lat, lon in locations))
+
+
+async def bulk(locations: list[tuple[float, float]]) -> None:
+    await weather_cron._fetch_weather_bulk(locations)
+
+
+async def main(n: int, latency_ms: float) -> None:
+    weather_cron.OPEN_METEO_FORECAST_URL = f"http://127.0.0.1:{PORT}/v1/forecast"
+    locations = [(42 + (i % 80) / 10, -4 + (i // 80) / 10) for i in range(n)]
+    print(f"{n} locations, {latency_ms:.0f} ms server latency, "
+          f"{weather_cron.PUSH_WEATHER_CONCURRENCY} concurrent, bulk size {weather_cron.WEATHER_BULK_SIZE}")
+    print(f"{'mode':>24} {'requests':>9} {'seconds':>8}")
+    for name, fn in (("new client / location", per_location_new_client),
+                     ("pooled / location", per_location_pooled),
+                     ("pooled bulk", bulk)):
+        open_meteo.reset()
+        started = time.perf_counter()
+        await fn(locations)
+        elapsed = time.perf_counter() - started
+        print(f"{name:>24} {open_meteo.stats['forecast_requests']:>9} {elapsed:>8.2f}")
+    await weather_cron.close_http_client()
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+    server = start_standin(latency)
+    asyncio.run(main(n, latency))
+    server.should_exit = True
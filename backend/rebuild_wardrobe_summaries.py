@@ -0,0 +1,22 @@
+"""
+Recompute every WardrobeSummary row from the users' items (drift repair).
+
+    python rebuild_wardrobe_summaries.py
+
+Same as ``POST /admin/wardrobe-summaries/rebuild``, without going through the API.
+"""
+import asyncio
+import json
+
+from app.database import async_session
+from app.services.wardrobe_summary import rebuild_all
+
+
+async def main() -> None:
+    async with async_session() as session:
+        report = await rebuild_all(session)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,24 @@
+"""
+Move images of the flat local ``uploads/`` layout into hash-prefix shard directories
+(``uploads/ab/cd/<name>``) and rewrite ``image_path`` / listing ``image_urls`` in bulk.
+
+    python shard_uploads.py [--batch-size 500]
+
+Safe to re-run: an interrupted migration resumes where it stopped. Local disk backend only.
+"""
+import argparse
+import asyncio
+import json
+
+from app.services.storage_service import shard_flat_uploads
+
+
+async def main(batch_size: int) -> None:
+    report = await shard_flat_uploads(batch_size)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shard the flat uploads/ directory")
+    parser.add_argument("--batch-size", type=int, default=500)
+    asyncio.run(main(parser.parse_args().batch_size))
@@ -0,0 +1,12 @@
+"""
+Local stand-ins for the third-party HTTP APIs the backend calls.
+
+Each module exposes an ASGI ``app`` mimicking the subset of the real API we use, with
+deterministic responses and an optional artificial latency. Tests mount them with
+``httpx.ASGITransport``; benchmarks run them on a real socket:
+
+    python -m standins.open_meteo --port 8091 --latency-ms 30
+    python -m standins.fcm --port 8092 --latency-ms 40
+    python -m standins.resend --port 8093 --latency-ms 80
+    python -m standins.s3 --port 8094 --latency-ms 20
+"""
@@ -0,0 +1,108 @@
+"""
+FCM HTTP v1 stand-in: OAuth token endpoint + ``messages:send``.
+
+  POST /token                                  JWT-bearer grant → access token (not verified)
+  POST /v1/projects/{project}/messages:send    200 {"name": …}, or the real FCM errors:
+       token ending in "dead"  → 404 UNREGISTERED
+       token ending in "bad"   → 400 INVALID_ARGUMENT (not a valid registration token)
+       unknown bearer token    → 401
+
+``fail_next(n, status)`` makes the next n sends fail (e.g. 503) and ``revoke_tokens()``
+expires every issued token, to exercise retries and refreshes. ``stats`` counts requests
+and the peak number of sends in flight.
+
+    python -m standins.fcm --port 8092 --latency-ms 40
+    FCM_API_URL=http://127.0.0.1:8092  (and "token_uri": "http://127.0.0.1:8092/token"
+    in the service account JSON)
+
+uvicorn serves HTTP/1.1 only, so over a socket the client falls back to HTTP/1.1.
+"""
+import argparse
+import asyncio
+import itertools
+
+from fastapi import FastAPI, Form, Header, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="FCM stand-in")
+
+LATENCY_S = 0.0
+stats = {"token_requests": 0, "sends": 0, "delivered": 0, "in_flight": 0, "peak_in_flight": 0}
+_issued: set[str] = set()
+_failures: list[int] = []
+_ids = itertools.count(1)
+
+
+def reset() -> None:
+    global LATENCY_S
+    LATENCY_S = 0.0
+    for key in stats:
+        stats[key] = 0
+    _issued.clear()
+    _failures.clear()
+
+
+def revoke_tokens() -> None:
+    _issued.clear()
+
+
+def fail_next(n: int, status: int = 503) -> None:
+    _failures.extend([status] * n)
+
+
+def _error(status: int, code: str, message: str, fcm_code: str = "") -> JSONResponse:
+    error = {"code": status, "message": message, "status": code}
+    if fcm_code:
+        error["details"] = [{"@type": "type.googleapis.com/google.firebase.fcm.v1.FcmError", "errorCode": fcm_code}]
+    return JSONResponse({"error": error}, status_code=status, headers={"Retry-After": "0"} if status >= 500 else None)
+
+
+@app.post("/token")
+async def token(grant_type: str = Form(...), assertion: str = Form(...)):
+    stats["token_requests"] += 1
+    if grant_type != "urn:ietf:params:oauth:grant-type:jwt-bearer" or assertion.count(".") != 2:
+        return JSONResponse({"error": "invalid_grant"}, status_code=400)
+    access_token = f"standin-{stats['token_requests']}"
+    _issued.add(access_token)
+    return {"access_token": access_token, "expires_in": 3600, "token_type": "Bearer"}
+
+
+@app.post("/v1/projects/{project}/messages:send")
+async def send(project: str, request: Request, authorization: str = Header("")):
+    stats["sends"] += 1
+    if authorization.removeprefix("Bearer ") not in _issued:
+        return _error(401, "UNAUTHENTICATED", "Request had invalid authentication credentials.")
+    stats["in_flight"] += 1
+    stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+    try:
+        if LATENCY_S:
+            await asyncio.sleep(LATENCY_S)
+        if _failures:
+            return _error(_failures.pop(0), "UNAVAILABLE", "The service is currently unavailable.")
+        message = (await request.json()).get("message", {})
+        fcm_token = message.get("token", "")
+        if fcm_token.endswith("dead"):
+            return _error(404, "NOT_FOUND", "Requested entity was not found.", "UNREGISTERED")
+        if not fcm_token or fcm_token.endswith("bad"):
+            return _error(400, "INVALID_ARGUMENT",
+                          "The registration token is not a valid FCM registration token", "INVALID_ARGUMENT")
+        stats["delivered"] += 1
+        return {"name": f"projects/{project}/messages/{next(_ids)}"}
+    finally:
+        stats["in_flight"] -= 1
+
+
+def main() -> None:
+    global LATENCY_S
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8092)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    args = parser.parse_args()
+    LATENCY_S = args.latency_ms / 1000
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
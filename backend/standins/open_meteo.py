@@ -0,0 +1,118 @@
+"""
+Open-Meteo stand-in: ``/v1/forecast`` (current + hourly, single or comma-separated
+multi-location requests) and ``/v1/search`` (geocoding).
+
+Weather is a deterministic function of the coordinates and the hour, so repeated runs
+compare. ``stats`` counts requests and locations served.
+
+    python -m standins.open_meteo --port 8091 --latency-ms 30
+    OPEN_METEO_FORECAST_URL=http://127.0.0.1:8091/v1/forecast \\
+    OPEN_METEO_GEOCODING_URL=http://127.0.0.1:8091/v1/search  uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import hashlib
+from datetime import date, datetime
+
+from fastapi import FastAPI, HTTPException, Query
+
+app = FastAPI(title="Open-Meteo stand-in")
+
+LATENCY_S = 0.0
+MAX_LOCATIONS = 1000  # the real API rejects longer lists
+stats = {"forecast_requests": 0, "locations": 0, "geocoding_requests": 0}
+
+_CODES = (0, 1, 2, 3, 45, 61, 63, 80, 95)
+
+
+def _seed(*parts) -> int:
+    return int.from_bytes(hashlib.blake2b(repr(parts).encode(), digest_size=4).digest(), "big")
+
+
+def _weather(lat: float, lon: float, hour: str) -> tuple[float, int]:
+    seed = _seed(round(lat, 2), round(lon, 2), hour)
+    return round(-5 + (seed % 3500) / 100, 1), _CODES[seed % len(_CODES)]
+
+
+def _floats(raw: str, name: str) -> list[float]:
+    try:
+        return [float(v) for v in raw.split(",")]
+    except ValueError:
+        raise HTTPException(status_code=400, detail={"error": True, "reason": f"Invalid {name}"})
+
+
+def reset() -> None:
+    for key in stats:
+        stats[key] = 0
+
+
+@app.get("/v1/forecast")
+async def forecast(
+    latitude: str,
+    longitude: str,
+    current: str = "",
+    hourly: str = "",
+    start_date: str = "",
+    end_date: str = "",
+    timezone: str = "GMT",
+):
+    lats, lons = _floats(latitude, "latitude"), _floats(longitude, "longitude")
+    if len(lats) != len(lons):
+        raise HTTPException(status_code=400, detail={"error": True, "reason": "Parameter count mismatch"})
+    if len(lats) > MAX_LOCATIONS:
+        raise HTTPException(status_code=400, detail={"error": True, "reason": "Too many locations"})
+    stats["forecast_requests"] += 1
+    stats["locations"] += len(lats)
+    if LATENCY_S:
+        await asyncio.sleep(LATENCY_S)
+
+    now = datetime.utcnow().strftime("%Y-%m-%dT%H:00")
+    day = start_date or date.today().isoformat()
+    entries = []
+    for lat, lon in zip(lats, lons):
+        entry = {"latitude": lat, "longitude": lon, "timezone": timezone}
+        if current:
+            temp, code = _weather(lat, lon, now)
+            entry["current"] = {"time": now, "temperature_2m": temp, "weathercode": code}
+        if hourly:
+            times = [f"{day}T{h:02d}:00" for h in range(24)]
+            values = [_weather(lat, lon, t) for t in times]
+            entry["hourly"] = {
+                "time": times,
+                "temperature_2m": [v[0] for v in values],
+                "weathercode": [v[1] for v in values],
+            }
+        entries.append(entry)
+    return entries if len(entries) > 1 else entries[0]
+
+
+@app.get("/v1/search")
+async def search(name: str = Query(""), count: int = 1, language: str = "fr", format: str = "json"):
+    stats["geocoding_requests"] += 1
+    if LATENCY_S:
+        await asyncio.sleep(LATENCY_S)
+    if not name.strip():
+        return {}
+    seed = _seed(name.strip().lower())
+    return {"results": [{
+        "name": name.strip(),
+        "latitude": round(42 + (seed % 800) / 100, 4),
+        "longitude": round(-4 + (seed // 800 % 1200) / 100, 4),
+        "country_code": "FR",
+    }]}
+
+
+def main() -> None:
+    global LATENCY_S
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8091)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    args = parser.parse_args()
+    LATENCY_S = args.latency_ms / 1000
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Resend stand-in: ``POST /emails`` and ``POST /emails/batch`` (up to 100 emails).
+
+  200 {"id": …} / {"data": [{"id": …}, …]}
+  422 validation_error when an address is malformed or ends in "@invalid.test" — for a
+      batch the whole request is rejected, like the real API
+  401 without a bearer API key
+
+``fail_next(n, status)`` makes the next n requests fail (429 / 5xx) to exercise retries.
+``delivered`` keeps (to, subject) of every accepted email; ``stats`` counts requests.
+
+    python -m standins.resend --port 8093 --latency-ms 80
+    RESEND_API_URL=http://127.0.0.1:8093  RESEND_API_KEY=re_test
+"""
+import argparse
+import asyncio
+import itertools
+
+from fastapi import FastAPI, Header, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="Resend stand-in")
+
+LATENCY_S = 0.0
+MAX_BATCH = 100
+stats = {"requests": 0, "batch_requests": 0, "rejected": 0}
+delivered: list[tuple[str, str]] = []
+_failures: list[int] = []
+_ids = itertools.count(1)
+
+
+def reset() -> None:
+    global LATENCY_S
+    LATENCY_S = 0.0
+    for key in stats:
+        stats[key] = 0
+    delivered.clear()
+    _failures.clear()
+
+
+def fail_next(n: int, status: int = 503) -> None:
+    _failures.extend([status] * n)
+
+
+def _error(status: int, name: str, message: str) -> JSONResponse:
+    return JSONResponse({"statusCode": status, "name": name, "message": message}, status_code=status)
+
+
+def _invalid(email: dict) -> str:
+    for field in ("from", "to", "subject"):
+        if not email.get(field):
+            return f"Missing `{field}` field."
+    for address in email["to"]:
+        if "@" not in address or address.endswith("@invalid.test"):
+            return f"Invalid `to` field: {address}"
+    return ""
+
+
+async def _handle(emails: list[dict], authorization: str):
+    stats["requests"] += 1
+    if not authorization.startswith("Bearer ") or len(authorization) <= len("Bearer "):
+        return None, _error(401, "missing_api_key", "Missing API key in the authorization header.")
+    if LATENCY_S:
+        await asyncio.sleep(LATENCY_S)
+    if _failures:
+        status = _failures.pop(0)
+        name = "rate_limit_exceeded" if status == 429 else "internal_server_error"
+        return None, _error(status, name, "Try again later.")
+    for email in emails:
+        problem = _invalid(email)
+        if problem:
+            stats["rejected"] += 1
+            return None, _error(422, "validation_error", problem)
+    ids = []
+    for email in emails:
+        delivered.append((email["to"][0], email["subject"]))
+        ids.append(f"standin-{next(_ids)}")
+    return ids, None
+
+
+@app.post("/emails")
+async def send(request: Request, authorization: str = Header("")):
+    ids, error = await _handle([await request.json()], authorization)
+    return error or {"id": ids[0]}
+
+
+@app.post("/emails/batch")
+async def send_batch(request: Request, authorization: str = Header("")):
+    stats["batch_requests"] += 1
+    emails = await request.json()
+    if not isinstance(emails, list) or not 1 <= len(emails) <= MAX_BATCH:
+        return _error(422, "validation_error", f"A batch holds 1 to {MAX_BATCH} emails.")
+    ids, error = await _handle(emails, authorization)
+    return error or {"data": [{"id": i} for i in ids]}
+
+
+def main() -> None:
+    global LATENCY_S
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8093)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    args = parser.parse_args()
+    LATENCY_S = args.latency_ms / 1000
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
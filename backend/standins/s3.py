@@ -0,0 +1,216 @@
+"""
+S3-compatible stand-in (path-style): the requests ``app.services.s3_client`` sends.
+
+  PUT    /{bucket}/{key}                          PutObject
+  POST   /{bucket}/{key}?uploads                  CreateMultipartUpload
+  PUT    /{bucket}/{key}?partNumber=N&uploadId=   UploadPart
+  POST   /{bucket}/{key}?uploadId=                CompleteMultipartUpload
+  DELETE /{bucket}/{key}?uploadId=                AbortMultipartUpload
+  DELETE /{bucket}/{key}                          DeleteObject
+  GET    /{bucket}/{key}                          GetObject
+  POST   /{bucket}/?delete                        DeleteObjects (Content-MD5 checked)
+  GET    /{bucket}/?list-type=2&prefix=           ListObjectsV2 (max-keys, continuation-token)
+
+Every request must carry a valid SigV4 signature for ACCESS_KEY / SECRET_KEY (403
+SignatureDoesNotMatch otherwise). ``fail_next(n, status, operation)`` fails the next n
+requests (of that operation only, if given), ``objects`` holds what was stored and
+``stats`` counts requests per operation and the peak number in flight. ``modified`` holds
+each object's LastModified (tests may backdate it).
+
+    python -m standins.s3 --port 8094 --latency-ms 20
+    S3_ENDPOINT_URL=http://127.0.0.1:8094  S3_BUCKET=wardrobe
+    S3_ACCESS_KEY_ID=standin  S3_SECRET_KEY=standin-secret
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import itertools
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Optional
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+from botocore.auth import S3SigV4Auth
+from botocore.awsrequest import AWSRequest
+from botocore.credentials import Credentials
+from fastapi import FastAPI, Request, Response
+
+app = FastAPI(title="S3 stand-in")
+
+ACCESS_KEY = "standin"
+SECRET_KEY = "standin-secret"
+LATENCY_S = 0.0
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+objects: dict[tuple[str, str], bytes] = {}
+modified: dict[tuple[str, str], datetime] = {}
+stats: Counter = Counter()
+_uploads: dict[str, dict[int, bytes]] = {}
+_failures: list[tuple[int, Optional[str]]] = []
+_ids = itertools.count(1)
+_in_flight = 0
+
+
+def reset() -> None:
+    global LATENCY_S, _in_flight
+    LATENCY_S = 0.0
+    _in_flight = 0
+    objects.clear()
+    modified.clear()
+    stats.clear()
+    _uploads.clear()
+    _failures.clear()
+
+
+def fail_next(n: int, status: int = 503, operation: Optional[str] = None) -> None:
+    _failures.extend([(status, operation)] * n)
+
+
+def _operation(method: str, key: str, params) -> str:
+    if not key:
+        return "delete_objects" if method == "POST" else "list_objects"
+    if "uploads" in params:
+        return "create_multipart_upload"
+    if "uploadId" in params:
+        return {"PUT": "upload_part", "DELETE": "abort_multipart_upload"}.get(method, "complete_multipart_upload")
+    return {"PUT": "put_object", "DELETE": "delete_object", "GET": "get_object"}[method]
+
+
+def _error(status: int, code: str, message: str = "") -> Response:
+    body = f"<?xml version='1.0' encoding='UTF-8'?><Error><Code>{code}</Code><Message>{message}</Message></Error>"
+    return Response(body, status_code=status, media_type="application/xml")
+
+
+def _xml(body: str) -> Response:
+    return Response(f"<?xml version='1.0' encoding='UTF-8'?>{body}", media_type="application/xml")
+
+
+def _signature_ok(request: Request, body: bytes) -> bool:
+    """Recompute the SigV4 signature of the request with the known secret."""
+    authorization = request.headers.get("authorization", "")
+    if not authorization.startswith("AWS4-HMAC-SHA256 "):
+        return False
+    fields = dict(part.strip().split("=", 1) for part in authorization[len("AWS4-HMAC-SHA256 "):].split(","))
+    access_key, _, region, service, _ = fields["Credential"].split("/")
+    if access_key != ACCESS_KEY:
+        return False
+    payload_hash = request.headers.get("x-amz-content-sha256", "")
+    if payload_hash != "UNSIGNED-PAYLOAD" and payload_hash != hashlib.sha256(body).hexdigest():
+        return False
+    signed = fields["SignedHeaders"].split(";")
+    url = f"{request.url.scheme}://{request.headers['host']}{request.scope['raw_path'].decode()}"
+    if request.url.query:
+        url += f"?{request.url.query}"
+    aws_request = AWSRequest(method=request.method, url=url, data=body,
+                             headers={name: request.headers[name] for name in signed if name != "host"})
+    aws_request.context["timestamp"] = request.headers.get("x-amz-date", "")
+    auth = S3SigV4Auth(Credentials(ACCESS_KEY, SECRET_KEY), service, region)
+    canonical = auth.canonical_request(aws_request)
+    expected = auth.signature(auth.string_to_sign(aws_request, canonical), aws_request)
+    return hmac.compare_digest(expected, fields["Signature"])
+
+
+def _list(bucket: str, params) -> Response:
+    keys = sorted(k for b, k in objects if b == bucket and k.startswith(params.get("prefix", "")))
+    start = params.get("continuation-token", "")
+    keys = [k for k in keys if k > start]
+    page = keys[:int(params.get("max-keys", 1000))]
+    truncated = len(page) < len(keys)
+    contents = "".join(
+        f"<Contents><Key>{escape(k)}</Key><Size>{len(objects[(bucket, k)])}</Size>"
+        f"<LastModified>{modified[(bucket, k)].strftime('%Y-%m-%dT%H:%M:%S.000Z')}</LastModified></Contents>"
+        for k in page
+    )
+    token = f"<NextContinuationToken>{escape(page[-1])}</NextContinuationToken>" if truncated else ""
+    return _xml(f"<ListBucketResult><Name>{bucket}</Name><KeyCount>{len(page)}</KeyCount>"
+                f"<IsTruncated>{'true' if truncated else 'false'}</IsTruncated>{token}{contents}</ListBucketResult>")
+
+
+@app.api_route("/{bucket}/{key:path}", methods=["GET", "PUT", "POST", "DELETE"])
+async def object_api(bucket: str, key: str, request: Request):
+    global _in_flight
+    body = await request.body()
+    if not _signature_ok(request, body):
+        stats["rejected"] += 1
+        return _error(403, "SignatureDoesNotMatch")
+    params = request.query_params
+    operation = _operation(request.method, key, params)
+    _in_flight += 1
+    stats["peak_in_flight"] = max(stats["peak_in_flight"], _in_flight)
+    try:
+        if LATENCY_S:
+            await asyncio.sleep(LATENCY_S)
+        for i, (status, only) in enumerate(_failures):
+            if only in (None, operation):
+                del _failures[i]
+                return _error(status, "SlowDown" if status == 503 else "InternalError")
+        stats[operation] += 1
+
+        if operation == "delete_objects":
+            if request.headers.get("content-md5") != base64.b64encode(hashlib.md5(body).digest()).decode():
+                return _error(400, "InvalidDigest")
+            keys = [node.text for node in ElementTree.fromstring(body).iter("Key")]
+            if len(keys) > 1000:
+                return _error(400, "MalformedXML", "More than 1000 keys")
+            for name in keys:
+                objects.pop((bucket, name), None)
+                modified.pop((bucket, name), None)
+            return _xml("<DeleteResult></DeleteResult>")  # quiet mode: errors only
+        if operation == "list_objects":
+            return _list(bucket, params)
+        if operation == "create_multipart_upload":
+            upload_id = f"upload-{next(_ids)}"
+            _uploads[upload_id] = {}
+            return _xml(f'<CreateMultipartUploadResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+                        f"<Bucket>{bucket}</Bucket><Key>{key}</Key>"
+                        f"<UploadId>{upload_id}</UploadId></CreateMultipartUploadResult>")
+        if "uploadId" in params:
+            parts = _uploads.get(params["uploadId"])
+            if parts is None:
+                return _error(404, "NoSuchUpload")
+            if operation == "upload_part":
+                parts[int(params["partNumber"])] = body
+                return Response(headers={"ETag": f'"{hashlib.md5(body).hexdigest()}"'})
+            if operation == "abort_multipart_upload":
+                del _uploads[params["uploadId"]]
+                return Response(status_code=204)
+            listed = [int(n.text) for n in ElementTree.fromstring(body).iter("PartNumber")]
+            if listed != sorted(parts) or any(len(parts[n]) < MIN_PART_SIZE for n in listed[:-1]):
+                return _error(400, "InvalidPart")
+            objects[(bucket, key)] = b"".join(parts[n] for n in listed)
+            modified[(bucket, key)] = datetime.now(timezone.utc)
+            del _uploads[params["uploadId"]]
+            return _xml(f"<CompleteMultipartUploadResult><Key>{key}</Key></CompleteMultipartUploadResult>")
+
+        if operation == "put_object":
+            objects[(bucket, key)] = body
+            modified[(bucket, key)] = datetime.now(timezone.utc)
+            return Response(headers={"ETag": f'"{hashlib.md5(body).hexdigest()}"'})
+        if operation == "delete_object":
+            objects.pop((bucket, key), None)
+            modified.pop((bucket, key), None)
+            return Response(status_code=204)
+        if (bucket, key) not in objects:
+            return _error(404, "NoSuchKey")
+        return Response(objects[(bucket, key)], media_type="application/octet-stream")
+    finally:
+        _in_flight -= 1
+
+
+def main() -> None:
+    global LATENCY_S
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8094)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    args = parser.parse_args()
+    LATENCY_S = args.latency_ms / 1000
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
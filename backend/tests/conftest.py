@@ -20,8 +20,9 @@ from sqlalchemy.orm import sessionmaker
 from sqlmodel import SQLModel
 
 from app.database import get_session
-from app.main import app
+from app.main import app, limiter
 from app.models import User, Morphology, ClothingItem
+from app.services import chat_answer_cache, listing_snapshot, price_estimator, weather_cache
 
 logger = logging.getLogger(__name__)
 
@@ -50,6 +51,11 @@ async def setup_db():
     """Create all tables before each test; drop after."""
     async with engine_test.begin() as conn:
         await conn.run_sync(SQLModel.metadata.create_all)
+    listing_snapshot.reset()
+    chat_answer_cache.reset()
+    price_estimator.reset()
+    weather_cache.reset()
+    limiter.reset()
     yield
     async with engine_test.begin() as conn:
         await conn.run_sync(SQLModel.metadata.drop_all)
@@ -0,0 +1,99 @@
+"""
+Tests for the near-duplicate chat answer cache:
+- near-duplicate question in the same profile bucket → hit
+- different question / different bucket → miss
+- a negated question ("que ne pas porter…") never gets the affirmative answer
+- first name templated per asker
+- TTL and capacity eviction, hit-rate metrics
+- /chat serves a cached answer to another user without calling Gemini
+"""
+from unittest.mock import AsyncMock, patch
+
+from httpx import AsyncClient
+
+from app.models import User
+from app.services import chat_answer_cache
+
+PROFILE = {"prenom": "Léa", "genre": "Femme", "age": 28, "morphologie": "SABLIER"}
+ANSWER = {"reply": "Léa, ose un jean brut et des mocassins.", "products": []}
+
+
+def test_near_duplicate_hit_and_miss():
+    cache = chat_answer_cache.ChatAnswerCache()
+    cache.store(PROFILE, "Que porter avec un blazer marine ?", ANSWER)
+
+    hit = cache.lookup({**PROFILE, "prenom": "Inès"}, "Avec quoi porter mon blazer marine ?")
+    assert hit is not None
+    assert hit["reply"] == "Inès, ose un jean brut et des mocassins."
+
+    assert cache.lookup(PROFILE, "Quelle robe pour un mariage en été ?") is None
+    older = {**PROFILE, "age": 52}
+    assert cache.lookup(older, "Que porter avec un blazer marine ?") is None
+
+    stats = cache.stats()
+    assert stats["lookups"] == 3
+    assert stats["hits"] == 1
+    assert stats["hit_rate"] == round(1 / 3, 3)
+
+
+def test_negated_question_misses():
+    cache = chat_answer_cache.ChatAnswerCache()
+    cache.store(PROFILE, "Que porter avec un jean noir ?", ANSWER)
+    cache.store(PROFILE, "Quelles chaussures porter avec un jean noir et une veste en cuir pour un mariage ?", ANSWER)
+
+    assert cache.lookup(PROFILE, "Que ne pas porter avec un jean noir ?") is None
+    assert cache.lookup(PROFILE, "Quelle couleur ne jamais porter avec un jean noir ?") is None
+    assert cache.lookup(
+        PROFILE, "Quelles chaussures ne pas porter avec un jean noir et une veste en cuir pour un mariage ?",
+    ) is None
+    assert cache.lookup(PROFILE, "Que porter avec mon jean noir ?") is not None
+    assert chat_answer_cache.normalize("Un look sans ceinture, ni sac") == ["look", "san", "ceinture", "ni", "sac"]
+
+
+def test_normalize():
+    assert chat_answer_cache.normalize("Quelles CHAUSSURES avec mes jeans ?") == ["chaussure", "jean"]
+    assert chat_answer_cache.normalize("Bonjour !") == []
+
+
+def test_ttl_and_capacity_eviction(monkeypatch):
+    cache = chat_answer_cache.ChatAnswerCache()
+    cache.store(PROFILE, "Que porter avec un blazer marine ?", ANSWER)
+    monkeypatch.setattr(chat_answer_cache, "CHAT_CACHE_TTL_S", -1)
+    assert cache.lookup(PROFILE, "Que porter avec un blazer marine ?") is None
+    assert len(cache) == 0
+
+    monkeypatch.setattr(chat_answer_cache, "CHAT_CACHE_TTL_S", 3600)
+    monkeypatch.setattr(chat_answer_cache, "CHAT_CACHE_MAX_ENTRIES", 2)
+    for question in ("jupe plissée bureau", "baskets blanches costume", "trench beige pluie"):
+        cache.store(PROFILE, question, ANSWER)
+    assert len(cache) == 2
+    assert cache.lookup(PROFILE, "jupe plissée bureau") is None
+    assert cache.lookup(PROFILE, "trench beige pluie") is not None
+    assert cache.stats()["evictions"] == 2
+
+
+async def test_chat_endpoint_serves_cached_answer(client: AsyncClient, make_user, session):
+    tokens = {}
+    for prenom in ("Paul", "Marc"):
+        created = await make_user(client, prenom=prenom, genre="Homme", age=30)
+        user = await session.get(User, created["user"]["id"])
+        user.is_premium = True
+        session.add(user)
+        tokens[prenom] = (user.id, {"Authorization": f"Bearer {created['token']}"})
+    await session.commit()
+
+    reply = {"reply": "Paul, un chino beige et une chemise blanche.", "products": []}
+    with patch("app.main.chat_with_stylist", new=AsyncMock(return_value=reply)) as mock_chat:
+        user_id, headers = tokens["Paul"]
+        first = await client.post(f"/chat/{user_id}", json={"message": "Que porter avec un blazer marine ?"}, headers=headers)
+        user_id, headers = tokens["Marc"]
+        second = await client.post(f"/chat/{user_id}", json={"message": "avec quoi porter un blazer marine"}, headers=headers)
+
+    assert first.status_code == 200 and second.status_code == 200
+    assert mock_chat.await_count == 1
+    assert second.json()["cached"] is True
+    assert second.json()["reply"] == "Marc, un chino beige et une chemise blanche."
+
+    resp = await client.get("/admin/ai/chat-cache", headers={"X-Admin-Key": "test-admin-key-1234567890"})
+    assert resp.status_code == 200
+    assert resp.json()["hits"] == 1
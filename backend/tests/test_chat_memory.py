@@ -0,0 +1,93 @@
+"""
+Tests for server-side chat memory:
+- clients send only the new message, history is rebuilt server-side
+- latest session reused, new_session starts a fresh one, foreign session → 404
+- older turns folded into the rolling summary in the background
+- conversation restore endpoint
+"""
+from unittest.mock import AsyncMock, patch
+
+from httpx import AsyncClient
+
+from app.models import ChatSession, User
+from app.services import chat_memory
+from tests.conftest import async_session_test
+
+FAKE_REPLY = {"reply": "Un blazer marine avec un jean brut.", "products": []}
+
+
+async def _premium_user(client, make_user, session, prenom: str) -> tuple[int, dict]:
+    created = await make_user(client, prenom=prenom)
+    user_id = created["user"]["id"]
+    user = await session.get(User, user_id)
+    user.is_premium = True
+    session.add(user)
+    await session.commit()
+    return user_id, {"Authorization": f"Bearer {created['token']}"}
+
+
+async def test_history_kept_server_side(client: AsyncClient, make_user, session):
+    user_id, headers = await _premium_user(client, make_user, session, "ChatMem")
+
+    with patch("app.main.chat_with_stylist", new=AsyncMock(return_value=FAKE_REPLY)) as mock_chat:
+        first = await client.post(f"/chat/{user_id}", json={"message": "Bonjour"}, headers=headers)
+        second = await client.post(f"/chat/{user_id}", json={"message": "Et pour ce soir ?"}, headers=headers)
+
+    assert first.status_code == 200, first.text
+    assert first.json()["session_id"] == second.json()["session_id"]
+    history = mock_chat.await_args_list[1].args[2]
+    assert [m["role"] for m in history] == ["user", "assistant"]
+    assert history[0]["content"] == "Bonjour"
+
+    resp = await client.get(f"/chat/{user_id}/sessions/{first.json()['session_id']}", headers=headers)
+    assert resp.status_code == 200
+    assert [m["content"] for m in resp.json()["messages"]] == [
+        "Bonjour", FAKE_REPLY["reply"], "Et pour ce soir ?", FAKE_REPLY["reply"],
+    ]
+
+
+async def test_new_session_and_foreign_session(client: AsyncClient, make_user, session):
+    user_id, headers = await _premium_user(client, make_user, session, "ChatNew")
+    other_id, other_headers = await _premium_user(client, make_user, session, "ChatOther")
+
+    with patch("app.main.chat_with_stylist", new=AsyncMock(return_value=FAKE_REPLY)):
+        first = await client.post(f"/chat/{user_id}", json={"message": "Salut"}, headers=headers)
+        fresh = await client.post(
+            f"/chat/{user_id}", json={"message": "Nouvelle question", "new_session": True}, headers=headers,
+        )
+        foreign = await client.post(
+            f"/chat/{other_id}",
+            json={"message": "Coucou", "session_id": first.json()["session_id"]},
+            headers=other_headers,
+        )
+
+    assert fresh.json()["session_id"] != first.json()["session_id"]
+    assert foreign.status_code == 404
+
+
+async def test_older_turns_folded_into_summary(client: AsyncClient, make_user, session, monkeypatch):
+    user_id, headers = await _premium_user(client, make_user, session, "ChatSummary")
+    monkeypatch.setattr(chat_memory, "CHAT_SUMMARY_DELAY_S", 0)
+    monkeypatch.setattr(chat_memory, "async_session", async_session_test)
+    summarize = AsyncMock(return_value="Aime le marine, budget 100€.")
+    monkeypatch.setattr(chat_memory, "summarize_conversation", summarize)
+
+    turns = (chat_memory.CHAT_RECENT_MESSAGES + chat_memory.CHAT_SUMMARY_BATCH) // 2 + 1
+    with patch("app.main.chat_with_stylist", new=AsyncMock(return_value=FAKE_REPLY)) as mock_chat:
+        for n in range(turns):
+            resp = await client.post(f"/chat/{user_id}", json={"message": f"Question {n}"}, headers=headers)
+            assert resp.status_code == 200
+        await chat_memory.wait_for_summaries()
+        await client.post(f"/chat/{user_id}", json={"message": "Et avec des baskets ?"}, headers=headers)
+
+    assert summarize.await_count == 1
+    folded = summarize.await_args.args[1]
+    assert len(folded) == turns * 2 - chat_memory.CHAT_RECENT_MESSAGES
+
+    chat = await session.get(ChatSession, resp.json()["session_id"])
+    await session.refresh(chat)
+    assert chat.summary == "Aime le marine, budget 100€."
+
+    last_call = mock_chat.await_args_list[-1]
+    assert last_call.kwargs["summary"] == chat.summary
+    assert len(last_call.args[2]) == chat_memory.CHAT_RECENT_MESSAGES
@@ -0,0 +1,105 @@
+"""
+Tests for the win-back / upgrade-reminder campaigns:
+- eligibility by last activity (win-back) and signup day + free tier (upgrade)
+- a user gets a campaign once per anchor; a new inactivity streak qualifies again
+- templates rendered once per locale, emails queued in the user's language
+"""
+from datetime import date, datetime, time, timedelta, timezone
+
+import pytest
+from sqlmodel import select
+
+from app.models import CampaignSend, EmailOutbox, Morphology, User
+from app.services import email_campaigns, email_outbox, email_service
+from tests.conftest import async_session_test
+
+TODAY = date(2026, 10, 19)
+
+
+@pytest.fixture(autouse=True)
+def campaigns(monkeypatch):
+    monkeypatch.setattr(email_campaigns, "async_session", async_session_test)
+    monkeypatch.setattr(email_outbox, "RESEND_API_KEY", "re_test")
+
+
+def _user(user_id: int, inactive_days=None, signup_days: int = 60, **kw) -> User:
+    last = TODAY - timedelta(days=inactive_days) if inactive_days is not None else None
+    signup = datetime.combine(TODAY - timedelta(days=signup_days), time(9), tzinfo=timezone.utc)
+    kw.setdefault("email", f"u{user_id}@test.com")
+    return User(id=user_id, prenom=f"U{user_id}", morphologie=Morphology.RECTANGLE,
+                streak_last_activity=last, created_at=signup, **kw)
+
+
+async def _queued(session) -> list[tuple[str, int]]:
+    rows = (await session.execute(select(EmailOutbox).order_by(EmailOutbox.template, EmailOutbox.user_id))).scalars()
+    return [(r.template, r.user_id) for r in rows]
+
+
+async def test_selects_eligible_users_once(session):
+    session.add_all([
+        _user(1, inactive_days=7),
+        _user(2, inactive_days=9, push_city="Lyon"),         # missed runs: still in the window
+        _user(3, inactive_days=10),                          # too late
+        _user(4, inactive_days=1),
+        _user(5, inactive_days=7, email=None),
+        _user(6, signup_days=14),                            # D+14, free
+        _user(7, signup_days=14, is_premium=True),
+        _user(8, signup_days=5),
+    ])
+    await session.commit()
+
+    assert await email_campaigns.run_campaigns(TODAY) == {"winback_day7": 2, "upgrade_reminder": 1}
+    assert await _queued(session) == [("upgrade_reminder", 6), ("winback_day7", 1), ("winback_day7", 2)]
+    lyon = (await session.execute(select(EmailOutbox).where(EmailOutbox.user_id == 2))).scalars().one()
+    assert "La météo à Lyon a changé" in lyon.html and lyon.subject.startswith("U2,")
+
+    # Same day or the next: already sent for this anchor
+    assert await email_campaigns.run_campaigns(TODAY) == {"winback_day7": 0, "upgrade_reminder": 0}
+    assert await email_campaigns.run_campaigns(TODAY + timedelta(days=1)) == {"winback_day7": 0, "upgrade_reminder": 0}
+
+    # User 1 came back, then went quiet again: a new win-back
+    user = await session.get(User, 1)
+    user.streak_last_activity = TODAY
+    session.add(user)
+    await session.commit()
+    later = TODAY + timedelta(days=7)
+    assert (await email_campaigns.run_campaigns(later))["winback_day7"] == 2  # user 1 again, and user 4
+    keys = (await session.execute(select(CampaignSend.dedupe_key).where(CampaignSend.user_id == 1))).scalars().all()
+    assert sorted(keys) == ["winback_day7:1:2026-10-12", "winback_day7:1:2026-10-19"]
+
+
+async def test_rendered_once_per_locale(session, monkeypatch):
+    monkeypatch.setattr(email_campaigns, "CAMPAIGN_CHUNK_SIZE", 2)
+    calls = []
+    original = email_service.TEMPLATES["upgrade_reminder"]
+
+    def counting(locale):
+        calls.append(locale)
+        return original(locale)
+
+    monkeypatch.setitem(email_service.TEMPLATES, "upgrade_reminder", counting)
+    email_service.render.cache_clear()
+    session.add_all([_user(i, signup_days=14, locale="en" if i % 2 else "fr") for i in range(1, 7)]
+                    + [_user(7, signup_days=14, locale="xx")])  # unknown locale: French
+    await session.commit()
+
+    try:
+        queued = await email_campaigns.run_campaign(email_campaigns.CAMPAIGNS[1], TODAY)
+    finally:
+        email_service.render.cache_clear()
+
+    assert queued == 7
+    assert sorted(calls) == ["en", "fr"]
+    rows = (await session.execute(select(EmailOutbox).order_by(EmailOutbox.user_id))).scalars().all()
+    assert [r.subject.split(",")[1].strip().split()[0] for r in rows] == [
+        "unlimited", "suggestions", "unlimited", "suggestions", "unlimited", "suggestions", "suggestions",
+    ]
+    assert '<html lang="en">' in rows[0].html and '<html lang="fr">' in rows[1].html
+
+
+async def test_nothing_queued_without_api_key(session, monkeypatch):
+    monkeypatch.setattr(email_outbox, "RESEND_API_KEY", None)
+    session.add(_user(1, inactive_days=7))
+    await session.commit()
+    assert await email_campaigns.run_campaigns(TODAY) == {}
+    assert await _queued(session) == []
@@ -0,0 +1,132 @@
+"""
+Tests for the email outbox, against the Resend stand-in:
+- creating a user queues the welcome email with it instead of sending inline
+- the dispatcher sends due emails in batches and records the provider ids
+- 429 / 5xx retry with backoff; an invalid address only fails its own email
+- per-template metrics; nothing is queued without RESEND_API_KEY
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from sqlmodel import select
+
+from app.models import EmailOutbox
+from app.services import email_outbox
+from app.services.email_service import queue_email
+from standins import resend
+from tests.conftest import async_session_test
+
+
+@pytest.fixture
+async def standin(monkeypatch):
+    resend.reset()
+    email_outbox.reset()
+    monkeypatch.setattr(email_outbox, "async_session", async_session_test)
+    monkeypatch.setattr(email_outbox, "RESEND_API_KEY", "re_test")
+    monkeypatch.setattr(email_outbox, "RESEND_API_URL", "http://resend.test")
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=resend.app))
+    monkeypatch.setattr(email_outbox, "_http", client)
+    monkeypatch.setattr(email_outbox, "_http_loop", asyncio.get_running_loop())
+    yield resend
+    await client.aclose()
+    resend.reset()
+
+
+async def _queue(session, *addresses: str, template: str = "upgrade_reminder") -> None:
+    for address in addresses:
+        queue_email(session, template, to=address, prenom=address.split("@")[0])
+    await session.commit()
+
+
+async def _rows(session) -> list[EmailOutbox]:
+    session.expire_all()
+    return list((await session.execute(select(EmailOutbox).order_by(EmailOutbox.id))).scalars().all())
+
+
+async def test_create_user_queues_welcome(client, make_user, session, standin):
+    await make_user(client, prenom="Alice", email="alice@test.com")
+
+    [row] = await _rows(session)
+    assert (row.template, row.recipient, row.status) == ("welcome", "alice@test.com", "pending")
+    assert "Bienvenue Alice" in row.subject and row.user_id is not None
+    assert standin.delivered == []  # nothing sent inline
+
+    report = await email_outbox.dispatch()
+    assert report["sent"] == 1
+    assert standin.delivered == [("alice@test.com", row.subject)]
+
+
+async def test_dispatch_sends_in_batches(session, standin, monkeypatch):
+    monkeypatch.setattr(email_outbox, "EMAIL_BATCH_SIZE", 2)
+    await _queue(session, *(f"user{i}@test.com" for i in range(5)))
+
+    report = await email_outbox.dispatch()
+
+    assert report == {"sent": 5, "retried": 0, "failed": 0, "batches": 3}
+    assert standin.stats["batch_requests"] == 3
+    rows = await _rows(session)
+    assert all(r.status == "sent" and r.provider_id.startswith("standin-") for r in rows)
+    assert await email_outbox.dispatch() == {"sent": 0, "retried": 0, "failed": 0, "batches": 0}
+
+    stats = await email_outbox.stats(session)
+    assert stats["outbox"] == {"upgrade_reminder": {"sent": 5}}
+    assert stats["templates"]["upgrade_reminder"]["sent"] == 5
+    assert stats["templates"]["upgrade_reminder"]["queued"] == 5
+
+
+async def test_transient_failure_retries_with_backoff(session, standin, monkeypatch):
+    monkeypatch.setattr(email_outbox, "EMAIL_RETRY_BASE_S", 60)
+    await _queue(session, "a@test.com", "b@test.com")
+    standin.fail_next(1, 503)
+
+    report = await email_outbox.dispatch()
+    assert report["retried"] == 2 and report["sent"] == 0
+    rows = await _rows(session)
+    assert all(r.status == "pending" and r.attempts == 1 and "503" in r.last_error for r in rows)
+    wait = email_outbox._aware(rows[0].next_attempt_at) - datetime.now(timezone.utc)
+    assert timedelta(seconds=50) < wait <= timedelta(seconds=60)
+
+    assert (await email_outbox.dispatch())["batches"] == 0  # not due yet
+
+    for row in rows:
+        row.next_attempt_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+        session.add(row)
+    await session.commit()
+    assert (await email_outbox.dispatch())["sent"] == 2
+    assert [r.attempts for r in await _rows(session)] == [2, 2]
+    assert email_outbox.retry_delay(2) == 120 and email_outbox.retry_delay(20) == email_outbox.EMAIL_RETRY_MAX_S
+
+
+async def test_invalid_address_fails_alone(session, standin, monkeypatch):
+    monkeypatch.setattr(email_outbox, "EMAIL_MAX_ATTEMPTS", 2)
+    await _queue(session, "ok1@test.com", "nobody@invalid.test", "ok2@test.com")
+
+    report = await email_outbox.dispatch()
+
+    assert report["sent"] == 2 and report["failed"] == 1
+    assert sorted(to for to, _ in standin.delivered) == ["ok1@test.com", "ok2@test.com"]
+    rows = await _rows(session)
+    assert [r.status for r in rows] == ["sent", "failed", "sent"]
+    assert "validation_error" in rows[1].last_error
+
+    # Retries stop after EMAIL_MAX_ATTEMPTS
+    await _queue(session, "late@test.com")
+    for _ in range(2):
+        standin.fail_next(1, 429)
+        await email_outbox.dispatch()
+        for row in await _rows(session):
+            row.next_attempt_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+            session.add(row)
+        await session.commit()
+    late = (await _rows(session))[-1]
+    assert (late.status, late.attempts) == ("failed", 2)
+    assert (await email_outbox.stats(session))["templates"]["upgrade_reminder"]["failed"] == 2
+
+
+async def test_disabled_without_api_key(session, monkeypatch):
+    monkeypatch.setattr(email_outbox, "RESEND_API_KEY", None)
+    assert queue_email(session, "welcome", to="x@test.com", prenom="X") is False
+    await session.commit()
+    assert await _rows(session) == []
@@ -0,0 +1,104 @@
+"""
+Tests for the async FCM HTTP v1 client, against the FCM stand-in:
+- one OAuth token minted and reused; a 401 refreshes it once for everyone
+- sends run concurrently up to the configured limit, results in order
+- dead / malformed tokens reported invalid, 503 retried, transport errors keep the token
+- send_push / send_push_batch go through it when FCM_TRANSPORT=http2
+"""
+import asyncio
+import json
+
+import httpx
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from app.services import push_service
+from app.services.fcm_client import FcmClient
+from app.services.push_service import PushMessage
+from standins import fcm
+
+
+@pytest.fixture(scope="module")
+def service_account() -> dict:
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                            serialization.NoEncryption()).decode()
+    return {
+        "type": "service_account", "project_id": "stylist-test", "private_key_id": "k1",
+        "private_key": pem, "client_email": "push@stylist-test.iam.gserviceaccount.com",
+        "token_uri": "http://fcm.test/token",
+    }
+
+
+@pytest.fixture
+def standin():
+    fcm.reset()
+    yield fcm
+    fcm.reset()
+
+
+def _client(service_account, concurrency=100) -> FcmClient:
+    return FcmClient(service_account, api_url="http://fcm.test", concurrency=concurrency,
+                     transport=httpx.ASGITransport(app=fcm.app))
+
+
+def _messages(n: int) -> list[PushMessage]:
+    return [PushMessage(f"tok-{i:03d}", "☀️ Look du jour", "Trench et jean", {"n": i}) for i in range(n)]
+
+
+async def test_concurrent_sends_share_one_token(service_account, standin):
+    standin.LATENCY_S = 0.02
+    client = _client(service_account, concurrency=10)
+    messages = _messages(60)
+    messages[5].fcm_token, messages[9].fcm_token = "tok-dead", "tok-bad"
+
+    results = await client.send_many(messages)
+    await client.aclose()
+
+    assert [r.fcm_token for r in results] == [m.fcm_token for m in messages]
+    assert sum(r.success for r in results) == 58
+    assert sorted(r.fcm_token for r in results if r.invalid_token) == ["tok-bad", "tok-dead"]
+    assert standin.stats["token_requests"] == 1
+    assert standin.stats["peak_in_flight"] == 10
+    assert client.stats["sent"] == 58 and client.stats["invalid_tokens"] == 2
+
+
+async def test_refresh_and_retry(service_account, standin):
+    client = _client(service_account, concurrency=20)
+    assert all(r.success for r in await client.send_many(_messages(5)))
+
+    standin.revoke_tokens()  # every in-flight 401 triggers one refresh between them
+    assert all(r.success for r in await client.send_many(_messages(20)))
+    assert standin.stats["token_requests"] == 2
+
+    standin.fail_next(3, 503)
+    results = await client.send_many(_messages(3))
+    assert all(r.success for r in results) and client.stats["retries"] == 3
+
+    standin.fail_next(6, 503)  # still failing after the retry: not an invalid token
+    results = await client.send_many(_messages(3))
+    assert not any(r.success or r.invalid_token for r in results)
+    await client.aclose()
+
+    def unreachable(request):
+        raise httpx.ConnectError("down")
+
+    broken = FcmClient(service_account, api_url="http://fcm.test", transport=httpx.MockTransport(unreachable))
+    (result,) = await broken.send_many(_messages(1))
+    assert not result.success and not result.invalid_token
+    await broken.aclose()
+
+
+async def test_push_service_uses_http2_client(service_account, standin, monkeypatch):
+    monkeypatch.setenv("FIREBASE_CREDENTIALS_JSON", json.dumps(service_account))
+    monkeypatch.setattr(push_service, "FCM_TRANSPORT", "http2")
+    monkeypatch.setattr(push_service, "_client", _client(service_account))
+    monkeypatch.setattr(push_service, "_client_loop", asyncio.get_running_loop())
+
+    assert await push_service.send_push("tok-1", "Titre", "Corps", {"type": "test"}) is True
+    assert await push_service.send_push("tok-dead", "Titre", "Corps") is False
+    results = await push_service.send_push_batch(_messages(30))
+    assert all(r.success for r in results)
+    assert standin.stats["sends"] == 32 and standin.stats["token_requests"] == 1
+    await push_service.close()
@@ -0,0 +1,50 @@
+"""
+Tests for the bundled offline gazetteer:
+- accent/case/punctuation-insensitive exact and whole-word prefix lookups
+- qualifiers dropped, ambiguity resolved towards French then larger cities
+- push cities resolve without the network; unknown cities geocoded once and stored
+"""
+from unittest.mock import patch
+
+from sqlmodel import select
+
+from app.models import GeocodeCache
+from app.services import gazetteer, weather_cache
+
+
+def test_lookup_normalizes_names():
+    assert gazetteer.city_key(" St-Étienne ") == "saint etienne"
+    for query in ("Saint-Étienne", "saint etienne", "ST ETIENNE", "Saint-Etienne (42)"):
+        assert gazetteer.lookup(query).name == "Saint-Étienne"
+    assert gazetteer.lookup("lodz").name == "Łódź"
+    assert gazetteer.lookup("Londres").country == "GB"
+    assert gazetteer.lookup("Lyon 3e").name == "Lyon"
+    assert gazetteer.lookup("Marseille 13008").name == "Marseille"
+    assert gazetteer.lookup("Nice, France").name == "Nice"
+
+
+def test_prefix_and_ambiguity():
+    assert gazetteer.lookup("Clermont").name == "Clermont-Ferrand"
+    assert gazetteer.lookup("aix").name == "Aix-en-Provence"        # French over Aix-la-Chapelle
+    assert gazetteer.lookup("Boulogne").name == "Boulogne-Billancourt"
+    assert gazetteer.lookup("Mons-en-Barœul").country == "FR"
+    assert gazetteer.lookup("Mons").country == "BE"
+    assert gazetteer.lookup("Saint") is None
+    assert gazetteer.lookup("Mont") is None                          # not a whole word of Montpellier
+    assert gazetteer.lookup("Trifouilly-les-Oies") is None
+    assert gazetteer.lookup("") is None
+
+
+async def test_resolve_city_offline_first(session):
+    async def geocode(city):
+        return (47.1, 2.2)
+
+    with patch("app.services.weather_cron._geocode_city", side_effect=geocode) as network:
+        assert await weather_cache.resolve_city(session, "Grenoble") == (45.1885, 5.7245)
+        assert await weather_cache.resolve_city(session, "Trifouilly-les-Oies") == (47.1, 2.2)
+        assert weather_cache.stats()["gazetteer_hits"] == 1
+        weather_cache.reset()  # new process: the stored row answers
+        assert await weather_cache.resolve_city(session, "trifouilly les oies") == (47.1, 2.2)
+    assert network.call_count == 1
+    rows = (await session.execute(select(GeocodeCache))).scalars().all()
+    assert [r.city_key for r in rows] == ["trifouilly les oies"]
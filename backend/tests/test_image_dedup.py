@@ -0,0 +1,195 @@
+"""
+Tests for content-addressed image storage (local disk backend):
+- the same picture uploaded twice is stored once, under its SHA-256
+- deleting an item only removes the file with its last reference (listings hold one too)
+- a listing only retains the seller's own item pictures, legacy paths included
+- paths stored before content addressing are still deleted directly
+- objects are only removed after the commit: a rolled-back release keeps the file, and a
+  refcount-0 tombstone keeps the row until the object is gone (a re-upload revives it)
+- account deletion (self and admin) releases all pictures in one batch
+- the orphan collector clears leftover tombstones and removes old files no row points at
+- bytes-saved report
+"""
+import hashlib
+import io
+import os
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlmodel import select
+
+from app.models import ClothingItem, StoredImage
+from app.services import storage_service
+from tests.conftest import async_session_test
+from tests.test_admin import VALID_ADMIN_KEY
+from tests.test_wardrobe import MOCK_AI_RESULT, _tiny_jpeg
+
+
+@pytest.fixture(autouse=True)
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage_service, "LOCAL_UPLOAD_DIR", str(tmp_path))
+    return tmp_path
+
+
+async def _upload(client, created, headers, content: bytes) -> dict:
+    files = {"file": ("photo.jpg", io.BytesIO(content), "image/jpeg")}
+    data = {"user_id": str(created["user"]["id"]), "category": "wardrobe"}
+    resp = await client.post("/wardrobe/upload", files=files, data=data, headers=headers)
+    assert resp.status_code == 200, resp.text
+    return resp.json()
+
+
+def _files(upload_dir) -> list[str]:
+    return sorted(path.name for path in upload_dir.rglob("*") if path.is_file())
+
+
+async def _refcounts(session) -> dict:
+    session.expire_all()
+    rows = (await session.execute(select(StoredImage))).scalars().all()
+    return {os.path.basename(r.path): r.refcount for r in rows}
+
+
+@patch("app.services.ai_service.analyze_clothing_image", new_callable=AsyncMock, return_value=MOCK_AI_RESULT)
+async def test_same_upload_stored_once(mock_ai, client, make_user, auth_headers, session, upload_dir):
+    alice = await make_user(client, prenom="Alice")
+    bob = await make_user(client, prenom="Bob")
+    jpeg = _tiny_jpeg()
+    first = await _upload(client, alice, auth_headers(alice["token"]), jpeg)
+    second = await _upload(client, bob, auth_headers(bob["token"]), jpeg)
+    other = await _upload(client, alice, auth_headers(alice["token"]), jpeg + b"\x00")
+
+    name = f"{hashlib.sha256(jpeg).hexdigest()}.jpg"
+    assert first["image_path"] == second["image_path"] and first["image_path"].endswith(name)
+    assert first["image_path"] == f"{upload_dir}/{name[:2]}/{name[2:4]}/{name}"  # sharded
+    assert _files(upload_dir) == sorted([name, os.path.basename(other["image_path"])])
+    assert (await _refcounts(session))[name] == 2
+
+    report = await storage_service.dedup_report(session)
+    assert report["objects"] == 2 and report["references"] == 3
+    assert report["bytes_saved"] == len(jpeg)
+
+    resp = await client.delete(f"/wardrobe/item/{first['id']}", headers=auth_headers(alice["token"]))
+    assert resp.status_code == 200
+    assert _files(upload_dir).count(name) == 1 and (await _refcounts(session))[name] == 1
+
+    resp = await client.delete(f"/wardrobe/item/{second['id']}", headers=auth_headers(bob["token"]))
+    assert resp.status_code == 200
+    assert name not in _files(upload_dir) and name not in await _refcounts(session)
+
+
+@patch("app.services.ai_service.analyze_clothing_image", new_callable=AsyncMock, return_value=MOCK_AI_RESULT)
+async def test_listing_keeps_item_picture(mock_ai, client, make_user, auth_headers, session, upload_dir):
+    seller = await make_user(client, prenom="Seller")
+    headers = auth_headers(seller["token"])
+    item = await _upload(client, seller, headers, _tiny_jpeg())
+
+    prefill = (await client.post(f"/shop/listings/from-wardrobe/{item['id']}", headers=headers)).json()
+    resp = await client.post("/shop/listings", json={
+        **prefill, "price_cents": 1500, "image_urls": prefill["image_urls"] + ["https://elsewhere.test/x.jpg"],
+    }, headers=headers)
+    assert resp.status_code == 200, resp.text
+
+    await client.delete(f"/wardrobe/item/{item['id']}", headers=headers)
+    assert os.path.exists(item["image_path"])  # the listing still shows it
+    assert list((await _refcounts(session)).values()) == [1]
+
+
+@patch("app.services.ai_service.analyze_clothing_image", new_callable=AsyncMock, return_value=MOCK_AI_RESULT)
+async def test_listing_retains_only_own_pictures(mock_ai, client, make_user, auth_headers, session, upload_dir):
+    seller = await make_user(client, prenom="Seller")
+    bob = await make_user(client, prenom="Bob")
+    headers = auth_headers(seller["token"])
+    legacy = upload_dir / "0b1c2d3e-uuid.jpg"
+    legacy.write_bytes(b"old")
+    item = ClothingItem(user_id=seller["user"]["id"], type="Jean", couleur="Bleu", saison="Été",
+                        image_path=str(legacy))
+    session.add(item)
+    await session.commit()
+    item_id = item.id
+    foreign = await _upload(client, bob, auth_headers(bob["token"]), _tiny_jpeg())
+
+    prefill = (await client.post(f"/shop/listings/from-wardrobe/{item_id}", headers=headers)).json()
+    resp = await client.post("/shop/listings", json={
+        **prefill, "price_cents": 1500, "image_urls": [str(legacy), foreign["image_path"], str(legacy)],
+    }, headers=headers)
+    assert resp.status_code == 200, resp.text
+    refcounts = await _refcounts(session)
+    assert refcounts == {legacy.name: 2, os.path.basename(foreign["image_path"]): 1}
+
+    await client.delete(f"/wardrobe/item/{item_id}", headers=headers)
+    assert legacy.exists() and (await _refcounts(session))[legacy.name] == 1  # the listing still shows it
+    await client.delete(f"/wardrobe/item/{foreign['id']}", headers=auth_headers(bob["token"]))
+    assert not os.path.exists(foreign["image_path"])  # the listing's URL did not pin Bob's picture
+
+
+async def test_legacy_path_deleted_directly(session, upload_dir):
+    legacy = upload_dir / "0b1c2d3e-uuid.jpg"
+    legacy.write_bytes(b"old")
+    released = await storage_service.delete_image(session, str(legacy))
+    await session.commit()
+    assert released == [str(legacy)] and legacy.exists()
+    assert await storage_service.remove_objects(session, released) == 1
+    assert not legacy.exists()
+
+
+async def test_rolled_back_release_keeps_file(session, upload_dir):
+    [path] = await storage_service.save_images(session, [(b"kept", ".png")])
+    await session.commit()
+    assert await storage_service.delete_image(session, path) == [path]
+    await session.rollback()
+    assert os.path.exists(path) and await _refcounts(session) == {os.path.basename(path): 1}
+
+    released = await storage_service.delete_image(session, path)
+    await session.commit()
+    assert await _refcounts(session) == {os.path.basename(path): 0}  # tombstone until removed
+    os.remove(path)  # as if remove_objects had got as far as the unlink
+    await storage_service.save_images(session, [(b"kept", ".png")])  # revives it: stored again
+    await session.commit()
+    assert await storage_service.remove_objects(session, released) == 0 and os.path.exists(path)
+    assert await _refcounts(session) == {os.path.basename(path): 1}
+
+    assert await storage_service.delete_image(session, path) == [path]
+    await session.commit()
+    assert await storage_service.remove_objects(session, [path]) == 1
+    assert not os.path.exists(path) and await _refcounts(session) == {}
+
+
+@patch("app.services.ai_service.analyze_clothing_image", new_callable=AsyncMock, return_value=MOCK_AI_RESULT)
+async def test_account_deletion_releases_pictures(mock_ai, client, make_user, auth_headers, session, upload_dir):
+    alice = await make_user(client, prenom="Alice")
+    bob = await make_user(client, prenom="Bob")
+    jpeg = _tiny_jpeg()
+    for n in range(3):
+        await _upload(client, alice, auth_headers(alice["token"]), jpeg + bytes([n]))
+    shared = await _upload(client, alice, auth_headers(alice["token"]), jpeg)
+    await _upload(client, bob, auth_headers(bob["token"]), jpeg)
+    await _upload(client, bob, auth_headers(bob["token"]), jpeg + b"bob")
+
+    resp = await client.delete(f"/users/{alice['user']['id']}", headers=auth_headers(alice["token"]))
+    assert resp.status_code == 200
+    assert len(_files(upload_dir)) == 2 and os.path.exists(shared["image_path"])  # Bob still uses it
+
+    resp = await client.delete(f"/admin/users/{bob['user']['id']}", headers={"X-Admin-Key": VALID_ADMIN_KEY})
+    assert resp.status_code == 200 and resp.json()["deleted_files"] == 2
+    assert _files(upload_dir) == [] and await _refcounts(session) == {}
+
+
+async def test_collect_orphans_local(session, upload_dir, monkeypatch, make_clothing_item):
+    monkeypatch.setattr(storage_service, "async_session", async_session_test)
+    [kept, left] = await storage_service.save_images(session, [(b"kept", ".png"), (b"left", ".png")])
+    await session.commit()
+    await storage_service.delete_image(session, left)
+    await session.commit()  # worker died before remove_objects: tombstone left behind
+    await make_clothing_item(session, user_id=1)  # legacy path: uploads/fake.jpg
+    for name in ("orphan.png", "fake.jpg", "fresh.png"):
+        (upload_dir / name).write_bytes(b"x")
+    old = time.time() - storage_service.ORPHAN_GRACE_S - 60
+    for path in (upload_dir / "orphan.png", upload_dir / "fake.jpg", kept):
+        os.utime(path, (old, old))
+
+    assert await storage_service.collect_orphans() == {
+        "tombstones": 1, "tombstones_deleted": 1, "scanned": 3, "orphans": 1, "deleted": 1,
+    }
+    assert _files(upload_dir) == sorted(["fake.jpg", "fresh.png", os.path.basename(kept)])
+    assert await _refcounts(session) == {os.path.basename(kept): 1}
@@ -0,0 +1,73 @@
+"""
+Tests for the in-memory active listings snapshot:
+- full load on first access
+- create / cancel through the API invalidates the snapshot
+- seller exclusion and in-memory filters
+"""
+import logging
+
+from httpx import AsyncClient
+
+from app.models import MarketplaceListing
+from app.services import listing_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+def _listing_payload(title: str = "Veste en jean", **overrides) -> dict:
+    payload = {
+        "title": title,
+        "price_cents": 2500,
+        "category_type": "Veste",
+        "color": "Bleu",
+        "season": "Mi-saison",
+    }
+    payload.update(overrides)
+    return payload
+
+
+async def test_snapshot_full_load(client: AsyncClient, make_user, session):
+    seller = await make_user(client, prenom="Seller")
+    seller_id = seller["user"]["id"]
+    session.add(MarketplaceListing(seller_id=seller_id, title="Pull", price_cents=1500))
+    session.add(MarketplaceListing(seller_id=seller_id, title="Jupe", price_cents=1200, status="sold"))
+    await session.commit()
+
+    listings = await listing_snapshot.get_active_listings(session)
+    assert [ls["title"] for ls in listings] == ["Pull"]
+
+
+async def test_snapshot_follows_create_and_cancel(client: AsyncClient, make_user, auth_headers, session):
+    seller = await make_user(client, prenom="Seller")
+    headers = auth_headers(seller["token"])
+
+    assert await listing_snapshot.get_active_listings(session) == []
+
+    resp = await client.post("/shop/listings", json=_listing_payload(), headers=headers)
+    assert resp.status_code == 200, resp.text
+    listing_id = resp.json()["id"]
+
+    listings = await listing_snapshot.get_active_listings(session)
+    assert [ls["id"] for ls in listings] == [listing_id]
+
+    resp = await client.delete(f"/shop/listings/{listing_id}", headers=headers)
+    assert resp.status_code == 200
+    assert await listing_snapshot.get_active_listings(session) == []
+
+
+async def test_snapshot_filters(client: AsyncClient, make_user, auth_headers, session):
+    seller_a = await make_user(client, prenom="SellerA")
+    seller_b = await make_user(client, prenom="SellerB")
+    for seller, title, season in ((seller_a, "Manteau", "Hiver"), (seller_b, "Short", "Ete")):
+        resp = await client.post(
+            "/shop/listings",
+            json=_listing_payload(title, season=season),
+            headers=auth_headers(seller["token"]),
+        )
+        assert resp.status_code == 200, resp.text
+
+    others = await listing_snapshot.get_active_listings(session, exclude_seller_id=seller_a["user"]["id"])
+    assert [ls["title"] for ls in others] == ["Short"]
+
+    winter = await listing_snapshot.get_active_listings(session, season="Hiver")
+    assert [ls["title"] for ls in winter] == ["Manteau"]
@@ -0,0 +1,221 @@
+"""
+Tests for the concurrent morning push pipeline:
+- users run through the stages concurrently, each stage capped at its limit
+- one geocode per city and one weather fetch per location (persistent city cache)
+- many locations per Open-Meteo request, over the pooled client (stand-in server)
+- a stage timeout degrades to the generic message instead of failing the user
+- messages sent FCM_BATCH_SIZE per batched call, per-token results
+- rejected tokens cleared in one pass, completion report
+- coordinates resolved and stored when the push city is set
+"""
+import asyncio
+import time
+from unittest.mock import patch
+
+from sqlmodel import select
+
+import httpx
+
+from app.models import GeocodeCache, Morphology, User
+from app.services import push_service, weather_cache, weather_cron
+from app.services.push_service import PushMessage, PushResult
+from standins import open_meteo
+from tests.conftest import async_session_test
+
+
+async def _push_users(session, n: int, cities: int = 1) -> list[User]:
+    users = [
+        User(prenom=f"Push{i}", morphologie=Morphology.RECTANGLE, push_notifications_enabled=True,
+             fcm_token=f"token-{i:04d}", push_city=f"Ville {i % cities}")
+        for i in range(n)
+    ]
+    session.add_all(users)
+    await session.commit()
+    return users
+
+
+class _Probe:
+    """Async stand-in that sleeps and records its peak concurrency."""
+
+    def __init__(self, delay: float, result=None):
+        self.delay, self.result = delay, result
+        self.active = self.peak = self.calls = 0
+
+    async def __call__(self, *args, **kwargs):
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            return self.result(*args, **kwargs) if callable(self.result) else self.result
+        finally:
+            self.active -= 1
+
+
+def _delivered(rejected: str = ""):
+    """send_push_batch stand-in: every message delivered except to ``rejected``."""
+    return lambda messages: [
+        PushResult(m.fcm_token, success=m.fcm_token != rejected, invalid_token=m.fcm_token == rejected)
+        for m in messages
+    ]
+
+
+async def test_pipeline_runs_concurrently_within_limits(session, monkeypatch):
+    await _push_users(session, 30, cities=15)
+    monkeypatch.setattr(weather_cron, "async_session", async_session_test)
+    monkeypatch.setattr(weather_cron, "PUSH_WEATHER_CONCURRENCY", 10)
+    monkeypatch.setattr(weather_cron, "PUSH_AI_CONCURRENCY", 5)
+    monkeypatch.setattr(weather_cron, "PUSH_SEND_CONCURRENCY", 10)
+    monkeypatch.setattr(weather_cron, "WEATHER_BULK_SIZE", 4)
+    monkeypatch.setattr(push_service, "FCM_BATCH_SIZE", 8)
+
+    weather = _Probe(0.05, lambda locations: [{"temperature": 12, "description": "couvert"}] * len(locations))
+    ai = _Probe(0.05, {"suggestions": [{"titre": "Trench et jean", "occasion": "Bureau"}]})
+    send = _Probe(0.05, _delivered("token-0007"))
+
+    started = time.monotonic()
+    geocode = _Probe(0.01, lambda city: (45 + int(city.split()[-1]), 4.83))
+    with patch("app.services.weather_cron._geocode_city", new=geocode), \
+         patch("app.services.weather_cron._fetch_weather_bulk", new=weather), \
+         patch("app.services.suggestion_precompute.suggestions_for_push", new=ai), \
+         patch("app.services.push_service.send_push_batch", new=send):
+        report = await weather_cron.run_morning_push()
+    elapsed = time.monotonic() - started
+
+    # 30 users × 3 stages × 50 ms = 4.5 s one by one; the AI stage (5 at a time) bounds it at ~0.3 s
+    assert elapsed < 1.5
+    assert ai.peak == 5
+    assert send.calls == 4 and report["push_batches"] == 4  # 30 messages, 8 per batch
+    assert geocode.calls == 15
+    assert weather.calls == 4 and weather.peak == 4  # 15 locations in chunks of 4, fetched together
+    assert report["users"] == 30 and report["locations"] == 15
+    assert report["sent"] == 29 and report["failed"] == 1
+    assert report["invalid_tokens"] == 1
+
+    session.expire_all()
+    cleared = (await session.execute(select(User).where(User.fcm_token == "token-0007"))).scalars().all()
+    assert cleared == []
+
+
+async def test_stage_timeout_falls_back(session, monkeypatch):
+    await _push_users(session, 3)
+    monkeypatch.setattr(weather_cron, "async_session", async_session_test)
+    monkeypatch.setattr(weather_cron, "PUSH_AI_TIMEOUT_S", 0.05)
+
+    sent = []
+
+    async def fake_send(messages):
+        sent.extend(m.title for m in messages)
+        return [PushResult(m.fcm_token, success=True) for m in messages]
+
+    with patch("app.services.weather_cron._geocode_city", new=_Probe(0, None)), \
+         patch("app.services.weather_cron._fetch_weather_bulk", new=_Probe(0, lambda locs: [None] * len(locs))), \
+         patch("app.services.suggestion_precompute.suggestions_for_push", new=_Probe(5, {})), \
+         patch("app.services.push_service.send_push_batch", new=fake_send):
+        report = await weather_cron.run_morning_push()
+
+    assert report["sent"] == 3
+    assert report["timeouts"]["ai"] == 3
+    assert report["ai_fallbacks"] == 3 and report["weather_fallbacks"] == 3
+    assert all(title.startswith("☀️ Bonjour") for title in sent)
+    assert report["duration_s"] < 1
+
+
+async def test_city_cache_persists_and_weather_shared(session, monkeypatch):
+    await _push_users(session, 4, cities=2)
+    monkeypatch.setattr(weather_cron, "async_session", async_session_test)
+    geocode = _Probe(0, lambda city: (48.85, 2.35) if city.endswith("0") else (45.76, 4.83))
+    weather = _Probe(0, lambda locations: [{"temperature": 10, "description": "couvert"}] * len(locations))
+    with patch("app.services.weather_cron._geocode_city", new=geocode), \
+         patch("app.services.weather_cron._fetch_weather_bulk", new=weather), \
+         patch("app.services.suggestion_precompute.suggestions_for_push", new=_Probe(0, {})), \
+         patch("app.services.push_service.send_push_batch", new=_Probe(0, _delivered())):
+        await weather_cron.run_morning_push()
+        weather_cache.reset()  # new process: memory gone, DB rows remain
+        await weather_cron.run_morning_push()
+
+    assert geocode.calls == 2
+    assert weather.calls == 2  # one bulk request per run (memory reset in between)
+    rows = (await session.execute(select(GeocodeCache))).scalars().all()
+    assert sorted(r.city_key for r in rows) == ["ville 0", "ville 1"]
+
+    # Concurrent callers for the same location share one request
+    weather_cache.reset()
+    slow = _Probe(0.05, {"temperature": 10, "description": "couvert"})
+    with patch("app.services.weather_cron._fetch_weather", new=slow):
+        results = await asyncio.gather(*(weather_cache.current_weather(48.8566, 2.3522) for _ in range(5)))
+    assert slow.calls == 1 and all(r == results[0] for r in results)
+
+
+async def test_send_push_batch_chunks_and_classifies(monkeypatch):
+    from firebase_admin import exceptions, messaging
+
+    calls = []
+
+    def send_each(batch):
+        calls.append(len(batch))
+        responses = []
+        for message in batch:
+            if message.token.endswith("dead"):
+                responses.append(messaging.SendResponse(None, messaging.UnregisteredError("gone")))
+            elif message.token.endswith("flaky"):
+                responses.append(messaging.SendResponse(None, exceptions.UnavailableError("503")))
+            else:
+                responses.append(messaging.SendResponse({"name": f"projects/p/messages/{message.token}"}, None))
+        return messaging.BatchResponse(responses)
+
+    monkeypatch.setattr(push_service, "_get_app", lambda: object())
+    monkeypatch.setattr(messaging, "send_each", send_each)
+    monkeypatch.setattr(push_service, "FCM_BATCH_SIZE", 5)
+    messages = [PushMessage(f"tok-{i}", "Titre", "Corps", {"n": i}) for i in range(12)]
+    messages[3].fcm_token, messages[7].fcm_token = "tok-dead", "tok-flaky"
+
+    results = await push_service.send_push_batch(messages)
+    assert sorted(calls) == [2, 5, 5]
+    assert [r.fcm_token for r in results] == [m.fcm_token for m in messages]
+    assert sum(r.success for r in results) == 10
+    assert [r.fcm_token for r in results if r.invalid_token] == ["tok-dead"]  # 503: keep the token
+
+    monkeypatch.setattr(push_service, "_get_app", lambda: None)
+    results = await push_service.send_push_batch(messages[:2])
+    assert not any(r.success or r.invalid_token for r in results)  # push disabled: clear nothing
+
+
+async def test_bulk_weather_against_standin(monkeypatch):
+    open_meteo.reset()
+    monkeypatch.setattr(weather_cron, "WEATHER_BULK_SIZE", 50)
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=open_meteo.app))
+    monkeypatch.setattr(weather_cron, "_http", client)
+    monkeypatch.setattr(weather_cron, "_http_loop", asyncio.get_running_loop())
+
+    locations = [(43 + i / 10, 2 + i / 10) for i in range(120)]
+    weathers = await weather_cron._fetch_weather_bulk(locations)
+    assert open_meteo.stats["forecast_requests"] == 3 and open_meteo.stats["locations"] == 120
+    assert all(w["temperature"] is not None and w["description"] for w in weathers)
+    # Same answer as asking for each location on its own
+    assert await weather_cron._fetch_weather(*locations[7]) == weathers[7]
+
+    # Cached per location: a second pass makes no request
+    await weather_cache.current_weather_many(locations[:50])
+    await weather_cache.current_weather_many(locations[:50])
+    assert open_meteo.stats["forecast_requests"] == 5
+
+    assert await weather_cron._geocode_city("Lyon") == await weather_cron._geocode_city("Lyon")
+    await weather_cron.close_http_client()
+    assert client.is_closed
+
+
+async def test_register_token_stores_coordinates(client, make_user, auth_headers, session):
+    created = await make_user(client, prenom="Coords")
+    user_id = created["user"]["id"]
+    with patch("app.services.weather_cron._geocode_city", new=_Probe(0, (43.3, 5.37))) as geocode:
+        for _ in range(2):
+            resp = await client.put(
+                f"/push/{user_id}/token",
+                json={"fcm_token": "tok-123456", "city": "Trifouilly-les-Oies"},
+                headers=auth_headers(created["token"]),
+            )
+            assert resp.status_code == 200
+    assert geocode.calls == 1
+    user = await session.get(User, user_id)
+    assert (user.push_lat, user.push_lon) == (43.3, 5.37)
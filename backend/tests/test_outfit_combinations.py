@@ -0,0 +1,101 @@
+"""
+Tests for the constraint-based outfit combination counter:
+- bitset count matches a brute-force enumeration
+- enumeration and sampling only yield valid outfits
+- analytics endpoint uses the new count
+"""
+import itertools
+import json
+import random
+
+from httpx import AsyncClient
+
+from app.services import outfit_combinations as oc
+from app.services.outfit_engine import colour_key, garment_slot, season_key
+
+
+def _wardrobe(size: int, seed: int) -> list[dict]:
+    rng = random.Random(seed)
+    types = ["T-shirt", "Chemise", "Pull", "Jean", "Jupe", "Robe", "Baskets", "Bottines", "Veste", "Manteau"]
+    colours = ["Noir", "Blanc", "Bleu", "Rouge", "Vert", "Orange", "Beige", "Multicolore"]
+    seasons = ["Toutes saisons", "Été", "Hiver", "Mi-saison"]
+    styles = ["Casual", "Business Casual", "Sportswear"]
+    return [
+        {
+            "id": i,
+            "type": rng.choice(types),
+            "couleur": rng.choice(colours),
+            "saison": rng.choice(seasons),
+            "tags_ia": json.dumps({"items": [{"style": rng.choice(styles)}]}),
+        }
+        for i in range(size)
+    ]
+
+
+def _key(item: dict) -> tuple:
+    return (garment_slot(item["type"]), colour_key(item["couleur"]), season_key(item["saison"]), oc.style_family(item))
+
+
+def _valid(outfit: list[dict]) -> bool:
+    return all(oc.compatible(_key(a), _key(b)) for a, b in itertools.combinations(outfit, 2))
+
+
+def _brute_force(items: list[dict]) -> int:
+    by_slot: dict[str, list[dict]] = {}
+    for it in items:
+        by_slot.setdefault(garment_slot(it["type"]), []).append(it)
+    cores = [[t, b] for t in by_slot.get("top", []) for b in by_slot.get("bottom", [])]
+    cores += [[d] for d in by_slot.get("dress", [])]
+    shoes = [[s] for s in by_slot.get("shoes", [])] or [[]]
+    outers = [[]] + [[o] for o in by_slot.get("outer", [])]
+    return sum(
+        1 for core, s, o in itertools.product(cores, shoes, outers) if _valid(core + s + o)
+    )
+
+
+def test_count_matches_brute_force():
+    for seed in range(5):
+        items = _wardrobe(30, seed)
+        assert oc.OutfitCombinations(items).count() == _brute_force(items)
+
+
+def test_count_without_shoes():
+    items = [it for it in _wardrobe(30, 7) if garment_slot(it["type"]) != "shoes"]
+    assert oc.count_outfits(items) == _brute_force(items)
+
+
+def test_enumeration_and_sampling_are_valid():
+    engine = oc.OutfitCombinations(_wardrobe(25, 3))
+    outfits = list(engine.iter_outfits())
+    assert len(outfits) == engine.count()
+    assert all(_valid(o) for o in outfits)
+    assert len(list(engine.iter_outfits(limit=5))) == min(5, len(outfits))
+
+    sampled = engine.sample(20, seed=1)
+    assert len(sampled) == 20
+    assert all(_valid(o) for o in sampled)
+
+
+def test_season_and_colour_constraints():
+    winter_top = {"id": 1, "type": "Pull", "couleur": "Noir", "saison": "Hiver", "tags_ia": ""}
+    summer_bottom = {"id": 2, "type": "Short", "couleur": "Beige", "saison": "Été", "tags_ia": ""}
+    orange_bottom = {"id": 3, "type": "Jupe", "couleur": "Orange", "saison": "Toutes saisons", "tags_ia": ""}
+    pink_top = {"id": 4, "type": "Chemise", "couleur": "Rose", "saison": "Toutes saisons", "tags_ia": ""}
+    assert oc.count_outfits([winter_top, summer_bottom]) == 0
+    assert oc.count_outfits([pink_top, orange_bottom]) == 0
+    assert oc.count_outfits([winter_top, orange_bottom]) == 1
+    assert oc.count_outfits([]) == 0
+
+
+async def test_analytics_outfit_count(client: AsyncClient, make_user, auth_headers, session, make_clothing_item):
+    created = await make_user(client, prenom="Combos")
+    user_id = created["user"]["id"]
+    headers = auth_headers(created["token"])
+    await make_clothing_item(session, user_id=user_id, type_="T-shirt", couleur="Noir")
+    await make_clothing_item(session, user_id=user_id, type_="Chemise", couleur="Blanc")
+    await make_clothing_item(session, user_id=user_id, type_="Jean", couleur="Bleu")
+    await make_clothing_item(session, user_id=user_id, type_="Baskets", couleur="Blanc")
+
+    resp = await client.get(f"/wardrobe/{user_id}/analytics", headers=headers)
+    assert resp.status_code == 200
+    assert resp.json()["estimated_outfit_count"] == 2
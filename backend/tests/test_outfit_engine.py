@@ -0,0 +1,114 @@
+"""
+Tests for the local rule-based outfit composer:
+- slot assignment and colour harmony tables
+- weather constraints (no shorts in the cold, no coat in the heat)
+- 3 diverse looks in the Gemini payload format
+- shortlist keeps every slot covered
+- preview endpoint (no quota)
+"""
+from httpx import AsyncClient
+
+from app.services import outfit_engine
+
+PROFILE = {"prenom": "Léa", "genre": "Femme", "age": 28, "morphologie": "SABLIER"}
+
+
+def _wardrobe() -> list[dict]:
+    rows = [
+        ("T-shirt col rond", "Blanc", "Toutes saisons"),
+        ("Chemise en lin", "Bleu Ciel", "Été"),
+        ("Pull en laine", "Bordeaux", "Hiver"),
+        ("Jean slim", "Bleu Nuit", "Toutes saisons"),
+        ("Short en jean", "Bleu", "Été"),
+        ("Pantalon chino", "Beige", "Mi-saison"),
+        ("Baskets", "Blanc", "Toutes saisons"),
+        ("Bottines en cuir", "Marron", "Hiver"),
+        ("Manteau long", "Camel", "Hiver"),
+    ]
+    return [
+        {"id": i, "type": t, "couleur": c, "saison": s, "tags_ia": ""}
+        for i, (t, c, s) in enumerate(rows, start=1)
+    ]
+
+
+def test_garment_slot():
+    assert outfit_engine.garment_slot("Veste en jean") == "outer"
+    assert outfit_engine.garment_slot("Jean slim") == "bottom"
+    assert outfit_engine.garment_slot("Chemise à carreaux") == "top"
+    assert outfit_engine.garment_slot("Robe d'été") == "dress"
+    assert outfit_engine.garment_slot("Bottines Chelsea") == "shoes"
+    assert outfit_engine.garment_slot("Écharpe") == "accessory"
+
+
+def test_colour_harmony():
+    assert outfit_engine.colour_key("Vert Sapin") == "sapin"
+    assert outfit_engine.colour_key("Bleu Nuit") == "bleu nuit"
+    # neutral + accent beats a clashing pair, complementary beats a clash
+    neutral = outfit_engine.colour_harmony("noir", "rouge")
+    complementary = outfit_engine.colour_harmony("bleu", "orange")
+    clash = outfit_engine.colour_harmony("rouge", "vert")
+    assert neutral > clash
+    assert complementary > clash
+
+
+def test_cold_weather_constraints():
+    result = outfit_engine.compose_outfits(PROFILE, {"temperature": 3, "description": "neige"}, _wardrobe())
+    assert result["source"] == "local"
+    assert len(result["suggestions"]) == 3
+    used = {p.get("item_id") for s in result["suggestions"] for p in s["pieces"]}
+    assert 5 not in used  # shorts
+    assert 9 in used  # coat
+
+
+def test_hot_weather_constraints():
+    result = outfit_engine.compose_outfits(PROFILE, {"temperature": 30, "description": "soleil"}, _wardrobe())
+    used = {p.get("item_id") for s in result["suggestions"] for p in s["pieces"]}
+    assert 9 not in used  # coat
+    assert 3 not in used  # winter jumper
+
+
+def test_looks_are_diverse():
+    result = outfit_engine.compose_outfits(PROFILE, {"temperature": 16, "description": "nuageux"}, _wardrobe())
+    looks = [
+        frozenset(p["item_id"] for p in s["pieces"] if p["source"] == "wardrobe")
+        for s in result["suggestions"]
+    ]
+    assert len(set(looks)) == len(looks) == 3
+    for sug in result["suggestions"]:
+        assert {"titre", "description", "pieces", "occasion"} <= sug.keys()
+
+
+def test_empty_wardrobe():
+    result = outfit_engine.compose_outfits(PROFILE, {"temperature": 16}, [])
+    assert result["suggestions"] == []
+    assert "Léa" in result["greeting"]
+
+
+def test_shortlist_covers_every_slot():
+    items = [
+        {"id": i, "type": "T-shirt", "couleur": "Noir", "saison": "Toutes saisons", "tags_ia": ""}
+        for i in range(100)
+    ] + _wardrobe()[3:]
+    shortlisted = outfit_engine.shortlist_items(items, {"temperature": 16}, limit=20)
+    assert len(shortlisted) == 20
+    slots = {outfit_engine.garment_slot(it["type"]) for it in shortlisted}
+    assert {"top", "bottom", "shoes", "outer"} <= slots
+
+
+async def test_preview_endpoint_no_quota(client: AsyncClient, make_user, auth_headers, session, make_clothing_item):
+    created = await make_user(client, prenom="Preview")
+    user_id = created["user"]["id"]
+    headers = auth_headers(created["token"])
+    await make_clothing_item(session, user_id=user_id, type_="T-shirt", couleur="Blanc")
+    await make_clothing_item(session, user_id=user_id, type_="Jean droit", couleur="Bleu")
+
+    for _ in range(3):
+        resp = await client.post(
+            f"/suggestions/{user_id}/preview",
+            json={"temperature": 20, "description": "soleil"},
+            headers=headers,
+        )
+        assert resp.status_code == 200
+    body = resp.json()
+    assert body["source"] == "local"
+    assert body["suggestions"]
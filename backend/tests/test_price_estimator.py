@@ -0,0 +1,164 @@
+"""
+Tests for the local resale price estimator:
+- exact brand × category × condition bucket when it has enough sales
+- hierarchical backoff with condition adjustment when it does not
+- /ai-price answers locally when confident, falls back to Gemini otherwise
+- bulk /ai-price: one multi-item Gemini call, one AIRequest with per-listing attribution
+- batch pricing: chunks priced concurrently off the event loop, "n" given as a string accepted
+"""
+import json
+import threading
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from httpx import AsyncClient
+from sqlmodel import select
+
+from app.models import AIRequest, MarketplaceListing
+from app.services import ai_pricing, price_estimator
+from app.services.ai_base import drain_pending_requests
+from app.services.price_estimator import PriceModel
+
+ROWS = (
+    [("Zara", "Jean slim", "Bon état", p) for p in (1500, 1600, 1800, 2000, 2200)]
+    + [("Levi's", "Jeans droit", "Très bon état", p) for p in (3000, 3200, 3500, 3600, 4000, 4200)]
+    + [("Mango", "Jean", "Très bon état", p) for p in (2000, 2400)]
+    + [("H&M", "T-shirt col rond", "Bon état", p) for p in (400, 500, 500, 600, 700)]
+)
+
+
+def test_exact_bucket():
+    model = PriceModel.from_rows(ROWS)
+    est = model.estimate("ZARA", "jean", "bon etat")
+    assert est["level"] == "brand_category_condition"
+    assert est["suggested"] == 18
+    assert (est["price_min"], est["price_max"]) == (16, 20)
+    assert est["sample_size"] == 5
+    assert est["confidence"] >= price_estimator.PRICE_MIN_CONFIDENCE
+
+
+def test_backoff_and_condition_adjustment():
+    model = PriceModel.from_rows(ROWS)
+
+    # Mango jeans: only 2 sales → category × condition (8 "très bon" jeans)
+    est = model.estimate("Mango", "Jean large", "Très bon état")
+    assert est["level"] == "category_condition"
+    assert est["sample_size"] == 8
+
+    # Unknown brand, unseen condition → category level, no adjustment for "neuf"
+    est = model.estimate("Sézane", "Jean", "Neuf avec étiquette")
+    assert est["level"] == "category"
+    assert est["sample_size"] == 13
+
+    # Nothing for this category → global, low confidence
+    est = model.estimate(None, "Manteau", "Bon état")
+    assert est["level"] == "global"
+    assert est["confidence"] < price_estimator.PRICE_MIN_CONFIDENCE
+
+    assert PriceModel.from_rows([]).estimate("Zara", "Jean", "Bon état") is None
+
+
+async def _listing(session, seller_id, **kw) -> MarketplaceListing:
+    listing = MarketplaceListing(seller_id=seller_id, title="Annonce", **kw)
+    session.add(listing)
+    await session.commit()
+    await session.refresh(listing)
+    return listing
+
+
+async def test_ai_price_local_first(client: AsyncClient, make_user, auth_headers, session):
+    created = await make_user(client, prenom="Vendeur")
+    seller_id = created["user"]["id"]
+    headers = auth_headers(created["token"])
+    for brand, category_type, condition, price in ROWS:
+        await _listing(session, seller_id, brand=brand, category_type=category_type,
+                       condition=condition, price_cents=price, status="sold")
+    jean = await _listing(session, seller_id, brand="Zara", category_type="Jean", condition="Bon état", price_cents=2500)
+    coat = await _listing(session, seller_id, brand="Zara", category_type="Manteau", condition="Bon état", price_cents=5000)
+
+    ai_result = {"price_min": 30, "price_max": 60, "suggested": 45, "reasoning": "IA"}
+    with patch("app.routers.shop.suggest_listing_price", new=AsyncMock(return_value=ai_result)) as mock_ai:
+        resp = await client.post(f"/shop/listings/{jean.id}/ai-price", headers=headers)
+        assert resp.status_code == 200
+        assert resp.json()["source"] == "local"
+        assert resp.json()["suggested"] == 18
+        mock_ai.assert_not_awaited()
+
+        resp = await client.post(f"/shop/listings/{coat.id}/ai-price", headers=headers)
+        assert resp.json()["source"] == "ai"
+        assert resp.json()["suggested"] == 45
+        assert mock_ai.await_args.kwargs["local_estimate"]["level"] == "brand"
+
+
+async def test_bulk_ai_price_batches_and_attributes(client: AsyncClient, make_user, auth_headers, session, monkeypatch):
+    created = await make_user(client, prenom="Revendeuse")
+    seller_id = created["user"]["id"]
+    headers = auth_headers(created["token"])
+    for brand, category_type, condition, price in ROWS:
+        await _listing(session, seller_id, brand=brand, category_type=category_type,
+                       condition=condition, price_cents=price, status="sold")
+    jean = await _listing(session, seller_id, brand="Zara", category_type="Jean", condition="Bon état", price_cents=2500)
+    others = [
+        await _listing(session, seller_id, brand=None, category_type=t, condition="Bon état", price_cents=3000)
+        for t in ("Manteau", "Robe", "Manteau long")
+    ]
+
+    response = MagicMock()
+    response.text = json.dumps([
+        {"n": n, "price_min": 20, "price_max": 40, "suggested": 30, "reasoning": "IA"} for n in (1, 2)
+    ])  # third item missing from the answer
+    response.usage_metadata.prompt_token_count = 300
+    response.usage_metadata.candidates_token_count = 90
+    response.prompt_feedback = None
+    fake_client = MagicMock()
+    fake_client.models.generate_content.return_value = response
+    monkeypatch.setattr("app.services.ai_base.client", fake_client)
+    monkeypatch.setattr("app.services.ai_pricing.PRICING_BATCH_SIZE", 20)
+
+    ids = [jean.id] + [o.id for o in others]
+    resp = await client.post("/shop/listings/ai-price", json={"listing_ids": ids}, headers=headers)
+    assert resp.status_code == 200
+    body = resp.json()
+    assert [r["listing_id"] for r in body["results"]] == ids
+    assert body["results"][0]["source"] == "local"
+    assert (body["local_count"], body["ai_count"]) == (1, 3)
+    assert fake_client.models.generate_content.call_count == 1
+    assert sorted(r["suggested"] for r in body["results"][1:]) == [10, 30, 30]  # default for the skipped one
+
+    logs = (await session.execute(select(AIRequest))).scalars().all()
+    assert len(logs) == 1
+    assert logs[0].request_type == "pricing_batch"
+    shares = json.loads(logs[0].attribution)
+    assert sorted(s["listing_id"] for s in shares) == sorted(o.id for o in others)
+    assert abs(sum(s["input_tokens"] for s in shares) - 300) <= 2
+
+    resp = await client.post("/shop/listings/ai-price", json={"listing_ids": [ids[0], 99999]}, headers=headers)
+    assert resp.status_code == 404
+
+
+async def test_batch_chunks_concurrent_and_string_indices(monkeypatch):
+    threads = []
+
+    def generate(model, contents, config):
+        threads.append(threading.current_thread().name)
+        response = MagicMock()
+        response.text = json.dumps([
+            {"n": "1", "price_min": 20, "price_max": 40, "suggested": 30, "reasoning": "IA"},
+            {"n": " 2 ", "price_min": 10, "price_max": 30, "suggested": 20, "reasoning": "IA"},
+            {"n": "deux", "price_min": 1, "price_max": 2, "suggested": 1, "reasoning": "unparsable index"},
+        ])
+        response.usage_metadata.prompt_token_count = 100
+        response.usage_metadata.candidates_token_count = 30
+        response.prompt_feedback = None
+        return response
+
+    fake_client = MagicMock()
+    fake_client.models.generate_content.side_effect = generate
+    monkeypatch.setattr("app.services.ai_base.client", fake_client)
+    monkeypatch.setattr(ai_pricing, "PRICING_BATCH_SIZE", 2)
+    items = [{"listing_id": n, "type": "Jean", "brand": f"B{n}", "condition": "Bon état"} for n in range(5)]
+
+    results = await ai_pricing.suggest_listing_prices(items)
+    drain_pending_requests()
+    assert fake_client.models.generate_content.call_count == 3
+    assert all(name != threading.main_thread().name for name in threads)
+    assert [results[n]["suggested"] for n in range(5)] == [30, 20, 30, 20, 30]
@@ -0,0 +1,230 @@
+"""
+Tests for push scheduling across workers and time zones:
+- the scheduler lease has one holder at a time, renews, expires and hands over
+- jobs wrapped with leader_only only run on the holder
+- each user is due at the push hour in their own time zone, offset within the window
+- a tick pushes due users once per local day, even when ticks overlap
+- ticks read users in chunks and a tick left unfinished resumes after its checkpoint
+- suggestions are precomputed, looked up and cached under each user's local push day
+"""
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+
+from sqlmodel import select
+
+from app.models import JobRun, Morphology, SuggestionCache, User
+from app.services import job_runs, scheduler_lease, suggestion_cache, suggestion_precompute, weather_cron
+from app.services.push_service import PushResult
+from tests.conftest import async_session_test
+
+# 19 Oct 2026, Paris is UTC+2, London UTC+1, Nouméa UTC+11
+AT_0540_UTC = datetime(2026, 10, 19, 5, 40, tzinfo=timezone.utc)
+AT_0640_UTC = datetime(2026, 10, 19, 6, 40, tzinfo=timezone.utc)
+
+
+async def test_lease_single_holder(monkeypatch):
+    monkeypatch.setattr(scheduler_lease, "async_session", async_session_test)
+
+    assert await scheduler_lease.acquire(holder="worker-a") is True
+    assert await scheduler_lease.acquire(holder="worker-b") is False
+    assert await scheduler_lease.acquire(holder="worker-a") is True   # renewal
+    assert await scheduler_lease.acquire(holder="worker-b") is False
+
+    await scheduler_lease.acquire(holder="worker-a", ttl_s=-1)        # worker-a stops renewing
+    assert await scheduler_lease.acquire(holder="worker-b") is True
+    assert await scheduler_lease.acquire(holder="worker-a") is False
+
+    await scheduler_lease.release(holder="worker-b")
+    assert await scheduler_lease.acquire(holder="worker-a") is True
+
+
+async def test_leader_only(monkeypatch):
+    monkeypatch.setattr(scheduler_lease, "async_session", async_session_test)
+    runs = []
+
+    async def job():
+        runs.append(1)
+        return "ran"
+
+    wrapped = scheduler_lease.leader_only(job)
+    await scheduler_lease.acquire(holder="another-instance")
+    assert await wrapped() is None and runs == []
+
+    await scheduler_lease.release(holder="another-instance")
+    assert await wrapped() == "ran" and runs == [1]
+
+
+def _user(user_id: int, **kw) -> User:
+    return User(id=user_id, prenom=f"U{user_id}", morphologie=Morphology.RECTANGLE,
+                push_notifications_enabled=True, fcm_token=f"token-{user_id}", **kw)
+
+
+def test_due_in_local_time(monkeypatch):
+    monkeypatch.setattr(weather_cron, "PUSH_WINDOW_MINUTES", 1)  # no offset
+    paris = _user(1, push_city="Paris", push_lat=48.8566, push_lon=2.3522)
+    london = _user(2, push_city="Londres")                       # no coordinates: gazetteer
+    noumea = _user(3, push_city="Nouméa", push_lat=-22.28, push_lon=166.46)
+    unknown = _user(4, push_city="Trifouilly-les-Oies")          # default zone (Paris)
+
+    assert weather_cron.timezone_for(london) == "Europe/London"
+    assert weather_cron.timezone_for(noumea) == "Pacific/Noumea"
+    assert [u.id for u in (paris, london, noumea, unknown) if weather_cron.is_due(u, AT_0540_UTC)] == [1, 4]
+    assert [u.id for u in (paris, london, noumea, unknown) if weather_cron.is_due(u, AT_0640_UTC)] == [1, 2, 4]
+
+    paris.last_morning_push = AT_0640_UTC.date()
+    assert not weather_cron.is_due(paris, AT_0640_UTC)
+
+
+def test_window_spreads_users(monkeypatch):
+    monkeypatch.setattr(weather_cron, "PUSH_WINDOW_MINUTES", 30)
+    offsets = [weather_cron._slot_offset(i) for i in range(1, 301)]
+    assert all(0 <= o < 30 for o in offsets)
+    assert len(set(offsets)) == 30
+    assert max(offsets.count(o) for o in set(offsets)) <= 20  # roughly even
+
+
+async def test_tick_pushes_due_users_once(session, monkeypatch):
+    monkeypatch.setattr(weather_cron, "async_session", async_session_test)
+    monkeypatch.setattr(weather_cron, "PUSH_WINDOW_MINUTES", 1)
+    session.add_all([
+        _user(1, push_city="Paris", push_lat=48.8566, push_lon=2.3522),
+        _user(2, push_city="Londres"),
+        _user(3, push_city="Lyon", push_lat=45.764, push_lon=4.8357),
+    ])
+    await session.commit()
+
+    sent = []
+
+    async def send_batch(messages):
+        sent.extend(m.fcm_token for m in messages)
+        return [PushResult(m.fcm_token, success=True) for m in messages]
+
+    async def suggestions(session, user, weather, day):
+        return {"suggestions": [{"titre": "Trench", "occasion": "Bureau"}]}
+
+    async def weather_bulk(locations):
+        return [{"temperature": 12, "description": "couvert"}] * len(locations)
+
+    with patch("app.services.weather_cron._fetch_weather_bulk", new=weather_bulk), \
+         patch("app.services.suggestion_precompute.suggestions_for_push", new=suggestions), \
+         patch("app.services.push_service.send_push_batch", new=send_batch):
+        first = await weather_cron.run_push_tick(AT_0540_UTC)
+        again = await weather_cron.run_push_tick(AT_0540_UTC)
+        later = await weather_cron.run_push_tick(AT_0640_UTC)
+
+    assert first["due"] == 2 and first["sent"] == 2
+    assert again == {"due": 0}
+    assert later["due"] == 1 and later["sent"] == 1
+    assert sorted(sent) == ["token-1", "token-2", "token-3"]
+
+    session.expire_all()
+    users = (await session.execute(select(User).order_by(User.id))).scalars().all()
+    assert [u.push_timezone for u in users] == ["Europe/Paris", "Europe/London", "Europe/Paris"]
+    assert all(u.last_morning_push == AT_0540_UTC.date() for u in users)
+
+    runs = (await session.execute(select(JobRun).order_by(JobRun.id))).scalars().all()
+    assert [(r.run_key, r.status, r.cursor) for r in runs] == [
+        ("morning_push:2026-10-19T05:40", "done", 3),
+        ("morning_push:2026-10-19T06:40", "done", 3),
+    ]
+
+
+def _tick_patches(sent: list, fail: str = ""):
+    async def send_batch(messages):
+        sent.extend(m.fcm_token for m in messages)
+        return [PushResult(m.fcm_token, success=m.fcm_token != fail) for m in messages]
+
+    async def suggestions(session, user, weather, day):
+        return {}
+
+    async def weather_bulk(locations):
+        return [{"temperature": 12, "description": "couvert"}] * len(locations)
+
+    return (
+        patch("app.services.weather_cron._fetch_weather_bulk", new=weather_bulk),
+        patch("app.services.suggestion_precompute.suggestions_for_push", new=suggestions),
+        patch("app.services.push_service.send_push_batch", new=send_batch),
+    )
+
+
+async def test_tick_streams_chunks_and_resumes(session, monkeypatch):
+    monkeypatch.setattr(weather_cron, "async_session", async_session_test)
+    monkeypatch.setattr(weather_cron, "PUSH_WINDOW_MINUTES", 1)
+    monkeypatch.setattr(weather_cron, "PUSH_CHUNK_SIZE", 2)
+    monkeypatch.setattr(job_runs, "_now", lambda: AT_0540_UTC)  # the tick runs on time
+    session.add_all([_user(i, push_city="Paris", push_lat=48.8566, push_lon=2.3522) for i in range(1, 6)])
+    # A worker died after checkpointing user 2 of the 05:35 tick
+    quiet = AT_0540_UTC - timedelta(seconds=job_runs.JOB_RUN_STALE_S + 60)
+    session.add(JobRun(job="morning_push", run_key="morning_push:2026-10-19T05:35", cursor=2,
+                       holder="dead-worker", started_at=quiet, heartbeat_at=quiet))
+    await session.commit()
+
+    sent = []
+    weather_patch, ai_patch, send_patch = _tick_patches(sent, fail="token-4")
+    with weather_patch, ai_patch, send_patch:
+        report = await weather_cron.run_push_tick(AT_0540_UTC)
+
+    assert report["due"] == 3 and report["sent"] == 2 and report["failed"] == 1
+    assert sorted(sent) == ["token-3", "token-4", "token-5"]  # picked up after the checkpoint
+
+    session.expire_all()
+    run = (await session.execute(select(JobRun))).scalars().one()
+    assert (run.status, run.cursor, run.holder) == ("done", 5, scheduler_lease.WORKER_ID)
+    users = (await session.execute(select(User).order_by(User.id))).scalars().all()
+    # Marked once FCM answered; the transient failure stays due for the next tick
+    assert [u.last_morning_push for u in users] == [None, None, AT_0540_UTC.date(), None, AT_0540_UTC.date()]
+
+
+async def test_tick_skips_while_another_worker_runs(session, monkeypatch):
+    monkeypatch.setattr(weather_cron, "async_session", async_session_test)
+    session.add(_user(1, push_city="Paris"))
+    now = datetime.now(timezone.utc)
+    session.add(JobRun(job="morning_push", run_key="morning_push:earlier", holder="busy-worker",
+                       started_at=now, heartbeat_at=now))
+    await session.commit()
+
+    sent = []
+    weather_patch, ai_patch, send_patch = _tick_patches(sent)
+    with weather_patch, ai_patch, send_patch:
+        assert await weather_cron.run_push_tick(AT_0540_UTC) == {"due": 0}
+    assert sent == []
+
+
+async def test_suggestions_keyed_on_local_push_day(session, monkeypatch):
+    monkeypatch.setattr(weather_cron, "async_session", async_session_test)
+    monkeypatch.setattr(weather_cron, "PUSH_WINDOW_MINUTES", 1)
+    paris = _user(1, push_city="Paris", push_lat=48.8566, push_lon=2.3522)
+    noumea = _user(2, push_city="Nouméa", push_lat=-22.28, push_lon=166.46)
+    at_0300_utc = datetime(2026, 10, 19, 3, 0, tzinfo=timezone.utc)  # 05:00 Paris, 14:00 Nouméa
+    assert suggestion_precompute.next_push_day(paris, at_0300_utc) == date(2026, 10, 19)
+    assert suggestion_precompute.next_push_day(noumea, at_0300_utc) == date(2026, 10, 20)
+
+    # Nouméa's 07:30 on the 20th is 20:30 UTC on the 19th: the row precomputed for the 20th is served
+    session.add(noumea)
+    await session.commit()
+    payload = {"suggestions": [{"titre": "Lin", "occasion": "Plage"}]}
+    await suggestion_cache.store(session, 2, date(2026, 10, 20), "25:soleil", noumea.wardrobe_version, payload,
+                                 source="precompute", forecast_temperature=26)
+    await session.commit()
+
+    sent = []
+
+    async def send_batch(messages):
+        sent.extend(messages)
+        return [PushResult(m.fcm_token, success=True) for m in messages]
+
+    async def weather_bulk(locations):
+        return [{"temperature": 25, "description": "ensoleillé"}] * len(locations)
+
+    generate = AsyncMock(return_value={"suggestions": []})
+    with patch("app.services.weather_cron._fetch_weather_bulk", new=weather_bulk), \
+         patch("app.services.ai_suggestions.get_daily_suggestions", new=generate), \
+         patch("app.services.push_service.send_push_batch", new=send_batch):
+        report = await weather_cron.run_push_tick(datetime(2026, 10, 19, 20, 35, tzinfo=timezone.utc))
+
+    assert report["due"] == 1 and report["sent"] == 1
+    generate.assert_not_awaited()
+    assert sent[0].body.startswith("Lin") and sent[0].data["date"] == "2026-10-20"
+    session.expire_all()
+    days = (await session.execute(select(SuggestionCache.day))).scalars().all()
+    assert days == [date(2026, 10, 20)]
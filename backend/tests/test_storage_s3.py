@@ -0,0 +1,164 @@
+"""
+Tests for the async S3 client and the storage service in S3 mode, against the S3 stand-in:
+- signed single PUT / DELETE, concurrent derivative uploads on one pooled client, each
+  distinct content uploaded once
+- large originals go multipart (parts in parallel, reassembled in order)
+- a failed part aborts the upload; 503 is retried once
+- deletes batched with DeleteObjects, listing paginated; the orphan collector only
+  deletes old objects nothing points at
+- latency / errors per operation
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from app.models import ClothingItem
+from app.services import s3_client, storage_service
+from app.services.s3_client import S3Client, S3Error
+from standins import s3
+from tests.conftest import async_session_test
+
+ENDPOINT = "http://s3.test"
+BUCKET = "wardrobe"
+MiB = 1024 * 1024
+
+
+def _client(secret: str = s3.SECRET_KEY) -> S3Client:
+    return S3Client(bucket=BUCKET, access_key=s3.ACCESS_KEY, secret_key=secret, endpoint_url=ENDPOINT,
+                    transport=httpx.ASGITransport(app=s3.app))
+
+
+@pytest.fixture
+async def standin():
+    s3.reset()
+    yield s3
+    s3.reset()
+
+
+@pytest.fixture
+async def storage(monkeypatch, standin):
+    client = _client()
+    monkeypatch.setattr(storage_service, "_USE_S3", True)
+    monkeypatch.setattr(storage_service, "_S3_BUCKET", BUCKET)
+    monkeypatch.setattr(storage_service, "_CDN_BASE", "https://cdn.test")
+    monkeypatch.setattr(storage_service, "_s3", client)
+    monkeypatch.setattr(storage_service, "_s3_loop", asyncio.get_running_loop())
+    yield storage_service
+    await client.aclose()
+
+
+async def test_put_and_delete_signed(standin):
+    client = _client()
+    await client.put_object("clothing/a b.png", b"png", content_type="image/png")
+    assert standin.objects[(BUCKET, "clothing/a b.png")] == b"png"
+    await client.delete_object("clothing/a b.png")
+    assert standin.objects == {}
+
+    with pytest.raises(S3Error) as exc:
+        await _client(secret="wrong").put_object("clothing/x.png", b"png")
+    assert exc.value.status == 403 and standin.stats["rejected"] == 1
+
+    stats = client.stats()
+    assert stats["put_object"]["count"] == 1 and stats["put_object"]["errors"] == 0
+    assert stats["delete_object"]["mean_ms"] is not None
+    await client.aclose()
+
+
+async def test_multipart_upload(standin, monkeypatch):
+    monkeypatch.setattr(s3_client, "S3_PART_CONCURRENCY", 2)
+    standin.LATENCY_S = 0.01
+    body = bytes(range(256)) * (12 * MiB // 256 + 7)  # > threshold: 3 parts, the last one short
+    client = _client()
+    await client.put_object("clothing/large.jpg", body, content_type="image/jpeg")
+
+    assert standin.objects[(BUCKET, "clothing/large.jpg")] == body
+    assert standin.stats["create_multipart_upload"] == 1 and standin.stats["upload_part"] == 3
+    assert standin.stats["peak_in_flight"] == 2
+    assert client.stats()["upload_part"]["count"] == 3
+    await client.aclose()
+
+
+async def test_failed_part_aborts_upload(standin):
+    client = _client()
+    standin.fail_next(1, status=503, operation="create_multipart_upload")  # retried once
+    await client.put_object("clothing/large.jpg", b"x" * (9 * MiB))
+    assert standin.stats["complete_multipart_upload"] == 1
+
+    standin.fail_next(4, status=500, operation="upload_part")  # both parts, retries included
+    with pytest.raises(S3Error) as exc:
+        await client.put_object("clothing/broken.jpg", b"x" * (9 * MiB))
+    assert exc.value.status == 500
+    assert standin.stats["abort_multipart_upload"] == 1 and standin._uploads == {}
+    assert (BUCKET, "clothing/broken.jpg") not in standin.objects
+    assert client.stats()["upload_part"]["errors"] >= 1
+    await asyncio.sleep(0.3)
+    assert standin.stats["upload_part"] == 2  # the other part was cancelled, not sent after the abort
+    await client.aclose()
+
+
+async def test_storage_service_s3_mode(storage, standin, session):
+    standin.LATENCY_S = 0.02
+    urls = await storage.save_images(session, [
+        (b"original", ".jpg"), (b"thumb", ".webp"), (b"cutout", ".png"), (b"original", ".jpg"),
+    ])
+    await session.commit()
+
+    assert all(url.startswith("https://cdn.test/clothing/") for url in urls)
+    assert [url.rsplit(".", 1)[1] for url in urls] == ["jpg", "webp", "png", "jpg"]
+    assert urls[0] == urls[3]  # same content, same key, uploaded once
+    assert standin.stats["put_object"] == 3 and standin.stats["peak_in_flight"] == 3  # concurrent
+    assert sorted(standin.objects.values()) == [b"cutout", b"original", b"thumb"]
+
+    assert await storage.delete_image(session, urls[0]) == []  # still referenced once
+    released = await storage.delete_images(session, [urls[0], urls[1]])
+    assert released == sorted([urls[0], urls[1]]) and len(standin.objects) == 3  # removed after the commit
+    await session.commit()
+    await storage.save_images(session, [(b"thumb", ".webp")])  # revives its tombstone: put again
+    await session.commit()
+    assert await storage.remove_objects(session, released) == 1
+    assert sorted(standin.objects.values()) == [b"cutout", b"thumb"] and standin.stats["put_object"] == 4
+    report = storage.stats()
+    assert report["backend"] == "s3" and report["operations"]["put_object"]["count"] == 4
+    assert report["operations"]["delete_objects"]["count"] == 1
+
+
+async def test_batched_delete_and_listing(standin, monkeypatch):
+    monkeypatch.setattr(s3_client, "S3_DELETE_BATCH", 2)
+    client = _client()
+    keys = [f"clothing/{n}&<{n}>.png" for n in range(5)]
+    await asyncio.gather(*(client.put_object(key, b"png") for key in keys))
+    await client.put_object("other/keep.png", b"png")
+
+    listed = [key async for key, _, size in client.list_objects("clothing/", page_size=2)]
+    assert listed == sorted(keys) and standin.stats["list_objects"] == 3
+
+    assert await client.delete_objects(keys) == []
+    assert standin.stats["delete_objects"] == 3  # 2 + 2 + 1 keys
+    assert list(standin.objects) == [(BUCKET, "other/keep.png")]
+    await client.aclose()
+
+
+async def test_collect_orphans_s3(storage, standin, session, monkeypatch):
+    monkeypatch.setattr(storage_service, "async_session", async_session_test)
+    [kept] = await storage.save_images(session, [(b"kept", ".png")])
+    await session.commit()
+    client = storage._s3_client()
+    await client.put_object("clothing/rolled-back.png", b"orphan")
+    await client.put_object("clothing/fresh.png", b"in flight")
+    await client.put_object("clothing/legacy-uuid.jpg", b"legacy")
+    session.add(ClothingItem(user_id=1, type="T-shirt", couleur="Noir", saison="Été",
+                             image_path="https://old-cdn.test/clothing/legacy-uuid.jpg"))
+    await session.commit()
+    old = datetime.now(timezone.utc) - timedelta(seconds=storage.ORPHAN_GRACE_S + 60)
+    for key in standin.modified:
+        if not key[1].endswith("fresh.png"):
+            standin.modified[key] = old
+
+    assert await storage.collect_orphans() == {
+        "tombstones": 0, "tombstones_deleted": 0, "scanned": 3, "orphans": 1, "deleted": 1,
+    }
+    assert sorted(k for _, k in standin.objects) == sorted([
+        "clothing/fresh.png", "clothing/legacy-uuid.jpg", storage._s3_key(kept),
+    ])
@@ -0,0 +1,224 @@
+"""
+Tests for the daily suggestion cache:
+- repeat view served from cache (no second generation, no quota hit)
+- wardrobe change bumps the version and invalidates the cache
+- different weather bucket → fresh generation
+- history endpoint lists past days
+- a key stored concurrently is updated, not duplicated
+- the precompute takes users earliest push slot first, a few at a time, and reports the late ones
+"""
+import asyncio
+import logging
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+
+from httpx import AsyncClient
+from sqlmodel import select
+
+from app.models import JobRun, SuggestionCache, User
+from app.services import suggestion_cache, weather_cron
+
+logger = logging.getLogger(__name__)
+
+WEATHER_PAYLOAD = {"temperature": 18.0, "description": "ensoleillé", "ville": "Paris"}
+FAKE_RESULT = {
+    "greeting": "Bonjour !",
+    "suggestions": [{"titre": "Look casual", "pieces": [], "occasion": "Journée"}],
+}
+
+
+def test_weather_bucket():
+    assert suggestion_cache.weather_bucket(18.4, "ensoleillé") == "15:soleil"
+    assert suggestion_cache.weather_bucket(19.9, "principalement dégagé") == "15:soleil"
+    assert suggestion_cache.weather_bucket(-2, "neige légère") == "-5:neige"
+    assert suggestion_cache.weather_bucket(12, "averses modérées") == "10:pluie"
+
+
+async def test_repeat_view_served_from_cache(client: AsyncClient, make_user, auth_headers):
+    created = await make_user(client, prenom="CacheUser")
+    user_id = created["user"]["id"]
+    headers = auth_headers(created["token"])
+
+    with patch("app.main.get_daily_suggestions", new=AsyncMock(return_value=FAKE_RESULT)) as mock_gen:
+        first = await client.post(f"/suggestions/{user_id}", json=WEATHER_PAYLOAD, headers=headers)
+        # Free user already consumed the daily quota — cached view is still allowed
+        second = await client.post(f"/suggestions/{user_id}", json=WEATHER_PAYLOAD, headers=headers)
+
+    assert first.status_code == 200
+    assert second.status_code == 200, second.text
+    assert second.json()["cached"] is True
+    assert second.json()["suggestions"] == FAKE_RESULT["suggestions"]
+    assert mock_gen.await_count == 1
+
+
+async def test_wardrobe_change_invalidates_cache(client: AsyncClient, make_user, auth_headers, session, make_clothing_item):
+    created = await make_user(client, prenom="CacheInval")
+    user_id = created["user"]["id"]
+    headers = auth_headers(created["token"])
+    item = await make_clothing_item(session, user_id=user_id)
+
+    with patch("app.main.get_daily_suggestions", new=AsyncMock(return_value=FAKE_RESULT)):
+        resp = await client.post(f"/suggestions/{user_id}", json=WEATHER_PAYLOAD, headers=headers)
+    assert resp.status_code == 200
+
+    resp = await client.put(
+        f"/wardrobe/item/{item.id}",
+        data={"type": "Chemise", "couleur": "Blanc", "saison": "Été"},
+        headers=headers,
+    )
+    assert resp.status_code == 200
+
+    # New wardrobe version → cache miss → free quota applies again
+    resp = await client.post(f"/suggestions/{user_id}", json=WEATHER_PAYLOAD, headers=headers)
+    assert resp.status_code == 429
+
+
+async def test_other_weather_bucket_regenerates(client: AsyncClient, make_user, auth_headers, session):
+    created = await make_user(client, prenom="CacheBucket")
+    user_id = created["user"]["id"]
+    headers = auth_headers(created["token"])
+
+    with patch("app.main.get_daily_suggestions", new=AsyncMock(return_value=FAKE_RESULT)):
+        await client.post(f"/suggestions/{user_id}", json=WEATHER_PAYLOAD, headers=headers)
+
+    rainy = {**WEATHER_PAYLOAD, "temperature": 8.0, "description": "pluie forte"}
+    resp = await client.post(f"/suggestions/{user_id}", json=rainy, headers=headers)
+    assert resp.status_code == 429
+
+
+async def test_suggestions_history(client: AsyncClient, make_user, auth_headers, session):
+    created = await make_user(client, prenom="History")
+    user_id = created["user"]["id"]
+    headers = auth_headers(created["token"])
+
+    today = weather_cron.local_date(await session.get(User, user_id))  # cache days are the user's own
+    yesterday = today - timedelta(days=1)
+    await suggestion_cache.store(session, user_id, yesterday, "10:pluie", 0, FAKE_RESULT)
+    await session.commit()
+
+    with patch("app.main.get_daily_suggestions", new=AsyncMock(return_value=FAKE_RESULT)):
+        await client.post(f"/suggestions/{user_id}", json=WEATHER_PAYLOAD, headers=headers)
+
+    resp = await client.get(f"/suggestions/{user_id}/history", headers=headers)
+    assert resp.status_code == 200
+    history = resp.json()["history"]
+    assert [h["date"] for h in history] == [today.isoformat(), yesterday.isoformat()]
+    assert history[0]["suggestions"] == FAKE_RESULT["suggestions"]
+
+
+# ---------------------------------------------------------------------------
+# Overnight precompute
+# ---------------------------------------------------------------------------
+async def _enable_push(session, user_id: int) -> None:
+    from app.models import User
+
+    user = await session.get(User, user_id)
+    user.push_notifications_enabled = True
+    user.fcm_token = "fake-token-123456"
+    user.push_city = "Lyon"
+    session.add(user)
+    await session.commit()
+
+
+async def test_precompute_served_when_forecast_holds(client: AsyncClient, make_user, auth_headers, session):
+    from tests.conftest import async_session_test
+
+    created = await make_user(client, prenom="Precompute")
+    user_id = created["user"]["id"]
+    headers = auth_headers(created["token"])
+    await _enable_push(session, user_id)
+
+    forecast = {"temperature": 14.0, "description": "ensoleillé"}
+    with patch("app.services.suggestion_precompute.async_session", async_session_test), \
+         patch("app.services.suggestion_precompute.next_push_day", new=lambda user, now: weather_cron.local_date(user)), \
+         patch("app.services.suggestion_precompute.PRECOMPUTE_PAUSE_S", 0), \
+         patch("app.services.weather_cron._geocode_city", new=AsyncMock(return_value=(45.76, 4.83))), \
+         patch("app.services.weather_cron._fetch_forecast_at", new=AsyncMock(return_value=forecast)), \
+         patch("app.services.ai_suggestions.get_daily_suggestions", new=AsyncMock(return_value=FAKE_RESULT)):
+        from app.services.suggestion_precompute import run_suggestion_precompute
+        report = await run_suggestion_precompute()
+    assert report["stored"] == 1
+
+    # 16°C is a different 5°C bucket than the 14°C forecast, but within the drift threshold
+    actual = {"temperature": 16.0, "description": "principalement dégagé", "ville": "Lyon"}
+    with patch("app.main.get_daily_suggestions", new=AsyncMock(return_value=FAKE_RESULT)) as mock_gen:
+        resp = await client.post(f"/suggestions/{user_id}", json=actual, headers=headers)
+    assert resp.status_code == 200
+    assert resp.json()["cached"] is True
+    mock_gen.assert_not_awaited()
+
+    # Rain instead of sun → forecast diverged → regenerated
+    rainy = {"temperature": 14.0, "description": "pluie forte", "ville": "Lyon"}
+    with patch("app.main.get_daily_suggestions", new=AsyncMock(return_value=FAKE_RESULT)) as mock_gen:
+        resp = await client.post(f"/suggestions/{user_id}", json=rainy, headers=headers)
+    assert resp.status_code == 200
+    mock_gen.assert_awaited_once()
+
+
+async def test_precompute_in_push_slot_order(session, monkeypatch, caplog):
+    from app.models import Morphology
+    from app.services import job_runs, suggestion_precompute
+    from tests.conftest import async_session_test
+
+    zones = ["America/Montreal", "Europe/London", "Europe/Paris", "Pacific/Noumea"]
+    session.add_all([
+        User(id=n, prenom=f"U{n}", morphologie=Morphology.RECTANGLE, push_notifications_enabled=True,
+             fcm_token=f"token-{n}", push_timezone=tz)
+        for n, tz in enumerate(zones, 1)
+    ])
+    await session.commit()
+    started = datetime(2026, 10, 19, 20, 0, tzinfo=timezone.utc)  # before Nouméa's 07:30 (20:30 UTC)
+    monkeypatch.setattr(job_runs, "_now", lambda: started)
+    monkeypatch.setattr(suggestion_precompute, "_now", lambda: started + timedelta(hours=1))
+    monkeypatch.setattr(suggestion_precompute, "async_session", async_session_test)
+    monkeypatch.setattr(suggestion_precompute, "PRECOMPUTE_PAUSE_S", 0)
+    monkeypatch.setattr(suggestion_precompute, "PRECOMPUTE_CONCURRENCY", 2)
+    monkeypatch.setattr(suggestion_precompute, "PRECOMPUTE_CHUNK_SIZE", 3)
+    monkeypatch.setattr(weather_cron, "PUSH_WINDOW_MINUTES", 1)
+
+    calls, active, peak = [], [0], [0]
+
+    async def precompute(session, user, day):
+        calls.append((user.id, day))
+        active[0] += 1
+        peak[0] = max(peak[0], active[0])
+        await asyncio.sleep(0.01)
+        active[0] -= 1
+        return "stored"
+
+    monkeypatch.setattr(suggestion_precompute, "_precompute_for_user", precompute)
+    with caplog.at_level(logging.WARNING, logger="app.services.suggestion_precompute"):
+        report = await suggestion_precompute.run_suggestion_precompute()
+
+    assert [user_id for user_id, _ in calls] == [4, 3, 2, 1]  # Nouméa, Paris, London, Montréal
+    assert {day for _, day in calls} == {date(2026, 10, 20)}
+    assert peak[0] == 2
+    assert report["stored"] == 4 and report["late"] == 1  # Nouméa's slot passed before it was done
+    assert "after the push slot of 1 users" in caplog.text
+    run = (await session.execute(select(JobRun))).scalars().one()
+    assert (run.status, run.cursor) == ("done", 4)
+
+
+async def test_concurrent_store_updates_the_same_row(session, make_user, client: AsyncClient, monkeypatch):
+    created = await make_user(client, prenom="Race")
+    user_id, today = created["user"]["id"], date.today()
+    await suggestion_cache.store(session, user_id, today, "15:soleil", 1, {"n": 1}, source="precompute")
+    await session.commit()
+
+    # The other writer's row appears between our lookup and our insert
+    real_load = suggestion_cache._load
+    calls = []
+
+    async def late_load(*args):
+        calls.append(args)
+        return None if len(calls) == 1 else await real_load(*args)
+
+    monkeypatch.setattr(suggestion_cache, "_load", late_load)
+    await suggestion_cache.store(session, user_id, today, "15:soleil", 2, {"n": 2})
+    await session.commit()
+    assert len(calls) == 2  # insert hit the unique index, the row was reloaded and updated
+
+    session.expire_all()
+    rows = (await session.execute(select(SuggestionCache).where(SuggestionCache.user_id == user_id))).scalars().all()
+    assert len(rows) == 1 and rows[0].wardrobe_version == 2 and rows[0].source == "live"
+    assert await suggestion_cache.get_cached(session, user_id, today, "15:soleil", 2) == {"n": 2}
@@ -0,0 +1,91 @@
+"""
+Tests for the sharded local upload layout:
+- images land in uploads/ab/cd/, written on the storage threads via temp file + rename
+- STORAGE_FSYNC=dir fsyncs the file and its directory; a failed write leaves no temp file
+- shard_flat_uploads moves flat files and rewrites items, stored images and listings; re-runnable
+"""
+import json
+import os
+import stat
+import threading
+
+import pytest
+from sqlmodel import select
+
+from app.models import ClothingItem, MarketplaceListing, StoredImage
+from app.services import storage_service
+from tests.conftest import async_session_test
+
+UUID_NAME = "3f66596f-5a90-4924-8340-b9df922f3f7e.jpg"
+SHA_NAME = "a9d8392d7501f381277d83b3d12e08b323c9fb163c79ab57f7308d2ed19891db.png"
+
+
+@pytest.fixture(autouse=True)
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage_service, "LOCAL_UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(storage_service, "async_session", async_session_test)
+    return tmp_path
+
+
+async def test_sharded_atomic_write(session, upload_dir, monkeypatch):
+    monkeypatch.setattr(storage_service, "STORAGE_FSYNC", "dir")
+    synced, threads = [], []
+    real_fsync, real_save = os.fsync, storage_service._save_to_disk
+    monkeypatch.setattr(os, "fsync", lambda fd: synced.append(stat.S_ISDIR(os.fstat(fd).st_mode)) or real_fsync(fd))
+
+    def recording_save(content, path):
+        threads.append(threading.current_thread().name)
+        real_save(content, path)
+
+    monkeypatch.setattr(storage_service, "_save_to_disk", recording_save)
+    path = await storage_service.save_image(session, b"image", ".png")
+
+    digest = os.path.basename(path)
+    assert path == f"{upload_dir}/{digest[:2]}/{digest[2:4]}/{digest}"
+    assert open(path, "rb").read() == b"image" and stat.S_IMODE(os.stat(path).st_mode) == 0o644
+    assert os.listdir(os.path.dirname(path)) == [digest]  # no temp file left
+    assert synced == [False, True]  # the file, then its directory
+    assert threads[0].startswith("storage-disk")
+
+
+async def test_failed_write_leaves_no_temp_file(session, upload_dir, monkeypatch):
+    def failing_replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", failing_replace)
+    with pytest.raises(OSError):
+        await storage_service.save_image(session, b"image", ".png")
+    assert [p for p in upload_dir.rglob("*") if p.is_file()] == []
+
+
+async def test_shard_flat_uploads(session, upload_dir):
+    for name in (UUID_NAME, SHA_NAME, "fake.jpg", "unreferenced.jpg"):
+        (upload_dir / name).write_bytes(name.encode())
+    flat = lambda name: f"{upload_dir}/{name}"  # noqa: E731
+    session.add_all([
+        ClothingItem(user_id=1, type="T-shirt", couleur="Noir", saison="Été", image_path=flat(UUID_NAME)),
+        ClothingItem(user_id=1, type="Jean", couleur="Bleu", saison="Été", image_path=flat(SHA_NAME)),
+        ClothingItem(user_id=2, type="Pull", couleur="Gris", saison="Hiver", image_path=flat("fake.jpg")),
+        ClothingItem(user_id=2, type="Veste", couleur="Noir", saison="Hiver", image_path="https://cdn.test/x.jpg"),
+        StoredImage(path=flat(SHA_NAME), size_bytes=len(SHA_NAME), refcount=2),
+        MarketplaceListing(seller_id=1, title="Jean", price_cents=1500, condition="Bon état",
+                           image_urls=json.dumps([flat(SHA_NAME), "https://elsewhere.test/y.jpg"])),
+    ])
+    await session.commit()
+
+    report = await storage_service.shard_flat_uploads(batch_size=2)
+    assert report == {"files_moved": 4, "items": 3, "stored_images": 1, "listings": 1}
+
+    session.expire_all()
+    paths = (await session.execute(select(ClothingItem.image_path).order_by(ClothingItem.id))).scalars().all()
+    assert paths == [
+        f"{upload_dir}/3f/66/{UUID_NAME}", f"{upload_dir}/a9/d8/{SHA_NAME}",
+        storage_service._local_path("fake.jpg"), "https://cdn.test/x.jpg",
+    ]
+    assert all(open(p, "rb").read() == os.path.basename(p).encode() for p in paths[:3])
+    assert (await session.execute(select(StoredImage.path))).scalar_one() == paths[1]
+    listing = (await session.execute(select(MarketplaceListing))).scalar_one()
+    assert json.loads(listing.image_urls) == [paths[1], "https://elsewhere.test/y.jpg"]
+    assert not any(p.is_file() for p in upload_dir.iterdir())
+
+    assert await storage_service.shard_flat_uploads() == {"files_moved": 0, "items": 0, "stored_images": 0, "listings": 0}
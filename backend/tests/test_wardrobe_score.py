@@ -0,0 +1,81 @@
+"""
+Tests for the persisted wardrobe score:
+- repeat view served from storage (single Gemini call)
+- wardrobe edit changes the content hash → recomputed
+- debounced background refresh after edits (only for users with a stored score)
+"""
+from unittest.mock import AsyncMock, patch
+
+from httpx import AsyncClient
+from sqlmodel import select
+
+from app.models import WardrobeScore
+from app.services import wardrobe_score
+from tests.conftest import async_session_test
+
+FAKE_SCORE = {"score": 3.8, "style_dna": "Urban Casual", "forces": [], "axes_amelioration": [],
+              "capsule_manquante": [], "top_combos": []}
+
+
+async def _user_with_items(client, make_user, auth_headers, session, make_clothing_item, prenom):
+    created = await make_user(client, prenom=prenom)
+    user_id = created["user"]["id"]
+    items = [
+        await make_clothing_item(session, user_id=user_id, type_=t, couleur=c)
+        for t, c in (("T-shirt", "Blanc"), ("Jean", "Bleu"), ("Baskets", "Blanc"))
+    ]
+    return user_id, auth_headers(created["token"]), items
+
+
+async def test_repeat_view_served_from_storage(client: AsyncClient, make_user, auth_headers, session, make_clothing_item):
+    user_id, headers, items = await _user_with_items(client, make_user, auth_headers, session, make_clothing_item, "Score1")
+
+    with patch("app.services.ai_service.score_wardrobe", new=AsyncMock(return_value=FAKE_SCORE)) as mock_score:
+        first = await client.get(f"/wardrobe/{user_id}/score", headers=headers)
+        second = await client.get(f"/wardrobe/{user_id}/score", headers=headers)
+
+    assert first.status_code == 200
+    assert second.json()["cached"] is True
+    assert second.json()["score"] == 3.8
+    assert mock_score.await_count == 1
+
+
+async def test_fallback_report_not_stored(client: AsyncClient, make_user, auth_headers, session, make_clothing_item):
+    user_id, headers, _ = await _user_with_items(client, make_user, auth_headers, session, make_clothing_item, "Score2")
+
+    with patch("app.services.ai_service.score_wardrobe", new=AsyncMock(return_value={"score": None})) as mock_score:
+        await client.get(f"/wardrobe/{user_id}/score", headers=headers)
+        await client.get(f"/wardrobe/{user_id}/score", headers=headers)
+    assert mock_score.await_count == 2
+
+
+async def test_edit_triggers_debounced_refresh(
+    client: AsyncClient, make_user, auth_headers, session, make_clothing_item, monkeypatch,
+):
+    user_id, headers, items = await _user_with_items(client, make_user, auth_headers, session, make_clothing_item, "Score3")
+    monkeypatch.setattr(wardrobe_score, "WARDROBE_SCORE_DEBOUNCE_S", 0.05)
+    monkeypatch.setattr(wardrobe_score, "async_session", async_session_test)
+
+    with patch("app.services.ai_service.score_wardrobe", new=AsyncMock(return_value=FAKE_SCORE)) as mock_score:
+        await client.get(f"/wardrobe/{user_id}/score", headers=headers)
+        old_hash = (await session.execute(select(WardrobeScore.content_hash))).scalar_one()
+
+        # Two quick edits → a single background recompute
+        for couleur in ("Noir", "Gris"):
+            resp = await client.put(
+                f"/wardrobe/item/{items[0].id}",
+                data={"type": "T-shirt", "couleur": couleur, "saison": "Été"},
+                headers=headers,
+            )
+            assert resp.status_code == 200
+        await wardrobe_score.wait_for_recomputes()
+        assert mock_score.await_count == 2
+
+        # Served from storage again, no further call
+        resp = await client.get(f"/wardrobe/{user_id}/score", headers=headers)
+        assert resp.json()["cached"] is True
+        assert mock_score.await_count == 2
+
+    session.expire_all()
+    new_hash = (await session.execute(select(WardrobeScore.content_hash))).scalar_one()
+    assert new_hash != old_hash
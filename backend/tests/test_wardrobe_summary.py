@@ -0,0 +1,120 @@
+"""
+Tests for the incrementally maintained wardrobe summary:
+- item contribution parsed from tags_ia, applied / reverted
+- upload / update / delete through the API keep the row equal to a full rebuild
+- quota check and analytics read the summary row
+- rebuild endpoint repairs and reports drift
+"""
+import io
+import json
+from unittest.mock import AsyncMock, patch
+
+from httpx import AsyncClient
+from sqlmodel import select
+
+from app.models import ClothingItem, WardrobeSummary
+from app.services import wardrobe_summary
+
+ADMIN = {"X-Admin-Key": "test-admin-key-1234567890"}
+TAGS = json.dumps({
+    "items": [{"style": "Casual"}],
+    "evaluation": {"note": 4, "prix_total_look": {"budget": {"min": 20}, "moyen": {"min": 60}, "premium": {"min": 150}}},
+})
+ANALYSIS = {"type": "Chemise", "couleur_dominante": "Blanc", "saison": "Été", "tags_ia": TAGS}
+
+
+def test_apply_and_revert_item_facts():
+    item = ClothingItem(user_id=1, type="Chemise", couleur="Blanc", saison="Été", tags_ia=TAGS,
+                        image_path="x", category="wardrobe")
+    facts = wardrobe_summary.item_facts(item)
+    assert facts["styles"] == "Casual" and facts["note"] == 4.0
+    assert facts["value"] == {"budget": 20.0, "moyen": 60.0, "premium": 150.0}
+
+    summary = WardrobeSummary(user_id=1)
+    wardrobe_summary.apply(summary, facts, +1)
+    body = wardrobe_summary.analytics(summary, 0)
+    assert body["total"] == 1
+    assert body["styles"] == [{"name": "Casual", "count": 1}]
+    assert body["avg_look_score"] == 4.0
+    assert body["wardrobe_value_eur"] == {"budget": 20, "moyen": 60, "premium": 150}
+
+    wardrobe_summary.apply(summary, facts, -1)
+    assert summary.total_items == 0
+    assert json.loads(summary.colors) == {}
+    assert summary.look_score_count == 0
+
+
+async def _snapshot(session, user_id) -> dict:
+    session.expire_all()
+    row = (await session.execute(select(WardrobeSummary).where(WardrobeSummary.user_id == user_id))).scalar_one()
+    return {f: getattr(row, f) for f in ("total_items", "category_counts", "colors", "types", "styles", "look_score_count")}
+
+
+async def test_writes_keep_summary_in_sync(client: AsyncClient, make_user, auth_headers, session):
+    created = await make_user(client, prenom="Summary")
+    user_id = created["user"]["id"]
+    headers = auth_headers(created["token"])
+
+    with patch("app.services.ai_service.analyze_clothing_image", new=AsyncMock(return_value=ANALYSIS)), \
+         patch("app.services.storage_service.save_image", new=AsyncMock(return_value="uploads/s.png")), \
+         patch("app.services.storage_service.delete_image", new=AsyncMock()):
+        ids = []
+        for category in ("wardrobe", "wardrobe", "wishlist"):
+            resp = await client.post(
+                "/wardrobe/upload",
+                files={"file": ("a.jpg", io.BytesIO(b"\xff\xd8\xff"), "image/jpeg")},
+                data={"user_id": str(user_id), "category": category},
+                headers=headers,
+            )
+            assert resp.status_code == 200, resp.text
+            ids.append(resp.json()["id"])
+        resp = await client.put(f"/wardrobe/item/{ids[0]}", data={"type": "Jean", "couleur": "Bleu", "saison": "Été"}, headers=headers)
+        assert resp.status_code == 200
+        resp = await client.delete(f"/wardrobe/item/{ids[1]}", headers=headers)
+        assert resp.status_code == 200
+
+    incremental = await _snapshot(session, user_id)
+    assert incremental["total_items"] == 2
+    assert json.loads(incremental["category_counts"]) == {"wardrobe": 1, "wishlist": 1}
+    assert json.loads(incremental["types"]) == {"Jean": 1}
+
+    _, drifted = await wardrobe_summary.rebuild(session, user_id)
+    await session.commit()
+    assert drifted is False
+    assert await _snapshot(session, user_id) == incremental
+
+    resp = await client.get(f"/wardrobe/{user_id}/analytics", headers=headers)
+    body = resp.json()
+    assert body["total"] == 1
+    assert body["colors"] == [{"name": "Bleu", "count": 1}]
+    assert body["avg_look_score"] == 4.0
+
+
+async def test_quota_reads_summary_and_rebuild_repairs_drift(
+    client: AsyncClient, make_user, auth_headers, session, make_clothing_item,
+):
+    created = await make_user(client, prenom="Drift")
+    user_id = created["user"]["id"]
+    headers = auth_headers(created["token"])
+
+    # Row built on first read; items inserted behind the API's back are not seen
+    resp = await client.get(f"/wardrobe/{user_id}/analytics", headers=headers)
+    assert resp.json()["total"] == 0
+    for i in range(20):
+        await make_clothing_item(session, user_id=user_id, type_=f"Item{i}")
+    resp = await client.get(f"/wardrobe/{user_id}/analytics", headers=headers)
+    assert resp.json()["total"] == 0
+
+    resp = await client.post("/admin/wardrobe-summaries/rebuild", headers=ADMIN)
+    assert resp.status_code == 200
+    assert resp.json()["drifted_user_ids"] == [user_id]
+
+    resp = await client.get(f"/wardrobe/{user_id}/analytics", headers=headers)
+    assert resp.json()["total"] == 20
+    resp = await client.post(
+        "/wardrobe/upload",
+        files={"file": ("a.jpg", io.BytesIO(b"\xff\xd8\xff"), "image/jpeg")},
+        data={"user_id": str(user_id)},
+        headers=headers,
+    )
+    assert resp.status_code == 403